@@ -75,6 +75,12 @@ class DataModifierFactory(Factory):
     The intended use is to associate the factory with a specific matrix of a dataset.
     Both the created parameters and the created data modifiers are supplied
     with a reference to the dataset and the name of the matrix they belong to.
+    The created parameters are cached per data modifier, as they are derived from
+    the dataset, and are shared among all callers until the dataset changes.
+
+    Public methods:
+
+    invalidate_params
     """
 
     def __init__(self, matrix_name: str, dataset: Dataset):
@@ -86,6 +92,10 @@ class DataModifierFactory(Factory):
         """
         Factory.__init__(self, matrix_name)
         self.dataset = dataset
+        # cache of the created parameters keyed by data modifier name
+        self.params = {}
+        # the dataset matrices/tables information that the cached parameters are created from
+        self.params_state = None
 
     def create(self, obj_name: str, obj_params: Dict[str, Any]=None, **kwargs) -> DataModifier:
         """Create and return a new data modifier with the specified name.
@@ -108,21 +118,41 @@ class DataModifierFactory(Factory):
         kwargs['matrix_name'] = self.factory_name
         return Factory.create(self, obj_name, obj_params, **kwargs)
 
+    def invalidate_params(self) -> None:
+        """Invalidate the cached parameters of the data modifiers.
+
+        The parameters are created again on the next request.
+        """
+        self.params = {}
+        self.params_state = None
+
     def on_create_params(self, obj_name: str) -> ConfigParameters:
         """Create parameters for the data modifier with the specified name.
 
+        The parameters are cached and are created again when the matrices
+        or tables of the dataset change. The returned parameters are shared
+        and are therefore not to be modified.
+
         Args:
             obj_name: name of the data modifier to create parameters for.
 
         Returns:
             the configuration parameters of the object or empty parameters when it does not exist.
         """
-        kwargs = {
-            'column_name': obj_name,
-            'dataset': self.dataset,
-            'matrix_name': self.factory_name
-        }
-        return self.factory[obj_name][FUNC_CREATE_PARAMS](**kwargs)
+        params_state = (self.dataset.get_matrices_info(), self.dataset.get_table_info())
+        if params_state != self.params_state:
+            self.invalidate_params()
+            self.params_state = params_state
+
+        if obj_name not in self.params:
+            kwargs = {
+                'column_name': obj_name,
+                'dataset': self.dataset,
+                'matrix_name': self.factory_name
+            }
+            self.params[obj_name] = self.factory[obj_name][FUNC_CREATE_PARAMS](**kwargs)
+
+        return self.params[obj_name]
 
 
 def create_data_modifier_factory(
@@ -10,8 +10,9 @@ Utrecht University within the Software Project course.
 """
 
 from abc import ABCMeta, abstractmethod
-from typing import Any, Dict
+from typing import Any, Dict, Optional, Tuple
 
+import numpy as np
 import pandas as pd
 
 from ..set import dataset as ds
@@ -22,6 +23,9 @@ class DataFilter(DataModifier, metaclass=ABCMeta):
     """Base class to filter a df (not a dataframe in particular).
 
     Public method:
+        create_id_mask
+        create_mask
+        get_column_name
         run
     """
 
@@ -47,8 +51,71 @@ class DataFilter(DataModifier, metaclass=ABCMeta):
         Return:
             The filtered dataframe.
         """
-        # Filtering that requires external columns i.e., filter column not available in dataframe.
-        return self._external_col_filter(dataframe)
+        return dataframe[self.create_mask(dataframe)].reset_index(drop=True)
+
+    def create_mask(self, dataframe: pd.DataFrame, mask: np.ndarray=None) -> np.ndarray:
+        """Create the boolean mask of the dataframe rows that pass the filter.
+
+        The filter column is taken from the dataframe, or from the dataset tables when
+        the column is not available in the dataframe (i.e. an external column).
+
+        Args:
+            dataframe: Dataframe to be filtered on.
+            mask: (optional) mask of the rows to evaluate the filter on, e.g. the rows
+                that passed the previous filters. The other rows never pass the filter.
+
+        Returns:
+            The mask of the rows that pass the filter.
+        """
+        if mask is None:
+            mask = np.ones(len(dataframe), dtype=bool)
+
+        column_name = self.get_column_name()
+        if column_name in dataframe.columns:
+            values = dataframe[column_name]
+        else:
+            values = ds.add_dataset_columns(
+                self.dataset, self.matrix_name, dataframe, [column_name]).get(column_name)
+
+        if values is None:
+            return np.zeros(len(dataframe), dtype=bool)
+
+        return mask & self._create_values_mask(values, mask)
+
+    def create_id_mask(self) -> Optional[Tuple[str, np.ndarray]]:
+        """Create the mask of the matrix user/item ids of which the attribute passes the filter.
+
+        The mask has an additional last entry that applies to the ids that are unknown.
+
+        Returns:
+            The matrix column ('user' or 'item') and the mask that is indexed by its ids,
+            or None when the filter column is not an attribute of the users/items.
+        """
+        column_name = self.get_column_name()
+        for table_name, table_columns in self.dataset.get_available_columns(
+                self.matrix_name).items():
+            if column_name not in table_columns:
+                continue
+
+            attributes = self.dataset.load_attribute_arrays(
+                self.matrix_name, table_name, [column_name])[column_name]
+            if attributes.key_name is None:
+                return None
+
+            # the ids past the last one are taken as the missing value
+            ids = pd.DataFrame({attributes.key_name: np.arange(len(attributes.values) + 1)})
+            values = pd.Series(attributes.take(ids))
+            return attributes.key_name, self._create_values_mask(values, None)
+
+        return None
+
+    def get_column_name(self) -> str:
+        """Get the name of the column that is filtered on.
+
+        Returns:
+            The column name, which is the name of the filter by default.
+        """
+        return self.get_name()
 
     @abstractmethod
     def get_type(self) -> str:
@@ -60,37 +127,18 @@ class DataFilter(DataModifier, metaclass=ABCMeta):
         raise NotImplementedError()
 
     @abstractmethod
-    def _filter(self, dataframe: pd.DataFrame) -> pd.DataFrame:
-        """Sugar coats subclasses' filter() for run and _external_col_filter as sugar.
+    def _create_values_mask(self, values: pd.Series, mask: np.ndarray) -> np.ndarray:
+        """Create the mask of the column values that pass the filter configuration.
+
+        Args:
+            values: The values of the filter column.
+            mask: The mask of the rows to evaluate the filter on.
 
         Raises:
             NotImplementedError: This method should be implemented in the subclasses.
         """
         raise NotImplementedError()
 
-    def _external_col_filter(self, dataframe: pd.DataFrame) -> pd.DataFrame:
-        """When filter needs a column from some dataset table located elsewhere.
-
-        Args:
-            dataframe: The dataframe to be filtered.
-
-        Returns:
-            A filtered dataframe.
-        """
-        # Add required columns
-        og_cols = dataframe.columns
-        new_dataframe = ds.add_dataset_columns(
-            self.dataset, self.matrix_name, dataframe, [self.get_name()])
-        new_cols = new_dataframe.columns
-
-        new_dataframe = self._filter(new_dataframe)
-
-        # Remove columns not in original dataframe
-        for new_col in new_cols:
-            if new_col not in og_cols:
-                new_dataframe = new_dataframe.drop([new_col], axis=1, errors='ignore')
-        return new_dataframe
-
     @staticmethod
     def __empty_df__(dataframe: pd.DataFrame) -> pd.DataFrame:
         """Return an empty dataframe with same columns."""
@@ -50,13 +50,17 @@ class CategoricalFilter(DataFilter):
         """
         if column_name not in dataframe.columns:
             return self.__empty_df__(dataframe)
-        conditions = self._handle_none_value(conditions)
-        df_filter = dataframe[column_name].isin(conditions)
+        df_filter = self._isin_conditions(dataframe[column_name], conditions)
         return dataframe[df_filter].reset_index(drop=True)
 
-    def _filter(self, dataframe: pd.DataFrame) -> pd.DataFrame:
-        """Private filter used in run(). Requires configuration file."""
-        return self.filter(dataframe, self.get_name(), self.params['values'])
+    def _create_values_mask(self, values: pd.Series, mask: numpy.ndarray) -> numpy.ndarray:
+        """Private mask used in create_mask(). Requires configuration file."""
+        return self._isin_conditions(values, self.params['values'])
+
+    @staticmethod
+    def _isin_conditions(values: pd.Series, conditions: List[Any]) -> numpy.ndarray:
+        """Create the mask of the values that are in the list of conditions."""
+        return values.isin(CategoricalFilter._handle_none_value(conditions)).to_numpy(dtype=bool)
 
     @staticmethod
     def _handle_none_value(conditions: List[Any]):
@@ -64,7 +68,7 @@ class CategoricalFilter(DataFilter):
         if conditions is None:
             return []
         if None in conditions:
-            conditions.append(numpy.NaN)
+            return list(conditions) + [numpy.NaN]
         return conditions
 
 
@@ -15,7 +15,8 @@ Utrecht University within the Software Project course.
 © Copyright Utrecht University (Department of Information and Computing Sciences)
 """
 
-from typing import Any, Dict
+from typing import Any, Dict, Optional, Tuple
+import numpy as np
 import pandas as pd
 from .base_filter import DataFilter
 from .filter_constants import FILTER_COUNT
@@ -50,16 +51,36 @@ class CountFilter(DataFilter):
         """
         if column_name not in dataframe.columns:
             return self.__empty_df__(dataframe)
-        value_counts = dataframe[column_name].value_counts(dropna=False)
-        key_dict = (value_counts >= threshold).to_dict()
-        df_filter = dataframe[column_name].replace(key_dict)
+        df_filter = self._count_threshold(dataframe[column_name], threshold)
         return dataframe[df_filter].reset_index(drop=True)
 
-    def _filter(self, dataframe: pd.DataFrame) -> pd.DataFrame:
-        """Private filter used in run(). Requires configuration file."""
-        return self.filter(dataframe,
-                           self.get_name()[:-len(('_' + FILTER_COUNT))],
-                           self.params['threshold'])
+    def create_id_mask(self) -> Optional[Tuple[str, np.ndarray]]:
+        """Create the mask of the matrix user/item ids that pass the filter.
+
+        Returns:
+            None, because the counts depend on the rows of the dataframe that is filtered.
+        """
+        return None
+
+    def get_column_name(self) -> str:
+        """Get the name of the column that is filtered on.
+
+        Returns:
+            The column name, which is the name of the filter without the count suffix.
+        """
+        return self.get_name()[:-len(('_' + FILTER_COUNT))]
+
+    def _create_values_mask(self, values: pd.Series, mask: np.ndarray) -> np.ndarray:
+        """Private mask used in create_mask(). Only counts the values of the masked rows."""
+        return self._count_threshold(values, self.params['threshold'], mask)
+
+    @staticmethod
+    def _count_threshold(values: pd.Series, threshold: int, mask: np.ndarray=None) -> np.ndarray:
+        """Create the mask of the values which count is above or equal to the threshold."""
+        counted = values if mask is None else values[mask]
+        value_counts = counted.value_counts(dropna=False)
+        # categorical columns are matched on their integer codes
+        return values.isin(value_counts.index[value_counts >= threshold]).to_numpy(dtype=bool)
 
 
 def create_count_filter(name: str, params: Dict[str, Any], **kwargs) -> CountFilter:
@@ -0,0 +1,68 @@
+"""This module contains a cache of subgroups that are resolved to the qualifying user/item ids.
+
+A subgroup (data subset) that is resolved consists of a list with an entry for each filter pass,
+which is a dictionary with the matrix column ('user' or 'item') as key and the boolean mask of
+the qualifying ids as value. The mask of each matrix column has an additional last entry
+that is used for the ids that are unknown to the dataset (i.e. a missing attribute).
+A filter pass entry is None when it depends on the rows of the dataframe that is filtered,
+for example the count filter, in which case the filter pass is evaluated on each dataframe.
+
+The cache is intended to be shared among the data and evaluation pipelines of an experiment,
+so that a subgroup is only resolved once and every use becomes a membership test of the ids.
+
+Classes:
+
+    SubgroupCache: cache of resolved subgroups keyed by their yml format.
+
+This program has been developed by students from the bachelor Computer Science at
+Utrecht University within the Software Project course.
+© Copyright Utrecht University (Department of Information and Computing Sciences)
+"""
+
+import json
+from threading import Lock
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+
+from .filter_config import DataSubsetConfig
+
+ResolvedSubgroup = List[Optional[Dict[str, np.ndarray]]]
+
+
+class SubgroupCache:
+    """Subgroup Cache that stores the resolved filter passes of data subsets.
+
+    The subgroups are keyed by their yml format, which includes the dataset and matrix name.
+
+    Public methods:
+
+    get_subgroup
+    """
+
+    def __init__(self):
+        """Construct the (empty) subgroup cache."""
+        self.subgroups = {}
+        self.lock = Lock()
+
+    def get_subgroup(
+            self,
+            subset: DataSubsetConfig,
+            resolve_subgroup: Callable[[DataSubsetConfig], ResolvedSubgroup]) -> ResolvedSubgroup:
+        """Get the resolved subgroup of the data subset, which is resolved when not cached.
+
+        Args:
+            subset: the data subset to get the resolved subgroup of.
+            resolve_subgroup: function that resolves the filter passes of the subset.
+
+        Returns:
+            the resolved filter passes of the subgroup.
+        """
+        key = json.dumps(subset.to_yml_format(), sort_keys=True, default=str)
+        with self.lock:
+            subgroup = self.subgroups.get(key)
+            if subgroup is None:
+                subgroup = resolve_subgroup(subset)
+                self.subgroups[key] = subgroup
+
+        return subgroup
@@ -33,8 +33,13 @@ def create_params_numerical(**kwargs) -> ConfigParameters:
 
     for table_name, table_columns in dataset.get_available_columns(matrix_name).items():
         if column_name in table_columns:
-            table = dataset.read_table(table_name, [column_name])
-            numerical_range = (int(table[column_name].min()), int(table[column_name].max()))
+            column_stats = dataset.get_column_stats(table_name, column_name, matrix_name)
+            # a column without (present) values has no range to filter on
+            if column_stats is None or column_stats.get('min') is None:
+                numerical_range = (0, 0)
+            else:
+                numerical_range = (int(column_stats['min']), int(column_stats['max']))
+
             params.add_range('range', int, numerical_range, numerical_range)
 
     return params
@@ -59,9 +64,15 @@ def create_params_categorical(**kwargs) -> ConfigParameters:
 
     for table_name, table_columns in dataset.get_available_columns(matrix_name).items():
         if column_name in table_columns:
-            table = dataset.read_table(table_name, [column_name])
-            categories = list(table[column_name].fillna('').unique())
-            categories = [None if len(c) == 0 else c for c in categories]
+            column_stats = dataset.get_column_stats(table_name, column_name, matrix_name)
+            if column_stats is not None and not column_stats.get('truncated', True):
+                categories = column_stats['categories']
+            else:
+                # the catalog only keeps the most frequent categories of columns with many
+                table = dataset.read_table(table_name, [column_name])
+                categories = list(table[column_name].astype(object).fillna('').unique())
+                categories = [None if len(c) == 0 else c for c in categories]
+
             params.add_multi_option('values', categories, categories)
 
     return params
@@ -1,77 +1,182 @@
 """This module contains a function that performs filtering from filter passes.
 
+Each filter creates a boolean mask over the rows of the original dataframe. The masks of
+the filters in a filter pass are combined with AND, where each filter is evaluated on the
+rows that passed the previous filters of the pass. The masks of the filter passes are
+combined with OR, after which the rows are taken from the dataframe at once.
+
+When a subgroup cache is used, the filter passes are resolved once to the qualifying
+user/item ids, and the masks are created with a membership test of the dataframe ids.
+
 Functions:
+    create_filter_passes_mask: Create the mask of the rows that pass any filter pass.
+    create_subgroup_pass_masks: Create the mask of each filter pass of a resolved subgroup.
     filter_from_filter_passes: Apply filter to filter passes.
+    resolve_filter_passes: Resolve the filter passes to the qualifying user/item ids.
 
 This program has been developed by students from the bachelor Computer Science at
 Utrecht University within the Software Project course.
 © Copyright Utrecht University (Department of Information and Computing Sciences)
 """
 
-import os
-import random
-import pandas as pd
+from typing import Dict
 
-from ...core.io.io_create import create_dir
-from ...core.io.io_delete import delete_dir
+import numpy as np
+import pandas as pd
 
-from ...core.config.config_factories import GroupFactory
-from ...core.pipeline.core_pipeline import CorePipeline
+from ...core.config.config_factories import Factory, GroupFactory
 
-from .filter_config import DataSubsetConfig
+from .filter_cache import ResolvedSubgroup, SubgroupCache
+from .filter_config import DataSubsetConfig, FilterPassConfig
 
 
-def filter_from_filter_passes(core_pipeline: CorePipeline,
-                              output_dir: str,
-                              dataframe: pd.DataFrame,
+def create_filter_passes_mask(dataframe: pd.DataFrame,
                               subset: DataSubsetConfig,
-                              filter_factory: GroupFactory) -> pd.DataFrame:
-    """Apply filter to filter passes inside DataSubsetConfig.
-
-    For each filter pass, a filtered dataframe is returned. After which the dataframes
-    are appended to each other and returned.
+                              filter_factory: GroupFactory,
+                              subgroup_cache: SubgroupCache=None) -> np.ndarray:
+    """Create the boolean mask of the dataframe rows that pass any of the filter passes.
 
     Args:
-        core_pipeline: Pipeline where this function is used. Required for IO actions.
-        output_dir: Directory to write temp dataframes to.
         dataframe: Dataframe to be filtered.
         subset: Configuration file containing filter passes.
         filter_factory: Factory containing filters.
+        subgroup_cache: (optional) cache of the subgroups resolved to user/item ids.
+
+    Raises:
+        RuntimeError: when a filter pass does not select any rows.
 
     Returns:
-        An aggregation of filtered dataframes.
+        The mask of the rows in the subset.
     """
-    # Create temp files and store base dataframe.
-    random_num_str = str(random.randint(0, 100000))  # To prevent concurrency issues.
-    dir_path = create_dir(os.path.join(output_dir, 'filter_passes_temp'),
-        core_pipeline.event_dispatcher)
-    og_df_path = os.path.join(dir_path, 'og_df' + random_num_str + '.tsv')
-    core_pipeline.write_dataframe(og_df_path, dataframe, True)
-
-    # Apply filter passes.
-    final_df = None
     filter_dataset_factory = filter_factory.get_factory(subset.dataset).get_factory(subset.matrix)
-    for filter_pass_config in subset.filter_passes:
-        dataframe = core_pipeline.read_dataframe(
-            og_df_path,
-            'original_dataframe',
-            'filter_passes.on_begin_load_original_dataframe',
-            'filter_passes.on_end_load_original_dataframe')
-        for _filter in filter_pass_config.filters:
-            filterobj = filter_dataset_factory.create(_filter.name, _filter.params)
-            dataframe = filterobj.run(dataframe)
-        if len(dataframe) == 0:
+
+    subgroup = [None] * len(subset.filter_passes)
+    if subgroup_cache is not None:
+        subgroup = subgroup_cache.get_subgroup(
+            subset,
+            lambda _subset: resolve_filter_passes(_subset, filter_factory)
+        )
+
+    subset_mask = np.zeros(len(dataframe), dtype=bool)
+    for filter_pass_config, id_masks in zip(subset.filter_passes, subgroup):
+        if id_masks is None or any(key not in dataframe.columns for key in id_masks):
+            pass_mask = _create_filter_pass_mask(
+                dataframe, filter_pass_config, filter_dataset_factory)
+        else:
+            pass_mask = _create_id_pass_mask(dataframe, id_masks)
+        if not pass_mask.any():
             raise RuntimeError(
                 'Filter pass generating empty dataset. Perhaps filters chosen too strictly.'
             )
-        # Add to final dataframe and remove duplicates as well.
-        final_df = pd.concat(
-            [final_df, dataframe], copy=False).drop_duplicates().reset_index(drop=True)
+        subset_mask |= pass_mask
+
+    return subset_mask
+
+
+def create_subgroup_pass_masks(dataframe: pd.DataFrame,
+                               subgroup: ResolvedSubgroup) -> np.ndarray:
+    """Create the boolean mask of the dataframe rows for each filter pass of a resolved subgroup.
 
-    delete_dir(dir_path, core_pipeline.event_dispatcher)
-    if len(final_df) == 0:
+    The masks only depend on the user/item ids of the rows, so that the masks of the
+    chunks of a dataframe are the same as the mask of the entire dataframe.
+
+    Args:
+        dataframe: Dataframe to be filtered.
+        subgroup: The subgroup of which all filter passes are resolved to user/item ids.
+
+    Returns:
+        The masks of the rows with a row for each filter pass.
+    """
+    pass_masks = np.zeros((len(subgroup), len(dataframe)), dtype=bool)
+    for i, id_masks in enumerate(subgroup):
+        pass_masks[i] = _create_id_pass_mask(dataframe, id_masks)
+
+    return pass_masks
+
+
+def filter_from_filter_passes(dataframe: pd.DataFrame,
+                              subset: DataSubsetConfig,
+                              filter_factory: GroupFactory,
+                              subgroup_cache: SubgroupCache=None) -> pd.DataFrame:
+    """Apply filter to filter passes inside DataSubsetConfig.
+
+    The rows that pass any of the filter passes are taken from the dataframe,
+    in the original order of the dataframe.
+
+    Args:
+        dataframe: Dataframe to be filtered.
+        subset: Configuration file containing filter passes.
+        filter_factory: Factory containing filters.
+        subgroup_cache: (optional) cache of the subgroups resolved to user/item ids.
+
+    Raises:
+        RuntimeError: when a filter pass does not select any rows.
+
+    Returns:
+        The subset of the dataframe with a new index.
+    """
+    subset_mask = create_filter_passes_mask(dataframe, subset, filter_factory, subgroup_cache)
+    if not subset_mask.any():
         raise RuntimeError(
             'Wholly filtered dataframe is empty. All filter passes too strict or initial \
             dataframe missing.'
         )
-    return final_df
+
+    return dataframe.take(np.flatnonzero(subset_mask)).reset_index(drop=True)
+
+
+def resolve_filter_passes(subset: DataSubsetConfig,
+                          filter_factory: GroupFactory) -> ResolvedSubgroup:
+    """Resolve the filter passes inside DataSubsetConfig to the qualifying user/item ids.
+
+    Args:
+        subset: Configuration file containing filter passes.
+        filter_factory: Factory containing filters.
+
+    Returns:
+        A dictionary for each filter pass with the matrix column ('user' or 'item') as key
+        and the mask of the qualifying ids as value, or None when the filter pass
+        depends on the rows of the dataframe that is filtered.
+    """
+    filter_dataset_factory = filter_factory.get_factory(subset.dataset).get_factory(subset.matrix)
+
+    subgroup = []
+    for filter_pass_config in subset.filter_passes:
+        id_masks = {}
+        for _filter in filter_pass_config.filters:
+            filterobj = filter_dataset_factory.create(_filter.name, _filter.params)
+            id_mask = filterobj.create_id_mask()
+            if id_mask is None:
+                id_masks = None
+                break
+
+            key_name, mask = id_mask
+            id_masks[key_name] = mask & id_masks[key_name] if key_name in id_masks else mask
+
+        subgroup.append(id_masks)
+
+    return subgroup
+
+
+def _create_filter_pass_mask(dataframe: pd.DataFrame,
+                             filter_pass_config: FilterPassConfig,
+                             filter_dataset_factory: Factory) -> np.ndarray:
+    """Create the mask of the dataframe rows that pass the filters of the filter pass."""
+    pass_mask = np.ones(len(dataframe), dtype=bool)
+    for _filter in filter_pass_config.filters:
+        filterobj = filter_dataset_factory.create(_filter.name, _filter.params)
+        pass_mask = filterobj.create_mask(dataframe, pass_mask)
+
+    return pass_mask
+
+
+def _create_id_pass_mask(dataframe: pd.DataFrame, id_masks: Dict[str, np.ndarray]) -> np.ndarray:
+    """Create the mask of the dataframe rows of which the user/item ids qualify for the pass."""
+    pass_mask = np.ones(len(dataframe), dtype=bool)
+    for key_name, id_mask in id_masks.items():
+        ids = dataframe[key_name].to_numpy()
+        # the last entry of the mask applies to the ids that are unknown
+        num_ids = len(id_mask) - 1
+        pass_mask &= id_mask[np.where((ids >= 0) & (ids < num_ids), ids, num_ids)]
+
+    return pass_mask
@@ -16,6 +16,7 @@ Utrecht University within the Software Project course.
 
 import math
 from typing import Any, Dict
+import numpy as np
 import pandas as pd
 from .base_filter import DataFilter
 from .filter_constants import FILTER_NUMERICAL
@@ -53,11 +54,11 @@ class NumericalFilter(DataFilter):
         df_filter = dataframe[column_name].between(min_val, max_val, inclusive="both")
         return dataframe[df_filter].reset_index(drop=True)
 
-    def _filter(self, dataframe: pd.DataFrame) -> pd.DataFrame:
-        """Private filter used in run(). Requires configuration file."""
+    def _create_values_mask(self, values: pd.Series, mask: np.ndarray) -> np.ndarray:
+        """Private mask used in create_mask(). Requires configuration file."""
         numerical_range = self.params['range']
-        return self.filter(dataframe, self.get_name(),
-                           numerical_range["min"], numerical_range["max"])
+        return values.between(numerical_range["min"], numerical_range["max"],
+                              inclusive="both").to_numpy(dtype=bool)
 
     def _filter_empty(self, dataframe: pd.DataFrame) -> pd.DataFrame:
         """Filter only the empty value: -1."""
@@ -2,6 +2,7 @@
 
 Modules:
 
+    data_cache: content-addressed cache of the train and test sets.
     data_config: dataset configuration class.
     data_config_parsing: parse dataset configuration.
     data_event: event ids, event args and a print switch for the data pipeline.
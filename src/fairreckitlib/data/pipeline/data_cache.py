@@ -0,0 +1,265 @@
+"""This module contains functionality to cache the train and test sets of the data pipeline.
+
+The train and test sets are cached in a content-addressed directory, of which the key is the
+hash of the dataset matrix fingerprint and the data matrix configuration. The configuration
+consists of the matrix, the filter passes, the rating converter and the splitter with its test
+ratio and seed, and whether the sets are streamed (which orders the rows by user). The
+fingerprint of the matrix consists of its configuration and the modification time and size
+of its file(s), the user/item indirection array files and the files of the tables that the
+filter passes read, so that a changed matrix, indirection array or filtered table is never
+a cache hit.
+Configurations with an unspecified random seed are not cached, as these are not reproducible.
+
+A cached entry consists of the train and test set files and a json file with the rating scale,
+that is stored last so that an entry is only available when it is complete. The cached sets
+are hard-linked into the data output directory (or copied when linking is not possible).
+
+Constants:
+
+    DATA_CACHE_FILE: the name of the json file of a cached entry.
+    DATA_CACHE_SETS: the names of the train and test set files of a cached entry.
+    KEY_RATING_SCALE: the key of the rating scale in the json file of a cached entry.
+
+Functions:
+
+    get_data_cache_key: get the key of the train and test sets of a data matrix configuration.
+    load_cached_sets: load the cached train and test sets into a data output directory.
+    save_cached_sets: save the train and test sets in the cache.
+
+This program has been developed by students from the bachelor Computer Science at
+Utrecht University within the Software Project course.
+© Copyright Utrecht University (Department of Information and Computing Sciences)
+"""
+
+import hashlib
+import json
+import os
+import shutil
+from typing import Any, Dict, List, Optional, Tuple
+
+from ...core.core_constants import KEY_RANDOM_SEED
+from ...core.io.io_utility import load_json, save_json
+from ..filter.filter_constants import FILTER_COUNT
+from ..set.dataset import Dataset
+from ..set.dataset_constants import KEY_MATRIX
+from .data_config import DataMatrixConfig
+
+DATA_CACHE_FILE = 'data_cache.json'
+DATA_CACHE_SETS = ('train_set.tsv', 'test_set.tsv')
+
+KEY_RATING_SCALE = 'rating_scale'
+
+
+def get_data_cache_key(
+        dataset: Dataset,
+        data_config: DataMatrixConfig,
+        *,
+        streamed: bool=False) -> Optional[str]:
+    """Get the key of the train and test sets that are produced for a data matrix configuration.
+
+    Args:
+        dataset: the dataset of the data matrix configuration.
+        data_config: the data matrix configuration.
+        streamed: whether the sets are streamed in user partitions,
+            which determines the order of the rows in the sets.
+
+    Returns:
+        the hexadecimal key of the train and test sets or None when the configuration
+        is not reproducible or the dataset matrix is not available.
+    """
+    config = data_config.to_yml_format()
+    if _has_unspecified_seed(config):
+        return None
+
+    matrix_config = dataset.get_matrix_config(data_config.matrix)
+    matrix_path = dataset.get_matrix_file_path(data_config.matrix)
+    if matrix_config is None or not os.path.exists(matrix_path):
+        return None
+
+    index_paths = [os.path.join(dataset.data_dir, index_config.file_name)
+                   for index_config in [matrix_config.user, matrix_config.item]
+                   if index_config.file_name is not None]
+
+    fingerprint = {
+        'dataset': dataset.get_name(),
+        'matrix': matrix_config.to_yml_format(),
+        'matrix_stat': _get_path_stat(matrix_path),
+        'indices_stat': [_get_path_stat(path) for path in index_paths if os.path.exists(path)],
+        'tables_stat': _get_filter_tables_stat(dataset, data_config),
+        'config': config
+    }
+    if streamed:
+        fingerprint['streamed'] = True
+
+    data = json.dumps(fingerprint, sort_keys=True, default=str)
+    return hashlib.sha256(data.encode('utf-8')).hexdigest()
+
+
+def load_cached_sets(
+        cache_dir: str,
+        cache_key: str,
+        output_dir: str) -> Optional[Tuple[str, str, Tuple[float, float]]]:
+    """Load the cached train and test sets into the data output directory.
+
+    Args:
+        cache_dir: the directory of the data cache.
+        cache_key: the key of the train and test sets.
+        output_dir: the data output directory to store the train and test sets.
+
+    Returns:
+        the paths of the train and test set in the output directory and the rating scale
+        of the sets, or None when the sets are not cached.
+    """
+    entry_dir = os.path.join(cache_dir, cache_key)
+    try:
+        entry = load_json(os.path.join(entry_dir, DATA_CACHE_FILE))
+    except (FileNotFoundError, ValueError):
+        return None
+
+    set_paths = []
+    for _, file_name in enumerate(DATA_CACHE_SETS):
+        set_path = os.path.join(output_dir, file_name)
+        try:
+            _link_file(os.path.join(entry_dir, file_name), set_path)
+        except FileNotFoundError:
+            return None
+
+        set_paths.append(set_path)
+
+    rating_min, rating_max = entry[KEY_RATING_SCALE]
+    return set_paths[0], set_paths[1], (rating_min, rating_max)
+
+
+def save_cached_sets(
+        cache_dir: str,
+        cache_key: str,
+        train_set_path: str,
+        test_set_path: str,
+        rating_scale: Tuple[float, float]) -> None:
+    """Save the train and test sets in the data cache.
+
+    The entry is created in a temporary directory that is renamed when complete,
+    which leaves an entry that is already cached (concurrently) untouched.
+
+    Args:
+        cache_dir: the directory of the data cache, which is created when it does not exist.
+        cache_key: the key of the train and test sets.
+        train_set_path: the path to the train set file.
+        test_set_path: the path to the test set file.
+        rating_scale: the minimum and maximum rating in the train and test set combined.
+    """
+    entry_dir = os.path.join(cache_dir, cache_key)
+    if os.path.isdir(entry_dir):
+        return
+
+    os.makedirs(cache_dir, exist_ok=True)
+    tmp_dir = os.path.join(cache_dir, 'tmp_' + cache_key + '_' + str(os.getpid()))
+    if os.path.isdir(tmp_dir):
+        shutil.rmtree(tmp_dir)
+    os.mkdir(tmp_dir)
+
+    for file_name, set_path in zip(DATA_CACHE_SETS, [train_set_path, test_set_path]):
+        _link_file(set_path, os.path.join(tmp_dir, file_name))
+
+    save_json(os.path.join(tmp_dir, DATA_CACHE_FILE), {
+        KEY_RATING_SCALE: [float(rating_scale[0]), float(rating_scale[1])]
+    })
+
+    try:
+        os.rename(tmp_dir, entry_dir)
+    except OSError:
+        # the entry is cached concurrently
+        shutil.rmtree(tmp_dir)
+
+
+def _get_filter_tables_stat(
+        dataset: Dataset,
+        data_config: DataMatrixConfig) -> Dict[str, List[List[Any]]]:
+    """Get the stat of the file(s) of the dataset tables that the filter passes read.
+
+    The filters read the column of their name from the tables (see add_dataset_columns),
+    of which the count filters strip the count suffix of their name.
+
+    Args:
+        dataset: the dataset of the data matrix configuration.
+        data_config: the data matrix configuration with the filter passes.
+
+    Returns:
+        a dictionary with the table name as key and the stat of its file(s) as value.
+    """
+    column_names = set()
+    for filter_pass_config in data_config.filter_passes:
+        for filter_config in filter_pass_config.filters:
+            column_names.add(filter_config.name)
+            if filter_config.name.endswith('_' + FILTER_COUNT):
+                column_names.add(filter_config.name[:-len('_' + FILTER_COUNT)])
+
+    result = {}
+    for table_name, table_columns in dataset.get_available_columns(data_config.matrix).items():
+        # the matrix is already part of the fingerprint
+        if table_name == KEY_MATRIX or not column_names.intersection(table_columns):
+            continue
+
+        table_path = os.path.join(dataset.data_dir, dataset.config.tables[table_name].file.name)
+        if os.path.exists(table_path):
+            result[table_name] = _get_path_stat(table_path)
+
+    return result
+
+
+def _get_path_stat(path: str) -> List[List[Any]]:
+    """Get the relative name, modification time and size of the file(s) of the path.
+
+    Args:
+        path: the path to a file or a directory of files.
+
+    Returns:
+        a sorted list with the name, modification time (in nanoseconds) and size of each file.
+    """
+    if not os.path.isdir(path):
+        stat = os.stat(path)
+        return [[os.path.basename(path), stat.st_mtime_ns, stat.st_size]]
+
+    result = []
+    for root, _, file_names in os.walk(path):
+        for file_name in file_names:
+            stat = os.stat(os.path.join(root, file_name))
+            name = os.path.relpath(os.path.join(root, file_name), path)
+            result.append([name, stat.st_mtime_ns, stat.st_size])
+
+    return sorted(result)
+
+
+def _has_unspecified_seed(config: Any) -> bool:
+    """Check whether the (yml formatted) configuration has an unspecified random seed."""
+    if isinstance(config, dict):
+        return any(
+            (key == KEY_RANDOM_SEED and value is None) or _has_unspecified_seed(value)
+            for key, value in config.items()
+        )
+    if isinstance(config, list):
+        return any(_has_unspecified_seed(value) for value in config)
+
+    return False
+
+
+def _link_file(src_path: str, dst_path: str) -> None:
+    """Hard-link the source file to the destination or copy it when linking fails.
+
+    Args:
+        src_path: the path to the source file.
+        dst_path: the path to the destination file, which is replaced when it exists.
+
+    Raises:
+        FileNotFoundError: when the source file does not exist.
+    """
+    if os.path.isfile(dst_path):
+        os.remove(dst_path)
+
+    if not os.path.isfile(src_path):
+        raise FileNotFoundError('Unable to link unknown file: ' + src_path)
+
+    try:
+        os.link(src_path, dst_path)
+    except OSError:
+        shutil.copyfile(src_path, dst_path)
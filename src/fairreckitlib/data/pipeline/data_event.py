@@ -14,6 +14,7 @@ Constants:
     ON_END_MODIFY_DATASET: id of the event that is used when dataset ratings have been modified.
     ON_END_SAVE_SETS: id of the event that is used when the train and test sets have been saved.
     ON_END_SPLIT_DATASET: id of the event that is used when a dataset has been split.
+    ON_LOAD_CACHED_SETS: id of the event that is used when cached train and test sets are loaded.
 
 Classes:
 
@@ -52,6 +53,7 @@ ON_END_LOAD_DATASET = 'DataPipeline.on_end_load_dataset'
 ON_END_CONVERT_RATINGS = 'DataPipeline.on_end_convert_ratings'
 ON_END_SAVE_SETS = 'DataPipeline.on_end_save_sets'
 ON_END_SPLIT_DATASET = 'DataPipeline.on_end_split_dataset'
+ON_LOAD_CACHED_SETS = 'DataPipeline.on_load_cached_sets'
 
 
 @dataclass
@@ -117,6 +119,7 @@ def get_data_events() -> List[str]:
         # SaveSetsEventArgs
         ON_BEGIN_SAVE_SETS,
         ON_END_SAVE_SETS,
+        ON_LOAD_CACHED_SETS,
     ]
 
 
@@ -157,5 +160,8 @@ def get_data_event_print_switch(elapsed_time: float=None) -> Dict[str,Callable[[
         ON_END_SAVE_SETS:
             lambda args: print(f'Saved train and test sets in {elapsed_time:1.4f}s'),
         ON_END_SPLIT_DATASET:
-            lambda args: print_split_event_args(args, elapsed_time)
+            lambda args: print_split_event_args(args, elapsed_time),
+        ON_LOAD_CACHED_SETS:
+            lambda args: print('Loaded cached train set to', args.train_set_path,
+                               '\nLoaded cached test set to', args.test_set_path)
     }
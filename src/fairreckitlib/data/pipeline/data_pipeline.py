@@ -1,5 +1,9 @@
 """This module contains functionality of the complete data pipeline.
 
+Constants:
+
+    STREAM_MATRIX_DTYPES: the dtypes of the standardized matrix columns when streamed.
+
 Classes:
 
     DataPipeline: class that performs dataset operations in preparation for the model pipeline.
@@ -9,10 +13,13 @@ Utrecht University within the Software Project course.
 © Copyright Utrecht University (Department of Information and Computing Sciences)
 """
 
+import math
 import os
+import tempfile
 import time
-from typing import Callable, Optional, Tuple
+from typing import Callable, Iterable, List, Optional, Tuple
 
+import numpy as np
 import pandas as pd
 
 from ...core.config.config_factories import GroupFactory
@@ -21,18 +28,23 @@ from ...core.events.event_error import ON_FAILURE_ERROR, ErrorEventArgs
 from ...core.io.io_create import create_dir
 from ...core.pipeline.core_pipeline import CorePipeline
 from ..data_transition import DataTransition
+from ..filter.filter_cache import ResolvedSubgroup, SubgroupCache
 from ..filter.filter_config import DataSubsetConfig
 from ..filter.filter_constants import KEY_DATA_SUBSET
 from ..filter.filter_event import FilterDataframeEventArgs
-from ..filter.filter_passes import filter_from_filter_passes
+from ..filter.filter_passes import create_subgroup_pass_masks, filter_from_filter_passes
+from ..filter.filter_passes import resolve_filter_passes
+from ..ratings.base_converter import RatingConverter
 from ..ratings.convert_config import ConvertConfig
 from ..ratings.convert_event import ConvertRatingsEventArgs
 from ..ratings.rating_converter_factory import KEY_RATING_CONVERTER
 from ..set.dataset import Dataset
 # from ..filter.filter_constants import KEY_DATA_FILTERS, deduce_filter_type
+from ..split.base_splitter import DataSplitter
 from ..split.split_config import SplitConfig
 from ..split.split_constants import KEY_SPLITTING, KEY_SPLIT_TEST_RATIO
 from ..split.split_event import SplitDataframeEventArgs
+from .data_cache import get_data_cache_key, load_cached_sets, save_cached_sets
 from .data_config import DataMatrixConfig
 from .data_event import ON_BEGIN_DATA_PIPELINE, ON_END_DATA_PIPELINE, DatasetEventArgs
 from .data_event import ON_BEGIN_LOAD_DATASET, ON_END_LOAD_DATASET, DatasetMatrixEventArgs
@@ -40,6 +52,14 @@ from .data_event import ON_BEGIN_FILTER_DATASET, ON_END_FILTER_DATASET
 from .data_event import ON_BEGIN_CONVERT_RATINGS, ON_END_CONVERT_RATINGS
 from .data_event import ON_BEGIN_SPLIT_DATASET, ON_END_SPLIT_DATASET
 from .data_event import ON_BEGIN_SAVE_SETS, ON_END_SAVE_SETS, SaveSetsEventArgs
+from .data_event import ON_LOAD_CACHED_SETS
+
+STREAM_MATRIX_DTYPES = {
+    'user': np.int64,
+    'item': np.int64,
+    'rating': np.float64,
+    'timestamp': np.int64
+}
 
 
 class DataPipeline(CorePipeline):
@@ -57,21 +77,63 @@ class DataPipeline(CorePipeline):
     5) split the dataframe into a train and test set.
     6) save the train and test set in the output directory.
 
+    When the pipeline is constructed with a data cache directory, the train and test sets
+    are cached by the fingerprint of the dataset matrix and the data matrix configuration.
+    Steps 2-6 are skipped when the sets of the same (seeded) configuration are cached
+    already, in which case the cached sets are linked into the output directory instead.
+
+    When the pipeline is constructed with a chunk size, steps 2-6 are streamed instead,
+    so that the matrix is never loaded into memory as a whole:
+
+    2-3) load the matrix in chunks, filter the rows of each chunk on the subgroup that is
+        resolved to user/item ids and append the rows to the user partition files on disk.
+    4-6) convert the ratings of the partitions in chunked mode, split each partition into
+        a train and test set and append these to the train and test set files in order
+        of the users.
+
+    The users are partitioned by contiguous ranges of their ids, which are cut by the
+    cumulative number of rows of the users (the interaction counts of the statistics catalog),
+    so that each partition has approximately the chunk size number of rows and all the rows
+    of a user are split together. Each partition is a single file of binary records to which
+    the rows of the chunks are appended, and that is read back with the same dtypes.
+    The matrix is read with the explicit dtypes of STREAM_MATRIX_DTYPES rather than the
+    dtypes that are inferred from each chunk, so that the ratings of the sets are floats.
+    The rows of the sets are ordered by user and then by their order in the matrix, and the
+    splitters only depend on the rows of each user, so that the resulting sets are the same
+    for a fixed seed regardless of the chunk size. Filter passes that depend on the rows of
+    the matrix (e.g. count filters) are not supported in this mode, in which case the run
+    raises a RuntimeError that names these filters, before any rows are read.
+
     Public methods:
 
     run
     """
 
-    def __init__(self, data_factory: GroupFactory, event_dispatcher: EventDispatcher):
+    def __init__(
+            self,
+            data_factory: GroupFactory,
+            event_dispatcher: EventDispatcher,
+            *,
+            cache_dir: str=None,
+            subgroup_cache: SubgroupCache=None,
+            chunk_size: int=None):
         """Construct the DataPipeline.
 
         Args:
             data_factory: the factory with available data modifier factories.
             event_dispatcher: used to dispatch data/IO events when running the pipeline.
+            cache_dir: (optional) the directory to cache the train and test sets in,
+                which is expected to be outside the result directory.
+            subgroup_cache: (optional) the cache of resolved subgroups to filter rows with.
+            chunk_size: (optional) the number of rows to stream the dataset matrix with
+                or None to process the matrix in memory.
         """
         CorePipeline.__init__(self, event_dispatcher)
         self.split_datasets = {}
         self.data_factory = data_factory
+        self.cache_dir = cache_dir
+        self.subgroup_cache = subgroup_cache
+        self.chunk_size = chunk_size
 
     def run(self,
             output_dir: str,
@@ -80,6 +142,9 @@ class DataPipeline(CorePipeline):
             is_running: Callable[[], bool]) -> Optional[DataTransition]:
         """Run the entire data pipeline from beginning to end.
 
+        The train and test sets are loaded from the data cache instead, when the
+        pipeline has a cache directory that contains the sets of the configuration.
+
         Args:
             output_dir: the path of the directory to store the output.
             dataset: the dataset to run the pipeline on.
@@ -108,31 +173,62 @@ class DataPipeline(CorePipeline):
         # step 1
         data_dir = self.create_data_output_dir(output_dir, data_config)
 
-        # step 2
-        dataframe = self.load_from_dataset(dataset, data_config.matrix)
-        if not is_running():
-            return None
-
-        # step 3
-        dataframe = self.filter_rows(output_dir, dataframe, data_config)
-        if not is_running():
-            return None
-
-        # step 4
-        dataframe = self.convert_ratings(dataset,
-                                         data_config.matrix,
-                                         dataframe,
-                                         data_config.converter)
-        if not is_running():
-            return None
-
-        # step 5
-        train_set, test_set = self.split(dataframe, data_config.splitting)
-        if not is_running():
-            return None
-
-        # step 6
-        train_set_path, test_set_path = self.save_sets(data_dir, train_set, test_set)
+        cache_key = None
+        if self.cache_dir is not None:
+            cache_key = get_data_cache_key(
+                dataset,
+                data_config,
+                streamed=self.chunk_size is not None
+            )
+
+        data_output = self.load_cached_sets(dataset, data_config, data_dir, cache_key)
+        if data_output is not None:
+            self.split_datasets[data_config.get_data_matrix_name()] += 1
+
+            self.event_dispatcher.dispatch(DatasetEventArgs(
+                ON_END_DATA_PIPELINE,
+                dataset.get_name()
+            ), elapsed_time=time.time() - start)
+
+            return data_output
+
+        if self.chunk_size is not None:
+            # steps 2-6
+            streamed_sets = self.stream_sets(data_dir, dataset, data_config, is_running)
+            if streamed_sets is None:
+                return None
+
+            train_set_path, test_set_path, rating_scale = streamed_sets
+        else:
+            # step 2
+            dataframe = self.load_from_dataset(dataset, data_config.matrix)
+            if not is_running():
+                return None
+
+            # step 3
+            dataframe = self.filter_rows(dataframe, data_config)
+            if not is_running():
+                return None
+
+            # step 4
+            dataframe = self.convert_ratings(dataset,
+                                             data_config.matrix,
+                                             dataframe,
+                                             data_config.converter)
+            if not is_running():
+                return None
+
+            # step 5
+            train_set, test_set = self.split(dataframe, data_config.splitting)
+            if not is_running():
+                return None
+
+            # step 6
+            train_set_path, test_set_path = self.save_sets(data_dir, train_set, test_set)
+            rating_scale = (dataframe['rating'].min(), dataframe['rating'].max())
+
+        if cache_key is not None:
+            save_cached_sets(self.cache_dir, cache_key, train_set_path, test_set_path, rating_scale)
 
         # update data matrix counter
         self.split_datasets[data_config.get_data_matrix_name()] += 1
@@ -150,7 +246,7 @@ class DataPipeline(CorePipeline):
             data_dir,
             train_set_path,
             test_set_path,
-            (dataframe['rating'].min(), dataframe['rating'].max())
+            rating_scale
         )
 
         return data_output
@@ -174,6 +270,46 @@ class DataPipeline(CorePipeline):
         data_dir = os.path.join(output_dir, dataset_matrix_name + '_' + str(index))
         return create_dir(data_dir, self.event_dispatcher)
 
+    def load_cached_sets(
+            self,
+            dataset: Dataset,
+            data_config: DataMatrixConfig,
+            data_dir: str,
+            cache_key: Optional[str]) -> Optional[DataTransition]:
+        """Load the cached train and test sets of the data matrix configuration.
+
+        Args:
+            dataset: the dataset of the data matrix configuration.
+            data_config: the data matrix configuration to load the sets of.
+            data_dir: the path of the directory to store the train and test sets.
+            cache_key: the key of the train and test sets or None when not cached.
+
+        Returns:
+            the data transition of the cached sets or None when the sets are not cached.
+        """
+        if cache_key is None:
+            return None
+
+        cached_sets = load_cached_sets(self.cache_dir, cache_key, data_dir)
+        if cached_sets is None:
+            return None
+
+        train_set_path, test_set_path, rating_scale = cached_sets
+        self.event_dispatcher.dispatch(SaveSetsEventArgs(
+            ON_LOAD_CACHED_SETS,
+            train_set_path,
+            test_set_path
+        ))
+
+        return DataTransition(
+            dataset,
+            data_config.matrix,
+            data_dir,
+            train_set_path,
+            test_set_path,
+            rating_scale
+        )
+
     def load_from_dataset(self, dataset: Dataset, matrix_name: str) -> pd.DataFrame:
         """Load in the desired dataset matrix into a dataframe.
 
@@ -221,7 +357,6 @@ class DataPipeline(CorePipeline):
         return dataframe
 
     def filter_rows(self,
-                    output_dir: str,
                     dataframe: pd.DataFrame,
                     subset: DataSubsetConfig) -> pd.DataFrame:
         """Apply the specified subset filters to the dataframe.
@@ -247,7 +382,8 @@ class DataPipeline(CorePipeline):
 
         start = time.time()
         filter_factory = self.data_factory.get_factory(KEY_DATA_SUBSET)
-        dataframe = filter_from_filter_passes(self, output_dir, dataframe, subset, filter_factory)
+        dataframe = filter_from_filter_passes(
+            dataframe, subset, filter_factory, self.subgroup_cache)
         end = time.time()
 
         self.event_dispatcher.dispatch(FilterDataframeEventArgs(
@@ -286,20 +422,7 @@ class DataPipeline(CorePipeline):
         ))
 
         start = time.time()
-
-        converter_factory = self.data_factory.get_factory(KEY_RATING_CONVERTER)
-        dataset_converter_factory = converter_factory.get_factory(dataset.get_name())
-        matrix_converter_factory = dataset_converter_factory.get_factory(matrix_name)
-
-        converter = matrix_converter_factory.create(convert_config.name, convert_config.params)
-        if converter is None:
-            self.event_dispatcher.dispatch(ErrorEventArgs(
-                ON_FAILURE_ERROR,
-                'Failure: to get converter from factory: ' + convert_config.name
-            ))
-            # raise error so the data run aborts
-            raise RuntimeError()
-
+        converter = self.create_converter(dataset, matrix_name, convert_config)
         dataframe = converter.run(dataframe)
 
         end = time.time()
@@ -336,17 +459,7 @@ class DataPipeline(CorePipeline):
         ))
 
         start = time.time()
-        split_kwargs = {KEY_SPLIT_TEST_RATIO: split_config.test_ratio}
-        split_factory = self.data_factory.get_factory(KEY_SPLITTING)
-        splitter = split_factory.create(split_config.name, split_config.params, **split_kwargs)
-        if splitter is None:
-            self.event_dispatcher.dispatch(ErrorEventArgs(
-                ON_FAILURE_ERROR,
-                'Failure: to get splitter from factory: ' + split_config.name
-            ))
-            # raise error so the data run aborts
-            raise RuntimeError()
-
+        splitter = self.create_splitter(split_config)
         train_set, test_set = splitter.run(dataframe)
         end = time.time()
 
@@ -397,3 +510,376 @@ class DataPipeline(CorePipeline):
         ), elapsed_time=end - start)
 
         return train_set_path, test_set_path
+
+    def create_converter(
+            self,
+            dataset: Dataset,
+            matrix_name: str,
+            convert_config: ConvertConfig) -> RatingConverter:
+        """Create the rating converter of the specified configuration.
+
+        Args:
+            dataset: the dataset of the matrix to convert the ratings of.
+            matrix_name: the name of the dataset matrix.
+            convert_config: the configuration of the converter.
+
+        Raises:
+            RuntimeError: when the converter specified by the configuration is not available.
+
+        Returns:
+            the created rating converter.
+        """
+        converter_factory = self.data_factory.get_factory(KEY_RATING_CONVERTER)
+        dataset_converter_factory = converter_factory.get_factory(dataset.get_name())
+        matrix_converter_factory = dataset_converter_factory.get_factory(matrix_name)
+
+        converter = matrix_converter_factory.create(convert_config.name, convert_config.params)
+        if converter is None:
+            self.event_dispatcher.dispatch(ErrorEventArgs(
+                ON_FAILURE_ERROR,
+                'Failure: to get converter from factory: ' + convert_config.name
+            ))
+            # raise error so the data run aborts
+            raise RuntimeError()
+
+        return converter
+
+    def create_splitter(self, split_config: SplitConfig) -> DataSplitter:
+        """Create the data splitter of the specified configuration.
+
+        Args:
+            split_config: the dataset splitting configuration.
+
+        Raises:
+            RuntimeError: when the splitter specified by the configuration is not available.
+
+        Returns:
+            the created data splitter.
+        """
+        split_kwargs = {KEY_SPLIT_TEST_RATIO: split_config.test_ratio}
+        split_factory = self.data_factory.get_factory(KEY_SPLITTING)
+        splitter = split_factory.create(split_config.name, split_config.params, **split_kwargs)
+        if splitter is None:
+            self.event_dispatcher.dispatch(ErrorEventArgs(
+                ON_FAILURE_ERROR,
+                'Failure: to get splitter from factory: ' + split_config.name
+            ))
+            # raise error so the data run aborts
+            raise RuntimeError()
+
+        return splitter
+
+    def stream_sets(
+            self,
+            output_dir: str,
+            dataset: Dataset,
+            data_config: DataMatrixConfig,
+            is_running: Callable[[], bool]) -> Optional[Tuple[str, str, Tuple[float, float]]]:
+        """Stream the dataset matrix in chunks into the train and test set.
+
+        The user partition files are stored in a temporary directory in the output directory,
+        which is removed when the train and test set are saved.
+
+        Args:
+            output_dir: the path of the directory to store the train and test set.
+            dataset: the dataset to stream the matrix of.
+            data_config: the dataset matrix configuration.
+            is_running: function that returns whether the pipeline
+                is still running. Stops early when False is returned.
+
+        Raises:
+            FileNotFoundError: when the dataset matrix file does not exist.
+            RuntimeError: when any data modifiers are not found in their respective factories,
+                or the filter passes can not be streamed or select no rows.
+
+        Returns:
+            the paths where the train and test set are stored and the rating scale of the sets,
+            or None when the pipeline stopped running.
+        """
+        with tempfile.TemporaryDirectory(dir=output_dir) as partition_dir:
+            # steps 2-3
+            partition_paths, record_dtype = self.partition_from_dataset(
+                partition_dir,
+                dataset,
+                data_config,
+                is_running
+            )
+            if not is_running():
+                return None
+
+            def read_partitions() -> Iterable[pd.DataFrame]:
+                for _, partition_path in enumerate(partition_paths):
+                    yield pd.DataFrame(np.fromfile(partition_path, dtype=record_dtype))
+
+            # steps 4-6
+            return self.stream_partitions(
+                output_dir,
+                dataset,
+                data_config,
+                read_partitions,
+                is_running
+            )
+
+    def partition_from_dataset(
+            self,
+            partition_dir: str,
+            dataset: Dataset,
+            data_config: DataMatrixConfig,
+            is_running: Callable[[], bool]) -> Tuple[List[str], Optional[np.dtype]]:
+        """Load the dataset matrix in chunks and append the filtered rows to user partitions.
+
+        Each chunk is filtered on the subgroup of the data matrix configuration, after which
+        the rows are appended to the file of the partition of their user as binary records,
+        so that the rows of each partition are kept in the original order.
+
+        Args:
+            partition_dir: the path of the directory to store the partitions.
+            dataset: the dataset to load the matrix chunks from.
+            data_config: the dataset matrix configuration.
+            is_running: function that returns whether the pipeline
+                is still running. Stops early when False is returned.
+
+        Raises:
+            FileNotFoundError: when the dataset matrix file does not exist.
+            RuntimeError: when the filter passes can not be streamed or select no rows.
+
+        Returns:
+            the paths of the files of the (non-empty) partitions in order of the users and
+            the dtype of the records in the files, or an empty list (and None) when stopped.
+        """
+        matrix_name = data_config.matrix
+        user_partitions = self.create_user_partitions(dataset, matrix_name)
+
+        subgroup = None
+        if len(data_config.filter_passes) > 0:
+            subgroup = self.resolve_subgroup(data_config)
+
+        self.event_dispatcher.dispatch(DatasetMatrixEventArgs(
+            ON_BEGIN_LOAD_DATASET,
+            dataset.get_name(),
+            matrix_name,
+            dataset.get_matrix_file_path(matrix_name)
+        ))
+
+        if subgroup is not None:
+            self.event_dispatcher.dispatch(FilterDataframeEventArgs(
+                ON_BEGIN_FILTER_DATASET,
+                data_config
+            ))
+
+        start = time.time()
+
+        partitions = {}
+        record_dtype = None
+        passed = np.zeros(0 if subgroup is None else len(subgroup), dtype=bool)
+        try:
+            chunks = dataset.load_matrix(matrix_name, self.chunk_size, dtype=STREAM_MATRIX_DTYPES)
+            for _, chunk in enumerate(chunks):
+                if subgroup is not None:
+                    pass_masks = create_subgroup_pass_masks(chunk, subgroup)
+                    passed |= pass_masks.any(axis=1)
+                    chunk = chunk[pass_masks.any(axis=0)]
+
+                if record_dtype is None:
+                    record_dtype = np.dtype([
+                        (name, STREAM_MATRIX_DTYPES[name]) for name in chunk.columns
+                    ])
+                # the binary storage is typed already and is cast to the same dtypes
+                records = chunk.to_records(index=False).astype(record_dtype)
+
+                users = np.clip(chunk['user'].to_numpy(), 0, len(user_partitions) - 1)
+                partition_ids = user_partitions[users]
+                for _, partition in enumerate(np.unique(partition_ids)):
+                    partition_path = os.path.join(
+                        partition_dir,
+                        'partition_' + str(partition) + '.bin'
+                    )
+                    with open(partition_path, 'ab') as partition_file:
+                        records[partition_ids == partition].tofile(partition_file)
+                    partitions[partition] = partition_path
+
+                if not is_running():
+                    return [], None
+        except FileNotFoundError as err:
+            self.event_dispatcher.dispatch(ErrorEventArgs(
+                ON_FAILURE_ERROR,
+                'Failure: to load dataset matrix ' + dataset.get_name() + '_' + matrix_name
+            ))
+            # raise again so the data run aborts
+            raise err
+
+        end = time.time()
+
+        if subgroup is not None:
+            self.event_dispatcher.dispatch(FilterDataframeEventArgs(
+                ON_END_FILTER_DATASET,
+                data_config
+            ), elapsed_time=end - start)
+
+        self.event_dispatcher.dispatch(DatasetMatrixEventArgs(
+            ON_END_LOAD_DATASET,
+            dataset.get_name(),
+            matrix_name,
+            dataset.get_matrix_file_path(matrix_name)
+        ), elapsed_time=end - start)
+
+        if not passed.all():
+            raise RuntimeError(
+                'Filter pass generating empty dataset. Perhaps filters chosen too strictly.'
+            )
+        if len(partitions) == 0:
+            raise RuntimeError('Wholly filtered dataframe is empty.')
+
+        return [partitions[partition] for partition in sorted(partitions)], record_dtype
+
+    def create_user_partitions(self, dataset: Dataset, matrix_name: str) -> np.ndarray:
+        """Create the partitions of the users of the dataset matrix.
+
+        The users are cut into contiguous ranges of ids by the cumulative number of rows
+        before them, so that a partition has approximately the chunk size number of rows.
+        The ranges are cut by the number of users instead when the interaction counts
+        of the users are not available.
+
+        Args:
+            dataset: the dataset of the matrix.
+            matrix_name: the name of the dataset matrix.
+
+        Returns:
+            the partition of each user, indexed by the user id of the matrix.
+        """
+        user_counts = dataset.get_interaction_counts(matrix_name, 'user')
+        if user_counts is not None and len(user_counts) > 0:
+            return (np.cumsum(user_counts) - user_counts) // self.chunk_size
+
+        matrix_config = dataset.get_matrix_config(matrix_name)
+        num_users = max(matrix_config.user.num_records, 1)
+        num_partitions = max(math.ceil(matrix_config.table.num_records / self.chunk_size), 1)
+        return np.arange(num_users) * num_partitions // num_users
+
+    def resolve_subgroup(self, subset: DataSubsetConfig) -> ResolvedSubgroup:
+        """Resolve the filter passes of the subset to the qualifying user/item ids.
+
+        Args:
+            subset: the subset to resolve the filter passes of.
+
+        Count filters count the values over the rows of the matrix that passed the previous
+        filters of the pass, which are not known until the entire matrix is read. These
+        (and any other filters that can not be resolved to ids) are not supported when
+        streaming, and the error names the filters of the passes that can not be resolved.
+
+        Raises:
+            RuntimeError: when a filter pass depends on the rows of the matrix.
+
+        Returns:
+            the resolved filter passes of the subgroup.
+        """
+        filter_factory = self.data_factory.get_factory(KEY_DATA_SUBSET)
+        if self.subgroup_cache is None:
+            subgroup = resolve_filter_passes(subset, filter_factory)
+        else:
+            subgroup = self.subgroup_cache.get_subgroup(
+                subset,
+                lambda _subset: resolve_filter_passes(_subset, filter_factory)
+            )
+
+        unresolved = [_filter.name for filter_pass_config, id_masks in
+                      zip(subset.filter_passes, subgroup) if id_masks is None
+                      for _filter in filter_pass_config.filters]
+        if len(unresolved) > 0:
+            error_msg = 'Unable to stream the filter passes with filters that depend on the ' \
+                'rows of the matrix (e.g. count filters): ' + ', '.join(unresolved) + \
+                '. Run the data pipeline without a chunk size to apply these filters.'
+            self.event_dispatcher.dispatch(ErrorEventArgs(
+                ON_FAILURE_ERROR,
+                'Failure: ' + error_msg
+            ))
+            # raise error so the data run aborts
+            raise RuntimeError(error_msg)
+
+        return subgroup
+
+    def stream_partitions(
+            self,
+            output_dir: str,
+            dataset: Dataset,
+            data_config: DataMatrixConfig,
+            read_partitions: Callable[[], Iterable[pd.DataFrame]],
+            is_running: Callable[[], bool]) -> Optional[Tuple[str, str, Tuple[float, float]]]:
+        """Convert and split the user partitions and append them to the train and test set.
+
+        The rows of each split partition are (stably) sorted by user, which makes the order
+        of the rows in the sets independent of the boundaries of the partitions.
+
+        Args:
+            output_dir: the path of the directory to store both sets.
+            dataset: the dataset of the partitions.
+            data_config: the dataset matrix configuration.
+            read_partitions: function that reads the user partitions in order.
+            is_running: function that returns whether the pipeline
+                is still running. Stops early when False is returned.
+
+        Raises:
+            RuntimeError: when any data modifiers are not found in their respective factories.
+
+        Returns:
+            the paths where the train and test set are stored and the rating scale of the sets,
+            or None when the pipeline stopped running.
+        """
+        headers_to_save = ['user', 'item', 'rating']
+
+        train_set_path = os.path.join(output_dir, 'train_set.tsv')
+        test_set_path = os.path.join(output_dir, 'test_set.tsv')
+
+        end_events = []
+        partitions = read_partitions()
+        if data_config.converter is not None:
+            converter = self.create_converter(dataset, data_config.matrix, data_config.converter)
+            partitions = converter.run_chunked(read_partitions)
+            end_events.append(ConvertRatingsEventArgs(
+                ON_END_CONVERT_RATINGS,
+                data_config.converter
+            ))
+            self.event_dispatcher.dispatch(ConvertRatingsEventArgs(
+                ON_BEGIN_CONVERT_RATINGS,
+                data_config.converter
+            ))
+
+        splitter = self.create_splitter(data_config.splitting)
+        end_events.append(SplitDataframeEventArgs(ON_END_SPLIT_DATASET, data_config.splitting))
+        self.event_dispatcher.dispatch(SplitDataframeEventArgs(
+            ON_BEGIN_SPLIT_DATASET,
+            data_config.splitting
+        ))
+
+        end_events.append(SaveSetsEventArgs(ON_END_SAVE_SETS, train_set_path, test_set_path))
+        self.event_dispatcher.dispatch(SaveSetsEventArgs(
+            ON_BEGIN_SAVE_SETS,
+            train_set_path,
+            test_set_path
+        ))
+
+        start = time.time()
+
+        rating_min, rating_max = np.inf, -np.inf
+        for i, partition in enumerate(partitions):
+            train_set, test_set = splitter.run(partition)
+            train_set = train_set.sort_values('user', kind='stable')
+            test_set = test_set.sort_values('user', kind='stable')
+
+            mode = 'w' if i == 0 else 'a'
+            train_set[headers_to_save].to_csv(
+                train_set_path, sep='\t', header=False, index=False, mode=mode)
+            test_set[headers_to_save].to_csv(
+                test_set_path, sep='\t', header=False, index=False, mode=mode)
+
+            rating_min = min(rating_min, partition['rating'].min())
+            rating_max = max(rating_max, partition['rating'].max())
+            if not is_running():
+                return None
+
+        end = time.time()
+
+        for _, event_args in enumerate(reversed(end_events)):
+            self.event_dispatcher.dispatch(event_args, elapsed_time=end - start)
+
+        return train_set_path, test_set_path, (rating_min, rating_max)
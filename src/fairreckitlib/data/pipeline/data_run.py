@@ -14,11 +14,12 @@ Utrecht University within the Software Project course.
 """
 
 from dataclasses import dataclass
-from typing import Callable, List
+from typing import Callable, List, Optional
 
 from ...core.config.config_factories import GroupFactory
 from ...core.events.event_dispatcher import EventDispatcher
 from ...core.events.event_error import ON_FAILURE_ERROR, ErrorEventArgs
+from ..filter.filter_cache import SubgroupCache
 from ..set.dataset_registry import DataRegistry
 from .data_config import DataMatrixConfig
 from .data_pipeline import DataPipeline, DataTransition
@@ -32,12 +33,18 @@ class DataPipelineConfig:
     data_registry: the registry with available datasets.
     data_factory: the factory with available data modifier factories.
     data_config_list: the dataset matrix configurations to compute.
+    cache_dir: the directory to cache the train and test sets in or None to disable caching.
+    subgroup_cache: the cache of resolved subgroups to filter rows with or None.
+    chunk_size: the number of rows to stream the dataset matrices with or None.
     """
 
     output_dir: str
     data_registry: DataRegistry
     data_factory: GroupFactory
     data_config_list: List[DataMatrixConfig]
+    cache_dir: Optional[str]=None
+    subgroup_cache: Optional[SubgroupCache]=None
+    chunk_size: Optional[int]=None
 
 
 def run_data_pipelines(
@@ -57,7 +64,13 @@ def run_data_pipelines(
     """
     data_result = []
 
-    data_pipeline = DataPipeline(pipeline_config.data_factory, event_dispatcher)
+    data_pipeline = DataPipeline(
+        pipeline_config.data_factory,
+        event_dispatcher,
+        cache_dir=pipeline_config.cache_dir,
+        subgroup_cache=pipeline_config.subgroup_cache,
+        chunk_size=pipeline_config.chunk_size
+    )
     for data_config in pipeline_config.data_config_list:
         dataset = pipeline_config.data_registry.get_set(data_config.dataset)
         if dataset is None:
@@ -9,7 +9,7 @@ Utrecht University within the Software Project course.
 © Copyright Utrecht University (Department of Information and Computing Sciences)
 """
 
-from typing import Any, Dict
+from typing import Any, Callable, Dict, Iterable, Iterator
 
 import pandas as pd
 
@@ -41,3 +41,17 @@ class RatingConverter(DataModifier):
             the converted dataframe and the type of rating, either 'explicit' or 'implicit'.
         """
         raise NotImplementedError()
+
+    def run_chunked(
+            self,
+            read_chunks: Callable[[], Iterable[pd.DataFrame]]) -> Iterator[pd.DataFrame]:
+        """Run the converter on the specified chunks of a dataframe.
+
+        Args:
+            read_chunks: function that reads the chunks of the dataframe,
+                which can be called multiple times to read the chunks again.
+
+        Returns:
+            an iterator over the converted chunks.
+        """
+        raise NotImplementedError()
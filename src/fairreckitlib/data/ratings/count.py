@@ -7,18 +7,27 @@ play and listen count, but just whatever is in the 'item' column.
 If you pass a dataframe for which the 'item' column contains artists,
 it should work correctly, otherwise it will require changes to work properly.
 
+The counts are computed with a grouped aggregation over the codes of the items,
+and the counts of multiple chunks of a dataframe can be merged afterwards.
+The APC and ALC are returned as dictionaries, whereas count_items returns the counts
+as a series that is used by the vectorized Kullback-Leibler converter.
+
 Functions:
 
     get_item_dict: return dict with unique items.
     calculate_apc: count the artist play count.
     calculate_alc: count the artist listener count.
+    count_items: count the (weighted) occurrences of each item in a series.
+    merge_counts: merge the counts of multiple chunks.
 
 This program has been developed by students from the bachelor Computer Science at
 Utrecht University within the Software Project course.
 © Copyright Utrecht University (Department of Information and Computing Sciences)
 """
 
-from typing import Dict
+from typing import Dict, Iterable, Optional, Union
+
+import numpy as np
 import pandas as pd
 
 
@@ -31,10 +40,7 @@ def get_item_dict(dataframe: pd.DataFrame) -> Dict[int, float]:
     Returns:
         a dictionary with unique items as keys and 0 as values.
     """
-    result = {}
-    for item in dataframe['item'].unique():
-        result[item] = 0
-    return result
+    return dict.fromkeys(dataframe['item'].unique(), 0)
 
 
 def calculate_apc(dataframe: pd.DataFrame) -> Dict[int, float]:
@@ -48,12 +54,7 @@ def calculate_apc(dataframe: pd.DataFrame) -> Dict[int, float]:
     Returns:
         a dictionary with key:item, value:apc.
     """
-    apc = get_item_dict(dataframe)
-
-    for _, row in dataframe.iterrows():
-        apc[row['item']] += row['rating']
-
-    return apc
+    return count_items(dataframe['item'], dataframe['rating'].to_numpy(dtype=float)).to_dict()
 
 
 def calculate_alc(dataframe: pd.DataFrame) -> Dict[int, float]:
@@ -67,9 +68,31 @@ def calculate_alc(dataframe: pd.DataFrame) -> Dict[int, float]:
     Returns:
         a dictionary with key:item, value:alc.
     """
-    alc = get_item_dict(dataframe)
+    return count_items(dataframe['item']).to_dict()
+
+
+def count_items(items: pd.Series, weights: Optional[np.ndarray]=None) -> pd.Series:
+    """Count the (weighted) occurrences of each item with a grouped aggregation.
+
+    Args:
+        items: the items to count.
+        weights: the (optional) weight of each occurrence, e.g. the ratings for the apc.
+
+    Returns:
+        a series with the items as index and the counts as values.
+    """
+    codes, uniques = pd.factorize(items)
+    return pd.Series(np.bincount(codes, weights=weights, minlength=len(uniques)), index=uniques)
+
 
-    for _, row in dataframe.iterrows():
-        alc[row['item']] += 1
+def merge_counts(
+        counts: Iterable[Union[pd.Series, pd.DataFrame]]) -> Union[pd.Series, pd.DataFrame]:
+    """Merge the counts of multiple chunks by summing the counts with the same index.
 
-    return alc
+    Args:
+        counts: the counts of each chunk, e.g. the apc/alc of the chunks of a dataframe.
+
+    Returns:
+        the merged counts.
+    """
+    return pd.concat(list(counts)).groupby(level=0, sort=False).sum()
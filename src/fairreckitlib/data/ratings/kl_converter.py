@@ -1,6 +1,5 @@
 """This module contains the Kullback-Leibler converter.
 
-This way of converting is not implemented in the data pipeline.
 The intended use of this stems from the following paper about mainstreaminess:
 
 https://www.christinebauer.eu/publications/bauer-2019-plosone-mainstreaminess/
@@ -8,7 +7,23 @@ https://www.christinebauer.eu/publications/bauer-2019-plosone-mainstreaminess/
 see pages 10-11.
 
 This paper describes an altered version of the Kullback-Leibler formla
-and converts implicit ratings to explicit ratings in the range [0,1].
+and converts implicit ratings to explicit ratings.
+
+For each user the distribution P of the user's artist counts A.C(u) is compared to the
+distribution Q of the global artist counts A.C (either APC or ALC) of the same artists.
+The divergences KL(P||Q) and KL(Q||P) are summed per user, and all the ratings of the user
+are converted to the score of the user that is specified by the paper:
+
+    1 / mean(1 - exp(-KL(P||Q)), 1 - exp(-KL(Q||P)))
+
+The score is at least 1 and grows as the distribution of the user approaches the global
+distribution. A user with the same distribution as the global one (e.g. a user with a single
+artist) has an infinite score, as both divergences are zero.
+
+The conversion consists of vectorized column operations and grouped sums only. The chunked
+mode converts a dataframe that does not fit in memory in four passes over its chunks, which
+count the artists, sum the counts of each user, sum the divergences of each user and
+convert the ratings respectively.
 
 Classes:
 
@@ -24,18 +39,28 @@ Utrecht University within the Software Project course.
 © Copyright Utrecht University (Department of Information and Computing Sciences)
 """
 
-from typing import Any, Dict
+from typing import Any, Callable, Dict, Iterable, Iterator
 
+import numpy as np
 import pandas as pd
 
 from ...core.config.config_parameters import ConfigParameters
 from .base_converter import RatingConverter
+from .count import count_items, merge_counts
+
+KL_METHOD_APC = 'APC'
+KL_METHOD_ALC = 'ALC'
 
 
 class KLConverter(RatingConverter):
     """Kullback-Leibler Converter on data ratings.
 
     Applies the Kullback-Leibler formula to the rating column of the dataframe.
+
+    Public methods:
+
+    run
+    run_chunked
     """
 
     def run(self, dataframe: pd.DataFrame) -> pd.DataFrame:
@@ -47,18 +72,124 @@ class KLConverter(RatingConverter):
         Returns:
             the converted dataframe.
         """
-        # TODO apply kullback-leibler formula on the rating column. Needs APC/ALC arg.
-        # method = self.params['method']
-        # use the APC/ALC parameter, import count.py from this package to calculate either
-        # apply the altered kl formula to each row of the given dataframe:
-        #       1 / np.mean(1 - np.exp(-KL(P||Q)), 1 - np.exp(-KL(Q||P)))
-        #       where
-        #           KL(P||Q) = sum(A.C(u) * np.log(A.C(u) / A.C   ))
-        #           KL(Q||P) = sum(A.C    * np.log(A.C    / A.C(u)))
-        #   note that the above is a slightly abstract and incomplete notation,
-        #   please consult the paper linked at the top.
-        # return converted_dataframe
-        raise RuntimeError()
+        item_counts = self.count_items(dataframe)
+        user_counts = self.count_users(dataframe, item_counts)
+        divergences = self.sum_divergences(dataframe, item_counts, user_counts)
+        dataframe['rating'] = self.convert_ratings(dataframe, divergences)
+        return dataframe
+
+    def run_chunked(
+            self,
+            read_chunks: Callable[[], Iterable[pd.DataFrame]]) -> Iterator[pd.DataFrame]:
+        """Apply the Kullback-Leibler formula to convert the ratings of a chunked dataframe.
+
+        The chunks are read four times, where the rows of a user can be in any chunk.
+        Only the counts of the items and the counts and divergences of the users
+        are kept in memory.
+
+        Args:
+            read_chunks: function that reads the chunks of the dataframe,
+                with 'user', 'item' and 'rating' columns.
+
+        Returns:
+            an iterator over the converted chunks.
+        """
+        item_counts = merge_counts(self.count_items(chunk) for chunk in read_chunks())
+        user_counts = merge_counts(
+            self.count_users(chunk, item_counts) for chunk in read_chunks()
+        )
+        divergences = merge_counts(
+            self.sum_divergences(chunk, item_counts, user_counts) for chunk in read_chunks()
+        )
+
+        for _, chunk in enumerate(read_chunks()):
+            chunk['rating'] = self.convert_ratings(chunk, divergences)
+            yield chunk
+
+    def count_items(self, dataframe: pd.DataFrame) -> pd.Series:
+        """Count the global artist counts (A.C) with the method of the converter.
+
+        Args:
+            dataframe: with 'item' and 'rating' columns.
+
+        Returns:
+            a series with the items as index and the APC or ALC as values.
+        """
+        return count_items(dataframe['item'], self._get_user_item_counts(dataframe))
+
+    def count_users(self, dataframe: pd.DataFrame, item_counts: pd.Series) -> pd.DataFrame:
+        """Sum the artist counts of the user (A.C(u)) and the global artist counts of each user.
+
+        Args:
+            dataframe: with 'user', 'item' and 'rating' columns.
+            item_counts: the global artist counts of all the items in the dataframe.
+
+        Returns:
+            a dataframe with the users as index and the summed 'user_count' and 'item_count'.
+        """
+        counts = pd.DataFrame({
+            'user_count': self._get_user_item_counts(dataframe),
+            'item_count': _take_counts(item_counts, dataframe['item'])
+        })
+        return counts.groupby(dataframe['user'].to_numpy(), sort=False).sum()
+
+    def sum_divergences(
+            self,
+            dataframe: pd.DataFrame,
+            item_counts: pd.Series,
+            user_counts: pd.DataFrame) -> pd.DataFrame:
+        """Sum the Kullback-Leibler divergences of each user in the dataframe.
+
+        Args:
+            dataframe: with 'user', 'item' and 'rating' columns.
+            item_counts: the global artist counts of all the items in the dataframe.
+            user_counts: the summed counts of all the users in the dataframe.
+
+        Returns:
+            a dataframe with the users as index and the summed 'kl_pq' and 'kl_qp'.
+        """
+        user_sums = _take_counts(user_counts, dataframe['user'])
+        p = self._get_user_item_counts(dataframe) / user_sums[:, 0]
+        q = _take_counts(item_counts, dataframe['item']) / user_sums[:, 1]
+
+        divergences = pd.DataFrame({
+            'kl_pq': _relative_entropy(p, q),
+            'kl_qp': _relative_entropy(q, p)
+        })
+        return divergences.groupby(dataframe['user'].to_numpy(), sort=False).sum()
+
+    def convert_ratings(self, dataframe: pd.DataFrame, divergences: pd.DataFrame) -> np.ndarray:
+        """Convert the ratings of the dataframe to the scores of the users.
+
+        Args:
+            dataframe: with 'user', 'item' and 'rating' columns.
+            divergences: the summed divergences of all the users in the dataframe.
+
+        Returns:
+            the converted ratings, which are the same for all the rows of a user.
+        """
+        # rounding errors can make a zero divergence slightly negative
+        user_divergences = np.maximum(_take_counts(divergences, dataframe['user']), 0.0)
+        with np.errstate(divide='ignore'):
+            return 1.0 / np.mean(1.0 - np.exp(-user_divergences), axis=1)
+
+    def _get_user_item_counts(self, dataframe: pd.DataFrame) -> np.ndarray:
+        """Get the artist counts of the users (A.C(u)) with the method of the converter."""
+        if self.params['method'] == KL_METHOD_ALC:
+            return np.ones(len(dataframe))
+
+        return dataframe['rating'].to_numpy(dtype=float)
+
+
+def _relative_entropy(x: np.ndarray, y: np.ndarray) -> np.ndarray:
+    """Compute the terms x * log(x / y) of the relative entropy, which are zero where x is."""
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(x == 0, 0.0, x * np.log(x / y))
+
+
+def _take_counts(counts: pd.Series, keys: pd.Series) -> np.ndarray:
+    """Take the counts of the keys, which are expected to be present in the index."""
+    return counts.to_numpy()[counts.index.get_indexer(keys)]
 
 
 def create_kl_converter(name: str, params: Dict[str, Any], **_) -> KLConverter:
@@ -81,7 +212,7 @@ def create_kl_converter_params(**_) -> ConfigParameters:
     Returns:
         the configuration parameters of the converter.
     """
-    methods = ['APC', 'ALC']
+    methods = [KL_METHOD_APC, KL_METHOD_ALC]
 
     params = ConfigParameters()
     params.add_single_option('method', str, methods[0], methods)
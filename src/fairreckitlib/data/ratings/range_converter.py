@@ -14,7 +14,7 @@ Utrecht University within the Software Project course.
 © Copyright Utrecht University (Department of Information and Computing Sciences)
 """
 
-from typing import Any, Dict
+from typing import Any, Callable, Dict, Iterable, Iterator
 
 import pandas as pd
 
@@ -44,10 +44,31 @@ class RangeConverter(RatingConverter):
         """
         upper_bound = self.params['upper_bound']
         max_rating = dataframe.max()['rating']
-        dataframe['rating'] = dataframe['rating'].apply(lambda x : x / max_rating * upper_bound)
+        dataframe['rating'] = dataframe['rating'] / max_rating * upper_bound
 
         return dataframe
 
+    def run_chunked(
+            self,
+            read_chunks: Callable[[], Iterable[pd.DataFrame]]) -> Iterator[pd.DataFrame]:
+        """Convert ratings in the chunks of a dataframe.
+
+        The chunks are read twice, the first time to take the max value of all chunks.
+
+        Args:
+            read_chunks: function that reads the chunks of the dataframe,
+                which should contain a 'rating' column.
+
+        Returns:
+            an iterator over the converted chunks.
+        """
+        upper_bound = self.params['upper_bound']
+        max_rating = max(chunk['rating'].max() for chunk in read_chunks())
+
+        for _, chunk in enumerate(read_chunks()):
+            chunk['rating'] = chunk['rating'] / max_rating * upper_bound
+            yield chunk
+
 
 def create_range_converter(name: str, params: Dict[str, Any], **_) -> RangeConverter:
     """Create the Range Converter.
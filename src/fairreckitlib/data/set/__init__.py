@@ -3,12 +3,24 @@
 Modules:
 
     dataset: class wrapper for accessing a dataset and related data tables.
+    dataset_aggregation: aggregation of user-item pairs with a bounded memory usage.
+    dataset_attributes: attribute arrays of table columns that are aligned with a matrix.
+    dataset_catalog: statistics catalog of the dataset table columns and matrices.
+    dataset_compression: pluggable compression codecs of dataset files.
     dataset_config: configuration structs that define the matrix/tables.
     dataset_config_parser: parser for a dataset configuration and utility functions.
     dataset_constants: constants to be used in other modules.
+    dataset_delta: functionality to append new events to a processed dataset.
     dataset_matrix: functionality to create matrices from dataset event tables.
+    dataset_metadata: metadata of dataset table files and fast record counting.
+    dataset_migration: functionality to migrate the storage of processed datasets.
+    dataset_partition: functionality to split dataset tables into partitions.
+    dataset_predicate: predicates that select the rows of dataset tables while reading.
     dataset_registry: registry for available datasets and processing them into a standard format.
     dataset_sampling: create a sample of an existing dataset.
+    dataset_statistics: accumulators of dataset statistics that are updated in chunks.
+    dataset_storage: columnar binary storage of dataset tables.
+    dataset_time_partition: functionality to partition dataset tables by month.
 
 Packages:
 
@@ -14,11 +14,22 @@ Utrecht University within the Software Project course.
 """
 
 import os
-from typing import Any, Dict, Optional, List, Union
+from typing import Any, Dict, Iterator, Optional, List, Tuple, Union
 
+import numpy as np
 import pandas as pd
+from scipy import sparse
 
-from .dataset_config import DatasetConfig, DatasetMatrixConfig, DatasetTableConfig
+from .dataset_attributes import AttributeArray
+from .dataset_attributes import create_id_attribute_arrays, create_pair_attribute_arrays
+from .dataset_catalog import is_catalog_up_to_date, load_interaction_counts
+from .dataset_catalog import update_statistics_catalog
+from .dataset_config import DatasetConfig, DatasetIndexConfig, DatasetMatrixConfig
+from .dataset_config import DatasetTableConfig, create_dataset_table_config
+from .dataset_constants import KEY_MATRICES, KEY_MATRIX, KEY_TABLES
+from .dataset_constants import MATRIX_CSR_SUFFIX, TABLE_FILE_PREFIX
+from .dataset_delta import append_dataset_events
+from .dataset_storage import is_csr_matrix_cached, load_csr_matrix, save_csr_matrix
 
 
 class Dataset:
@@ -27,7 +38,8 @@ class Dataset:
     A dataset is used for carrying out recommender system experiments.
     Each dataset has a strong affinity with a database structure consisting of
     multiple tables.
-    The standardized matrix is a pandas.DataFrame stored in a '.tsv' file.
+    The standardized matrix is a pandas.DataFrame stored in a '.tsv' file or
+    in the columnar binary storage of typed NumPy arrays.
     The (derived sparse) matrix is used in experiments and needs to be
     in a CSR compatible format, meaning three fields:
 
@@ -51,21 +63,30 @@ class Dataset:
 
     Public methods:
 
+    append_events
     get_available_columns
     get_available_event_tables
     get_available_matrices
     get_available_tables
+    get_column_stats
+    get_interaction_counts
     get_matrices_info
     get_matrix_config
     get_matrix_file_path
+    get_matrix_stats
     get_name
     get_table_config
     get_table_info
+    invalidate_indices
+    load_attribute_arrays
     load_matrix
+    load_matrix_csr
+    read_event_table
     read_matrix
     read_table
     resolve_item_ids
     resolve_user_ids
+    update_statistics_catalog
     """
 
     def __init__(self, data_dir: str, config: DatasetConfig):
@@ -80,6 +101,60 @@ class Dataset:
 
         self.data_dir = data_dir
         self.config = config
+        # cache of the user/item indirection arrays keyed by (matrix_name, 'user'/'item')
+        self.indices = {}
+        # cache of the attribute arrays keyed by (matrix_name, table_name, column_name)
+        self.attributes = {}
+        # the statistics catalog is loaded on the first request
+        self.catalog = None
+
+    def append_events(
+            self,
+            event_table_name: str,
+            events: Union[str, pd.DataFrame]) -> List[str]:
+        """Append a delta of new events to an event table of the dataset.
+
+        The user-item count matrices that are derived from the event table are updated
+        by merging the counts of the new events, without scanning the existing events.
+        The count matrices are streamed and rewritten once, and other matrices with the
+        user and item key of the event table (e.g. ratings) are not supported.
+        The indirection arrays of the matrices are extended with the new user/item ids.
+
+        Args:
+            event_table_name: the name of the event table to append the events to.
+            events: the new events or the path of a delta file with the events, which has
+                the columns and file options (e.g. header and separator) of the event table.
+
+        Raises:
+            KeyError: when the event table does not exist in the dataset.
+            ValueError: when the events do not have the columns of the event table, when
+                the event table or any of its count matrices has the binary storage, or when
+                any matrix with the user and item key of the event table is not a count matrix.
+
+        Returns:
+            the names of the matrices that are updated.
+        """
+        if event_table_name not in self.config.events:
+            raise KeyError('Event table does not exist: ' + event_table_name)
+
+        if isinstance(events, str):
+            event_table = self.config.events[event_table_name]
+            # the compression of the delta file is inferred from its extension
+            events = create_dataset_table_config(
+                os.path.abspath(events),
+                event_table.primary_key,
+                event_table.columns,
+                encoding=event_table.file.options.encoding,
+                foreign_keys=event_table.foreign_keys,
+                header=event_table.file.options.header,
+                sep=event_table.file.options.sep
+            ).read_table(self.data_dir)
+
+        matrix_names = append_dataset_events(self.data_dir, self.config, event_table_name, events)
+        for matrix_name in matrix_names:
+            self.invalidate_indices(matrix_name)
+
+        return matrix_names
 
     def get_available_columns(self, matrix_name: str) -> Dict[str, List[str]]:
         """Get the available table column names of this dataset.
@@ -132,6 +207,58 @@ class Dataset:
 
         return table_names
 
+    def get_column_stats(
+            self,
+            table_name: str,
+            column_name: str,
+            matrix_name: str=None) -> Optional[Dict[str, Any]]:
+        """Get the statistics of a dataset table column from the statistics catalog.
+
+        The statistics of a numerical column contain the range and the mean of the values,
+        the statistics of a categorical column contain the counts of the categories.
+        The statistics catalog is updated first when it is outdated.
+
+        Args:
+            table_name: the name of the table or 'matrix' for the columns of a matrix.
+            column_name: the name of the column to get the statistics of.
+            matrix_name: the name of the matrix when the table name is 'matrix'.
+
+        Returns:
+            a dictionary containing the column statistics or None when not available.
+        """
+        if table_name == KEY_MATRIX:
+            table_stats = self.get_matrix_stats(matrix_name)
+        elif table_name in self.config.tables:
+            table_stats = self.update_statistics_catalog()[KEY_TABLES].get(table_name)
+        else:
+            return None
+
+        if table_stats is None:
+            return None
+
+        return table_stats['columns'].get(column_name)
+
+    def get_interaction_counts(self, matrix_name: str, index_name: str) -> Optional[np.ndarray]:
+        """Get the number of interactions per user/item of the matrix.
+
+        Args:
+            matrix_name: the name of the matrix to get the interaction counts of.
+            index_name: the name of the interaction counts, either 'user' or 'item'.
+
+        Returns:
+            the interaction counts indexed by user/item id or None when not available.
+        """
+        matrix_stats = self.get_matrix_stats(matrix_name)
+        if matrix_stats is None:
+            return None
+
+        return load_interaction_counts(
+            self.data_dir,
+            matrix_stats,
+            self.config.matrices[matrix_name],
+            index_name
+        )
+
     def get_matrices_info(self) -> Dict[str, Any]:
         """Get the information on the dataset's available matrices.
 
@@ -173,6 +300,24 @@ class Dataset:
             self.config.matrices[matrix_name].table.file.name
         )
 
+    def get_matrix_stats(self, matrix_name: str) -> Optional[Dict[str, Any]]:
+        """Get the statistics of the matrix from the statistics catalog.
+
+        The statistics of a matrix contain the statistics of the matrix columns,
+        the interaction counts summary of the users and items and the rating histogram.
+        The statistics catalog is updated first when it is outdated.
+
+        Args:
+            matrix_name: the name of the matrix to get the statistics of.
+
+        Returns:
+            a dictionary containing the matrix statistics or None when not available.
+        """
+        if matrix_name not in self.config.matrices:
+            return None
+
+        return self.update_statistics_catalog()[KEY_MATRICES].get(matrix_name)
+
     def get_name(self) -> str:
         """Get the name of the dataset.
 
@@ -205,26 +350,136 @@ class Dataset:
 
         return info
 
-    def load_matrix(self, matrix_name: str) -> Optional[pd.DataFrame]:
+    def invalidate_indices(self, matrix_name: str=None) -> None:
+        """Invalidate the cached user/item indices and attribute arrays.
+
+        The indices are loaded again on the next request, which is needed when
+        the indirection arrays are changed on disk after they were loaded.
+        The attribute arrays depend on the indices and are invalidated as well.
+
+        Args:
+            matrix_name: the name of the matrix to invalidate the indices of or None for all.
+        """
+        if matrix_name is None:
+            self.indices = {}
+            self.attributes = {}
+            return
+
+        self.indices = {key: indices for key, indices in self.indices.items()
+                        if key[0] != matrix_name}
+        self.attributes = {key: array for key, array in self.attributes.items()
+                           if key[0] != matrix_name}
+
+    def load_attribute_arrays(
+            self,
+            matrix_name: str,
+            table_name: str,
+            column_names: List[str]) -> Dict[str, AttributeArray]:
+        """Load the attribute arrays of the table columns that are aligned with the matrix.
+
+        The attribute arrays are materialized once from the table and are cached
+        until the indices of the matrix are invalidated.
+
+        Args:
+            matrix_name: the name of the matrix to align the attributes with.
+            table_name: the name of the table or 'matrix' for the columns of the matrix.
+            column_names: the names of the table columns to load the attribute arrays of.
+
+        Raises:
+            KeyError: when the matrix or table does not exist or is not related.
+
+        Returns:
+            a dictionary with the column name as key and the (cached) attribute array as value.
+        """
+        matrix_config = self.get_matrix_config(matrix_name)
+        if matrix_config is None:
+            raise KeyError('Unknown matrix configuration to load attributes from')
+
+        missing = [name for name in column_names
+                   if (matrix_name, table_name, name) not in self.attributes]
+        if len(missing) > 0:
+            self.attributes.update({
+                (matrix_name, table_name, name): array
+                for name, array in self._create_attribute_arrays(
+                    matrix_name, matrix_config, table_name, missing).items()
+            })
+
+        return {name: self.attributes[(matrix_name, table_name, name)] for name in column_names}
+
+    def load_matrix(
+            self,
+            matrix_name: str,
+            chunk_size: int=None,
+            *,
+            dtype: Dict[str, Any]=None) -> Optional[Union[pd.DataFrame, Iterator[pd.DataFrame]]]:
         """Load the standardized user-item matrix of the dataset.
 
+        Args:
+            matrix_name: the name of the matrix to load.
+            chunk_size: loads the matrix in chunks as an iterator or
+                the entire matrix when None.
+            dtype: (optional) dictionary with the standardized column names as key
+                and the type of the column as value, e.g. {'rating': 'float64'}.
+
+        Returns:
+            the loaded user-item matrix (iterator) or None when not available.
+        """
+        matrix_config = self.get_matrix_config(matrix_name)
+        if matrix_config is None:
+            return None
+
+        return matrix_config.load_matrix(self.data_dir, chunk_size=chunk_size, dtype=dtype)
+
+    def load_matrix_csr(self, matrix_name: str) -> Optional[sparse.csr_matrix]:
+        """Load the user-item matrix of the dataset as a sparse CSR matrix.
+
+        The CSR matrix is cached next to the matrix as separate NumPy arrays and
+        (re)created from the standardized matrix when missing or outdated.
+        The cached arrays are memory-mapped (read-only) so that the pages are shared
+        among all processes that load the same matrix, without parsing or copying.
+        Duplicate user-item pairs are summed.
+
         Args:
             matrix_name: the name of the matrix to load.
 
         Returns:
-            the loaded user-item matrix or None when not available.
+            the loaded CSR matrix with users as rows and items as columns or
+            None when not available.
         """
         matrix_config = self.get_matrix_config(matrix_name)
         if matrix_config is None:
             return None
 
-        return matrix_config.load_matrix(self.data_dir)
+        csr_dir = os.path.join(
+            self.data_dir,
+            TABLE_FILE_PREFIX + self.get_name() + '_' + matrix_name + MATRIX_CSR_SUFFIX
+        )
+        matrix_file_path = self.get_matrix_file_path(matrix_name)
+        if not is_csr_matrix_cached(csr_dir, matrix_file_path):
+            matrix = matrix_config.table.read_table(
+                self.data_dir,
+                columns=[matrix_config.user.key, matrix_config.item.key,
+                         matrix_config.table.columns[0]]
+            )
+            users = matrix[matrix_config.user.key].to_numpy()
+            items = matrix[matrix_config.item.key].to_numpy()
+            shape = (
+                max(matrix_config.user.num_records, int(users.max(initial=-1)) + 1),
+                max(matrix_config.item.num_records, int(items.max(initial=-1)) + 1)
+            )
+            save_csr_matrix(csr_dir, sparse.csr_matrix(
+                (matrix[matrix_config.table.columns[0]].to_numpy(), (users, items)),
+                shape=shape
+            ), matrix_file_path)
+
+        return load_csr_matrix(csr_dir)
 
-    def load_item_indices(self, matrix_name: str) -> Optional[List[int]]:
+    def load_item_indices(self, matrix_name: str) -> Optional[np.ndarray]:
         """Load the item indices.
 
         Optional indirection array of the item IDs that do not match up in
-        the corresponding data table.
+        the corresponding data table. The array is shared by all callers and
+        is therefore read-only, copy it before modifying.
 
         Args:
             matrix_name: the name of the matrix to load the item indices of.
@@ -233,19 +488,20 @@ class Dataset:
             KeyError: when the matrix with the specified name does not exist.
 
         Returns:
-            the indirection array or None when not needed.
+            the (cached read-only) int64 indirection array or None when not needed.
         """
         matrix_config = self.get_matrix_config(matrix_name)
         if not matrix_config:
             raise KeyError('Unknown matrix configuration to load item indices from')
 
-        return matrix_config.item.load_indices(self.data_dir)
+        return self._load_indices(matrix_name, 'item', matrix_config.item)
 
-    def load_user_indices(self, matrix_name: str) -> Optional[List[int]]:
+    def load_user_indices(self, matrix_name: str) -> Optional[np.ndarray]:
         """Load the user indices.
 
         Optional indirection array of the user IDs that do not match up in
-        the corresponding data table.
+        the corresponding data table. The array is shared by all callers and
+        is therefore read-only, copy it before modifying.
 
         Args:
             matrix_name: the name of the matrix to load the user indices of.
@@ -254,19 +510,144 @@ class Dataset:
             KeyError: when the matrix with the specified name does not exist.
 
         Returns:
-            the indirection array or None when not needed.
+            the (cached read-only) int64 indirection array or None when not needed.
         """
         matrix_config = self.get_matrix_config(matrix_name)
         if not matrix_config:
-            raise KeyError('Unknown matrix configuration to load item indices from')
+            raise KeyError('Unknown matrix configuration to load user indices from')
 
-        return matrix_config.user.load_indices(self.data_dir)
+        return self._load_indices(matrix_name, 'user', matrix_config.user)
+
+    def _create_attribute_arrays(
+            self,
+            matrix_name: str,
+            matrix_config: DatasetMatrixConfig,
+            table_name: str,
+            column_names: List[str]) -> Dict[str, AttributeArray]:
+        """Create the attribute arrays of the table columns from the table.
+
+        Args:
+            matrix_name: the name of the matrix to align the attributes with.
+            matrix_config: the configuration of the matrix.
+            table_name: the name of the table or 'matrix' for the columns of the matrix.
+            column_names: the names of the table columns to create the attribute arrays of.
+
+        Raises:
+            KeyError: when the table does not exist or is not related to the matrix.
+
+        Returns:
+            a dictionary with the column name as key and the attribute array as value.
+        """
+        if table_name == KEY_MATRIX:
+            primary_key = matrix_config.table.primary_key
+            return create_pair_attribute_arrays(
+                self.read_matrix(matrix_name, columns=primary_key + column_names),
+                primary_key,
+                column_names,
+                None,
+                None
+            )
+
+        table_config = self.get_table_config(table_name)
+        if table_config is None:
+            raise KeyError('Unknown table configuration to load attributes from')
+
+        table = self.read_table(table_name, columns=table_config.primary_key + column_names)
+        if table_config.primary_key == [matrix_config.user.key]:
+            return create_id_attribute_arrays(
+                table,
+                matrix_config.user.key,
+                column_names,
+                'user',
+                self.load_user_indices(matrix_name),
+                matrix_config.user.num_records
+            )
+        if table_config.primary_key == [matrix_config.item.key]:
+            return create_id_attribute_arrays(
+                table,
+                matrix_config.item.key,
+                column_names,
+                'item',
+                self.load_item_indices(matrix_name),
+                matrix_config.item.num_records
+            )
+        if table_config.primary_key == [matrix_config.user.key, matrix_config.item.key]:
+            return create_pair_attribute_arrays(
+                table,
+                table_config.primary_key,
+                column_names,
+                self.load_user_indices(matrix_name),
+                self.load_item_indices(matrix_name)
+            )
+
+        raise KeyError('Table is not related to the matrix: ' + table_name)
+
+    def _load_indices(
+            self,
+            matrix_name: str,
+            index_name: str,
+            index_config: DatasetIndexConfig) -> Optional[np.ndarray]:
+        """Load the indices from the cache or from disk when not cached yet.
+
+        Args:
+            matrix_name: the name of the matrix to load the indices of.
+            index_name: the name of the indices, either 'user' or 'item'.
+            index_config: the configuration of the indices to load.
+
+        Returns:
+            the contiguous indirection array or None when not needed.
+        """
+        key = (matrix_name, index_name)
+        if key not in self.indices:
+            indices = index_config.load_indices(self.data_dir)
+            if indices is not None:
+                indices = np.ascontiguousarray(indices, dtype=np.int64)
+                # the array is shared by all callers and is therefore read-only
+                indices.flags.writeable = False
+
+            self.indices[key] = indices
+
+        return self.indices[key]
+
+    def read_event_table(
+            self,
+            event_table_name: str,
+            columns: List[Union[int,str]]=None,
+            chunk_size: int=None,
+            predicate: List[Tuple[str, str, Any]]=None) -> Optional[pd.DataFrame]:
+        """Read the event table with the specified name from the dataset.
+
+        The event tables that are partitioned by month only open the partitions
+        that overlap with the time range of the predicate.
+
+        Args:
+            event_table_name: name of the event table to read.
+            columns: subset list of columns to load or None to load all.
+            chunk_size: reads the event table in chunks as an iterator or
+                the entire table when None.
+            predicate: (optional) list of (column, operator, value) conditions that all need
+                to hold for a row to be read, e.g. [('timestamp', '>=', 1356998400)].
+
+        Returns:
+            the resulting event table dataframe (iterator) or None when not available.
+        """
+        event_table_config = self.config.events.get(event_table_name)
+        if event_table_config is None:
+            return None
+
+        return event_table_config.read_table(
+            self.data_dir,
+            columns=columns,
+            chunk_size=chunk_size,
+            predicate=predicate
+        )
 
     def read_matrix(
             self,
             matrix_name: str,
             columns: List[Union[int,str]]=None,
-            chunk_size: int=None) -> Optional[pd.DataFrame]:
+            chunk_size: int=None,
+            predicate: List[Tuple[str, str, Any]]=None) -> Optional[pd.DataFrame]:
         """Read the matrix with the specified name from the dataset.
 
         Args:
@@ -276,6 +657,8 @@ class Dataset:
                 strings that correspond to the one of the available table columns.
             chunk_size: reads the matrix in chunks as an iterator or
                 the entire table when None.
+            predicate: (optional) list of (column, operator, value) conditions that all need
+                to hold for a row to be read, e.g. [('matrix_rating', '>=', 3)].
 
         Returns:
             the resulting matrix dataframe (iterator) or None when not available.
@@ -284,14 +667,19 @@ class Dataset:
         if matrix_config is None:
             return None
 
-        table_config = matrix_config.table
-        return table_config.read_table(self.data_dir, columns=columns, chunk_size=chunk_size)
+        return matrix_config.table.read_table(
+            self.data_dir,
+            columns=columns,
+            chunk_size=chunk_size,
+            predicate=predicate
+        )
 
     def read_table(
             self,
             table_name: str,
             columns: List[Union[int,str]]=None,
-            chunk_size: int=None) -> Optional[pd.DataFrame]:
+            chunk_size: int=None,
+            predicate: List[Tuple[str, str, Any]]=None) -> Optional[pd.DataFrame]:
         """Read the table with the specified name from the dataset.
 
         Args:
@@ -301,6 +689,8 @@ class Dataset:
                 strings that correspond to the one of the available table columns.
             chunk_size: reads the table in chunks as an iterator or
                 the entire table when None.
+            predicate: (optional) list of (column, operator, value) conditions that all need
+                to hold for a row to be read, e.g. [('user_country', 'in', ['NL', 'BE'])].
 
         Returns:
             the resulting table dataframe (iterator) or None when not available.
@@ -309,7 +699,12 @@ class Dataset:
         if table_config is None:
             return None
 
-        return table_config.read_table(self.data_dir, columns=columns, chunk_size=chunk_size)
+        return table_config.read_table(
+            self.data_dir,
+            columns=columns,
+            chunk_size=chunk_size,
+            predicate=predicate
+        )
 
     def resolve_item_ids(
             self,
@@ -334,7 +729,7 @@ class Dataset:
         if item_indices is None:
             return items
 
-        return item_indices[items]
+        return np.take(item_indices, items)
 
     def resolve_user_ids(
             self,
@@ -359,7 +754,22 @@ class Dataset:
         if user_indices is None:
             return users
 
-        return user_indices[users]
+        return np.take(user_indices, users)
+
+    def update_statistics_catalog(self) -> Dict[str, Dict[str, Any]]:
+        """Update the statistics catalog of the dataset.
+
+        The entries of the catalog are computed for the tables and matrices
+        that are missing or outdated, e.g. when a matrix is added or changed.
+
+        Returns:
+            the statistics catalog with the matrix and table entries.
+        """
+        if self.catalog is None or \
+                not is_catalog_up_to_date(self.data_dir, self.catalog, self.config):
+            self.catalog = update_statistics_catalog(self.data_dir, self.config)
+
+        return self.catalog
 
 
 def add_dataset_columns(
@@ -369,6 +779,10 @@ def add_dataset_columns(
         column_names: List[str]) -> pd.DataFrame:
     """Add the specified columns from the dataset to the dataframe.
 
+    The columns are taken from the (cached) attribute arrays of the dataset, which are
+    aligned with the matrix user/item ids. The input dataframe is not modified and its
+    columns are shared with the resulting dataframe instead of copied.
+
     Args:
         dataset: the set related to the dataframe.
         matrix_name: the name of the dataset matrix.
@@ -380,59 +794,16 @@ def add_dataset_columns(
     Returns:
         the resulting dataframe with the added columns that exist in the dataset.
     """
+    result = dataframe.copy(deep=False)
+
     for table_name, table_columns in dataset.get_available_columns(matrix_name).items():
         columns = [c for c in column_names if c in table_columns]
         # skip table that does not contain any needed columns
         if len(columns) == 0:
             continue
 
-        matrix_config = dataset.get_matrix_config(matrix_name)
-        table_config = dataset.get_table_config(table_name)
-
-        user_key = matrix_config.user.key
-        item_key = matrix_config.item.key
-        user_item_key = [user_key, item_key]
-
-        # add matrix columns
-        if table_name == 'matrix':
-            dataframe = pd.merge(
-                dataframe,
-                dataset.read_matrix(matrix_name, columns=matrix_config.table.primary_key + columns),
-                how='left',
-                left_on=['user', 'item'],
-                right_on=matrix_config.table.primary_key
-            )
-            dataframe.drop(matrix_config.table.primary_key, inplace=True, axis=1)
-        # add user columns
-        elif table_config.primary_key == [user_key]:
-            dataframe[user_key] = dataset.resolve_user_ids(matrix_name, dataframe['user'])
-            dataframe = pd.merge(
-                dataframe,
-                dataset.read_table(table_name, columns=table_config.primary_key + columns),
-                how='left',
-                on=user_key
-            )
-            dataframe.drop(user_key, inplace=True, axis=1)
-        # add item columns
-        elif table_config.primary_key == [item_key]:
-            dataframe[item_key] = dataset.resolve_item_ids(matrix_name, dataframe['item'])
-            dataframe = pd.merge(
-                dataframe,
-                dataset.read_table(table_name, columns=table_config.primary_key + columns),
-                how='left',
-                on=item_key
-            )
-            dataframe.drop(item_key, inplace=True, axis=1)
-        # add user-item columns
-        elif table_config.primary_key == user_item_key:
-            dataframe[user_key] = dataset.resolve_user_ids(matrix_name, dataframe['user'])
-            dataframe[item_key] = dataset.resolve_item_ids(matrix_name, dataframe['item'])
-            dataframe = pd.merge(
-                dataframe,
-                dataset.read_table(table_name, columns=table_config.primary_key + columns),
-                how='left',
-                on=user_item_key
-            )
-            dataframe.drop(user_item_key, inplace=True, axis=1)
+        attributes = dataset.load_attribute_arrays(matrix_name, table_name, columns)
+        for column_name in columns:
+            result[column_name] = attributes[column_name].take(dataframe)
 
-    return dataframe
+    return result
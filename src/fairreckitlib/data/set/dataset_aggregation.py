@@ -0,0 +1,256 @@
+"""This module contains functionality to aggregate user-item pairs in linear passes.
+
+The user-item pairs are encoded as a single 64-bit key, with the user in the upper
+and the item in the lower 32 bits, so that the pairs are ordered by user and item.
+Pairs are accumulated in memory and combined (summed) once enough pairs are pending,
+which amortizes the sorting over all the added pairs. When the number of distinct
+pairs exceeds the memory limit, the combined pairs are spilled to disk as a sorted
+run, and the runs are merged afterwards with an external-memory sort-merge.
+Runs also serve as the binary partial aggregates of (parallel) partition scans.
+
+Constants:
+
+    DEFAULT_MAX_PAIRS: the default maximum number of distinct pairs kept in memory.
+
+Classes:
+
+    PairAggregator: aggregate the values of (user, item) pairs with a bounded memory usage.
+
+Functions:
+
+    combine_pairs: combine the values of duplicate pair keys by summing them.
+    decode_pairs: decode the pair keys to users and items.
+    encode_pairs: encode users and items to pair keys.
+
+This program has been developed by students from the bachelor Computer Science at
+Utrecht University within the Software Project course.
+© Copyright Utrecht University (Department of Information and Computing Sciences)
+"""
+
+import os
+from typing import Iterator, List, Tuple
+
+import numpy as np
+
+DEFAULT_MAX_PAIRS = 50E6
+
+MAX_PAIR_ID = 2 ** 31 - 1
+MIN_PENDING_PAIRS = 1E6
+
+RUN_KEYS_EXT = '_keys.npy'
+RUN_VALUES_EXT = '_values.npy'
+
+
+class PairAggregator:
+    """Pair Aggregator that sums the values of (user, item) pairs.
+
+    The pairs that are added to the aggregator are combined in memory until the
+    number of distinct pairs exceeds the maximum, after which they are spilled as
+    a sorted run to the spill directory. The aggregated pairs are retrieved in
+    ascending (user, item) order by merging the in-memory pairs with the runs.
+
+    Public methods:
+
+    add
+    add_runs
+    flush
+    get_num_runs
+    merge
+    """
+
+    def __init__(
+            self,
+            spill_dir: str,
+            *,
+            max_pairs: int=DEFAULT_MAX_PAIRS,
+            run_prefix: str='run'):
+        """Construct the pair aggregator.
+
+        Args:
+            spill_dir: the (existing) directory to spill the sorted runs to.
+            max_pairs: the maximum number of distinct pairs to keep in memory.
+            run_prefix: the file name prefix of the spilled runs, which needs to be
+                unique for aggregators that share the spill directory.
+        """
+        self.spill_dir = spill_dir
+        self.run_prefix = run_prefix
+        self.max_pairs = int(max_pairs)
+        # combined pairs sorted by key
+        self.keys = np.empty(0, dtype=np.int64)
+        self.values = np.empty(0, dtype=np.float64)
+        # added pairs that are not combined yet
+        self.pending_keys = []
+        self.pending_values = []
+        self.num_pending = 0
+        # file paths of the spilled runs without extension
+        self.runs = []
+
+    def add(self, users: np.ndarray, items: np.ndarray, values: np.ndarray) -> None:
+        """Add the values of the specified (user, item) pairs.
+
+        Args:
+            users: the user ids of the pairs.
+            items: the item ids of the pairs.
+            values: the values of the pairs to sum.
+
+        Raises:
+            ValueError: when the ids are negative or do not fit in 31 bits.
+        """
+        self.pending_keys.append(encode_pairs(users, items))
+        self.pending_values.append(np.asarray(values, dtype=np.float64))
+        self.num_pending += len(self.pending_keys[-1])
+
+        # combining when the pending pairs outnumber the combined pairs keeps it linear
+        if self.num_pending >= max(len(self.keys), min(MIN_PENDING_PAIRS, self.max_pairs)):
+            self._combine()
+
+    def add_runs(self, runs: List[str]) -> None:
+        """Add the sorted runs of another aggregator to be merged with the pairs.
+
+        Args:
+            runs: the file paths of the runs without extension, as returned by flush.
+        """
+        self.runs += runs
+
+    def flush(self) -> List[str]:
+        """Flush all the aggregated pairs to disk as sorted runs.
+
+        Returns:
+            the file paths of the runs without extension.
+        """
+        self._combine()
+        if len(self.keys) > 0:
+            self._spill()
+
+        return list(self.runs)
+
+    def get_num_runs(self) -> int:
+        """Get the number of runs that are spilled to disk.
+
+        Returns:
+            the number of sorted runs.
+        """
+        return len(self.runs)
+
+    def merge(
+            self,
+            chunk_size: int=DEFAULT_MAX_PAIRS
+    ) -> Iterator[Tuple[np.ndarray, np.ndarray, np.ndarray]]:
+        """Merge the aggregated pairs in ascending (user, item) order.
+
+        Args:
+            chunk_size: the number of pairs to read from each run at once.
+
+        Returns:
+            an iterator of (users, items, values) chunks with distinct pairs.
+        """
+        self._combine()
+        chunk_size = int(chunk_size)
+
+        if len(self.runs) == 0:
+            for start in range(0, len(self.keys), chunk_size):
+                end = start + chunk_size
+                yield (*decode_pairs(self.keys[start:end]), self.values[start:end])
+            return
+
+        if len(self.keys) > 0:
+            self._spill()
+
+        run_keys = [np.load(run + RUN_KEYS_EXT, mmap_mode='r') for run in self.runs]
+        run_values = [np.load(run + RUN_VALUES_EXT, mmap_mode='r') for run in self.runs]
+        positions = [0] * len(self.runs)
+
+        while True:
+            active = [i for i, keys in enumerate(run_keys) if positions[i] < len(keys)]
+            if len(active) == 0:
+                break
+
+            # all the keys up to the smallest last key of the blocks are present in the blocks
+            bound = min(run_keys[i][min(positions[i] + chunk_size, len(run_keys[i])) - 1]
+                        for i in active)
+
+            keys = []
+            values = []
+            for i in active:
+                block = run_keys[i][positions[i]:positions[i] + chunk_size]
+                num_keys = int(np.searchsorted(block, bound, side='right'))
+                keys.append(np.array(block[:num_keys]))
+                values.append(np.array(run_values[i][positions[i]:positions[i] + num_keys]))
+                positions[i] += num_keys
+
+            keys, values = combine_pairs(np.concatenate(keys), np.concatenate(values))
+            yield (*decode_pairs(keys), values)
+
+    def _combine(self) -> None:
+        """Combine the pending pairs with the combined pairs and spill when needed."""
+        if self.num_pending == 0:
+            return
+
+        self.keys, self.values = combine_pairs(
+            np.concatenate([self.keys] + self.pending_keys),
+            np.concatenate([self.values] + self.pending_values)
+        )
+        self.pending_keys = []
+        self.pending_values = []
+        self.num_pending = 0
+
+        if len(self.keys) > self.max_pairs:
+            self._spill()
+
+    def _spill(self) -> None:
+        """Spill the combined pairs to disk as a sorted run."""
+        run = os.path.join(self.spill_dir, self.run_prefix + '_' + str(len(self.runs)))
+        np.save(run + RUN_KEYS_EXT, self.keys)
+        np.save(run + RUN_VALUES_EXT, self.values)
+        self.runs.append(run)
+
+        self.keys = np.empty(0, dtype=np.int64)
+        self.values = np.empty(0, dtype=np.float64)
+
+
+def combine_pairs(keys: np.ndarray, values: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Combine the values of duplicate pair keys by summing them.
+
+    Args:
+        keys: the (unsorted) pair keys.
+        values: the values that belong to the pair keys.
+
+    Returns:
+        the sorted distinct pair keys and the summed values.
+    """
+    unique_keys, inverse = np.unique(keys, return_inverse=True)
+    return unique_keys, np.bincount(inverse, weights=values, minlength=len(unique_keys))
+
+
+def decode_pairs(keys: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Decode the pair keys to users and items.
+
+    Args:
+        keys: the pair keys to decode.
+
+    Returns:
+        the user ids and item ids of the pairs.
+    """
+    return keys >> 32, keys & MAX_PAIR_ID
+
+
+def encode_pairs(users: np.ndarray, items: np.ndarray) -> np.ndarray:
+    """Encode users and items to pair keys that are ordered by user and item.
+
+    Args:
+        users: the user ids to encode.
+        items: the item ids to encode.
+
+    Raises:
+        ValueError: when the ids are negative or do not fit in 31 bits.
+
+    Returns:
+        the encoded pair keys.
+    """
+    users = np.asarray(users, dtype=np.int64)
+    items = np.asarray(items, dtype=np.int64)
+    for ids in [users, items]:
+        if len(ids) > 0 and (ids.min() < 0 or ids.max() > MAX_PAIR_ID):
+            raise ValueError('Expected pair ids in the range [0, ' + str(MAX_PAIR_ID) + ']')
+
+    return (users << 32) | items
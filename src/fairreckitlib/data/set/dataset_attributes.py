@@ -0,0 +1,276 @@
+"""This module contains attribute arrays of dataset table columns that are aligned with a matrix.
+
+The attributes of a user/item table column are materialized in a dense array that is
+indexed by the user/item id of the matrix, so that the attributes of any dataframe with
+matrix ids are looked up with a single take. The values of categorical columns are
+dictionary-encoded first, which makes the dense array share a single object per category.
+Columns that are already pandas Categorical are kept as integer codes instead, and are
+taken as pandas Categorical with the same categories.
+Ids that do not have a record in the table are assigned a missing value (NaN).
+
+The attributes of a user-item table column are aligned by their combined user-item key,
+of which the positions in the table are found with a binary search.
+
+Classes:
+
+    AttributeArray: the attribute array of a table column that is aligned with a matrix.
+
+Functions:
+
+    create_id_attribute_arrays: create the attribute arrays of user/item table columns.
+    create_pair_attribute_arrays: create the attribute arrays of user-item table columns.
+
+This program has been developed by students from the bachelor Computer Science at
+Utrecht University within the Software Project course.
+© Copyright Utrecht University (Department of Information and Computing Sciences)
+"""
+
+from typing import Dict, List, Optional, Tuple, Union
+
+import numpy as np
+import pandas as pd
+from pandas.api.types import is_numeric_dtype
+
+
+class AttributeArray:
+    """Attribute Array of a table column that is aligned with the ids of a matrix.
+
+    The array is indexed by the 'user' or 'item' id of the matrix, or by the position
+    of the combined user-item key in the sorted pair keys. Ids or pairs that are not
+    present are taken as the missing value (NaN). The arrays are shared and therefore
+    read-only. The values of a categorical attribute are the integer codes of the categories.
+
+    Public methods:
+
+    take
+    """
+
+    def __init__(
+            self,
+            values: np.ndarray,
+            key_name: Optional[str],
+            *,
+            dtype: pd.CategoricalDtype=None,
+            pair_keys: np.ndarray=None,
+            user_indices: np.ndarray=None,
+            item_indices: np.ndarray=None):
+        """Construct the attribute array.
+
+        Args:
+            values: the attribute values.
+            key_name: the matrix column that indexes the values, either 'user' or 'item',
+                or None when the values are indexed by the combined user-item keys.
+            dtype: the (optional) categorical dtype when the values are the category codes.
+            pair_keys: the sorted combined user-item keys of the table.
+            user_indices: the (optional) indirection array of the matrix user ids.
+            item_indices: the (optional) indirection array of the matrix item ids.
+        """
+        self.values = values
+        self.values.flags.writeable = False
+        self.key_name = key_name
+        self.dtype = dtype
+        self.pair_keys = pair_keys
+        self.user_indices = user_indices
+        self.item_indices = item_indices
+
+    def take(self, dataframe: pd.DataFrame) -> Union[np.ndarray, pd.Categorical]:
+        """Take the attribute values of the matrix ids in the dataframe.
+
+        Args:
+            dataframe: with the 'user' and/or 'item' columns of the matrix.
+
+        Returns:
+            the attribute values that are aligned with the rows of the dataframe,
+            which are pandas Categorical for a categorical attribute.
+        """
+        if self.key_name is not None:
+            rows = dataframe[self.key_name].to_numpy()
+        else:
+            users = _resolve_ids(dataframe['user'].to_numpy(), self.user_indices)
+            items = _resolve_ids(dataframe['item'].to_numpy(), self.item_indices)
+            rows = _search_sorted_keys(self.pair_keys, _create_pair_keys(users, items))
+
+        if self.dtype is not None:
+            return pd.Categorical.from_codes(_take_codes(self.values, rows), dtype=self.dtype)
+
+        return _take_rows(self.values, rows)
+
+
+def create_id_attribute_arrays(
+        table: pd.DataFrame,
+        key: str,
+        column_names: List[str],
+        key_name: str,
+        indices: Optional[np.ndarray],
+        num_ids: int) -> Dict[str, AttributeArray]:
+    """Create the attribute arrays of user/item table columns.
+
+    Args:
+        table: the user/item table with the key and attribute columns.
+        key: the name of the key column of the table.
+        column_names: the names of the attribute columns.
+        key_name: the matrix column that is associated with the key, either 'user' or 'item'.
+        indices: the (optional) indirection array of the matrix ids to the table keys.
+        num_ids: the number of user/item ids in the matrix.
+
+    Returns:
+        a dictionary with the column name as key and the attribute array as value.
+    """
+    table_keys = table[key].to_numpy()
+    if indices is None:
+        matrix_keys = np.arange(max(num_ids, int(table_keys.max(initial=-1)) + 1))
+    else:
+        matrix_keys = np.asarray(indices, dtype=np.int64)
+
+    order = np.argsort(table_keys, kind='stable')
+    rows = _search_sorted_keys(table_keys[order], matrix_keys)
+    rows[rows < len(order)] = order[rows[rows < len(order)]]
+
+    attributes = {}
+    for name in column_names:
+        values, dtype = _encode_column(table[name])
+        attributes[name] = AttributeArray(
+            _take_rows(values, rows) if dtype is None else _take_codes(values, rows),
+            key_name,
+            dtype=dtype
+        )
+
+    return attributes
+
+
+def create_pair_attribute_arrays(
+        table: pd.DataFrame,
+        key: List[str],
+        column_names: List[str],
+        user_indices: Optional[np.ndarray],
+        item_indices: Optional[np.ndarray]) -> Dict[str, AttributeArray]:
+    """Create the attribute arrays of user-item table columns.
+
+    Args:
+        table: the user-item table with the key and attribute columns.
+        key: the names of the user and item key columns of the table.
+        column_names: the names of the attribute columns.
+        user_indices: the (optional) indirection array of the matrix user ids to the table keys.
+        item_indices: the (optional) indirection array of the matrix item ids to the table keys.
+
+    Returns:
+        a dictionary with the column name as key and the attribute array as value.
+    """
+    pair_keys = _create_pair_keys(table[key[0]].to_numpy(), table[key[1]].to_numpy())
+    order = np.argsort(pair_keys, kind='stable')
+    # the sorted keys are shared by the attribute arrays of all the columns
+    pair_keys = pair_keys[order]
+    pair_keys.flags.writeable = False
+
+    attributes = {}
+    for name in column_names:
+        values, dtype = _encode_column(table[name])
+        attributes[name] = AttributeArray(
+            np.take(values, order),
+            None,
+            dtype=dtype,
+            pair_keys=pair_keys,
+            user_indices=user_indices,
+            item_indices=item_indices
+        )
+
+    return attributes
+
+
+def _create_pair_keys(users: np.ndarray, items: np.ndarray) -> np.ndarray:
+    """Create the combined user-item keys, which preserve the order of the pairs.
+
+    Args:
+        users: the non-negative user keys.
+        items: the non-negative item keys, which are less than 2^32.
+
+    Returns:
+        the combined user-item keys.
+    """
+    return (users.astype(np.int64) << 32) | items.astype(np.int64)
+
+
+def _encode_column(column: pd.Series) -> Tuple[np.ndarray, Optional[pd.CategoricalDtype]]:
+    """Encode the values of a table column.
+
+    The categories of a non-numerical column are dictionary-encoded first,
+    so that each of the categories is a single object that is shared by the values.
+    A pandas Categorical column is encoded as the integer codes of its categories.
+
+    Args:
+        column: the table column to encode.
+
+    Returns:
+        the values of the column and the categorical dtype when the values are codes.
+    """
+    if isinstance(column.dtype, pd.CategoricalDtype):
+        return column.cat.codes.to_numpy(), column.dtype
+    if is_numeric_dtype(column):
+        return column.to_numpy(), None
+
+    codes, categories = pd.factorize(column)
+    # missing values have code -1 and are taken from the appended NaN category
+    categories = np.append(categories.to_numpy(dtype=object), np.nan)
+    return categories.take(codes), None
+
+
+def _resolve_ids(ids: np.ndarray, indices: Optional[np.ndarray]) -> np.ndarray:
+    """Resolve the matrix ids to the table keys."""
+    return ids if indices is None else np.take(indices, ids)
+
+
+def _search_sorted_keys(sorted_keys: np.ndarray, keys: np.ndarray) -> np.ndarray:
+    """Search the positions of the keys in the sorted keys.
+
+    Args:
+        sorted_keys: the sorted keys to search in.
+        keys: the keys to search for.
+
+    Returns:
+        the (first) position of each key, or the number of sorted keys when it is missing.
+    """
+    positions = np.searchsorted(sorted_keys, keys)
+    found = positions < len(sorted_keys)
+    found[found] = sorted_keys[positions[found]] == keys[found]
+    positions[~found] = len(sorted_keys)
+    return positions
+
+
+def _take_codes(codes: np.ndarray, rows: np.ndarray) -> np.ndarray:
+    """Take the category codes of the rows, where rows past the last one are missing (-1).
+
+    Args:
+        codes: the category codes to take the rows of.
+        rows: the rows to take.
+
+    Returns:
+        the category codes of the rows.
+    """
+    result = np.full(len(rows), -1, dtype=codes.dtype)
+    found = rows < len(codes)
+    result[found] = codes[rows[found]]
+    return result
+
+
+def _take_rows(values: np.ndarray, rows: np.ndarray) -> np.ndarray:
+    """Take the rows of the values, where rows past the last one are the missing value.
+
+    Args:
+        values: the values to take the rows of.
+        rows: the rows to take.
+
+    Returns:
+        the values of the rows, which are converted to floating-point when integer
+        values are missing.
+    """
+    if len(rows) == 0 or rows.max() < len(values):
+        return np.take(values, rows)
+
+    missing = rows >= len(values)
+    result = np.take(values, np.where(missing, 0, rows)) if len(values) > 0 else \
+        np.empty(len(rows), dtype=values.dtype)
+    if result.dtype.kind in 'biu':
+        result = result.astype(np.float64)
+
+    result[missing] = np.nan
+    return result
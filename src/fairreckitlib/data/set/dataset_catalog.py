@@ -0,0 +1,375 @@
+"""This module contains the statistics catalog of processed datasets.
+
+The statistics catalog contains the statistics of each of the dataset table columns and
+matrices, which are computed with a single (chunked) pass over the table once the dataset
+is processed. The catalog is stored next to the dataset configuration file, so that the
+creation of (filter) parameters and other queries do not need to scan the tables again.
+Each catalog entry is tied to the modification time and size of the table file(s), and
+entries that are missing or outdated are computed again when the catalog is updated.
+
+The statistics of a matrix contain the statistics of the matrix columns, the interaction
+counts summary of the users/items and a histogram of the ratings. The interaction counts
+per user/item are stored in separate NumPy files next to the catalog.
+
+The catalog is kept in memory when the dataset directory is read-only, in which case the
+interaction counts are kept in the matrix entry and the entry is not saved at all.
+
+Constants:
+
+    CATALOG_CHUNK_SIZE: the size of the chunks to compute the statistics with.
+    KEY_INTERACTION_COUNTS: the key of the interaction counts that are kept in a matrix entry.
+    RATING_HISTOGRAM_BINS: the number of bins of the rating histogram.
+
+Functions:
+
+    create_matrix_catalog: create the catalog entry of a dataset matrix.
+    create_table_catalog: create the catalog entry of a dataset table.
+    is_catalog_up_to_date: check whether the statistics catalog is up-to-date with the dataset.
+    load_interaction_counts: load the interaction counts per user/item of a dataset matrix.
+    load_statistics_catalog: load the statistics catalog of a dataset.
+    update_statistics_catalog: update the missing/outdated entries of the statistics catalog.
+
+This program has been developed by students from the bachelor Computer Science at
+Utrecht University within the Software Project course.
+© Copyright Utrecht University (Department of Information and Computing Sciences)
+"""
+
+import os
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from ...core.io.io_utility import load_json, save_json
+from .dataset_config import DATASET_RATINGS_IMPLICIT
+from .dataset_config import DatasetConfig, DatasetMatrixConfig, DatasetTableConfig
+from .dataset_constants import KEY_MATRICES, KEY_TABLES, STATISTICS_CATALOG_FILE
+from .dataset_constants import TABLE_FILE_PREFIX
+from .dataset_statistics import MAX_CATEGORIES
+from .dataset_statistics import ColumnStatistics, Histogram, InteractionCounts
+
+CATALOG_CHUNK_SIZE = 1000000
+KEY_INTERACTION_COUNTS = 'interaction_counts'
+RATING_HISTOGRAM_BINS = 20
+
+
+def create_matrix_catalog(
+        dataset_dir: str,
+        matrix_config: DatasetMatrixConfig,
+        *,
+        chunk_size: int=CATALOG_CHUNK_SIZE) -> Dict[str, Any]:
+    """Create the catalog entry of a dataset matrix.
+
+    The interaction counts per user/item are saved in the dataset directory as well,
+    or are kept in the entry when they cannot be saved.
+
+    Args:
+        dataset_dir: the directory of the dataset.
+        matrix_config: the configuration of the matrix.
+        chunk_size: the size of the chunks to compute the statistics with.
+
+    Returns:
+        a dictionary containing the matrix (column) statistics.
+    """
+    user_key = matrix_config.user.key
+    item_key = matrix_config.item.key
+    rating_column = matrix_config.table.columns[0]
+
+    users = InteractionCounts()
+    items = InteractionCounts()
+    ratings = Histogram(_create_rating_bin_edges(matrix_config))
+
+    def on_chunk(chunk):
+        users.add(chunk[user_key].to_numpy())
+        items.add(chunk[item_key].to_numpy())
+        ratings.add(chunk[rating_column].to_numpy())
+
+    catalog = _create_catalog_entry(dataset_dir, matrix_config.table, chunk_size, on_chunk)
+    catalog['users'] = users.to_json_format()
+    catalog['items'] = items.to_json_format()
+    catalog['ratings'] = ratings.to_json_format()
+
+    interaction_counts = {'user': users.get_counts(), 'item': items.get_counts()}
+    try:
+        for index_name, counts in interaction_counts.items():
+            np.save(_get_counts_file_path(dataset_dir, matrix_config, index_name), counts)
+    except OSError:
+        catalog[KEY_INTERACTION_COUNTS] = interaction_counts
+
+    return catalog
+
+
+def create_table_catalog(
+        dataset_dir: str,
+        table_config: DatasetTableConfig,
+        *,
+        chunk_size: int=CATALOG_CHUNK_SIZE) -> Dict[str, Any]:
+    """Create the catalog entry of a dataset table.
+
+    Args:
+        dataset_dir: the directory of the dataset.
+        table_config: the configuration of the table.
+        chunk_size: the size of the chunks to compute the statistics with.
+
+    Returns:
+        a dictionary containing the table column statistics.
+    """
+    return _create_catalog_entry(dataset_dir, table_config, chunk_size)
+
+
+def is_catalog_up_to_date(
+        dataset_dir: str,
+        catalog: Dict[str, Dict[str, Any]],
+        dataset_config: DatasetConfig) -> bool:
+    """Check whether the statistics catalog is up-to-date with the dataset (configuration).
+
+    Args:
+        dataset_dir: the directory of the dataset.
+        catalog: the statistics catalog of the dataset.
+        dataset_config: the configuration of the dataset.
+
+    Returns:
+        whether the catalog contains an up-to-date entry for each matrix and table only.
+    """
+    if catalog[KEY_MATRICES].keys() != dataset_config.matrices.keys() or \
+            catalog[KEY_TABLES].keys() != dataset_config.tables.keys():
+        return False
+
+    return all(_is_entry_up_to_date(dataset_dir, catalog[KEY_MATRICES][name], config.table)
+               for name, config in dataset_config.matrices.items()) and \
+        all(_is_entry_up_to_date(dataset_dir, catalog[KEY_TABLES][name], config)
+            for name, config in dataset_config.tables.items())
+
+
+def load_interaction_counts(
+        dataset_dir: str,
+        matrix_entry: Dict[str, Any],
+        matrix_config: DatasetMatrixConfig,
+        index_name: str) -> Optional[np.ndarray]:
+    """Load the interaction counts per user/item of a dataset matrix.
+
+    Args:
+        dataset_dir: the directory of the dataset.
+        matrix_entry: the (up-to-date) catalog entry of the matrix.
+        matrix_config: the configuration of the matrix.
+        index_name: the name of the interaction counts, either 'user' or 'item'.
+
+    Returns:
+        the interaction counts indexed by user/item id or None when not available.
+    """
+    if KEY_INTERACTION_COUNTS in matrix_entry:
+        return matrix_entry[KEY_INTERACTION_COUNTS][index_name]
+
+    file_path = _get_counts_file_path(dataset_dir, matrix_config, index_name)
+    if not os.path.isfile(file_path):
+        return None
+
+    return np.load(file_path)
+
+
+def load_statistics_catalog(dataset_dir: str) -> Dict[str, Dict[str, Any]]:
+    """Load the statistics catalog of a dataset.
+
+    Args:
+        dataset_dir: the directory of the dataset.
+
+    Returns:
+        the statistics catalog with the matrix and table entries, which are empty
+        when the catalog file is missing or invalid.
+    """
+    catalog = {KEY_MATRICES: {}, KEY_TABLES: {}}
+
+    file_path = os.path.join(dataset_dir, STATISTICS_CATALOG_FILE)
+    if os.path.isfile(file_path):
+        try:
+            catalog_file = load_json(file_path)
+            catalog[KEY_MATRICES] = dict(catalog_file[KEY_MATRICES])
+            catalog[KEY_TABLES] = dict(catalog_file[KEY_TABLES])
+        except (KeyError, TypeError, ValueError):
+            pass
+
+    return catalog
+
+
+def update_statistics_catalog(
+        dataset_dir: str,
+        dataset_config: DatasetConfig,
+        *,
+        chunk_size: int=CATALOG_CHUNK_SIZE) -> Dict[str, Dict[str, Any]]:
+    """Update the missing/outdated entries of the statistics catalog of a dataset.
+
+    The catalog file is only saved when any of the entries changed and is kept
+    in memory when it cannot be saved, e.g. when the dataset directory is read-only.
+
+    Args:
+        dataset_dir: the directory of the dataset.
+        dataset_config: the configuration of the dataset.
+        chunk_size: the size of the chunks to compute the statistics with.
+
+    Returns:
+        the updated statistics catalog.
+    """
+    catalog = load_statistics_catalog(dataset_dir)
+    changed = False
+
+    for catalog_key, configs in [
+            (KEY_MATRICES, dataset_config.matrices),
+            (KEY_TABLES, dataset_config.tables)]:
+        entries = catalog[catalog_key]
+        for name in [name for name in entries if name not in configs]:
+            del entries[name]
+            changed = True
+
+        for name, config in configs.items():
+            table_config = config.table if catalog_key == KEY_MATRICES else config
+            if name in entries and _is_entry_up_to_date(dataset_dir, entries[name], table_config):
+                continue
+
+            if catalog_key == KEY_MATRICES:
+                entries[name] = create_matrix_catalog(dataset_dir, config, chunk_size=chunk_size)
+            else:
+                entries[name] = create_table_catalog(dataset_dir, config, chunk_size=chunk_size)
+            changed = True
+
+    if changed:
+        # the entries of which the interaction counts are kept in memory are not saved
+        catalog_file = {
+            catalog_key: {name: entry for name, entry in entries.items()
+                          if KEY_INTERACTION_COUNTS not in entry}
+            for catalog_key, entries in catalog.items()
+        }
+
+        try:
+            save_json(os.path.join(dataset_dir, STATISTICS_CATALOG_FILE), catalog_file)
+        except OSError:
+            pass
+
+    return catalog
+
+
+def _create_catalog_entry(
+        dataset_dir: str,
+        table_config: DatasetTableConfig,
+        chunk_size: int,
+        on_chunk=None) -> Dict[str, Any]:
+    """Create the catalog entry with the column statistics of a table.
+
+    Args:
+        dataset_dir: the directory of the dataset.
+        table_config: the configuration of the table.
+        chunk_size: the size of the chunks to compute the statistics with.
+        on_chunk: (optional) function that is called with each of the table chunks.
+
+    Returns:
+        a dictionary containing the table file (stat), number of records and column statistics.
+    """
+    columns = {name: ColumnStatistics(MAX_CATEGORIES) for name in table_config.get_column_names()}
+    # stat before reading so that a concurrent change invalidates the entry
+    file_stat = _get_table_stat(dataset_dir, table_config)
+
+    if table_config.num_records > 0:
+        for _, chunk in enumerate(table_config.read_table(dataset_dir, chunk_size=chunk_size)):
+            for column_name, column_stats in columns.items():
+                column_stats.add(chunk[column_name])
+
+            if on_chunk is not None:
+                on_chunk(chunk)
+
+    return {
+        'file_name': table_config.file.name,
+        'file_stat': file_stat,
+        'num_records': table_config.num_records,
+        'columns': {name: stats.to_json_format() for name, stats in columns.items()}
+    }
+
+
+def _create_rating_bin_edges(matrix_config: DatasetMatrixConfig) -> np.ndarray:
+    """Create the bin edges of the rating histogram of a matrix.
+
+    Implicit ratings (e.g. play counts) are heavily skewed and are therefore binned with
+    logarithmically spaced edges, explicit ratings with linearly spaced edges.
+
+    Args:
+        matrix_config: the configuration of the matrix.
+
+    Returns:
+        the bin edges of the rating histogram.
+    """
+    rating_min = float(matrix_config.ratings.rating_min)
+    rating_max = max(float(matrix_config.ratings.rating_max), rating_min + 1.0)
+    if matrix_config.ratings.rating_type == DATASET_RATINGS_IMPLICIT and rating_min > 0:
+        return np.geomspace(rating_min, rating_max, RATING_HISTOGRAM_BINS + 1)
+
+    return np.linspace(rating_min, rating_max, RATING_HISTOGRAM_BINS + 1)
+
+
+def _get_counts_file_path(
+        dataset_dir: str,
+        matrix_config: DatasetMatrixConfig,
+        index_name: str) -> str:
+    """Get the path of the file with the interaction counts per user/item of a matrix.
+
+    Args:
+        dataset_dir: the directory of the dataset.
+        matrix_config: the configuration of the matrix.
+        index_name: the name of the interaction counts, either 'user' or 'item'.
+
+    Returns:
+        the path of the interaction counts file.
+    """
+    matrix_file_name = matrix_config.table.file.name.split('.')[0]
+    # the matrix files of processed datasets are already prefixed
+    if not matrix_file_name.startswith(TABLE_FILE_PREFIX):
+        matrix_file_name = TABLE_FILE_PREFIX + matrix_file_name
+
+    return os.path.join(dataset_dir, matrix_file_name + '_' + index_name + '_counts.npy')
+
+
+def _get_table_stat(dataset_dir: str, table_config: DatasetTableConfig) -> List[List[Any]]:
+    """Get the relative name, modification time and size of the file(s) of a table.
+
+    The file of a table with the npy storage or with time partitions is a directory.
+
+    Args:
+        dataset_dir: the directory of the dataset.
+        table_config: the configuration of the table.
+
+    Returns:
+        a sorted list with the name, modification time (in nanoseconds) and size of each
+        file, which is empty when the table file does not exist.
+    """
+    path = os.path.join(dataset_dir, table_config.file.name)
+    if not os.path.isdir(path):
+        if not os.path.isfile(path):
+            return []
+
+        stat = os.stat(path)
+        return [[os.path.basename(path), stat.st_mtime_ns, stat.st_size]]
+
+    result = []
+    for root, _, file_names in os.walk(path):
+        for file_name in file_names:
+            stat = os.stat(os.path.join(root, file_name))
+            name = os.path.relpath(os.path.join(root, file_name), path)
+            result.append([name, stat.st_mtime_ns, stat.st_size])
+
+    return sorted(result)
+
+
+def _is_entry_up_to_date(
+        dataset_dir: str,
+        entry: Dict[str, Any],
+        table_config: DatasetTableConfig) -> bool:
+    """Check whether the catalog entry is up-to-date with the table (configuration).
+
+    Args:
+        dataset_dir: the directory of the dataset.
+        entry: the catalog entry of the table.
+        table_config: the configuration of the table.
+
+    Returns:
+        whether the entry describes the same unchanged table file(s) and columns.
+    """
+    return entry.get('file_name') == table_config.file.name and \
+        entry.get('num_records') == table_config.num_records and \
+        list(entry.get('columns', {}).keys()) == table_config.get_column_names() and \
+        entry.get('file_stat') == _get_table_stat(dataset_dir, table_config)
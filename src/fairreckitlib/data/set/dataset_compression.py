@@ -0,0 +1,299 @@
+"""This module contains the compression codecs of dataset files.
+
+A compression codec describes how the (de)compressed stream of a dataset file is opened,
+which file extension it uses and on which (optional) package it depends. Tables that are
+compressed with a codec that pandas supports (bz2, gzip, xz) are read/written by pandas,
+which is given the compression level of the codec, otherwise the stream is opened by the
+codec itself. The zstd codec is opened by the codec as well, as tables are written in
+chunks (appended frames) that pandas does not read across. Codecs are allowed to compress
+with multiple threads. Other codecs can be added with register_compression_codec.
+
+Constants:
+
+    COMPRESSION_BZ2: the bzip2 codec, slow but available in the standard library.
+    COMPRESSION_GZIP: the gzip codec.
+    COMPRESSION_LZ4: the lz4 codec, very fast but requires the 'lz4' package.
+    COMPRESSION_XZ: the xz/lzma codec.
+    COMPRESSION_ZSTD: the zstd codec, fast and multi-threaded but requires the 'zstandard' package.
+    DEFAULT_COMPRESSION: the default compression of processed dataset files.
+    DEFAULT_COMPRESSION_THREADS: the default number of threads that compress a file.
+
+Classes:
+
+    CompressionCodec: the definition of a compression codec.
+
+Functions:
+
+    create_compression_args: create the pandas compression arguments of a codec.
+    get_compression_codec: get the compression codec with the specified name.
+    get_compression_codecs: get the names of the available compression codecs.
+    get_compression_ext: get the file extension of the compression codec.
+    infer_compression: infer the compression codec from the extension of a file name.
+    is_compression_available: check whether the package of a compression codec is installed.
+    open_compressed_file: open the (de)compressed binary stream of a file.
+    register_compression_codec: register a compression codec.
+
+This program has been developed by students from the bachelor Computer Science at
+Utrecht University within the Software Project course.
+© Copyright Utrecht University (Department of Information and Computing Sciences)
+"""
+
+import bz2
+from dataclasses import dataclass
+import gzip
+import importlib
+import importlib.util
+import lzma
+import os
+from typing import Any, BinaryIO, Callable, Dict, List, Optional
+
+COMPRESSION_BZ2 = 'bz2'
+COMPRESSION_GZIP = 'gzip'
+COMPRESSION_LZ4 = 'lz4'
+COMPRESSION_XZ = 'xz'
+COMPRESSION_ZSTD = 'zstd'
+
+DEFAULT_COMPRESSION = COMPRESSION_BZ2
+DEFAULT_COMPRESSION_THREADS = os.cpu_count() or 1
+
+
+@dataclass
+class CompressionCodec:
+    """Compression Codec definition.
+
+    name: the name of the codec as it is used in the dataset configuration.
+    extension: the file extension of files that are compressed with the codec.
+    open_file: function with the file path, mode, level and number of threads
+        as arguments that opens the (de)compressed binary stream of a file.
+    package: the (optional) package that the codec depends on or None for the standard library.
+    pandas_method: the (optional) compression method of the codec in pandas, or None
+        when pandas does not support the codec and the stream is opened with open_file.
+    level_arg: the name of the pandas compression level argument or None when not supported.
+    """
+
+    name: str
+    extension: str
+    open_file: Callable[[str, str, Optional[int], int], BinaryIO]
+    package: Optional[str]=None
+    pandas_method: Optional[str]=None
+    level_arg: Optional[str]=None
+
+
+def _open_bz2_file(file_path: str, mode: str, level: Optional[int], _: int) -> BinaryIO:
+    """Open the bzip2 (de)compressed stream of a file."""
+    return bz2.open(file_path, mode, compresslevel=level if level is not None else 9)
+
+
+def _open_gzip_file(file_path: str, mode: str, level: Optional[int], _: int) -> BinaryIO:
+    """Open the gzip (de)compressed stream of a file."""
+    return gzip.open(file_path, mode, compresslevel=level if level is not None else 9)
+
+
+def _open_lz4_file(file_path: str, mode: str, level: Optional[int], _: int) -> BinaryIO:
+    """Open the lz4 (de)compressed stream of a file."""
+    lz4_frame = importlib.import_module('lz4.frame')
+    if 'r' in mode:
+        return lz4_frame.open(file_path, mode)
+
+    return lz4_frame.open(file_path, mode, compression_level=level if level is not None else 0)
+
+
+def _open_xz_file(file_path: str, mode: str, level: Optional[int], _: int) -> BinaryIO:
+    """Open the xz (de)compressed stream of a file."""
+    if 'r' in mode:
+        return lzma.open(file_path, mode)
+
+    return lzma.open(file_path, mode, preset=level)
+
+
+def _open_zstd_file(file_path: str, mode: str, level: Optional[int], num_threads: int) -> BinaryIO:
+    """Open the zstd (de)compressed stream of a file."""
+    zstandard = importlib.import_module('zstandard')
+    if 'r' in mode:
+        # tables that are written in chunks consist of multiple frames
+        return zstandard.ZstdDecompressor().stream_reader(
+            open(file_path, 'rb'),
+            read_across_frames=True,
+            closefd=True
+        )
+
+    return zstandard.open(file_path, mode, cctx=zstandard.ZstdCompressor(
+        level=level if level is not None else 3,
+        threads=num_threads
+    ))
+
+
+COMPRESSION_CODECS = {
+    COMPRESSION_BZ2: CompressionCodec(
+        COMPRESSION_BZ2, '.bz2', _open_bz2_file,
+        pandas_method='bz2',
+        level_arg='compresslevel'
+    ),
+    COMPRESSION_GZIP: CompressionCodec(
+        COMPRESSION_GZIP, '.gz', _open_gzip_file,
+        pandas_method='gzip',
+        level_arg='compresslevel'
+    ),
+    COMPRESSION_LZ4: CompressionCodec(
+        COMPRESSION_LZ4, '.lz4', _open_lz4_file,
+        package='lz4'
+    ),
+    COMPRESSION_XZ: CompressionCodec(
+        COMPRESSION_XZ, '.xz', _open_xz_file,
+        pandas_method='xz'
+    ),
+    COMPRESSION_ZSTD: CompressionCodec(
+        COMPRESSION_ZSTD, '.zst', _open_zstd_file,
+        package='zstandard'
+    )
+}
+
+
+def create_compression_args(
+        compression: str,
+        *,
+        level: int=None,
+        writing: bool=False) -> Optional[Dict[str, Any]]:
+    """Create the pandas compression arguments of a codec.
+
+    Args:
+        compression: the name of the compression codec.
+        level: the (optional) compression level or None for the default of the codec.
+        writing: whether the arguments are used to write (compress) a file.
+
+    Raises:
+        KeyError: when the compression codec is not registered.
+
+    Returns:
+        a dictionary with the codec method and the compression arguments, or None when
+        pandas does not support the codec.
+    """
+    codec = get_compression_codec(compression)
+    if codec.pandas_method is None:
+        return None
+
+    compression_args = {'method': codec.pandas_method}
+    if writing and level is not None and codec.level_arg is not None:
+        compression_args[codec.level_arg] = level
+
+    return compression_args
+
+
+def get_compression_codec(compression: str) -> CompressionCodec:
+    """Get the compression codec with the specified name.
+
+    Args:
+        compression: the name of the compression codec.
+
+    Raises:
+        KeyError: when the compression codec is not registered.
+
+    Returns:
+        the compression codec.
+    """
+    if compression not in COMPRESSION_CODECS:
+        raise KeyError('Unknown compression codec: ' + str(compression))
+
+    return COMPRESSION_CODECS[compression]
+
+
+def get_compression_codecs() -> List[str]:
+    """Get the names of the registered compression codecs.
+
+    Returns:
+        a list of compression codec names.
+    """
+    return list(COMPRESSION_CODECS.keys())
+
+
+def get_compression_ext(compression: Optional[str]) -> str:
+    """Get the file extension of the compression codec.
+
+    Args:
+        compression: the name of the compression codec or None for no compression.
+
+    Raises:
+        KeyError: when the compression codec is not registered.
+
+    Returns:
+        the file extension of the codec or an empty string for no compression.
+    """
+    if compression is None:
+        return ''
+
+    return get_compression_codec(compression).extension
+
+
+def infer_compression(file_name: str) -> Optional[str]:
+    """Infer the compression codec from the extension of a file name.
+
+    Args:
+        file_name: the name of the file.
+
+    Returns:
+        the name of the compression codec or None when the extension is unknown.
+    """
+    extension = os.path.splitext(file_name)[1]
+    for codec_name, codec in COMPRESSION_CODECS.items():
+        if codec.extension == extension:
+            return codec_name
+
+    return None
+
+
+def is_compression_available(compression: str) -> bool:
+    """Check whether the (optional) package of a compression codec is installed.
+
+    Args:
+        compression: the name of the compression codec.
+
+    Raises:
+        KeyError: when the compression codec is not registered.
+
+    Returns:
+        whether the compression codec can be used.
+    """
+    codec = get_compression_codec(compression)
+    return codec.package is None or importlib.util.find_spec(codec.package) is not None
+
+
+def open_compressed_file(
+        file_path: str,
+        compression: str,
+        mode: str='rb',
+        *,
+        level: int=None,
+        num_threads: int=DEFAULT_COMPRESSION_THREADS) -> BinaryIO:
+    """Open the (de)compressed binary stream of a file.
+
+    Args:
+        file_path: the path of the compressed file.
+        compression: the name of the compression codec.
+        mode: the binary mode to open the file with, e.g. 'rb', 'wb' or 'ab'.
+        level: the (optional) compression level or None for the default of the codec.
+        num_threads: the number of threads that compress the file, when supported.
+
+    Raises:
+        KeyError: when the compression codec is not registered.
+        ImportError: when the package of the compression codec is not installed.
+
+    Returns:
+        the binary stream of the file.
+    """
+    codec = get_compression_codec(compression)
+    return codec.open_file(file_path, mode, level, num_threads)
+
+
+def register_compression_codec(codec: CompressionCodec) -> None:
+    """Register a compression codec.
+
+    Args:
+        codec: the compression codec to register.
+
+    Raises:
+        KeyError: when a compression codec with the same name is already registered.
+    """
+    if codec.name in COMPRESSION_CODECS:
+        raise KeyError('Compression codec is already registered: ' + codec.name)
+
+    COMPRESSION_CODECS[codec.name] = codec
@@ -8,6 +8,7 @@ Constants:
 Classes:
 
     DatasetFileConfig: the configuration of a dataset file.
+    DatasetTimePartitionConfig: the configuration of a time partition of a dataset table.
     DatasetTableConfig: the configuration of a dataset table.
     DatasetIndexConfig: the configuration of a dataset matrix' user/item indices.
     DatasetMatrixConfig: the configuration of a dataset matrix.
@@ -23,8 +24,10 @@ Utrecht University within the Software Project course.
 """
 
 from dataclasses import dataclass
+import io
+import itertools
 import os
-from typing import Any, Dict, List, Optional, Union
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple, Union
 
 import pandas as pd
 
@@ -35,8 +38,19 @@ from .dataset_constants import KEY_RATING_MIN, KEY_RATING_MAX, KEY_RATING_TYPE
 from .dataset_constants import KEY_MATRIX, KEY_IDX_ITEM, KEY_IDX_USER
 from .dataset_constants import KEY_DATASET, KEY_EVENTS, KEY_MATRICES, KEY_TABLES
 from .dataset_constants import TABLE_KEY, TABLE_PRIMARY_KEY, TABLE_FOREIGN_KEYS, TABLE_COLUMNS
-from .dataset_constants import TABLE_FILE, TABLE_COMPRESSION, TABLE_ENCODING
-from .dataset_constants import TABLE_HEADER, TABLE_NUM_RECORDS, TABLE_SEP
+from .dataset_constants import TABLE_FILE, TABLE_COMPRESSION, TABLE_COMPRESSION_LEVEL
+from .dataset_constants import TABLE_CATEGORICAL, TABLE_ENCODING
+from .dataset_constants import TABLE_HEADER, TABLE_NUM_RECORDS, TABLE_SEP, TABLE_STORAGE
+from .dataset_constants import TABLE_PARTITION_COLUMN, TABLE_PARTITIONS
+from .dataset_constants import TABLE_TIME_MAX, TABLE_TIME_MIN
+from .dataset_compression import create_compression_args, infer_compression
+from .dataset_compression import open_compressed_file
+from .dataset_partition import COMPRESSED_FILE_EXTS, FileRangeReader
+from .dataset_partition import split_file_ranges, split_row_ranges
+from .dataset_predicate import PREDICATE_CHUNK_SIZE
+from .dataset_predicate import filter_table_chunks, get_predicate_columns
+from .dataset_predicate import is_range_matching, validate_predicate
+from .dataset_storage import STORAGE_NPY, read_npy_table, save_npy_table
 
 DATASET_RATINGS_EXPLICIT = 'explicit'
 DATASET_RATINGS_IMPLICIT = 'implicit'
@@ -47,15 +61,19 @@ class FileOptionsConfig(YmlConfig):
     r"""File Options Configuration.
 
     sep: the separator in the file or None for \t.
-    compression: the (optional) compression of the file.
+    compression: the (optional) compression codec of the file.
     encoding: the encoding of the file or None for 'utf-8'.
     header: is there a header on the first line of the file.
+    storage: the (optional) binary storage of the file or None for a text file.
+    compression_level: the (optional) compression level or None for the codec default.
     """
 
     sep: Optional[str]
     compression: Optional[str]
     encoding: Optional[str]
     header: bool
+    storage: Optional[str]=None
+    compression_level: Optional[int]=None
 
     def to_yml_format(self):
         """Format file settings configuration to a yml compatible dictionary.
@@ -71,8 +89,12 @@ class FileOptionsConfig(YmlConfig):
             yml_format[TABLE_SEP] = self.sep
         if self.compression is not None:
             yml_format[TABLE_COMPRESSION] = self.compression
+        if self.compression_level is not None:
+            yml_format[TABLE_COMPRESSION_LEVEL] = self.compression_level
         if self.encoding is not None:
             yml_format[TABLE_ENCODING] = self.encoding
+        if self.storage is not None:
+            yml_format[TABLE_STORAGE] = self.storage
 
         return yml_format
 
@@ -81,7 +103,7 @@ class FileOptionsConfig(YmlConfig):
 class DatasetFileConfig(YmlConfig):
     """Dataset File Configuration.
 
-    name: the file name.
+    name: the file name, or the directory name when stored in a binary storage.
     options: the file options.
     """
 
@@ -99,6 +121,38 @@ class DatasetFileConfig(YmlConfig):
         return yml_format
 
 
+@dataclass
+class DatasetTimePartitionConfig(YmlConfig):
+    """Dataset Time Partition Configuration.
+
+    name: the name of the partition, which is the month of its records, e.g. '2013-11'.
+    file_name: the name of the partition file in the directory of the table.
+    num_records: the number of records in the partition.
+    time_min: the minimum value of the partition column in the partition.
+    time_max: the maximum value of the partition column in the partition.
+    """
+
+    name: str
+    file_name: str
+    num_records: int
+    time_min: Union[int, float, str]
+    time_max: Union[int, float, str]
+
+    def to_yml_format(self) -> Dict[str, Any]:
+        """Format dataset time partition configuration to a yml compatible dictionary.
+
+        Returns:
+            a dictionary containing the dataset time partition configuration.
+        """
+        return {
+            KEY_NAME: self.name,
+            TABLE_FILE: self.file_name,
+            TABLE_NUM_RECORDS: self.num_records,
+            TABLE_TIME_MIN: self.time_min,
+            TABLE_TIME_MAX: self.time_max
+        }
+
+
 @dataclass
 class DatasetTableConfig(YmlConfig):
     """Dataset Table Configuration.
@@ -116,6 +170,13 @@ class DatasetTableConfig(YmlConfig):
     columns: list of column names that contain the relevant table data.
     num_records: the number of records in the table.
     file: the dataset file configuration of the table.
+    categorical: (optional) list of column names that contain a limited set of categories.
+        These are read as pandas Categorical and are stored as integer codes with a dictionary
+        of the categories by the binary storage.
+    partition_column: (optional) the name of the (time) column the table is partitioned on.
+    partitions: (optional) list of the time partitions of the table in chronological order.
+        The file name of a partitioned table is the directory that contains the partition
+        files, which share the file options of the table.
     """
 
     primary_key: List[str]
@@ -123,15 +184,120 @@ class DatasetTableConfig(YmlConfig):
     columns: List[str]
     num_records: int
     file: DatasetFileConfig
+    categorical: Optional[List[str]]=None
+    partition_column: Optional[str]=None
+    partitions: Optional[List[DatasetTimePartitionConfig]]=None
+
+    def create_partition_config(
+            self,
+            partition_config: DatasetTimePartitionConfig) -> 'DatasetTableConfig':
+        """Create the table configuration of one of the time partitions of the table.
+
+        Args:
+            partition_config: the configuration of the time partition.
+
+        Returns:
+            the configuration of the partition file, relative to the directory of the table.
+        """
+        return DatasetTableConfig(
+            self.primary_key,
+            self.foreign_keys,
+            self.columns,
+            partition_config.num_records,
+            DatasetFileConfig(
+                os.path.join(self.file.name, partition_config.file_name),
+                self.file.options
+            ),
+            self.categorical
+        )
+
+    def get_column_names(self) -> List[str]:
+        """Get the names of all the columns in the table.
+
+        Returns:
+            the primary key, columns and foreign keys that are not in the primary key.
+        """
+        names = self.primary_key + self.columns
+        if self.foreign_keys is not None:
+            names += [key for key in self.foreign_keys if key not in self.primary_key]
+
+        return names
+
+    def get_compression(self) -> Optional[str]:
+        """Get the compression codec of the table file.
+
+        Returns:
+            the compression codec, inferred from the file extension when not specified,
+            or None when the file is not compressed with a known codec.
+        """
+        if self.file.options.compression is not None:
+            return self.file.options.compression
+
+        return infer_compression(self.file.name)
+
+    def get_categorical_names(self) -> List[str]:
+        """Get the names of the categorical columns in the table.
+
+        Returns:
+            the declared categorical columns that are present in the table.
+        """
+        if self.categorical is None:
+            return []
+
+        column_names = self.get_column_names()
+        return [name for name in self.categorical if name in column_names]
+
+    def get_partitions(
+            self,
+            dataset_dir: str,
+            num_partitions: int) -> Optional[List[Tuple[int, int]]]:
+        """Get the partitions of the table that can be read independently.
+
+        Tables with the binary storage are split into row ranges and uncompressed
+        text tables into byte ranges, compressed text tables can not be partitioned.
+        Time-partitioned tables are split into ranges of their time partitions instead.
+
+        Args:
+            dataset_dir: the directory of the table.
+            num_partitions: the (maximum) number of partitions to split into.
+
+        Returns:
+            a list of (start, end) partitions or None when the table can not be partitioned.
+        """
+        if self.partitions is not None:
+            return split_row_ranges(len(self.partitions), num_partitions)
+        if self.file.options.storage == STORAGE_NPY:
+            return split_row_ranges(self.num_records, num_partitions)
+
+        # compression is inferred from the file extension when not specified
+        if self.get_compression() is not None or \
+                os.path.splitext(self.file.name)[1] in COMPRESSED_FILE_EXTS:
+            return None
+
+        return split_file_ranges(
+            os.path.join(dataset_dir, self.file.name),
+            num_partitions,
+            skip_header=self.file.options.header
+        )
 
     def read_table(
             self,
             dataset_dir: str,
             *,
             columns: List[Union[str, int]]=None,
-            chunk_size=None) -> pd.DataFrame:
+            chunk_size=None,
+            dtype: Dict[str, Any]=None,
+            partition: Tuple[int, int]=None,
+            predicate: List[Tuple[str, str, Any]]=None) -> pd.DataFrame:
         """Read the table from the specified directory.
 
+        The rows of the table are selected with the (optional) predicate while reading,
+        so that only the matching rows are held in memory. The predicate is pushed down
+        into the reader of the binary storage and is applied chunk by chunk for text files.
+        The resulting table (chunks) keep the row numbers of the matching rows as index,
+        and chunks without any matching rows are skipped. The time partitions of a partitioned
+        table that can not match the conditions on the partition column are not opened at all.
+
         Args:
             dataset_dir: the directory to read the table from.
             columns: subset list of columns to load or None to load all.
@@ -139,48 +305,304 @@ class DatasetTableConfig(YmlConfig):
                 strings that correspond to the 'names' argument.
             chunk_size: loads the table in chunks as an iterator or
                 the entire table when None.
+            dtype: (optional) dictionary with the column names as key and the type of
+                the column as value, only used for text files as the binary storage is typed.
+            partition: (optional) the partition of the table to read, as returned by
+                get_partitions, or None to read the entire table.
+            predicate: (optional) list of (column, operator, value) conditions that all need
+                to hold for a row to be read, e.g. [('matrix_rating', '>=', 3)].
+                The supported operators are ==, !=, <, <=, >, >=, in and not in.
+
+        Raises:
+            ValueError: when the columns or the predicate do not match the table columns.
+
+        Returns:
+            the resulting table (iterator), with the categorical columns as pandas Categorical.
+        """
+        if predicate is not None:
+            validate_predicate(predicate, self.get_column_names())
+        if self.partitions is not None:
+            return self._read_time_partitions(
+                dataset_dir,
+                columns,
+                chunk_size,
+                dtype,
+                partition,
+                predicate
+            )
+
+        categorical = self.get_categorical_names()
+        if self.file.options.storage == STORAGE_NPY:
+            return read_npy_table(
+                os.path.join(dataset_dir, self.file.name),
+                self.get_column_names(),
+                columns=columns,
+                chunk_size=chunk_size,
+                rows=partition,
+                categorical=categorical,
+                predicate=predicate
+            )
+
+        if len(categorical) > 0:
+            # the explicitly specified dtype takes precedence over the categorical columns
+            dtype = {**{name: 'category' for name in categorical}, **(dtype or {})}
+
+        if predicate is None:
+            return self._read_text_table(dataset_dir, columns, chunk_size, dtype, partition)
+
+        names = self.get_column_names()
+        result_columns = self._get_result_columns(columns)
+
+        # the predicate columns are read as well and are dropped after filtering
+        predicate_columns = get_predicate_columns(predicate)
+        table_chunks = filter_table_chunks(
+            self._read_text_table(
+                dataset_dir,
+                [name for name in names if name in result_columns or name in predicate_columns],
+                chunk_size if chunk_size else PREDICATE_CHUNK_SIZE,
+                dtype,
+                partition
+            ),
+            predicate,
+            result_columns
+        )
+        if chunk_size:
+            return table_chunks
+
+        return self._concat_table_chunks(table_chunks, result_columns)
+
+    def _concat_table_chunks(
+            self,
+            table_chunks: Iterable[pd.DataFrame],
+            result_columns: List[str]) -> pd.DataFrame:
+        """Concatenate the table chunks into a single table.
+
+        Args:
+            table_chunks: the (filtered) chunks of the table.
+            result_columns: the names of the columns in the chunks.
+
+        Returns:
+            the concatenated table or an empty table with the columns when there are no chunks.
+        """
+        table_chunks = list(table_chunks)
+        if len(table_chunks) == 0:
+            return pd.DataFrame(columns=result_columns)
+
+        dataset_table = pd.concat(table_chunks)
+        for name in self.get_categorical_names():
+            # the categories of the chunks differ and are unified again
+            if name in dataset_table and \
+                    not isinstance(dataset_table[name].dtype, pd.CategoricalDtype):
+                dataset_table[name] = dataset_table[name].astype('category')
+
+        return dataset_table
+
+    def _get_result_columns(self, columns: Optional[List[Union[str, int]]]) -> List[str]:
+        """Get the names of the columns that result from reading the table.
+
+        Args:
+            columns: subset list of columns to load or None to load all.
+
+        Raises:
+            ValueError: when the columns do not match the table columns.
+
+        Returns:
+            the names of the requested columns in the order of the table.
+        """
+        names = self.get_column_names()
+        requested = names if columns is None else \
+            [names[col] if isinstance(col, int) else col for col in columns]
+        if any(col not in names for col in requested):
+            raise ValueError('Usecols do not match columns: ' + str(columns))
+
+        return [name for name in names if name in requested]
+
+    def _read_time_partitions(
+            self,
+            dataset_dir: str,
+            columns: Optional[List[Union[str, int]]],
+            chunk_size: Optional[int],
+            dtype: Optional[Dict[str, Any]],
+            partition: Optional[Tuple[int, int]],
+            predicate: Optional[List[Tuple[str, str, Any]]]) -> pd.DataFrame:
+        """Read the time partitions of the table from the specified directory.
+
+        Only the partitions with a time range that can match the predicate are read.
+        The index of the partitions is offset by the number of records that precede them,
+        so that the index is the row number in the entire table.
+
+        Args:
+            dataset_dir: the directory to read the table from.
+            columns: subset list of columns to load or None to load all.
+            chunk_size: loads the table in chunks as an iterator or
+                the entire table when None.
+            dtype: (optional) dictionary with the column names as key and the type of
+                the column as value, only used for text files.
+            partition: (optional) the range of time partitions to read, as returned by
+                get_partitions, or None to read all the time partitions.
+            predicate: (optional) list of (column, operator, value) conditions that all need
+                to hold for a row to be read.
 
         Returns:
             the resulting table (iterator).
         """
-        names = self.primary_key + self.columns
-        if self.foreign_keys is not None:
-            names += [key for key in self.foreign_keys if key not in self.primary_key]
+        result_columns = self._get_result_columns(columns)
+        offsets = list(itertools.accumulate(
+            [0] + [partition_config.num_records for partition_config in self.partitions]
+        ))
+
+        start, end = partition if partition is not None else (0, len(self.partitions))
+        selected = [i for i in range(start, end) if predicate is None or is_range_matching(
+            self.partition_column,
+            self.partitions[i].time_min,
+            self.partitions[i].time_max,
+            predicate
+        )]
+
+        def read_partition(index: int, partition_chunk_size: Optional[int]):
+            partition_table = self.create_partition_config(self.partitions[index]).read_table(
+                dataset_dir,
+                columns=result_columns,
+                chunk_size=partition_chunk_size,
+                dtype=dtype,
+                predicate=predicate
+            )
+            if partition_chunk_size:
+                return (_offset_index(chunk, offsets[index]) for chunk in partition_table)
+
+            return [_offset_index(partition_table, offsets[index])]
+
+        table_chunks = itertools.chain.from_iterable(
+            read_partition(index, chunk_size) for index in selected
+        )
+        if chunk_size:
+            return table_chunks
+
+        return self._concat_table_chunks(
+            (chunk for chunk in table_chunks if predicate is None or len(chunk) > 0),
+            result_columns
+        )
+
+    def _read_text_table(
+            self,
+            dataset_dir: str,
+            columns: Optional[List[Union[str, int]]],
+            chunk_size: Optional[int],
+            dtype: Optional[Dict[str, Any]],
+            partition: Optional[Tuple[int, int]]) -> pd.DataFrame:
+        """Read the table from a text file in the specified directory.
+
+        Args:
+            dataset_dir: the directory to read the table from.
+            columns: subset list of columns to load or None to load all.
+            chunk_size: loads the table in chunks as an iterator or
+                the entire table when None.
+            dtype: (optional) dictionary with the column names as key and the type of
+                the column as value.
+            partition: (optional) the partition of the table to read, as returned by
+                get_partitions, or None to read the entire table.
+
+        Returns:
+            the resulting table (iterator).
+        """
+        file_path = os.path.join(dataset_dir, self.file.name)
+        compression = self.get_compression()
+        compression_args = create_compression_args(compression) \
+            if compression is not None else 'infer'
+
+        file_stream = None
+        if partition is not None:
+            file_stream = io.BufferedReader(FileRangeReader(file_path, *partition))
+        elif compression_args is None:
+            # the stream is opened by codecs that are not supported by pandas
+            file_stream = open_compressed_file(file_path, compression)
 
         dataset_table = pd.read_table(
-            os.path.join(dataset_dir, self.file.name),
+            file_path if file_stream is None else file_stream,
             sep=self.file.options.sep if self.file.options.sep is not None else '\t',
-            header=0 if self.file.options.header else None,
-            names=names,
+            # the header is not part of any partition
+            header=0 if self.file.options.header and partition is None else None,
+            names=self.get_column_names(),
             usecols=columns,
+            dtype=dtype,
             encoding=self.file.options.encoding
             if self.file.options.encoding is not None else 'utf-8',
-            compression=self.file.options.compression
-            if self.file.options.compression is not None else 'infer',
+            compression=compression_args,
             chunksize=chunk_size,
             iterator=bool(chunk_size)
         )
 
+        if file_stream is not None:
+            if chunk_size:
+                # the stream is closed when the table iterator is exhausted or closed
+                return _close_when_exhausted(dataset_table, file_stream)
+
+            file_stream.close()
+
         return dataset_table
 
-    def save_table(self, dataset_table: pd.DataFrame, dataset_dir: str) -> None:
+    def save_table(
+            self,
+            dataset_table: pd.DataFrame,
+            dataset_dir: str,
+            *,
+            append: bool=False) -> None:
         """Save the table in the specified directory.
 
         Args:
             dataset_table: the dataframe to save with this table configuration.
             dataset_dir: the directory to save the table to.
+            append: whether to append the dataframe to the existing table file.
+
+        Raises:
+            ValueError: when appending to a table with a binary storage or when
+                the table is time-partitioned.
         """
+        if self.partitions is not None:
+            raise ValueError('Unable to save a time-partitioned table, save its partitions instead')
+        if self.file.options.storage == STORAGE_NPY:
+            if append:
+                raise ValueError('Unable to append to a table with the npy storage')
+
+            save_npy_table(
+                dataset_table,
+                os.path.join(dataset_dir, self.file.name),
+                self.get_column_names()
+            )
+            return
+
+        file_path = os.path.join(dataset_dir, self.file.name)
+        compression = self.get_compression()
+        compression_args = create_compression_args(
+            compression,
+            level=self.file.options.compression_level,
+            writing=True
+        ) if compression is not None else 'infer'
+
+        file_stream = None
+        if compression_args is None:
+            # the stream is opened by codecs that are not supported by pandas
+            file_stream = open_compressed_file(
+                file_path,
+                compression,
+                'ab' if append else 'wb',
+                level=self.file.options.compression_level
+            )
+
         dataset_table.to_csv(
-            os.path.join(dataset_dir, self.file.name),
+            file_path if file_stream is None else file_stream,
             sep=self.file.options.sep if self.file.options.sep else '\t',
-            header=self.file.options.header,
+            header=self.file.options.header and not append,
             index=False,
+            mode=('a' if append else 'w') + ('b' if file_stream is not None else ''),
             encoding=self.file.options.encoding
             if self.file.options.encoding else 'utf-8',
-            compression=self.file.options.compression
-            if self.file.options.compression else 'infer',
+            compression=compression_args
         )
 
+        if file_stream is not None:
+            file_stream.close()
+
     def to_yml_format(self) -> Dict[str, Any]:
         """Format dataset table configuration to a yml compatible dictionary.
 
@@ -196,6 +618,13 @@ class DatasetTableConfig(YmlConfig):
 
         if self.foreign_keys is not None:
             yml_format[TABLE_FOREIGN_KEYS] = self.foreign_keys
+        if self.categorical:
+            yml_format[TABLE_CATEGORICAL] = self.categorical
+        if self.partitions is not None:
+            yml_format[TABLE_PARTITION_COLUMN] = self.partition_column
+            yml_format[TABLE_PARTITIONS] = [
+                partition_config.to_yml_format() for partition_config in self.partitions
+            ]
 
         return yml_format
 
@@ -305,24 +734,34 @@ class DatasetMatrixConfig(YmlConfig):
     user: DatasetIndexConfig
     item: DatasetIndexConfig
 
-    def load_matrix(self, dataset_dir: str) -> pd.DataFrame:
+    def load_matrix(
+            self,
+            dataset_dir: str,
+            *,
+            chunk_size: int=None,
+            dtype: Dict[str, Any]=None) -> Union[pd.DataFrame, Iterator[pd.DataFrame]]:
         """Load the matrix from the specified directory.
 
         Args:
             dataset_dir: directory path to where the dataset matrix is stored.
+            chunk_size: loads the matrix in chunks as an iterator or
+                the entire matrix when None.
+            dtype: (optional) dictionary with the standardized column names as key and the
+                type of the column as value, only used for text files as the binary storage
+                is typed.
 
         Returns:
             the resulting matrix (iterator).
         """
-        matrix = self.table.read_table(dataset_dir)
+        if dtype is not None:
+            dtype = {name: dtype[column] for name, column in
+                     self._get_standardized_columns().items() if column in dtype}
 
-        columns = {
-            self.user.key: 'user',
-            self.item.key: 'item',
-            self.table.columns[0]: 'rating'
-        }
-        if len(self.table.columns) == 2:
-            columns[self.table.columns[1]] = 'timestamp'
+        matrix = self.table.read_table(dataset_dir, chunk_size=chunk_size, dtype=dtype)
+        columns = self._get_standardized_columns()
+
+        if chunk_size:
+            return (chunk.rename(columns=columns) for chunk in matrix)
 
         return matrix.rename(columns=columns)
 
@@ -340,6 +779,23 @@ class DatasetMatrixConfig(YmlConfig):
         })
         return yml_format
 
+    def _get_standardized_columns(self) -> Dict[str, str]:
+        """Get the standardized names of the matrix columns.
+
+        Returns:
+            a dictionary with the column names of the table as key and the
+            standardized 'user', 'item', 'rating' and 'timestamp' names as value.
+        """
+        columns = {
+            self.user.key: 'user',
+            self.item.key: 'item',
+            self.table.columns[0]: 'rating'
+        }
+        if len(self.table.columns) == 2:
+            columns[self.table.columns[1]] = 'timestamp'
+
+        return columns
+
 
 @dataclass
 class DatasetConfig(YmlConfig):
@@ -409,24 +865,30 @@ def create_dataset_table_config(
         primary_key: List[str],
         columns: List[str],
         *,
+        categorical: List[str]=None,
         compression: str=None,
+        compression_level: int=None,
         encoding: str=None,
         foreign_keys: List[str]=None,
         header: bool=False,
         num_records: int=0,
-        sep: str=None) -> DatasetTableConfig:
+        sep: str=None,
+        storage: str=None) -> DatasetTableConfig:
     """Create a dataset table configuration.
 
     Args:
         file_name: name of the dataset table file.
         primary_key: a list of strings that are combined the primary key of the table.
         columns: a list of strings with other available columns in the table.
-        compression:  the (optional) compression of the file, 'bz2' is recommended.
+        categorical: (optional) list of column names that contain a limited set of categories.
+        compression: the (optional) compression codec of the file, e.g. 'bz2' or 'zstd'.
+        compression_level: the (optional) compression level or None for the codec default.
         encoding: the encoding for reading/writing the table contents or None for 'utf-8'.
         foreign_keys: (optional) list of column names that are foreign keys in other tables.
         header: whether the table file contains a header on the first line.
         num_records: the number of records in the table.
         sep: the delimiter that is used in the table or None for a tab separator.
+        storage: the (optional) binary storage of the table, e.g. 'npy', or None for a text file.
 
     Returns:
         the resulting data table configuration.
@@ -442,7 +904,45 @@ def create_dataset_table_config(
                 sep,
                 compression,
                 encoding,
-                header
+                header,
+                storage,
+                compression_level
             )
-        )
+        ),
+        categorical
     )
+
+
+def _offset_index(dataset_table: pd.DataFrame, offset: int) -> pd.DataFrame:
+    """Offset the index of the table (chunk) by the number of preceding records.
+
+    Args:
+        dataset_table: the table (chunk) to offset the index of.
+        offset: the number of records that precede the table.
+
+    Returns:
+        the table with the offset index.
+    """
+    if offset > 0:
+        dataset_table.index = dataset_table.index + offset
+
+    return dataset_table
+
+
+def _close_when_exhausted(
+        table_iterator: Iterator[pd.DataFrame],
+        file_stream: io.IOBase) -> Iterator[pd.DataFrame]:
+    """Iterate the table chunks and close the table iterator and the file stream afterwards.
+
+    Args:
+        table_iterator: the iterator of the table chunks that reads from the file stream.
+        file_stream: the file stream to close when the iteration ends.
+
+    Returns:
+        the table chunks.
+    """
+    try:
+        yield from table_iterator
+    finally:
+        table_iterator.close()
+        file_stream.close()
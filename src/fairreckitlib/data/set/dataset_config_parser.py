@@ -32,15 +32,22 @@ from .dataset_constants import KEY_DATASET, KEY_EVENTS, KEY_MATRICES, KEY_TABLES
 from .dataset_constants import KEY_MATRIX, KEY_IDX_ITEM, KEY_IDX_USER
 from .dataset_constants import KEY_RATING_MIN, KEY_RATING_MAX, KEY_RATING_TYPE
 from .dataset_constants import TABLE_KEY, TABLE_PRIMARY_KEY, TABLE_FOREIGN_KEYS, TABLE_COLUMNS
-from .dataset_constants import TABLE_FILE, TABLE_COMPRESSION, TABLE_ENCODING
-from .dataset_constants import TABLE_HEADER, TABLE_NUM_RECORDS, TABLE_SEP
+from .dataset_constants import TABLE_FILE, TABLE_COMPRESSION, TABLE_COMPRESSION_LEVEL
+from .dataset_constants import TABLE_CATEGORICAL, TABLE_ENCODING
+from .dataset_constants import TABLE_HEADER, TABLE_NUM_RECORDS, TABLE_SEP, TABLE_STORAGE
+from .dataset_constants import TABLE_PARTITION_COLUMN, TABLE_PARTITIONS
+from .dataset_constants import TABLE_TIME_MAX, TABLE_TIME_MIN
 from .dataset_config import DatasetIndexConfig, DatasetMatrixConfig, RatingMatrixConfig
 from .dataset_config import DatasetConfig, DatasetFileConfig, DatasetTableConfig, FileOptionsConfig
+from .dataset_config import DatasetTimePartitionConfig
 from .dataset_config import DATASET_RATINGS_EXPLICIT, DATASET_RATINGS_IMPLICIT
+from .dataset_compression import get_compression_codecs
+from .dataset_storage import STORAGE_NPY
 
 VALID_SEPARATORS = [',', '|']
-VALID_COMPRESSIONS = ['bz2']
+VALID_COMPRESSIONS = get_compression_codecs()
 VALID_ENCODINGS = ['utf-8', 'ISO-8859-1']
+VALID_STORAGES = [STORAGE_NPY]
 
 class DatasetConfigParser:
     """Dataset Configuration Parser.
@@ -251,12 +258,24 @@ class DatasetConfigParser:
         success, file_compression = parse_optional_string(
             file_config,
             TABLE_COMPRESSION,
-            VALID_COMPRESSIONS,
+            # includes the codecs that are registered after the import
+            get_compression_codecs(),
             self.event_dispatcher
         )
         if not success:
             return None
 
+        # attempt to parse the optional compression level
+        file_compression_level = None
+        if file_config.get(TABLE_COMPRESSION_LEVEL) is not None:
+            file_compression_level = parse_int(
+                file_config,
+                TABLE_COMPRESSION_LEVEL,
+                self.event_dispatcher
+            )
+            if file_compression_level is None:
+                return None
+
         # attempt to parse the optional encoding string
         success, file_encoding = parse_optional_string(
             file_config,
@@ -276,41 +295,58 @@ class DatasetConfigParser:
         if not success:
             return None
 
+        # attempt to parse the optional storage string
+        success, file_storage = parse_optional_string(
+            file_config,
+            TABLE_STORAGE,
+            VALID_STORAGES,
+            self.event_dispatcher
+        )
+        if not success:
+            return None
+
         return FileOptionsConfig(
             file_sep,
             file_compression,
             file_encoding,
-            file_header
+            file_header,
+            file_storage,
+            file_compression_level
         )
 
     def parse_dataset_file_config(
             self,
             data_dir: str,
-            file_config: Dict[str, Any]) -> Optional[DatasetFileConfig]:
+            file_config: Dict[str, Any],
+            *,
+            is_dir: bool=False) -> Optional[DatasetFileConfig]:
         """Parse a dataset file configuration.
 
         Args:
             data_dir: the directory where the file is stored.
             file_config: the dataset file configuration.
+            is_dir: whether the file name is expected to be a directory,
+                which is always the case for a binary storage.
 
         Returns:
             the parsed configuration or None on failure.
         """
-        # attempt to parse the (required) file name
+        # attempt to parse the file options
+        file_options = self.parse_file_options_config(file_config)
+        if file_options is None:
+            return None
+
+        # attempt to parse the (required) file name, which is a directory for binary storage
         success, file_name = parse_file_name(
             data_dir,
             file_config,
             KEY_NAME,
-            self.event_dispatcher
+            self.event_dispatcher,
+            is_dir=is_dir or file_options.storage is not None
         )
         if not success:
             return None
 
-        # attempt to parse the file options
-        file_options = self.parse_file_options_config(file_config)
-        if file_options is None:
-            return None
-
         return DatasetFileConfig(file_name, file_options)
 
     def parse_dataset_index_config(
@@ -416,7 +452,12 @@ class DatasetConfigParser:
         Returns:
             the parsed configuration or None on failure.
         """
-        file_config = self.parse_dataset_file_config(data_dir, table_config.get(TABLE_FILE, {}))
+        # the file name of a time-partitioned table is the directory of the partition files
+        file_config = self.parse_dataset_file_config(
+            data_dir,
+            table_config.get(TABLE_FILE, {}),
+            is_dir=TABLE_PARTITIONS in table_config
+        )
         if file_config is None:
             return None
 
@@ -455,14 +496,121 @@ class DatasetConfigParser:
         if table_num_records is None:
             return None
 
+        table_categorical = None
+        if TABLE_CATEGORICAL in table_config:
+            table_categorical = parse_string_list(
+                table_config,
+                TABLE_CATEGORICAL,
+                0,
+                self.event_dispatcher
+            )
+
+        table_partition_column = None
+        table_partitions = None
+        if TABLE_PARTITIONS in table_config:
+            table_partition_column = parse_string(
+                table_config,
+                TABLE_PARTITION_COLUMN,
+                self.event_dispatcher,
+                one_of_list=table_primary_key + table_columns
+            )
+            if table_partition_column is None:
+                return None
+
+            table_partitions = self.parse_dataset_time_partitions(
+                os.path.join(data_dir, file_config.name),
+                table_config,
+                file_config.options.storage is not None
+            )
+            if table_partitions is None:
+                return None
+
         return DatasetTableConfig(
             table_primary_key,
             table_foreign_keys,
             table_columns,
             table_num_records,
-            file_config
+            file_config,
+            table_categorical,
+            table_partition_column,
+            table_partitions
         )
 
+    def parse_dataset_time_partitions(
+            self,
+            table_dir: str,
+            table_config: Dict[str, Any],
+            is_dir: bool) -> Optional[List[DatasetTimePartitionConfig]]:
+        """Parse the time partitions of a dataset table configuration.
+
+        Args:
+            table_dir: the directory where the partition files are stored.
+            table_config: the dataset table configuration with the partitions.
+            is_dir: whether the partition file names are expected to be directories.
+
+        Returns:
+            the parsed partition configurations or None on failure.
+        """
+        partitions = table_config[TABLE_PARTITIONS]
+        if not assert_is_type(
+            partitions,
+            list,
+            self.event_dispatcher,
+            'PARSE ERROR: dataset table configuration contains invalid partitions'
+        ): return None
+
+        result_partitions = []
+        for partition_config in partitions:
+            if not assert_is_type(
+                partition_config,
+                dict,
+                self.event_dispatcher,
+                'PARSE ERROR: dataset table configuration contains invalid partition'
+            ): return None
+
+            partition_name = parse_string(partition_config, KEY_NAME, self.event_dispatcher)
+            if partition_name is None:
+                return None
+
+            success, partition_file = parse_file_name(
+                table_dir,
+                partition_config,
+                TABLE_FILE,
+                self.event_dispatcher,
+                is_dir=is_dir
+            )
+            if not success:
+                return None
+
+            partition_num_records = parse_int(
+                partition_config,
+                TABLE_NUM_RECORDS,
+                self.event_dispatcher
+            )
+            if partition_num_records is None:
+                return None
+
+            time_range = []
+            for time_key in [TABLE_TIME_MIN, TABLE_TIME_MAX]:
+                time_value = partition_config.get(time_key)
+                if not assert_is_type(
+                    time_value,
+                    (int, float, str),
+                    self.event_dispatcher,
+                    'PARSE ERROR: partition configuration contains invalid \'' + time_key + '\''
+                ): return None
+
+                time_range.append(time_value)
+
+            result_partitions.append(DatasetTimePartitionConfig(
+                partition_name,
+                partition_file,
+                partition_num_records,
+                *time_range
+            ))
+
+        return result_partitions
+
 
 def parse_file_name(
         data_dir: str,
@@ -470,6 +618,7 @@ def parse_file_name(
         file_key: str,
         event_dispatcher: EventDispatcher,
         *,
+        is_dir: bool=False,
         required: bool=True) -> Tuple[bool, Optional[str]]:
     """Parse the file name from the configuration.
 
@@ -481,6 +630,7 @@ def parse_file_name(
         file_config: the configuration dictionary to parse from.
         file_key: the key in the configuration that contains the file name.
         event_dispatcher: to dispatch the parse event on failure.
+        is_dir: whether the file name is expected to be a directory.
         required: whether the parsing is required to succeed.
 
     Returns:
@@ -510,7 +660,8 @@ def parse_file_name(
         ): return False, None
 
         file_path = os.path.join(data_dir, file_name)
-        if not os.path.isfile(file_path):
+        exists = os.path.isdir(file_path) if is_dir else os.path.isfile(file_path)
+        if not exists:
             event_dispatcher.dispatch(ParseEventArgs(
                 ON_PARSE,
                 'PARSE ERROR: file configuration file name does not exist: ' + file_path
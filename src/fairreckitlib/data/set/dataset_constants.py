@@ -11,13 +11,24 @@ TABLE_PRIMARY_KEY = 'primary_key'
 TABLE_FOREIGN_KEYS = 'foreign_keys'
 TABLE_KEY = 'key'
 TABLE_COLUMNS = 'columns'
+TABLE_CATEGORICAL = 'categorical'
 TABLE_COMPRESSION = 'compression'
+TABLE_COMPRESSION_LEVEL = 'compression_level'
 TABLE_ENCODING = 'encoding'
 TABLE_HEADER = 'header'
 TABLE_NUM_RECORDS = 'num_records'
+TABLE_PARTITION_COLUMN = 'partition_column'
+TABLE_PARTITIONS = 'partitions'
 TABLE_SEP = 'sep'
+TABLE_STORAGE = 'storage'
+TABLE_TIME_MAX = 'time_max'
+TABLE_TIME_MIN = 'time_min'
+
+MATRIX_CSR_SUFFIX = '_csr'
 
 DATASET_CONFIG_FILE = TABLE_FILE_PREFIX + 'dataset_config.yml'
+DATA_REGISTRY_FILE = TABLE_FILE_PREFIX + 'data_registry.json'
+STATISTICS_CATALOG_FILE = TABLE_FILE_PREFIX + 'statistics_catalog.json'
 DATASET_SPLIT_DELIMITER = '_'
 
 KEY_MATRIX = 'matrix'
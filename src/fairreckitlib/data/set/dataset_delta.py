@@ -0,0 +1,397 @@
+"""This module contains functionality to append new events to a processed dataset.
+
+A delta of new events is appended to an event table of the dataset, after which the
+user-item count matrices that are derived from the event table are updated by merging
+the counts of the delta, so that the existing events are never scanned again.
+The user/item indirection arrays of the matrices are extended with the ids that are new,
+and the number of records and the rating range of the matrices are updated accordingly.
+Each matrix is streamed once to add the counts of the existing user-item pairs, and the
+pairs that are new are appended to the end of the matrix. The cost of an append is
+therefore linear in the size of the count matrices (which are rewritten), but not in the
+size of the event table.
+
+Only count matrices are updated, which have the user and item key of the event table as
+primary key and a single column with the number of events of each pair, as created by the
+matrix processor. Other matrices with the user and item key of the event table, such as
+rating matrices, can not be derived from the events. Appending raises an error for these,
+rather than leaving them out of date.
+
+The update is all or nothing: the merged matrices, extended indirection arrays and dataset
+configuration are written to temporary files first and the events are appended afterwards.
+The appended events are rolled back when any of these fails, otherwise the temporary files
+replace the original files at the end.
+
+Appending is supported for text tables only, as the binary storage is not appendable.
+
+Constants:
+
+    DELTA_CHUNK_SIZE: the number of matrix records that are merged at once.
+
+Functions:
+
+    append_dataset_events: append a delta of new events to an event table of a dataset.
+    get_event_count_matrices: get the names of the count matrices derived from an event table.
+    get_event_matrices: get the names of the matrices with the user and item key of an event table.
+    merge_matrix_counts: merge the user-item count deltas into a dataset matrix.
+
+This program has been developed by students from the bachelor Computer Science at
+Utrecht University within the Software Project course.
+© Copyright Utrecht University (Department of Information and Computing Sciences)
+"""
+
+import copy
+import os
+from typing import Dict, List, Tuple
+
+import numpy as np
+import pandas as pd
+
+from ...core.io.io_utility import save_yml
+from ..ratings.convert_constants import RATING_TYPE_THRESHOLD
+from .dataset_config import DATASET_RATINGS_EXPLICIT, DATASET_RATINGS_IMPLICIT
+from .dataset_config import DatasetConfig, DatasetFileConfig, DatasetIndexConfig
+from .dataset_config import DatasetMatrixConfig, DatasetTableConfig
+from .dataset_constants import DATASET_CONFIG_FILE, TABLE_FILE_PREFIX
+from .dataset_storage import STORAGE_NPY
+from .dataset_time_partition import append_table_by_month
+
+DELTA_CHUNK_SIZE = 10000000
+
+
+def append_dataset_events(
+        dataset_dir: str,
+        dataset_config: DatasetConfig,
+        event_table_name: str,
+        events: pd.DataFrame,
+        *,
+        chunk_size: int=DELTA_CHUNK_SIZE) -> List[str]:
+    """Append a delta of new events to an event table of a dataset.
+
+    The events are appended to the event table (partitions) and the count matrices
+    that are derived from the event table are updated with the counts of the events.
+    The dataset configuration is updated in place and saved in the dataset directory.
+    The dataset (configuration) is left unchanged when the update fails.
+
+    Args:
+        dataset_dir: the directory of the dataset.
+        dataset_config: the configuration of the dataset.
+        event_table_name: the name of the event table to append the events to.
+        events: the new events with (at least) the columns of the event table.
+        chunk_size: the number of matrix records that are merged at once.
+
+    Raises:
+        KeyError: when the event table does not exist in the dataset.
+        ValueError: when the events do not have the columns of the event table, when
+            the event table or any of its count matrices has the binary storage, or when
+            any matrix with the user and item key of the event table is not a count matrix.
+
+    Returns:
+        the names of the matrices that are updated.
+    """
+    if event_table_name not in dataset_config.events:
+        raise KeyError('Event table does not exist: ' + event_table_name)
+
+    event_table = dataset_config.events[event_table_name]
+    column_names = event_table.get_column_names()
+    if any(name not in events for name in column_names):
+        raise ValueError('Events do not match the event table columns: ' + str(column_names))
+
+    matrix_names = get_event_count_matrices(dataset_config, event_table_name)
+    unsupported = [name for name in get_event_matrices(dataset_config, event_table_name)
+                   if name not in matrix_names]
+    if len(unsupported) > 0:
+        raise ValueError('Unable to update the matrices that are not count matrices: ' +
+                         ', '.join(unsupported))
+
+    for table_config in [event_table] + \
+            [dataset_config.matrices[name].table for name in matrix_names]:
+        if table_config.file.options.storage == STORAGE_NPY:
+            raise ValueError('Unable to append to a table with the npy storage')
+
+    if len(events) == 0:
+        return []
+
+    events = events[column_names]
+    # the copy of the configuration is updated first, to leave the original one on failure
+    updated_config = copy.deepcopy(dataset_config)
+    event_table = updated_config.events[event_table_name]
+    event_path = os.path.join(dataset_dir, event_table.file.name)
+    event_file_sizes = _get_file_sizes(event_path)
+    replacements = []
+
+    try:
+        for matrix_name in matrix_names:
+            matrix_config = updated_config.matrices[matrix_name]
+            counts = events.groupby([matrix_config.user.key, matrix_config.item.key]).size()
+            replacements += merge_matrix_counts(
+                dataset_dir,
+                matrix_config,
+                counts.index.get_level_values(0).to_numpy(),
+                counts.index.get_level_values(1).to_numpy(),
+                counts.to_numpy(),
+                chunk_size=chunk_size
+            )
+
+        if event_table.partitions is not None:
+            append_table_by_month(dataset_dir, event_table, events)
+        else:
+            event_table.save_table(events, dataset_dir, append=True)
+            event_table.num_records += len(events)
+
+        config_file_name = TABLE_FILE_PREFIX + 'tmp_' + DATASET_CONFIG_FILE
+        save_yml(os.path.join(dataset_dir, config_file_name), updated_config.to_yml_format())
+        replacements.append((config_file_name, DATASET_CONFIG_FILE))
+    except Exception:
+        _restore_file_sizes(event_path, event_file_sizes)
+        for tmp_file_name, _ in replacements:
+            if os.path.isfile(os.path.join(dataset_dir, tmp_file_name)):
+                os.remove(os.path.join(dataset_dir, tmp_file_name))
+        raise
+
+    for tmp_file_name, file_name in replacements:
+        os.replace(os.path.join(dataset_dir, tmp_file_name), os.path.join(dataset_dir, file_name))
+
+    dataset_config.events[event_table_name] = event_table
+    for matrix_name in matrix_names:
+        dataset_config.matrices[matrix_name] = updated_config.matrices[matrix_name]
+
+    return matrix_names
+
+
+def get_event_count_matrices(dataset_config: DatasetConfig, event_table_name: str) -> List[str]:
+    """Get the names of the user-item count matrices that are derived from an event table.
+
+    A count matrix has the user key and an item key of the event table as primary key
+    and the number of events of each user-item pair as its only column, of which the
+    name depends on the rating column of the matrix processor (e.g. 'matrix_count').
+
+    Args:
+        dataset_config: the configuration of the dataset.
+        event_table_name: the name of the event table.
+
+    Returns:
+        the names of the count matrices of the event table.
+    """
+    return [name for name in get_event_matrices(dataset_config, event_table_name)
+            if len(dataset_config.matrices[name].table.columns) == 1]
+
+
+def get_event_matrices(dataset_config: DatasetConfig, event_table_name: str) -> List[str]:
+    """Get the names of the matrices that have the user and item key of an event table.
+
+    Args:
+        dataset_config: the configuration of the dataset.
+        event_table_name: the name of the event table.
+
+    Returns:
+        the names of the matrices with the user and item key of the event table.
+    """
+    event_table = dataset_config.events.get(event_table_name)
+    if event_table is None:
+        return []
+
+    return [name for name, matrix_config in dataset_config.matrices.items()
+            if matrix_config.user.key in event_table.primary_key and
+            matrix_config.item.key in event_table.primary_key]
+
+
+def merge_matrix_counts(
+        dataset_dir: str,
+        matrix_config: DatasetMatrixConfig,
+        users: np.ndarray,
+        items: np.ndarray,
+        counts: np.ndarray,
+        *,
+        chunk_size: int=DELTA_CHUNK_SIZE) -> List[Tuple[str, str]]:
+    """Merge the user-item count deltas into a dataset matrix.
+
+    The counts are added to the user-item pairs that are present in the matrix and the
+    other pairs are appended. The merged matrix and the extended indirection arrays are
+    written to temporary files, which the caller is expected to replace the original
+    files with, so that the files of all the merged matrices are replaced at once.
+    The matrix configuration is updated in place.
+
+    Args:
+        dataset_dir: the directory of the dataset.
+        matrix_config: the configuration of the matrix to merge the counts into.
+        users: the (original) user ids of the unique user-item pairs.
+        items: the (original) item ids of the unique user-item pairs.
+        counts: the count deltas of the user-item pairs.
+        chunk_size: the number of matrix records that are merged at once.
+
+    Returns:
+        a list of the temporary file names and the names of the files they replace.
+    """
+    replacements = []
+    users = _extend_indices(dataset_dir, matrix_config.user, users, replacements)
+    items = _extend_indices(dataset_dir, matrix_config.item, items, replacements)
+
+    delta_keys = (users.astype(np.int64) << 32) | items.astype(np.int64)
+    order = np.argsort(delta_keys)
+    delta_keys = delta_keys[order]
+    counts = counts[order]
+    merged = np.zeros(len(delta_keys), dtype=bool)
+
+    # only used when the matrix ids are the original ids, to count the new users/items
+    delta_users = np.unique(users) if matrix_config.user.file_name is None else None
+    delta_items = np.unique(items) if matrix_config.item.file_name is None else None
+    is_user_present = np.zeros(0 if delta_users is None else len(delta_users), dtype=bool)
+    is_item_present = np.zeros(0 if delta_items is None else len(delta_items), dtype=bool)
+
+    table = matrix_config.table
+    user_key, item_key = table.primary_key
+    rating_column = table.columns[0]
+    merged_config = DatasetTableConfig(
+        table.primary_key,
+        table.foreign_keys,
+        table.columns,
+        0,
+        DatasetFileConfig(TABLE_FILE_PREFIX + 'tmp_' + table.file.name, table.file.options),
+        table.categorical
+    )
+
+    rating_min = np.inf
+    rating_max = -np.inf
+    for _, chunk in enumerate(table.read_table(dataset_dir, chunk_size=chunk_size)):
+        chunk_keys = (chunk[user_key].to_numpy().astype(np.int64) << 32) | \
+            chunk[item_key].to_numpy().astype(np.int64)
+        positions, found = _search_keys(delta_keys, chunk_keys)
+        if np.any(found):
+            chunk[rating_column] = chunk[rating_column].to_numpy() + \
+                np.where(found, counts[np.where(found, positions, 0)], 0)
+            merged[positions[found]] = True
+
+        if delta_users is not None:
+            is_user_present |= np.isin(delta_users, chunk[user_key].to_numpy())
+        if delta_items is not None:
+            is_item_present |= np.isin(delta_items, chunk[item_key].to_numpy())
+
+        merged_config.save_table(chunk, dataset_dir, append=merged_config.num_records > 0)
+        merged_config.num_records += len(chunk)
+        rating_min, rating_max = _update_range(rating_min, rating_max, chunk[rating_column])
+
+    new_pairs = pd.DataFrame({
+        user_key: delta_keys[~merged] >> 32,
+        item_key: delta_keys[~merged] & 0xFFFFFFFF,
+        rating_column: counts[~merged]
+    })
+    if len(new_pairs) > 0:
+        merged_config.save_table(new_pairs, dataset_dir, append=merged_config.num_records > 0)
+        merged_config.num_records += len(new_pairs)
+        rating_min, rating_max = _update_range(rating_min, rating_max, new_pairs[rating_column])
+
+    replacements.append((merged_config.file.name, table.file.name))
+    table.num_records = merged_config.num_records
+
+    if delta_users is not None:
+        matrix_config.user.num_records += int(np.count_nonzero(~is_user_present))
+    if delta_items is not None:
+        matrix_config.item.num_records += int(np.count_nonzero(~is_item_present))
+
+    matrix_config.ratings.rating_min = rating_min
+    matrix_config.ratings.rating_max = rating_max
+    matrix_config.ratings.rating_type = DATASET_RATINGS_IMPLICIT \
+        if rating_max > RATING_TYPE_THRESHOLD else DATASET_RATINGS_EXPLICIT
+
+    return replacements
+
+
+def _extend_indices(
+        dataset_dir: str,
+        index_config: DatasetIndexConfig,
+        ids: np.ndarray,
+        replacements: List[Tuple[str, str]]) -> np.ndarray:
+    """Extend the indirection array with the new ids and map the ids to the matrix ids.
+
+    The extended indirection array is saved in a temporary file.
+
+    Args:
+        dataset_dir: the directory of the dataset.
+        index_config: the configuration of the user/item indices, updated in place.
+        ids: the original user/item ids to map.
+        replacements: the list to add the temporary file name and the replaced file name to.
+
+    Returns:
+        the matrix ids, which are the original ids when there is no indirection array.
+    """
+    indices = index_config.load_indices(dataset_dir)
+    if indices is None:
+        return ids
+
+    indices = pd.Index(np.asarray(indices, dtype=np.int64))
+    matrix_ids = indices.get_indexer(ids)
+    if np.any(matrix_ids == -1):
+        # new ids are assigned in order of appearance after the existing ids
+        indices = indices.append(pd.Index(pd.unique(ids[matrix_ids == -1])))
+        matrix_ids = indices.get_indexer(ids)
+        tmp_config = DatasetIndexConfig(
+            TABLE_FILE_PREFIX + 'tmp_' + index_config.file_name,
+            index_config.key,
+            len(indices)
+        )
+        tmp_config.save_indices(dataset_dir, list(indices))
+        replacements.append((tmp_config.file_name, index_config.file_name))
+        index_config.num_records = len(indices)
+
+    return matrix_ids
+
+
+def _get_file_sizes(path: str) -> Dict[str, int]:
+    """Get the sizes of the file(s) of the path.
+
+    Args:
+        path: the path to a file or a directory of files.
+
+    Returns:
+        a dictionary with the file paths as key and the sizes of the files as value.
+    """
+    if not os.path.isdir(path):
+        return {path: os.path.getsize(path)} if os.path.isfile(path) else {}
+
+    return {os.path.join(path, file_name): os.path.getsize(os.path.join(path, file_name))
+            for file_name in os.listdir(path)}
+
+
+def _restore_file_sizes(path: str, file_sizes: Dict[str, int]) -> None:
+    """Restore the file(s) of the path that are only appended to since the sizes are taken.
+
+    The files are truncated to their original size and the files that are new are removed.
+
+    Args:
+        path: the path to a file or a directory of files.
+        file_sizes: the original sizes of the files as returned by _get_file_sizes.
+    """
+    for file_path in _get_file_sizes(path):
+        if file_path in file_sizes:
+            os.truncate(file_path, file_sizes[file_path])
+        else:
+            os.remove(file_path)
+
+
+def _search_keys(
+        sorted_keys: np.ndarray,
+        keys: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Search the positions of the keys in the sorted keys.
+
+    Args:
+        sorted_keys: the sorted keys to search in.
+        keys: the keys to search for.
+
+    Returns:
+        the positions of the keys and the mask of the keys that are found.
+    """
+    positions = np.searchsorted(sorted_keys, keys)
+    found = positions < len(sorted_keys)
+    found[found] = sorted_keys[positions[found]] == keys[found]
+    return positions, found
+
+
+def _update_range(
+        value_min: float,
+        value_max: float,
+        values: pd.Series) -> Tuple[float, float]:
+    """Update the range with the (non-empty) values."""
+    if len(values) == 0:
+        return value_min, value_max
+
+    return min(value_min, float(values.min())), max(value_max, float(values.max()))
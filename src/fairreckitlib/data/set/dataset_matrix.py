@@ -7,6 +7,8 @@ Classes:
 
 Functions:
 
+    add_matrix_chunks: add the user-item matrix chunks of an event table chunk to aggregators.
+    aggregate_event_partition: aggregate the user-item pairs of an event table partition.
     create_matrix_chunk: create a user-item matrix chunk by counting user-item occurrences.
 
 This program has been developed by students from the bachelor Computer Science at
@@ -14,9 +16,10 @@ Utrecht University within the Software Project course.
 © Copyright Utrecht University (Department of Information and Computing Sciences)
 """
 
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from dataclasses import dataclass
 import os
-from typing import List, Tuple
+from typing import Dict, List, Tuple, Union
 
 import numpy as np
 import pandas as pd
@@ -28,6 +31,8 @@ from ...core.io.io_delete import delete_dir
 from ...core.io.io_utility import save_yml
 from ..ratings.convert_constants import RATING_TYPE_THRESHOLD
 from .dataset import Dataset
+from .dataset_aggregation import DEFAULT_MAX_PAIRS, PairAggregator
+from .dataset_compression import DEFAULT_COMPRESSION, get_compression_ext
 from .dataset_constants import TABLE_FILE_PREFIX, DATASET_CONFIG_FILE
 from .dataset_config import DATASET_RATINGS_EXPLICIT, DATASET_RATINGS_IMPLICIT, \
     DatasetTableConfig, DatasetMatrixConfig, DatasetIndexConfig, RatingMatrixConfig, \
@@ -54,14 +59,22 @@ class DatasetMatrixProcessor:
     """Dataset Matrix Processor.
 
     The intended use of this class is to utilize an existing dataset that has event tables present,
-    in order to generate a new user-item matrix. The processor does the following steps in order:
+    in order to generate new user-item matrices. The processor does the following steps in order:
 
-    1) create a temporary directory to store user-item chunks.
-    2) process the event table by creating and saving user-item chunks.
-    3) process the matrix by merging chunks.
-    4) save the matrix in the dataset directory.
-    5) update the dataset configuration file with the new user-item matrix.
-    6) remove the temporary directory with.
+    1) create a temporary directory to spill aggregated user-item runs to.
+    2) process the event table by aggregating user-item chunks for each of the matrices.
+    3) merge the aggregated user-item pairs and save the matrices in the dataset directory.
+    4) update the dataset configuration file and statistics catalog with the new matrices.
+    5) remove the temporary directory.
+
+    Step 2 and 3 are repeated for each event table, so that all the matrices that are
+    derived from the same event table are produced with a single pass over the table.
+
+    The user-item pairs are aggregated in linear passes over the event table. When the
+    number of distinct user-item pairs exceeds the specified maximum, the aggregated pairs
+    are spilled to disk as sorted runs that are merged when the matrix is saved.
+    The event table is split into partitions that are scanned by multiple worker processes
+    when possible, each handing back its partial aggregate as sorted (binary) runs.
 
     Public methods:
 
@@ -84,35 +97,49 @@ class DatasetMatrixProcessor:
             self.event_dispatcher.add_listener(event_id, None, (print_event, None))
 
     def run(self,
-            processor_config: MatrixProcessorConfig,
+            processor_config: Union[MatrixProcessorConfig, List[MatrixProcessorConfig]],
             *,
-            chunk_size: int=DEFAULT_MATRIX_CHUNK_SIZE) -> bool:
-        """Run the processor with the specified matrix configuration.
+            chunk_size: int=DEFAULT_MATRIX_CHUNK_SIZE,
+            max_pairs: int=DEFAULT_MAX_PAIRS,
+            num_workers: int=1) -> bool:
+        """Run the processor with the specified matrix configuration(s).
 
-        The processor fails when the user-item matrix is already present in the
-        existing dataset configuration.
+        A list of matrix configurations produces all the user-item matrices with a single
+        pass over each of the event tables that are involved. The user-item matrices that
+        are already present in the existing dataset configuration are skipped.
 
         Args:
-            processor_config: the configuration to use for creating a user-item matrix.
+            processor_config: the configuration or list of configurations to use
+                for creating the user-item matrices.
             chunk_size: the size of the chunks to use during processing.
+            max_pairs: the maximum number of distinct user-item pairs to keep in memory
+                for each of the user-item matrices.
+            num_workers: the number of worker processes that scan the event table.
 
         Raises:
             KeyError: when the event table does not exist in the dataset.
             IndexError: when the item key name is not present in the event table.
 
         Returns:
-            whether the processing of the user-item matrix succeeded.
+            whether the processing of any user-item matrix succeeded.
         """
-        if not processor_config.event_table_name in self.dataset.config.events:
-            raise KeyError('Event table does not exist: ' + processor_config.event_table_name)
+        if isinstance(processor_config, MatrixProcessorConfig):
+            processor_config = [processor_config]
+
+        matrix_configs = {}
+        for config in processor_config:
+            if not config.event_table_name in self.dataset.config.events:
+                raise KeyError('Event table does not exist: ' + config.event_table_name)
 
-        event_table = self.dataset.config.events[processor_config.event_table_name]
-        item_key = processor_config.item_key
-        if item_key not in event_table.primary_key:
-            raise IndexError('Event table does not have the requested item key')
+            event_table = self.dataset.config.events[config.event_table_name]
+            if config.item_key not in event_table.primary_key:
+                raise IndexError('Event table does not have the requested item key')
 
-        matrix_name = 'user-' + item_key.split('_')[0] + '-' + processor_config.rating_column
-        if self.dataset.get_matrix_config(matrix_name) is not None:
+            matrix_name = 'user-' + config.item_key.split('_')[0] + '-' + config.rating_column
+            if self.dataset.get_matrix_config(matrix_name) is None:
+                matrix_configs[matrix_name] = config
+
+        if len(matrix_configs) == 0:
             return False
 
         # step 1
@@ -124,82 +151,132 @@ class DatasetMatrixProcessor:
         if self.verbose:
             print('Started processing matrix')
 
-        # step 2
-        num_chunks = self.process_event_table(
-            temp_dir,
-            event_table,
-            item_key,
-            processor_config.rating_column,
-            chunk_size=chunk_size
-        )
-
-        # step 3
-        matrix_tuple = self.process_matrix_from_chunks(
-            temp_dir,
-            num_chunks,
-            item_key,
-            processor_config.rating_column
-        )
+        event_table_names = list(dict.fromkeys(
+            config.event_table_name for config in matrix_configs.values()
+        ))
+        for i, event_table_name in enumerate(event_table_names):
+            # step 2
+            aggregators = {}
+            for config in matrix_configs.values():
+                if config.event_table_name == event_table_name and \
+                        config.item_key not in aggregators:
+                    aggregators[config.item_key] = PairAggregator(
+                        temp_dir,
+                        max_pairs=max_pairs,
+                        run_prefix='run_' + str(i) + '_' + config.item_key
+                    )
+
+            self.process_event_table(
+                aggregators,
+                self.dataset.config.events[event_table_name],
+                chunk_size=chunk_size,
+                num_workers=num_workers
+            )
+
+            # step 3
+            for matrix_name, config in matrix_configs.items():
+                if config.event_table_name != event_table_name:
+                    continue
+
+                matrix_config = self.save_matrix(
+                    matrix_name,
+                    aggregators[config.item_key],
+                    config.item_key,
+                    config.rating_column,
+                    chunk_size=chunk_size
+                )
+                # an empty event table does not produce a matrix
+                if matrix_config.table.num_records > 0:
+                    self.dataset.config.matrices[matrix_name] = matrix_config
+                self.dataset.invalidate_indices(matrix_name)
 
         # step 4
-        dataset_matrix_config = self.save_matrix(
-            matrix_name,
-            matrix_tuple,
-            item_key,
-            processor_config.rating_column
-        )
-
-        # step 5
-        self.dataset.config.matrices[matrix_name] = dataset_matrix_config
         save_yml(
             os.path.join(self.dataset.data_dir, DATASET_CONFIG_FILE),
             self.dataset.config.to_yml_format()
         )
+        self.dataset.update_statistics_catalog()
 
         if self.verbose:
             print('Finished processing matrix')
 
-        # step 6
+        # step 5
         delete_dir(temp_dir, self.event_dispatcher)
         return True
 
     def process_event_table(
             self,
-            output_dir: str,
+            aggregators: Dict[str, PairAggregator],
             event_table: DatasetTableConfig,
-            item_key: str,
-            rating_column: str,
             *,
-            chunk_size: int=DEFAULT_MATRIX_CHUNK_SIZE) -> int:
+            chunk_size: int=DEFAULT_MATRIX_CHUNK_SIZE,
+            num_workers: int=1) -> int:
         """Process the event table in chunks.
 
+        The event table is scanned in parallel when more than one worker is requested
+        and the event table can be partitioned, otherwise it is scanned sequentially.
+
         Args:
-            output_dir: the output directory to store the chunks.
+            aggregators: the aggregators to add the user-item chunks to, keyed by item key name.
             event_table: the event table to process into chunks.
-            item_key: the item key name to create a user-item chunk for.
-            rating_column: the name of the rating column to use in the user-item chunk.
             chunk_size: the size of the chunks to use during processing.
+            num_workers: the number of worker processes that scan the event table.
 
         Returns:
-            the number of chunks that are generated.
+            the number of chunks that are processed.
         """
         if self.verbose:
             print('Started processing event table')
 
+        partitions = None
+        if num_workers > 1:
+            partitions = event_table.get_partitions(self.dataset.data_dir, num_workers)
+
+        if partitions is not None and len(partitions) > 1:
+            num_chunks = 0
+            with ProcessPoolExecutor(max_workers=num_workers) as executor:
+                futures = [executor.submit(
+                    aggregate_event_partition,
+                    self.dataset.data_dir,
+                    event_table,
+                    partition,
+                    list(aggregators.keys()),
+                    next(iter(aggregators.values())).spill_dir,
+                    'partition_' + str(i),
+                    chunk_size=chunk_size,
+                    max_pairs=next(iter(aggregators.values())).max_pairs
+                ) for i, partition in enumerate(partitions)]
+
+                for i, future in enumerate(as_completed(futures)):
+                    partition_runs, num_partition_chunks = future.result()
+                    for item_key, runs in partition_runs.items():
+                        aggregators[item_key].add_runs(runs)
+
+                    num_chunks += num_partition_chunks
+                    if self.verbose:
+                        print('Processed partition', i + 1, 'of', len(partitions))
+
+            if self.verbose:
+                print('Finished processing event table')
+
+            return num_chunks
+
         num_chunks = 0
         start_row = 0
-        event_table_it = event_table.read_table(self.dataset.data_dir, chunk_size=chunk_size)
-        for i, chunk in enumerate(event_table_it):
+        event_table_it = event_table.read_table(
+            self.dataset.data_dir,
+            columns=['user_id'] + list(aggregators.keys()),
+            chunk_size=chunk_size
+        )
+        for _, chunk in enumerate(event_table_it):
             end_row = int(min(start_row + chunk_size, event_table.num_records))
             percent = float(start_row) / float(event_table.num_records) * 100.0
             if self.verbose:
                 print('Processing rows', start_row, 'to', end_row,
                       'of', event_table.num_records, '=>', str(percent) + '%')
 
-            chunk = create_matrix_chunk(chunk, item_key, rating_column)
             # TODO filter chunk based on user/item columns
-            chunk.to_csv(os.path.join(output_dir, 'chunk_' + str(i) + '.tsv'),
-                         sep='\t', header=True, index=False)
+            add_matrix_chunks(aggregators, chunk)
 
             num_chunks += 1
             start_row += chunk_size
@@ -209,76 +286,22 @@ class DatasetMatrixProcessor:
 
         return num_chunks
 
-    def process_matrix_from_chunks(
-            self,
-            output_dir: str,
-            num_chunks: int,
-            item_key: str,
-            rating_column: str) -> Tuple[pd.DataFrame, List[int], List[int]]:
-        """Process the user-item matrix from the stored chunks.
-
-        Args:
-            output_dir: the output directory where the chunks are stored.
-            num_chunks: the number of chunks in the output directory.
-            item_key: the item key name that was used to create user-item chunks.
-            rating_column: the name of the rating column that was used to create user-item chunks.
-
-        Returns:
-            the user-item matrix and the lists of unique user/item ids.
-        """
-        if self.verbose:
-            print('Started processing matrix chunks')
-
-        matrix = pd.DataFrame({
-            'user_id': pd.Series(dtype='int'),
-            item_key: pd.Series(dtype='int'),
-            rating_column: pd.Series(dtype='float')
-        })
-
-        for i in range(num_chunks):
-            if self.verbose:
-                print('Processing matrix chunk', i + 1, 'of', num_chunks)
-
-            chunk = pd.read_table(os.path.join(output_dir, 'chunk_' + str(i) + '.tsv'))
-            matrix = pd.concat([matrix, chunk], ignore_index=True)
-            matrix = matrix.groupby(['user_id', item_key], as_index=False).sum()
-
-        unique_users = matrix['user_id'].unique()
-        # users from 0...num_users
-        matrix = pd.merge(
-            matrix,
-            pd.DataFrame(list(enumerate(unique_users)), columns=['user', 'user_id']),
-            how='left', on='user_id'
-        )
-        matrix.drop('user_id', axis=1, inplace=True)
-
-        unique_items = matrix[item_key].unique()
-        # items from 0...num_items
-        matrix = pd.merge(
-            matrix,
-            pd.DataFrame(list(enumerate(unique_items)), columns=['item', item_key]),
-            how='left', on=item_key
-        )
-        matrix.drop(item_key, axis=1, inplace=True)
-
-        if self.verbose:
-            print('Finished processing matrix chunks')
-
-        return matrix[['user', 'item', rating_column]], list(unique_users), list(unique_items)
-
     def save_matrix(
             self,
             matrix_name: str,
-            matrix_tuple: Tuple[pd.DataFrame, List[int], List[int]],
+            aggregator: PairAggregator,
             item_key: str,
-            rating_column: str) -> DatasetMatrixConfig:
+            rating_column: str,
+            *,
+            chunk_size: int=DEFAULT_MATRIX_CHUNK_SIZE) -> DatasetMatrixConfig:
         """Save the matrix in the dataset directory.
 
         Args:
             matrix_name: the name that is used to save the matrix, user and item lists.
-            matrix_tuple: the user-item matrix and the lists of unique user/item ids.
+            aggregator: the aggregator that contains the user-item pairs.
             item_key: the item key name that was used to create the user-item matrix.
             rating_column: name of the rating column that was used to create the user-item matrix.
+            chunk_size: the number of user-item pairs to save at once.
 
         Returns:
             the dataset matrix configuration.
@@ -287,7 +310,54 @@ class DatasetMatrixProcessor:
             print('Started saving matrix')
 
         dataset_matrix_name = TABLE_FILE_PREFIX + self.dataset.get_name() + '_' + matrix_name
-        matrix, users, items = matrix_tuple
+
+        # create the matrix table config and save the table in chunks
+        matrix_table_config = create_dataset_table_config(
+            dataset_matrix_name + '_matrix.tsv' + get_compression_ext(DEFAULT_COMPRESSION),
+            ['user_id', item_key],
+            ['matrix_' + rating_column],
+            compression=DEFAULT_COMPRESSION,
+            foreign_keys=['user_id', item_key]
+        )
+
+        unique_users = []
+        unique_items = pd.Index([], dtype='int64')
+        num_users = 0
+        last_user = None
+        rating_min = np.inf
+        rating_max = -np.inf
+
+        for _, (users, items, ratings) in enumerate(aggregator.merge(chunk_size)):
+            # users from 0...num_users, the pairs are sorted by user
+            new_users = np.ones(len(users), dtype=bool)
+            new_users[1:] = users[1:] != users[:-1]
+            new_users[0] = users[0] != last_user
+            last_user = users[-1]
+            user_indices = np.cumsum(new_users) + (num_users - 1)
+            unique_users.append(users[new_users])
+            num_users += len(unique_users[-1])
+
+            # items from 0...num_items in order of appearance
+            item_indices = unique_items.get_indexer(items)
+            if np.any(item_indices == -1):
+                unique_items = unique_items.append(pd.Index(pd.unique(items[item_indices == -1])))
+                item_indices = unique_items.get_indexer(items)
+
+            matrix_table_config.save_table(
+                pd.DataFrame({'user': user_indices, 'item': item_indices, 'rating': ratings}),
+                self.dataset.data_dir,
+                append=matrix_table_config.num_records > 0
+            )
+            matrix_table_config.num_records += len(ratings)
+            rating_min = min(rating_min, float(ratings.min()))
+            rating_max = max(rating_max, float(ratings.max()))
+
+        if matrix_table_config.num_records == 0:
+            # no ratings to take the range of
+            rating_min, rating_max = 0.0, 0.0
+
+        users = list(np.concatenate(unique_users)) if len(unique_users) > 0 else []
+        items = list(unique_items)
 
         # create the user indices config and save the array
         user_index_config = DatasetIndexConfig(
@@ -305,19 +375,6 @@ class DatasetMatrixProcessor:
         )
         item_index_config.save_indices(self.dataset.data_dir, items)
 
-        # create the sample matrix table config and save the table
-        matrix_table_config = create_dataset_table_config(
-            dataset_matrix_name + '_matrix.tsv.bz2',
-            ['user_id', item_key],
-            ['matrix_' + rating_column],
-            compression='bz2',
-            foreign_keys=['user_id', item_key],
-            num_records=len(matrix)
-        )
-        matrix_table_config.save_table(matrix, self.dataset.data_dir)
-
-        rating_min = float(matrix[rating_column].min())
-        rating_max = float(matrix[rating_column].max())
         rating_type = DATASET_RATINGS_IMPLICIT \
             if rating_max > RATING_TYPE_THRESHOLD else DATASET_RATINGS_EXPLICIT
 
@@ -336,6 +393,72 @@ class DatasetMatrixProcessor:
         )
 
 
+def add_matrix_chunks(aggregators: Dict[str, PairAggregator], chunk: pd.DataFrame) -> None:
+    """Add the user-item matrix chunks of an event table chunk to the aggregators.
+
+    Args:
+        aggregators: the aggregators to add the user-item chunks to, keyed by item key name.
+        chunk: a dataframe chunk containing the user-item events.
+    """
+    for item_key, aggregator in aggregators.items():
+        matrix_chunk = create_matrix_chunk(chunk, item_key, 'rating')
+        aggregator.add(
+            matrix_chunk['user_id'].to_numpy(),
+            matrix_chunk[item_key].to_numpy(),
+            matrix_chunk['rating'].to_numpy()
+        )
+
+
+def aggregate_event_partition(
+        dataset_dir: str,
+        event_table: DatasetTableConfig,
+        partition: Tuple[int, int],
+        item_keys: List[str],
+        spill_dir: str,
+        run_prefix: str,
+        *,
+        chunk_size: int=DEFAULT_MATRIX_CHUNK_SIZE,
+        max_pairs: int=DEFAULT_MAX_PAIRS) -> Tuple[Dict[str, List[str]], int]:
+    """Aggregate the user-item pairs of an event table partition.
+
+    This function is intended to be run by a worker process, the partial aggregates
+    are flushed to the spill directory as sorted runs that are handed back to the caller.
+
+    Args:
+        dataset_dir: the directory of the dataset that contains the event table.
+        event_table: the event table to aggregate a partition of.
+        partition: the partition of the event table to aggregate.
+        item_keys: the item key names to aggregate user-item pairs for.
+        spill_dir: the directory to flush the sorted runs to.
+        run_prefix: the unique file name prefix of the sorted runs.
+        chunk_size: the size of the chunks to read from the partition.
+        max_pairs: the maximum number of distinct user-item pairs to keep in memory
+            for each of the item keys.
+
+    Returns:
+        the file paths of the sorted runs keyed by item key name
+        and the number of chunks that are processed.
+    """
+    aggregators = {item_key: PairAggregator(
+        spill_dir,
+        max_pairs=max_pairs,
+        run_prefix=run_prefix + '_' + item_key
+    ) for item_key in item_keys}
+
+    num_chunks = 0
+    event_table_it = event_table.read_table(
+        dataset_dir,
+        columns=['user_id'] + list(aggregators.keys()),
+        chunk_size=chunk_size,
+        partition=partition
+    )
+    for _, chunk in enumerate(event_table_it):
+        add_matrix_chunks(aggregators, chunk)
+        num_chunks += 1
+
+    return {item_key: aggregator.flush() for item_key, aggregator in aggregators.items()}, \
+        num_chunks
+
 
 def create_matrix_chunk(chunk: pd.DataFrame, item_key: str, rating_column: str) -> pd.DataFrame:
     """Create a user-item matrix chunk by counting occurrences of user-item combinations.
@@ -0,0 +1,332 @@
+"""This module contains the metadata of dataset table files and fast record counting.
+
+The metadata of a table file consists of the number of records, the size of the file and
+the dtypes of the columns. The number of records is counted with a raw newline scan of
+the file, which is split into byte ranges that are scanned by multiple threads, instead
+of parsing the entire table. The metadata is stored in a sidecar file next to the table
+file and is reused as long as the table file does not change. The sidecar file is not
+stored when the directory of the table file is read-only.
+
+The newline scan counts lines rather than parsed records. Blank lines (which pandas skips)
+and newlines inside quoted fields (which pandas joins) are counted as records as well, so
+that the number of records is an upper bound for such files. The count is exact for the
+tables that are written by the dataset processors, as these contain neither of them.
+
+Constants:
+
+    DEFAULT_NUM_THREADS: the default number of threads that scan a file.
+    DTYPE_SAMPLE_SIZE: the number of records that are parsed to infer the column dtypes.
+    METADATA_FILE_SUFFIX: the suffix of the metadata sidecar file of a table file.
+    SCAN_BLOCK_SIZE: the number of bytes that are scanned at once.
+
+Classes:
+
+    TableMetadata: the metadata of a dataset table file.
+
+Functions:
+
+    count_file_records: count the records of a (compressed) text file with a newline scan.
+    get_table_metadata: get the (cached) metadata of a dataset table file.
+
+This program has been developed by students from the bachelor Computer Science at
+Utrecht University within the Software Project course.
+© Copyright Utrecht University (Department of Information and Computing Sciences)
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+import os
+from typing import Any, Dict, List, Optional, Tuple
+
+from ...core.io.io_utility import load_json, save_json
+from .dataset_compression import infer_compression, open_compressed_file
+from .dataset_config import DatasetTableConfig
+from .dataset_constants import TABLE_FILE_PREFIX
+from .dataset_partition import COMPRESSED_FILE_EXTS
+from .dataset_storage import STORAGE_NPY
+
+DEFAULT_NUM_THREADS = min(8, os.cpu_count() or 1)
+DTYPE_SAMPLE_SIZE = 1000
+METADATA_FILE_SUFFIX = '.meta.json'
+SCAN_BLOCK_SIZE = 1 << 24
+
+
+@dataclass
+class TableMetadata:
+    """Table Metadata of a dataset table file.
+
+    num_records: the number of records in the table file.
+    file_size: the size of the table file in bytes.
+    file_mtime: the modification time of the table file in nanoseconds.
+    header: whether the table file contains a header on the first line.
+    column_dtypes: dictionary with the column names as key and the dtype as value.
+    """
+
+    num_records: int
+    file_size: int
+    file_mtime: int
+    header: bool
+    column_dtypes: Dict[str, str]
+
+    def is_up_to_date(self, file_path: str, table_config: DatasetTableConfig) -> bool:
+        """Check whether the metadata is up-to-date with the table file and configuration.
+
+        Args:
+            file_path: the path of the table file.
+            table_config: the configuration of the table.
+
+        Returns:
+            whether the table file is unchanged and is described by the same columns.
+        """
+        file_stat = os.stat(file_path)
+        return self.file_size == file_stat.st_size and \
+            self.file_mtime == file_stat.st_mtime_ns and \
+            self.header == table_config.file.options.header and \
+            list(self.column_dtypes.keys()) == table_config.get_column_names()
+
+    def to_json_format(self) -> Dict[str, Any]:
+        """Format the table metadata to a json compatible dictionary.
+
+        Returns:
+            a dictionary containing the table metadata.
+        """
+        return {
+            'num_records': self.num_records,
+            'file_size': self.file_size,
+            'file_mtime': self.file_mtime,
+            'header': self.header,
+            'column_dtypes': self.column_dtypes
+        }
+
+
+def count_file_records(
+        file_path: str,
+        *,
+        compression: str=None,
+        header: bool=False,
+        num_threads: int=DEFAULT_NUM_THREADS) -> int:
+    """Count the records of a text file with a raw newline scan.
+
+    Uncompressed files are split into byte ranges that are scanned concurrently,
+    compressed files are decompressed and scanned sequentially. A last line that
+    is not terminated by a newline is counted as well. Blank lines and newlines inside
+    quoted fields are counted as records, which pandas skips and joins respectively.
+
+    Args:
+        file_path: the path of the text file to count the records of.
+        compression: the compression codec of the file, or None to infer it from the extension.
+        header: whether the file contains a header on the first line.
+        num_threads: the (maximum) number of threads that scan the file.
+
+    Raises:
+        FileNotFoundError: when the file does not exist.
+        ValueError: when the compression of the file is not supported.
+
+    Returns:
+        the number of records in the file.
+    """
+    if compression is None:
+        compression = infer_compression(file_path)
+        if compression is None and os.path.splitext(file_path)[1] in COMPRESSED_FILE_EXTS:
+            raise ValueError('Unable to count the records of file: ' + file_path)
+
+    if compression is None:
+        num_lines, ends_with_newline = _count_file_lines(file_path, num_threads)
+    else:
+        try:
+            file = open_compressed_file(file_path, compression)
+        except KeyError as err:
+            raise ValueError('Unable to count the records of file: ' + file_path) from err
+
+        with file:
+            num_lines, ends_with_newline = _count_stream_lines(file)
+
+    # the last line is not terminated when the file does not end with a newline
+    if ends_with_newline is not None and not ends_with_newline:
+        num_lines += 1
+    if header and num_lines > 0:
+        num_lines -= 1
+
+    return num_lines
+
+
+def get_table_metadata(
+        dataset_dir: str,
+        table_config: DatasetTableConfig,
+        *,
+        num_threads: int=DEFAULT_NUM_THREADS) -> TableMetadata:
+    """Get the metadata of the table file.
+
+    The metadata is loaded from the sidecar file when it is up-to-date with the table
+    file, otherwise the records are counted and the sidecar file is (re)created.
+    The metadata is not cached when the sidecar file cannot be written.
+
+    Args:
+        dataset_dir: the directory of the table file.
+        table_config: the configuration of the table with a text storage.
+        num_threads: the (maximum) number of threads that scan the table file.
+
+    Raises:
+        FileNotFoundError: when the table file does not exist.
+        ValueError: when the table has a binary storage or an unsupported compression.
+
+    Returns:
+        the metadata of the table file.
+    """
+    if table_config.file.options.storage == STORAGE_NPY:
+        raise ValueError('Expected a table with a text storage')
+
+    file_path = os.path.join(dataset_dir, table_config.file.name)
+    metadata_path = os.path.join(
+        dataset_dir,
+        TABLE_FILE_PREFIX + table_config.file.name + METADATA_FILE_SUFFIX
+    )
+
+    metadata = _load_table_metadata(metadata_path)
+    if metadata is not None and metadata.is_up_to_date(file_path, table_config):
+        return metadata
+
+    # stat before scanning so that a concurrent change invalidates the sidecar
+    file_stat = os.stat(file_path)
+    metadata = TableMetadata(
+        count_file_records(
+            file_path,
+            compression=table_config.get_compression(),
+            header=table_config.file.options.header,
+            num_threads=num_threads
+        ),
+        file_stat.st_size,
+        file_stat.st_mtime_ns,
+        table_config.file.options.header,
+        _infer_column_dtypes(dataset_dir, table_config)
+    )
+
+    try:
+        save_json(metadata_path, metadata.to_json_format(), indent=4)
+    except OSError:
+        pass
+
+    return metadata
+
+
+def _count_file_lines(file_path: str, num_threads: int) -> Tuple[int, Optional[bool]]:
+    """Count the newlines of an uncompressed file in concurrently scanned byte ranges.
+
+    Args:
+        file_path: the path of the file to count the newlines of.
+        num_threads: the (maximum) number of threads that scan the file.
+
+    Returns:
+        the number of newlines and whether the file ends with a newline (None when empty).
+    """
+    file_size = os.path.getsize(file_path)
+    if file_size == 0:
+        return 0, None
+
+    num_ranges = max(1, min(num_threads, file_size // SCAN_BLOCK_SIZE))
+    offsets = [file_size * i // num_ranges for i in range(num_ranges + 1)]
+    if num_ranges == 1:
+        num_lines = _count_range_lines(file_path, 0, file_size)
+    else:
+        # reading the blocks releases the GIL, which lets the scans overlap
+        with ThreadPoolExecutor(max_workers=num_ranges) as executor:
+            num_lines = sum(executor.map(
+                _count_range_lines,
+                [file_path] * num_ranges,
+                offsets[:-1],
+                offsets[1:]
+            ))
+
+    with open(file_path, 'rb') as file:
+        file.seek(file_size - 1)
+        ends_with_newline = file.read(1) == b'\n'
+
+    return num_lines, ends_with_newline
+
+
+def _count_range_lines(file_path: str, start: int, end: int) -> int:
+    """Count the newlines in the byte range of a file.
+
+    Args:
+        file_path: the path of the file to count the newlines of.
+        start: the byte offset to start counting from.
+        end: the byte offset to stop counting at (exclusive).
+
+    Returns:
+        the number of newlines in the byte range.
+    """
+    num_lines = 0
+    with open(file_path, 'rb') as file:
+        file.seek(start)
+        remaining = end - start
+        while remaining > 0:
+            block = file.read(min(SCAN_BLOCK_SIZE, remaining))
+            if not block:
+                break
+
+            num_lines += block.count(b'\n')
+            remaining -= len(block)
+
+    return num_lines
+
+
+def _count_stream_lines(stream) -> Tuple[int, Optional[bool]]:
+    """Count the newlines of a (decompressed) binary stream.
+
+    Args:
+        stream: the binary stream to count the newlines of.
+
+    Returns:
+        the number of newlines and whether the stream ends with a newline (None when empty).
+    """
+    num_lines = 0
+    last_block = b''
+    while True:
+        block = stream.read(SCAN_BLOCK_SIZE)
+        if not block:
+            break
+
+        num_lines += block.count(b'\n')
+        last_block = block
+
+    return num_lines, last_block.endswith(b'\n') if last_block else None
+
+
+def _infer_column_dtypes(dataset_dir: str, table_config: DatasetTableConfig) -> Dict[str, str]:
+    """Infer the dtypes of the table columns from the first records of the table.
+
+    Args:
+        dataset_dir: the directory of the table file.
+        table_config: the configuration of the table.
+
+    Returns:
+        dictionary with the column names as key and the (inferred) dtype as value.
+    """
+    column_names: List[str] = table_config.get_column_names()
+    try:
+        table_iterator = table_config.read_table(dataset_dir, chunk_size=DTYPE_SAMPLE_SIZE)
+        sample = next(table_iterator)
+        table_iterator.close()
+    except (StopIteration, ValueError):
+        # an empty table has no records to infer the dtypes from
+        return {name: 'object' for name in column_names}
+
+    return {name: str(sample[name].dtype) for name in column_names}
+
+
+def _load_table_metadata(metadata_path: str) -> Optional[TableMetadata]:
+    """Load the table metadata from the sidecar file.
+
+    Args:
+        metadata_path: the path of the metadata sidecar file.
+
+    Returns:
+        the table metadata or None when the sidecar file is missing or invalid.
+    """
+    if not os.path.isfile(metadata_path):
+        return None
+
+    try:
+        return TableMetadata(**load_json(metadata_path))
+    except (TypeError, ValueError):
+        return None
@@ -0,0 +1,311 @@
+"""This module contains functionality to migrate the storage of processed datasets.
+
+Functions:
+
+    migrate_dataset_storage: migrate the tables of a dataset to another storage in place.
+    migrate_data_dir_storage: migrate the tables of all the datasets in a data directory.
+
+This program has been developed by students from the bachelor Computer Science at
+Utrecht University within the Software Project course.
+© Copyright Utrecht University (Department of Information and Computing Sciences)
+"""
+
+import os
+import shutil
+from typing import Any, Dict, List, Optional
+
+import pandas as pd
+
+from ...core.io.io_utility import save_yml
+from .dataset_compression import DEFAULT_COMPRESSION, get_compression_ext
+from .dataset_config import DatasetConfig, DatasetTableConfig, DatasetTimePartitionConfig
+from .dataset_config import create_dataset_table_config
+from .dataset_config_parser import DatasetConfigParser
+from .dataset_constants import DATASET_CONFIG_FILE, TABLE_FILE_PREFIX
+from .dataset_storage import STORAGE_NPY, NpyTableWriter
+
+DEFAULT_MIGRATION_CHUNK_SIZE = 10E6
+
+
+def migrate_dataset_storage(
+        dataset_dir: str,
+        *,
+        storage: Optional[str]=STORAGE_NPY,
+        compression: Optional[str]=DEFAULT_COMPRESSION,
+        chunk_size: int=DEFAULT_MIGRATION_CHUNK_SIZE,
+        verbose: bool=True) -> Optional[DatasetConfig]:
+    """Migrate the event tables, matrices and tables of a dataset to another storage.
+
+    The tables are converted in chunks and the dataset configuration file is updated
+    in place when all tables are converted. Afterwards, the files of the previous
+    storage are removed, but only when they were generated by a dataset processor.
+    Tables that are already stored with the specified storage (and compression for
+    text files) remain untouched.
+
+    Args:
+        dataset_dir: the directory of the dataset to migrate.
+        storage: the storage to migrate to, e.g. 'npy', or None for text files.
+        compression: the compression codec of the text files or None for no compression.
+        chunk_size: the number of records to convert at once.
+        verbose: whether to give verbose output.
+
+    Returns:
+        the migrated dataset configuration or None when the configuration failed to parse.
+    """
+    config = DatasetConfigParser(verbose).parse_dataset_config_from_yml(
+        dataset_dir,
+        DATASET_CONFIG_FILE,
+        []
+    )
+    if config is None:
+        return None
+
+    tables = list(config.events.items()) + list(config.tables.items()) + \
+        [(name, matrix_config.table) for name, matrix_config in config.matrices.items()]
+
+    obsolete_files = []
+    for table_name, table_config in tables:
+        if table_config.file.options.storage == storage and \
+                (storage is not None or table_config.get_compression() == compression):
+            continue
+
+        if verbose:
+            print('Migrating', config.dataset_name, table_name, 'to', storage, 'storage')
+
+        migrate_func = _migrate_table if table_config.partitions is None \
+            else _migrate_partitioned_table
+        migrated_config = migrate_func(
+            dataset_dir,
+            TABLE_FILE_PREFIX + config.dataset_name + '_' + table_name,
+            table_config,
+            storage,
+            compression,
+            chunk_size
+        )
+        if table_config.file.name.startswith(TABLE_FILE_PREFIX):
+            obsolete_files.append(table_config.file.name)
+
+        # update the table configuration in place
+        table_config.file = migrated_config.file
+        table_config.num_records = migrated_config.num_records
+        table_config.partitions = migrated_config.partitions
+
+    save_yml(os.path.join(dataset_dir, DATASET_CONFIG_FILE), config.to_yml_format())
+
+    for file_name in obsolete_files:
+        file_path = os.path.join(dataset_dir, file_name)
+        if os.path.isdir(file_path):
+            shutil.rmtree(file_path)
+        elif os.path.isfile(file_path):
+            os.remove(file_path)
+
+    return config
+
+
+def migrate_data_dir_storage(
+        data_dir: str,
+        *,
+        storage: Optional[str]=STORAGE_NPY,
+        compression: Optional[str]=DEFAULT_COMPRESSION,
+        chunk_size: int=DEFAULT_MIGRATION_CHUNK_SIZE,
+        verbose: bool=True) -> List[str]:
+    """Migrate the tables of all the processed datasets in the data directory.
+
+    Args:
+        data_dir: the directory that contains the datasets.
+        storage: the storage to migrate to, e.g. 'npy', or None for text files.
+        compression: the compression codec of the text files or None for no compression.
+        chunk_size: the number of records to convert at once.
+        verbose: whether to give verbose output.
+
+    Returns:
+        a list of the names of the migrated datasets.
+    """
+    migrated = []
+
+    for file in os.listdir(data_dir):
+        dataset_dir = os.path.join(data_dir, os.fsdecode(file))
+        if not os.path.isfile(os.path.join(dataset_dir, DATASET_CONFIG_FILE)):
+            continue
+
+        config = migrate_dataset_storage(
+            dataset_dir,
+            storage=storage,
+            compression=compression,
+            chunk_size=chunk_size,
+            verbose=verbose
+        )
+        if config is not None:
+            migrated.append(config.dataset_name)
+
+    return migrated
+
+
+def _migrate_partitioned_table(
+        dataset_dir: str,
+        file_name: str,
+        table_config: DatasetTableConfig,
+        storage: Optional[str],
+        compression: Optional[str],
+        chunk_size: int) -> DatasetTableConfig:
+    """Migrate the time partitions of the table to the specified storage.
+
+    The migrated partitions are stored in a new directory, which is named after the
+    storage and compression as well to not collide with the directory of the table.
+
+    Args:
+        dataset_dir: the directory of the dataset.
+        file_name: the (unique) name of the migrated table directory without extension.
+        table_config: the configuration of the time-partitioned table to migrate.
+        storage: the storage to migrate to or None for text files.
+        compression: the compression codec of the text files or None for no compression.
+        chunk_size: the number of records to convert at once.
+
+    Returns:
+        the configuration of the migrated table.
+    """
+    dir_name = file_name
+    if storage is None:
+        dir_name += '.tsv' + get_compression_ext(compression)
+
+    table_dir = os.path.join(dataset_dir, dir_name)
+    if os.path.isdir(table_dir):
+        shutil.rmtree(table_dir)
+    os.makedirs(table_dir)
+
+    migrated_config = create_dataset_table_config(
+        dir_name,
+        table_config.primary_key,
+        table_config.columns,
+        categorical=table_config.categorical,
+        compression=compression if storage is None else None,
+        foreign_keys=table_config.foreign_keys,
+        num_records=table_config.num_records,
+        storage=storage
+    )
+    migrated_config.partition_column = table_config.partition_column
+    migrated_config.partitions = []
+
+    for partition_config in table_config.partitions:
+        migrated_partition = _migrate_table(
+            dataset_dir,
+            os.path.join(dir_name, partition_config.name),
+            table_config.create_partition_config(partition_config),
+            storage,
+            compression,
+            chunk_size
+        )
+        migrated_config.partitions.append(DatasetTimePartitionConfig(
+            partition_config.name,
+            os.path.basename(migrated_partition.file.name),
+            migrated_partition.num_records,
+            partition_config.time_min,
+            partition_config.time_max
+        ))
+
+    return migrated_config
+
+
+def _migrate_table(
+        dataset_dir: str,
+        file_name: str,
+        table_config: DatasetTableConfig,
+        storage: Optional[str],
+        compression: Optional[str],
+        chunk_size: int) -> DatasetTableConfig:
+    """Migrate the table to the specified storage.
+
+    Args:
+        dataset_dir: the directory of the dataset.
+        file_name: the (unique) name of the migrated table file without extension.
+        table_config: the configuration of the table to migrate.
+        storage: the storage to migrate to or None for text files.
+        compression: the compression codec of the text files or None for no compression.
+        chunk_size: the number of records to convert at once.
+
+    Returns:
+        the configuration of the migrated table.
+    """
+    if storage is None:
+        file_name += '.tsv' + get_compression_ext(compression)
+
+    migrated_config = create_dataset_table_config(
+        file_name,
+        table_config.primary_key,
+        table_config.columns,
+        categorical=table_config.categorical,
+        compression=compression if storage is None else None,
+        foreign_keys=table_config.foreign_keys,
+        num_records=table_config.num_records,
+        storage=storage
+    )
+
+    file_path = os.path.join(dataset_dir, file_name)
+    if os.path.isfile(file_path):
+        os.remove(file_path)
+
+    writer = None
+    if storage == STORAGE_NPY:
+        writer = NpyTableWriter(
+            file_path,
+            migrated_config.get_column_names(),
+            table_config.num_records
+        )
+
+    dtype = None
+    if table_config.file.options.storage is None and table_config.num_records > chunk_size:
+        dtype = _infer_table_types(dataset_dir, table_config, chunk_size)
+
+    num_records = 0
+    table_it = table_config.read_table(dataset_dir, chunk_size=chunk_size, dtype=dtype)
+    for _, table in enumerate(table_it):
+        if writer is None:
+            migrated_config.save_table(table, dataset_dir, append=True)
+        else:
+            writer.write(table)
+
+        num_records += len(table)
+
+    if writer is not None:
+        writer.close()
+
+    migrated_config.num_records = num_records
+    return migrated_config
+
+
+def _infer_table_types(
+        dataset_dir: str,
+        table_config: DatasetTableConfig,
+        chunk_size: int) -> Dict[str, Any]:
+    """Infer the column types of a text table that is read in chunks.
+
+    The types of the columns are inferred for each chunk individually when reading
+    a text table, and these are not guaranteed to be the same for all chunks.
+    Columns that are not numerical in any of the chunks are read as strings and
+    numerical columns with mixed (integer and floating-point) types as floats.
+    The categorical columns of the table are read as pandas Categorical instead.
+
+    Args:
+        dataset_dir: the directory of the dataset.
+        table_config: the configuration of the table to infer the types of.
+        chunk_size: the number of records to read at once.
+
+    Returns:
+        a dictionary with the column name as key and the type of the column as value.
+    """
+    column_types = {}
+    for _, table in enumerate(table_config.read_table(dataset_dir, chunk_size=chunk_size)):
+        for column in table.columns:
+            column_types.setdefault(column, set()).add(table[column].dtype)
+
+    dtype = {}
+    categorical = table_config.get_categorical_names()
+    for column, types in column_types.items():
+        if column in categorical:
+            continue
+        if not all(pd.api.types.is_numeric_dtype(typ) for typ in types):
+            dtype[column] = str
+        elif len(types) > 1:
+            dtype[column] = float
+
+    return dtype
@@ -0,0 +1,139 @@
+"""This module contains functionality to split dataset tables into partitions.
+
+A partition is a (start, end) range of a table that can be read independently of
+the other partitions, which allows multiple processes to scan a table in parallel.
+Uncompressed text tables are split into byte ranges that are aligned to the start
+of a line, whereas tables with the columnar storage are split into row ranges.
+
+Constants:
+
+    COMPRESSED_FILE_EXTS: the file extensions of compressed files that can not be partitioned.
+
+Classes:
+
+    FileRangeReader: raw reader of a byte range of a file.
+
+Functions:
+
+    split_file_ranges: split a text file into byte ranges that are aligned to lines.
+    split_row_ranges: split a number of records into row ranges.
+
+This program has been developed by students from the bachelor Computer Science at
+Utrecht University within the Software Project course.
+© Copyright Utrecht University (Department of Information and Computing Sciences)
+"""
+
+import io
+import os
+from typing import List, Tuple
+
+COMPRESSED_FILE_EXTS = ['.bz2', '.gz', '.lz4', '.tar', '.xz', '.zip', '.zst']
+
+
+class FileRangeReader(io.RawIOBase):
+    """File Range Reader that only reads the bytes of a file in the specified range.
+
+    Public methods:
+
+    close
+    readable
+    readinto
+    """
+
+    def __init__(self, file_path: str, start: int, end: int):
+        """Construct the file range reader.
+
+        Args:
+            file_path: the path of the file to read.
+            start: the byte offset to start reading from.
+            end: the byte offset to stop reading at (exclusive).
+        """
+        io.RawIOBase.__init__(self)
+        self.file = open(file_path, 'rb')
+        self.file.seek(start)
+        self.remaining = end - start
+
+    def close(self) -> None:
+        """Close the reader and the underlying file."""
+        self.file.close()
+        io.RawIOBase.close(self)
+
+    def readable(self) -> bool:
+        """Get whether the reader is readable.
+
+        Returns:
+            True.
+        """
+        return True
+
+    def readinto(self, buffer) -> int:
+        """Read bytes into the specified buffer without exceeding the range.
+
+        Args:
+            buffer: the (writable) buffer to read the bytes into.
+
+        Returns:
+            the number of bytes that are read, zero at the end of the range.
+        """
+        num_bytes = min(len(buffer), self.remaining)
+        if num_bytes <= 0:
+            return 0
+
+        num_read = self.file.readinto(memoryview(buffer)[:num_bytes])
+        self.remaining -= num_read
+        return num_read
+
+
+def split_file_ranges(
+        file_path: str,
+        num_partitions: int,
+        *,
+        skip_header: bool=False) -> List[Tuple[int, int]]:
+    """Split a text file into byte ranges that are aligned to the start of a line.
+
+    Args:
+        file_path: the path of the text file to split.
+        num_partitions: the (maximum) number of byte ranges to split into.
+        skip_header: whether to exclude the header on the first line from the ranges.
+
+    Returns:
+        a list of non-empty (start, end) byte ranges that cover the file.
+    """
+    file_size = os.path.getsize(file_path)
+
+    with open(file_path, 'rb') as file:
+        start = 0
+        if skip_header:
+            file.readline()
+            start = file.tell()
+
+        offsets = [start]
+        for i in range(1, num_partitions):
+            offset = start + (file_size - start) * i // num_partitions
+            if offset <= offsets[-1]:
+                continue
+
+            # move to the start of the next line
+            file.seek(offset - 1)
+            file.readline()
+            offsets.append(min(file.tell(), file_size))
+
+        offsets.append(file_size)
+
+    return [(offsets[i], offsets[i + 1]) for i in range(len(offsets) - 1)
+            if offsets[i] < offsets[i + 1]]
+
+
+def split_row_ranges(num_records: int, num_partitions: int) -> List[Tuple[int, int]]:
+    """Split a number of records into row ranges of (almost) equal size.
+
+    Args:
+        num_records: the number of records to split.
+        num_partitions: the (maximum) number of row ranges to split into.
+
+    Returns:
+        a list of non-empty (start, end) row ranges that cover the records.
+    """
+    offsets = [num_records * i // num_partitions for i in range(num_partitions + 1)]
+    return [(offsets[i], offsets[i + 1]) for i in range(num_partitions)
+            if offsets[i] < offsets[i + 1]]
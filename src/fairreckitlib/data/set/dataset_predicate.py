@@ -0,0 +1,233 @@
+"""This module contains the predicates that select the rows of dataset tables while reading.
+
+A predicate is a list of (column, operator, value) conditions that all need to hold for
+a row to be selected, for example [('user_id', 'in', [1, 2]), ('matrix_rating', '>=', 3)].
+The conditions are evaluated chunk by chunk while reading a table, so that only the
+matching rows are held in memory. Conditions on categorical (dictionary-encoded) columns
+are evaluated once for each of the categories and looked up by the integer codes.
+
+Missing values follow the pandas semantics: they only match the '!=' and 'not in'
+conditions, unless the values of an 'in' condition contain a missing value as well.
+
+Tables that are partitioned on a column (e.g. by the month of the timestamp) keep the
+range of the column values of each partition, which allows the partitions that can not
+contain any matching rows to be skipped before they are opened.
+
+Constants:
+
+    PREDICATE_CHUNK_SIZE: the number of records that are scanned at once.
+    PREDICATE_OPERATORS: the supported condition operators.
+
+Functions:
+
+    evaluate_condition: evaluate a condition on the values of a column.
+    evaluate_encoded_condition: evaluate a condition on the codes of a dictionary-encoded column.
+    create_predicate_mask: create the mask of the table rows that match the predicate.
+    filter_table_chunks: filter the chunks of a table on a predicate.
+    get_predicate_columns: get the names of the columns that a predicate depends on.
+    is_range_matching: check whether a range of column values can match a predicate.
+    validate_predicate: validate the conditions of a predicate against the table columns.
+
+This program has been developed by students from the bachelor Computer Science at
+Utrecht University within the Software Project course.
+© Copyright Utrecht University (Department of Information and Computing Sciences)
+"""
+
+import operator
+from typing import Any, Iterable, Iterator, List, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+PREDICATE_CHUNK_SIZE = 1000000
+
+PREDICATE_OPERATORS = {
+    '==': operator.eq,
+    '!=': operator.ne,
+    '<': operator.lt,
+    '<=': operator.le,
+    '>': operator.gt,
+    '>=': operator.ge,
+    'in': None,
+    'not in': None
+}
+
+
+def evaluate_condition(
+        values: Union[np.ndarray, pd.Series],
+        op: str,
+        value: Any) -> np.ndarray:
+    """Evaluate a condition on the values of a column.
+
+    Args:
+        values: the values of the column to evaluate the condition on.
+        op: the operator of the condition, one of the PREDICATE_OPERATORS.
+        value: the value to compare with, or the collection of values for (not) in.
+
+    Returns:
+        the boolean mask of the values that match the condition.
+    """
+    if isinstance(values, pd.Series) and isinstance(values.dtype, pd.CategoricalDtype):
+        return evaluate_encoded_condition(
+            values.cat.codes.to_numpy(),
+            values.cat.categories.to_numpy(dtype=object),
+            op,
+            value
+        )
+
+    if op in ('in', 'not in'):
+        mask = pd.Series(values).isin(list(value)).to_numpy()
+        return ~mask if op == 'not in' else mask
+
+    if isinstance(values, np.ndarray) and values.dtype == object:
+        # comparisons of an object series treat missing values like pandas does
+        values = pd.Series(values)
+
+    return np.asarray(PREDICATE_OPERATORS[op](values, value), dtype=bool)
+
+
+def evaluate_encoded_condition(
+        codes: np.ndarray,
+        categories: np.ndarray,
+        op: str,
+        value: Any) -> np.ndarray:
+    """Evaluate a condition on the codes of a dictionary-encoded column.
+
+    The condition is evaluated once for each of the categories (and the missing value),
+    which makes the evaluation of the column an integer lookup of the codes.
+
+    Args:
+        codes: the integer codes of the column, -1 for missing values.
+        categories: the object array of the categories.
+        op: the operator of the condition, one of the PREDICATE_OPERATORS.
+        value: the value to compare with, or the collection of values for (not) in.
+
+    Returns:
+        the boolean mask of the codes that match the condition.
+    """
+    # code -1 of missing values is looked up as the last category
+    lookup = evaluate_condition(np.append(categories, np.nan).astype(object), op, value)
+    return lookup[codes]
+
+
+def create_predicate_mask(
+        table: pd.DataFrame,
+        predicate: List[Tuple[str, str, Any]]) -> np.ndarray:
+    """Create the mask of the table rows that match the predicate.
+
+    Args:
+        table: the table (chunk) with the columns of the predicate.
+        predicate: list of (column, operator, value) conditions that all need to hold.
+
+    Returns:
+        the boolean mask of the matching rows.
+    """
+    mask = np.ones(len(table), dtype=bool)
+    for column_name, op, value in predicate:
+        mask &= evaluate_condition(table[column_name], op, value)
+
+    return mask
+
+
+def filter_table_chunks(
+        chunks: Iterable[pd.DataFrame],
+        predicate: List[Tuple[str, str, Any]],
+        columns: List[str]=None) -> Iterator[pd.DataFrame]:
+    """Filter the chunks of a table on a predicate.
+
+    Chunks without any matching rows are skipped.
+
+    Args:
+        chunks: the table chunks to filter.
+        predicate: list of (column, operator, value) conditions that all need to hold.
+        columns: (optional) subset list of the columns to keep after filtering.
+
+    Returns:
+        an iterator of the filtered table chunks.
+    """
+    for _, chunk in enumerate(chunks):
+        chunk = chunk[create_predicate_mask(chunk, predicate)]
+        if len(chunk) == 0:
+            continue
+
+        yield chunk if columns is None else chunk[columns]
+
+
+def get_predicate_columns(predicate: List[Tuple[str, str, Any]]) -> List[str]:
+    """Get the names of the columns that a predicate depends on.
+
+    Args:
+        predicate: list of (column, operator, value) conditions.
+
+    Returns:
+        the unique column names in order of the conditions.
+    """
+    return list(dict.fromkeys(column_name for column_name, _, _ in predicate))
+
+
+def is_range_matching(
+        column_name: str,
+        value_min: Any,
+        value_max: Any,
+        predicate: List[Tuple[str, str, Any]]) -> bool:
+    """Check whether the rows with column values in a range can match a predicate.
+
+    Only the conditions on the specified column are checked, and conditions that can not be
+    decided from the range alone (e.g. '!=' and 'not in') are assumed to match.
+
+    Args:
+        column_name: the name of the column that the range belongs to.
+        value_min: the minimum (present) value of the column in the range.
+        value_max: the maximum (present) value of the column in the range.
+        predicate: list of (column, operator, value) conditions that all need to hold.
+
+    Returns:
+        whether any of the rows in the range can match the predicate.
+    """
+    for name, op, value in predicate:
+        if name != column_name:
+            continue
+
+        try:
+            if op == '==':
+                matching = value_min <= value <= value_max
+            elif op in ('<', '<='):
+                matching = PREDICATE_OPERATORS[op](value_min, value)
+            elif op in ('>', '>='):
+                matching = PREDICATE_OPERATORS[op](value_max, value)
+            elif op == 'in':
+                matching = any(value_min <= val <= value_max for val in value)
+            else:
+                matching = True
+        except TypeError:
+            # values that are not comparable with the range can not be decided
+            matching = True
+
+        if not matching:
+            return False
+
+    return True
+
+
+def validate_predicate(predicate: List[Tuple[str, str, Any]], column_names: List[str]) -> None:
+    """Validate the conditions of a predicate against the table columns.
+
+    Args:
+        predicate: list of (column, operator, value) conditions.
+        column_names: the names of the table columns.
+
+    Raises:
+        ValueError: when a condition is malformed, refers to an unknown column
+            or uses an unknown operator.
+    """
+    for condition in predicate:
+        if not isinstance(condition, (list, tuple)) or len(condition) != 3:
+            raise ValueError('Expected a (column, operator, value) condition: ' + str(condition))
+
+        column_name, op, value = condition
+        if column_name not in column_names:
+            raise ValueError('Predicate column does not match columns: ' + str(column_name))
+        if op not in PREDICATE_OPERATORS:
+            raise ValueError('Unknown predicate operator: ' + str(op))
+        if op in ('in', 'not in') and isinstance(value, str):
+            raise ValueError('Expected a collection of values for operator: ' + op)
@@ -9,12 +9,16 @@ Utrecht University within the Software Project course.
 © Copyright Utrecht University (Department of Information and Computing Sciences)
 """
 
+from concurrent.futures import ThreadPoolExecutor, wait
 import os
-from typing import Any, Dict, List, Optional
+from threading import RLock
+from typing import Any, Callable, Dict, List, Optional
 
-from ...core.io.io_utility import save_yml
+from ...core.io.io_utility import load_json, load_yml, save_json, save_yml
+from .dataset_catalog import update_statistics_catalog
+from .dataset_compression import DEFAULT_COMPRESSION
 from .dataset_config_parser import DatasetConfigParser
-from .dataset_constants import DATASET_CONFIG_FILE
+from .dataset_constants import DATASET_CONFIG_FILE, DATA_REGISTRY_FILE, KEY_DATASET, KEY_MATRICES
 from .dataset import Dataset
 from .processor.dataset_processor_lfm1b import DatasetProcessorLFM1B
 from .processor.dataset_processor_lfm2b import DatasetProcessorLFM2B
@@ -28,6 +32,18 @@ DATASET_LFM_360K = 'LFM-360K'
 DATASET_ML_100K = 'ML-100K'
 DATASET_ML_25M = 'ML-25M'
 
+DATASET_STATE_PENDING = 'pending'
+DATASET_STATE_PROCESSING = 'processing'
+DATASET_STATE_READY = 'ready'
+DATASET_STATE_FAILED = 'failed'
+
+KEY_CONFIG = 'config'
+KEY_CONFIG_STAT = 'config_stat'
+KEY_DIR = 'dir'
+KEY_PROCESSOR = 'processor'
+KEY_PROGRESS = 'progress'
+KEY_STATE = 'state'
+
 
 class DataRegistry:
     """Data Registry with available datasets.
@@ -37,20 +53,52 @@ class DataRegistry:
     the subdirectory needs to be exactly the same as one of the available
     processors to trigger automatic data processing.
 
+    The parsed dataset configurations are stored in a registry snapshot in the
+    data directory. A configuration in the snapshot is reused as long as the
+    modification time and size of the dataset configuration file are unchanged,
+    which avoids parsing (and validating) all the datasets on construction.
+    The datasets themselves are only created when they are retrieved for the first time.
+
+    Datasets that need processing are processed on construction, unless the registry
+    is constructed with background workers. In that case the construction returns
+    immediately and the datasets become available as soon as they are processed.
+    The state of each dataset is either pending, processing, ready or failed.
+
     Public methods:
 
     get_available_processors
     get_available_sets
     get_info
     get_set
+    get_status
+    wait_for_processing
     """
 
-    def __init__(self, data_dir: str, verbose: bool=True):
+    def __init__(
+            self,
+            data_dir: str,
+            verbose: bool=True,
+            *,
+            num_workers: int=0,
+            num_processor_workers: int=1,
+            compression: Optional[str]=DEFAULT_COMPRESSION,
+            partition_events: bool=False,
+            on_dataset_ready: Callable[[str], None]=None):
         """Construct the data registry and scan for available datasets.
 
         Args:
             data_dir: path to the directory that contains the datasets.
             verbose: whether the dataset parser should give verbose output.
+            num_workers: the number of background workers that process datasets,
+                or zero to process the datasets before the construction returns.
+            num_processor_workers: the number of worker processes that each dataset
+                processor uses to run its independent table processors concurrently.
+            compression: the compression codec of the table files that are generated
+                by the dataset processors or None to store them uncompressed.
+            partition_events: whether the dataset processors partition the event tables
+                by month, which is supported by the LastFM dataset processors.
+            on_dataset_ready: (optional) callback with the dataset name as argument
+                that is called when a dataset is processed in the background.
 
         Raises:
             IOError: when the specified data directory does not exist.
@@ -58,7 +106,22 @@ class DataRegistry:
         if not os.path.isdir(data_dir):
             raise IOError('Unable to construct data registry from an unknown directory')
 
+        self.data_dir = data_dir
+        self.verbose = verbose
+        # datasets keyed by name, None when the dataset is not created yet
         self.registry = {}
+        # snapshot entries keyed by dataset name
+        self.entries = {}
+        self.snapshot = {}
+        # processing status keyed by dataset name
+        self.status = {}
+        self.lock = RLock()
+        self.on_dataset_ready = on_dataset_ready
+        self.num_processor_workers = num_processor_workers
+        self.compression = compression
+        self.partition_events = partition_events
+        self.executor = None
+        self.futures = []
         self.processors = {
             DATASET_LFM_1B: DatasetProcessorLFM1B,
             DATASET_LFM_2B: DatasetProcessorLFM2B,
@@ -67,6 +130,9 @@ class DataRegistry:
             DATASET_ML_25M: DatasetProcessorML25M
         }
 
+        self.snapshot = self._load_snapshot()
+        unprocessed_dirs = []
+
         for file in os.listdir(data_dir):
             file_name = os.fsdecode(file)
             dataset_dir = os.path.join(data_dir, file_name)
@@ -80,25 +146,44 @@ class DataRegistry:
                     print('Unknown dataset processor:', file_name)
                     continue
 
-                config = self.processors[file_name](dataset_dir, file_name).run()
-                if config is None:
-                    print('Processing dataset failed:', file_name)
-                    continue
+                unprocessed_dirs.append(file_name)
+                continue
 
-                save_yml(config_file_path, config.to_yml_format())
-            else:
-                parser = DatasetConfigParser(verbose)
-                config = parser.parse_dataset_config_from_yml(
-                    dataset_dir,
-                    DATASET_CONFIG_FILE,
-                    self.get_available_sets()
-                )
-                if config is None:
-                    print('Parsing dataset configuration failed:', file_name)
-                    continue
+            # reuse the snapshot entry when the configuration file is unchanged
+            entry = self.snapshot.get(file_name)
+            if entry is not None and entry[KEY_CONFIG_STAT] == _get_file_stat(config_file_path) \
+                    and entry[KEY_CONFIG].get(KEY_DATASET) not in self.registry:
+                self._add_dataset(file_name, config_file_path, entry[KEY_CONFIG])
+                continue
 
+            parser = DatasetConfigParser(verbose)
+            config = parser.parse_dataset_config_from_yml(
+                dataset_dir,
+                DATASET_CONFIG_FILE,
+                self.get_available_sets()
+            )
+            if config is None:
+                print('Parsing dataset configuration failed:', file_name)
+                continue
+
+            self._add_dataset(file_name, config_file_path, config.to_yml_format())
             self.registry[config.dataset_name] = Dataset(dataset_dir, config)
 
+        for file_name in unprocessed_dirs:
+            self.status[file_name] = {KEY_STATE: DATASET_STATE_PENDING, KEY_PROCESSOR: None}
+
+        if num_workers > 0 and len(unprocessed_dirs) > 0:
+            self.executor = ThreadPoolExecutor(max_workers=num_workers)
+            for file_name in unprocessed_dirs:
+                self.futures.append(self.executor.submit(self._process_dataset, file_name))
+            self.executor.shutdown(wait=False)
+        else:
+            for file_name in unprocessed_dirs:
+                self._process_dataset(file_name)
+
+        with self.lock:
+            self._update_snapshot()
+
     def get_available_processors(self) -> List[str]:
         """Get the names of the available processors in the registry.
 
@@ -120,8 +205,10 @@ class DataRegistry:
         """
         dataset_names = []
 
-        for dataset_name in self.registry:
-            dataset_names.append(dataset_name)
+        with self.lock:
+            self._remove_deleted_sets()
+            for dataset_name in self.registry:
+                dataset_names.append(dataset_name)
 
         return dataset_names
 
@@ -134,18 +221,204 @@ class DataRegistry:
         """
         info = {}
 
-        for dataset_name, dataset in self.registry.items():
-            info[dataset_name] = dataset.get_matrices_info()
+        with self.lock:
+            self._remove_deleted_sets()
+            for dataset_name, dataset in self.registry.items():
+                if dataset is None:
+                    # the information is available in the snapshot without creating the dataset
+                    config = self.entries[dataset_name][KEY_CONFIG]
+                    info[dataset_name] = config.get(KEY_MATRICES, {})
+                else:
+                    info[dataset_name] = dataset.get_matrices_info()
 
         return info
 
     def get_set(self, dataset_name: str) -> Optional[Dataset]:
         """Get the dataset with the specified name.
 
+        The dataset is created from the registry snapshot when it is retrieved for
+        the first time. In the unlikely case that the configuration in the snapshot
+        fails to parse, the dataset is removed from the registry. The same applies
+        to a dataset of which the directory or configuration file is deleted since.
+
         Args:
             dataset_name: name of the dataset to retrieve.
 
         Returns:
             the retrieved set or None when not present.
         """
-        return self.registry.get(dataset_name)
+        with self.lock:
+            self._remove_deleted_sets()
+            if dataset_name not in self.registry or self.registry[dataset_name] is not None:
+                return self.registry.get(dataset_name)
+
+            entry = self.entries[dataset_name]
+            dataset_dir = os.path.join(self.data_dir, entry[KEY_DIR])
+
+            parser = DatasetConfigParser(self.verbose)
+            config = parser.parse_dataset_config(dataset_dir, entry[KEY_CONFIG], [])
+            if config is None:
+                print('Parsing dataset configuration failed:', entry[KEY_DIR])
+                del self.registry[dataset_name]
+                del self.entries[dataset_name]
+                return None
+
+            self.registry[dataset_name] = Dataset(dataset_dir, config)
+            return self.registry[dataset_name]
+
+    def get_status(self) -> Dict[str, Dict[str, Any]]:
+        """Get the processing status of all the datasets in the registry.
+
+        Returns:
+            a dictionary where the key corresponds to the dataset name and the value
+                is a dictionary with the 'state' and 'progress' (between 0.0 and 1.0).
+        """
+        status = {}
+
+        with self.lock:
+            for dataset_name in self.registry:
+                status[dataset_name] = {KEY_STATE: DATASET_STATE_READY, KEY_PROGRESS: 1.0}
+
+            for dataset_name, dataset_status in self.status.items():
+                processor = dataset_status[KEY_PROCESSOR]
+                status[dataset_name] = {
+                    KEY_STATE: dataset_status[KEY_STATE],
+                    KEY_PROGRESS: 0.0 if processor is None else processor.get_progress()
+                }
+
+        return status
+
+    def wait_for_processing(self, timeout: float=None) -> bool:
+        """Wait for the datasets that are processed in the background.
+
+        Args:
+            timeout: the maximum number of seconds to wait or None to wait until finished.
+
+        Returns:
+            whether all the datasets are finished processing.
+        """
+        _, not_done = wait(self.futures, timeout=timeout)
+        return len(not_done) == 0
+
+    def _process_dataset(self, dir_name: str) -> None:
+        """Process the dataset in the directory with the processor of the same name.
+
+        The dataset is added to the registry when the processing succeeded.
+
+        Args:
+            dir_name: the name of the dataset directory that is also the processor name.
+        """
+        dataset_dir = os.path.join(self.data_dir, dir_name)
+        processor = self.processors[dir_name](
+            dataset_dir,
+            dir_name,
+            num_workers=self.num_processor_workers,
+            compression=self.compression,
+            partition_events=self.partition_events
+        )
+
+        with self.lock:
+            self.status[dir_name] = {KEY_STATE: DATASET_STATE_PROCESSING, KEY_PROCESSOR: processor}
+
+        try:
+            config = processor.run()
+            if config is not None:
+                update_statistics_catalog(dataset_dir, config)
+        except Exception as err: # pylint: disable=broad-except
+            print('Processing dataset raised an error:', dir_name, err)
+            config = None
+
+        with self.lock:
+            if config is None or config.dataset_name in self.registry:
+                print('Processing dataset failed:', dir_name)
+                self.status[dir_name][KEY_STATE] = DATASET_STATE_FAILED
+                return
+
+            config_file_path = os.path.join(dataset_dir, DATASET_CONFIG_FILE)
+            save_yml(config_file_path, config.to_yml_format())
+            self._add_dataset(dir_name, config_file_path, load_yml(config_file_path))
+            self.registry[config.dataset_name] = Dataset(dataset_dir, config)
+            del self.status[dir_name]
+
+            if self.executor is not None:
+                self._update_snapshot()
+
+        if self.executor is not None and self.on_dataset_ready is not None:
+            self.on_dataset_ready(config.dataset_name)
+
+    def _add_dataset(
+            self,
+            dir_name: str,
+            config_file_path: str,
+            config: Dict[str, Any]) -> None:
+        """Add the dataset configuration to the registry without creating the dataset.
+
+        Args:
+            dir_name: the name of the dataset directory.
+            config_file_path: the path to the dataset configuration file.
+            config: the (validated) dataset configuration in yml format.
+        """
+        dataset_name = config[KEY_DATASET]
+        self.registry[dataset_name] = None
+        self.entries[dataset_name] = {
+            KEY_DIR: dir_name,
+            KEY_CONFIG_STAT: _get_file_stat(config_file_path),
+            KEY_CONFIG: config
+        }
+
+    def _remove_deleted_sets(self) -> None:
+        """Remove the datasets that are not created yet and of which the files are deleted.
+
+        Only the existence of the dataset directory and configuration file is checked,
+        the datasets that are already created are kept as is.
+        """
+        for dataset_name, dataset in list(self.registry.items()):
+            if dataset is not None:
+                continue
+
+            dataset_dir = os.path.join(self.data_dir, self.entries[dataset_name][KEY_DIR])
+            if not os.path.isdir(dataset_dir) or \
+                    not os.path.isfile(os.path.join(dataset_dir, DATASET_CONFIG_FILE)):
+                del self.registry[dataset_name]
+                del self.entries[dataset_name]
+
+    def _load_snapshot(self) -> Dict[str, Any]:
+        """Load the registry snapshot from the data directory.
+
+        Returns:
+            the snapshot entries keyed by dataset directory or empty when not available.
+        """
+        try:
+            snapshot = load_json(os.path.join(self.data_dir, DATA_REGISTRY_FILE))
+        except (OSError, ValueError):
+            return {}
+
+        return snapshot if isinstance(snapshot, dict) else {}
+
+    def _update_snapshot(self) -> None:
+        """Update the registry snapshot in the data directory when it is changed.
+
+        The snapshot is not saved when the data directory is read-only.
+        """
+        snapshot = {entry[KEY_DIR]: entry for entry in self.entries.values()}
+        if snapshot == self.snapshot:
+            return
+
+        try:
+            save_json(os.path.join(self.data_dir, DATA_REGISTRY_FILE), snapshot)
+            self.snapshot = snapshot
+        except OSError:
+            pass
+
+
+def _get_file_stat(file_path: str) -> List[int]:
+    """Get the modification time and size of the file.
+
+    Args:
+        file_path: the path to the file.
+
+    Returns:
+        a list with the modification time (in nanoseconds) and size of the file.
+    """
+    stat = os.stat(file_path)
+    return [stat.st_mtime_ns, stat.st_size]
@@ -1,5 +1,16 @@
 """This module contains functionality to create a sample of an existing dataset.
 
+The samples are created by streaming the matrices and tables of the dataset in chunks.
+The users and items of a matrix sample are chosen before the matrix is filtered, so that
+each chunk is filtered with a vectorized membership test and written to the sample
+directly. This keeps the memory usage bounded by the chunk size and the sample size.
+
+Constants:
+
+    SAMPLE_FIRST: sample the first occurring users and their first occurring items.
+    SAMPLE_HASH: sample the users and items with a (seeded) hash below a threshold.
+    SAMPLE_RANDOM: sample the users and items uniformly at random (seeded).
+
 Functions:
 
     create_dataset_sample: create a sample of a dataset.
@@ -13,22 +24,34 @@ Utrecht University within the Software Project course.
 """
 
 import os
-from typing import Dict, List, Optional, Tuple
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
 
+import numpy as np
 import pandas as pd
 
 from ...core.io.io_utility import save_yml
 from .dataset import Dataset
+from .dataset_compression import DEFAULT_COMPRESSION, get_compression_ext
 from .dataset_constants import DATASET_CONFIG_FILE
 from .dataset_config import DatasetMatrixConfig, DatasetIndexConfig, RatingMatrixConfig
 from .dataset_config import DatasetConfig, DatasetTableConfig, create_dataset_table_config
 
+DEFAULT_SAMPLE_CHUNK_SIZE = 10E6
+
+SAMPLE_FIRST = 'first'
+SAMPLE_HASH = 'hash'
+SAMPLE_RANDOM = 'random'
+
 
 def create_dataset_sample(
         output_dir: str,
         dataset: Dataset,
         num_users: int,
-        num_items: int) -> Dataset:
+        num_items: int,
+        *,
+        sampling: str=SAMPLE_FIRST,
+        seed: int=None,
+        chunk_size: int=DEFAULT_SAMPLE_CHUNK_SIZE) -> Dataset:
     """Create a sample of the specified dataset.
 
     Look at the 'create_matrix_sample' function for specifics on how the
@@ -42,10 +65,20 @@ def create_dataset_sample(
         dataset: the dataset to create a sample of.
         num_users: the number of users in the created sample matrices.
         num_items: the number of items in the created sample matrices.
+        sampling: the sampling strategy of the users and items, one of 'first',
+            'hash' or 'random'.
+        seed: the (optional) seed of the 'hash' and 'random' sampling strategies.
+        chunk_size: the number of records to read from the matrices and tables at once.
+
+    Raises:
+        ValueError: when the sampling strategy is unknown.
 
     Returns:
         the resulting sample dataset.
     """
+    if sampling not in [SAMPLE_FIRST, SAMPLE_HASH, SAMPLE_RANDOM]:
+        raise ValueError('Unknown sampling strategy: ' + str(sampling))
+
     sample_dir = os.path.join(output_dir, dataset.get_name() + '-Sample')
     if os.path.isdir(sample_dir):
         raise IOError('Failed to create sample, directory already exists.')
@@ -62,24 +95,27 @@ def create_dataset_sample(
             dataset,
             matrix_name,
             num_users,
-            num_items
+            num_items,
+            sampling=sampling,
+            seed=seed,
+            chunk_size=chunk_size
         )
         sample_matrices[matrix_name] = sample_matrix_config
 
-        # append user key indices to the key map
-        user_keys = key_id_map.get(sample_matrix_config.user.key, [])
-        user_indices = pd.Series(sample_matrix_config.user.load_indices(sample_dir))
-        user_keys = pd.Series(user_keys).append(user_indices)
-        key_id_map[sample_matrix_config.user.key] = user_keys.unique()
-
-        # append item key indices to the key map
-        item_keys = key_id_map.get(sample_matrix_config.item.key, [])
-        item_indices = pd.Series(sample_matrix_config.item.load_indices(sample_dir))
-        item_keys = pd.Series(item_keys).append(item_indices)
-        key_id_map[sample_matrix_config.item.key] = item_keys.unique()
+        # append user/item key indices to the key map
+        for index_config in [sample_matrix_config.user, sample_matrix_config.item]:
+            key_id_map[index_config.key] = pd.unique(np.concatenate([
+                key_id_map.get(index_config.key, np.empty(0, dtype=np.int64)),
+                np.asarray(index_config.load_indices(sample_dir), dtype=np.int64)
+            ]))
 
     # create sample tables for the key map that contains all the needed indices of all matrices
-    sample_tables = create_dataset_table_samples(sample_dir, dataset, key_id_map)
+    sample_tables = create_dataset_table_samples(
+        sample_dir,
+        dataset,
+        key_id_map,
+        chunk_size=chunk_size
+    )
 
     # create and save dataset configuration
     sample_dataset_config = DatasetConfig(
@@ -96,19 +132,22 @@ def create_dataset_sample(
 def create_dataset_table_samples(
         output_dir: str,
         dataset: Dataset,
-        key_id_map: Dict[str, List[int]]) -> Dict[str, DatasetTableConfig]:
+        key_id_map: Dict[str, List[int]],
+        *,
+        chunk_size: int=DEFAULT_SAMPLE_CHUNK_SIZE) -> Dict[str, DatasetTableConfig]:
     """Create table samples for the specified dataset and key map.
 
     The key map is used to identify which tables of the dataset are sampled.
     A table is considered to be a candidate if the key in the map matches the
     primary key of the table. Any rows that do not contain the needed indices
-    in the key map are filtered.
+    in the key map are filtered. The tables are filtered and saved in chunks.
 
     Args:
         output_dir: the path to the directory where the sample tables will be stored.
         dataset: the dataset to create a sample tables from.
         key_id_map: a dictionary containing a table key paired with a list of indices
             that are related to these table keys.
+        chunk_size: the number of records to read from the tables at once.
 
     Returns:
         a dictionary with the resulting table sample configurations, keyed by table names.
@@ -118,29 +157,33 @@ def create_dataset_table_samples(
     for table_name in dataset.get_available_tables():
         table_config = dataset.get_table_config(table_name)
 
-        table = dataset.read_table(table_name)
-        table_modified = False
+        # filter unwanted table rows when the primary key matches
+        key_filters = [(key_id, _create_index_selector(key_id_list))
+                       for key_id, key_id_list in key_id_map.items()
+                       if table_config.primary_key == [key_id]]
+        if len(key_filters) == 0:
+            continue
+
+        sample_table_config = create_dataset_table_config(
+            dataset.get_name() + '_' + table_name + '.tsv' +
+            get_compression_ext(DEFAULT_COMPRESSION),
+            table_config.primary_key,
+            table_config.columns,
+            compression=DEFAULT_COMPRESSION,
+            encoding=table_config.file.options.encoding,
+            foreign_keys=table_config.foreign_keys
+        )
 
-        for key_id, key_id_list in key_id_map.items():
-            # filter unwanted table rows when the primary key matches
-            if table_config.primary_key == [key_id]:
-                table = table[table[key_id].isin(key_id_list)]
-                table_modified = True
+        for i, table in enumerate(dataset.read_table(table_name, chunk_size=chunk_size)):
+            for key_id, is_selected in key_filters:
+                table = table[is_selected(table[key_id].to_numpy())]
 
-        if table_modified:
             # store the table sample
-            sample_table_config = create_dataset_table_config(
-                dataset.get_name() + '_' + table_name + '.tsv.bz2',
-                table_config.primary_key,
-                table_config.columns,
-                compression='bz2',
-                encoding=table_config.file.options.encoding,
-                foreign_keys=table_config.foreign_keys,
-                num_records=len(table)
-            )
-            sample_table_config.save_table(table, output_dir)
-            # add sample table configuration
-            sample_tables[table_name] = sample_table_config
+            sample_table_config.save_table(table, output_dir, append=i > 0)
+            sample_table_config.num_records += len(table)
+
+        # add sample table configuration
+        sample_tables[table_name] = sample_table_config
 
     return sample_tables
 
@@ -150,12 +193,17 @@ def create_matrix_sample_config(
         dataset: Dataset,
         matrix_name: str,
         num_users: int,
-        num_items: int) -> Optional[DatasetMatrixConfig]:
+        num_items: int,
+        *,
+        sampling: str=SAMPLE_FIRST,
+        seed: int=None,
+        chunk_size: int=DEFAULT_SAMPLE_CHUNK_SIZE) -> Optional[DatasetMatrixConfig]:
     """Create a dataset matrix sample configuration.
 
     Look at the 'create_matrix_sample' function for specifics on how the
     matrix is sampled. The generated matrix and user/item indirection arrays are
     stored in the output directory and the corresponding configuration is returned.
+    The sample users and items are numbered in order of appearance in the matrix.
 
     Args:
         output_dir: the path to the directory where the sample matrix will be stored.
@@ -163,6 +211,10 @@ def create_matrix_sample_config(
         matrix_name: the name of the matrix to create a sample of.
         num_users: the number of users in the created sample matrix.
         num_items: the number of items in the created sample matrix.
+        sampling: the sampling strategy of the users and items, one of 'first',
+            'hash' or 'random'.
+        seed: the (optional) seed of the 'hash' and 'random' sampling strategies.
+        chunk_size: the number of records to read from the matrix at once.
 
     Returns:
         the sample matrix configuration or None when the specified matrix does not exist.
@@ -171,41 +223,82 @@ def create_matrix_sample_config(
     if matrix_config is None:
         return None
 
-    sample, users, items = create_matrix_sample(dataset, matrix_name, num_users, num_items)
+    user_key = matrix_config.user.key
+    item_key = matrix_config.item.key
+    rating_column = matrix_config.table.columns[0]
+
+    # create the sample matrix table config and save the table in chunks
+    sample_table_config = create_dataset_table_config(
+        dataset.get_name() + '_' + matrix_name + '.tsv' + get_compression_ext(DEFAULT_COMPRESSION),
+        matrix_config.table.primary_key,
+        matrix_config.table.columns,
+        compression=DEFAULT_COMPRESSION,
+        encoding=matrix_config.table.file.options.encoding,
+        foreign_keys=matrix_config.table.foreign_keys
+    )
+
+    users = pd.Index([], dtype='int64')
+    items = pd.Index([], dtype='int64')
+    rating_min = np.nan
+    rating_max = np.nan
+
+    matrix_sample_it = create_matrix_sample(
+        dataset,
+        matrix_name,
+        num_users,
+        num_items,
+        sampling=sampling,
+        seed=seed,
+        chunk_size=chunk_size
+    )
+    for i, sample in enumerate(matrix_sample_it):
+        # users/items from 0...num_users/num_items in order of appearance
+        users = users.append(pd.Index(pd.unique(sample[user_key]))).unique()
+        items = items.append(pd.Index(pd.unique(sample[item_key]))).unique()
+
+        sample_table_config.save_table(pd.DataFrame({
+            'user': users.get_indexer(sample[user_key]),
+            'item': items.get_indexer(sample[item_key]),
+            **{column: sample[column].to_numpy() for column in matrix_config.table.columns}
+        }), output_dir, append=i > 0)
+        sample_table_config.num_records += len(sample)
+
+        rating_min = np.nanmin([rating_min, sample[rating_column].min()])
+        rating_max = np.nanmax([rating_max, sample[rating_column].max()])
+
+    if sample_table_config.num_records == 0:
+        sample_table_config.save_table(
+            pd.DataFrame(columns=['user', 'item'] + matrix_config.table.columns),
+            output_dir
+        )
 
-    # create the user indices config and save the array
+    # create the user indices config and save the resolved array
     user_index_config = DatasetIndexConfig(
         matrix_name + '_user_indices.hdf5',
-        matrix_config.user.key,
+        user_key,
         len(users)
     )
-    user_index_config.save_indices(output_dir, list(users))
+    user_index_config.save_indices(
+        output_dir,
+        list(dataset.resolve_user_ids(matrix_name, users.to_numpy()))
+    )
 
-    # create the item indices config and save the array
+    # create the item indices config and save the resolved array
     item_index_config = DatasetIndexConfig(
         matrix_name + '_item_indices.hdf5',
-        matrix_config.item.key,
+        item_key,
         len(items)
     )
-    item_index_config.save_indices(output_dir, list(items))
-
-    # create the sample matrix table config and save the table
-    sample_table_config = create_dataset_table_config(
-        dataset.get_name() + '_' + matrix_name + '.tsv.bz2',
-        matrix_config.table.primary_key,
-        matrix_config.table.columns,
-        compression='bz2',
-        encoding=matrix_config.table.file.options.encoding,
-        foreign_keys=matrix_config.table.foreign_keys,
-        num_records=len(sample)
+    item_index_config.save_indices(
+        output_dir,
+        list(dataset.resolve_item_ids(matrix_name, items.to_numpy()))
     )
-    sample_table_config.save_table(sample, output_dir)
 
     return DatasetMatrixConfig(
         sample_table_config,
         RatingMatrixConfig(
-            float(sample[matrix_config.table.columns[0]].min()),
-            float(sample[matrix_config.table.columns[0]].max()),
+            float(rating_min),
+            float(rating_max),
             matrix_config.ratings.rating_type
         ),
         user_index_config,
@@ -217,24 +310,78 @@ def create_matrix_sample(
         dataset: Dataset,
         matrix_name: str,
         num_users: int,
-        num_items: int) -> Tuple[pd.DataFrame, List[int], List[int]]:
+        num_items: int,
+        *,
+        sampling: str=SAMPLE_FIRST,
+        seed: int=None,
+        chunk_size: int=DEFAULT_SAMPLE_CHUNK_SIZE) -> Iterator[pd.DataFrame]:
     """Create a sample for the specified matrix.
 
-    Extracts a sample with the first occurring users and items until the
-    specified amounts are reached, and therefore are only used as an indication.
-    No additional users/items are generated when the dataset matrix has
-    less available amounts than is specified. Moreover, due to the sparsity of the
-    matrix it can turn out that the resulting matrix is very close, but not
-    exactly the specified amounts.
+    The users and items of the sample are chosen before the matrix is filtered:
+
+    'first': the first occurring users and the first occurring items of these users.
+        This requires a (partial) pass over the matrix before filtering.
+    'hash': the users and items with a hash of their index below a threshold,
+        which results in approximately the specified amounts.
+    'random': the users and items are chosen uniformly at random.
+
+    The specified amounts are only used as an indication. No additional users/items
+    are generated when the dataset matrix has less available amounts than is specified.
+    Moreover, due to the sparsity of the matrix it can turn out that the resulting
+    matrix is very close, but not exactly the specified amounts.
 
     Args:
         dataset: the dataset to create a sample matrix from.
         matrix_name: the name of the matrix to create a sample of.
         num_users: the number of users in the created sample matrix.
         num_items: the number of items in the created sample matrix.
+        sampling: the sampling strategy of the users and items, one of 'first',
+            'hash' or 'random'.
+        seed: the (optional) seed of the 'hash' and 'random' sampling strategies.
+        chunk_size: the number of records to read from the matrix at once.
+
+    Raises:
+        ValueError: when the sampling strategy is unknown.
 
     Returns:
-        the sample matrix, the unique user and unique item indices.
+        an iterator of the filtered matrix chunks with the original matrix columns.
+    """
+    if sampling not in [SAMPLE_FIRST, SAMPLE_HASH, SAMPLE_RANDOM]:
+        raise ValueError('Unknown sampling strategy: ' + str(sampling))
+
+    return _create_matrix_sample(
+        dataset,
+        matrix_name,
+        num_users,
+        num_items,
+        sampling,
+        seed,
+        chunk_size
+    )
+
+
+def _create_matrix_sample(
+        dataset: Dataset,
+        matrix_name: str,
+        num_users: int,
+        num_items: int,
+        sampling: str,
+        seed: Optional[int],
+        chunk_size: int) -> Iterator[pd.DataFrame]:
+    """Create a sample for the specified matrix with a validated sampling strategy.
+
+    Args:
+        dataset: the dataset to create a sample matrix from.
+        matrix_name: the name of the matrix to create a sample of.
+        num_users: the number of users in the created sample matrix.
+        num_items: the number of items in the created sample matrix.
+        sampling: the sampling strategy of the users and items, one of 'first',
+            'hash' or 'random'.
+        seed: the (optional) seed of the 'hash' and 'random' sampling strategies.
+        chunk_size: the number of records to read from the matrix at once.
+
+    Returns:
+        an iterator of the filtered matrix chunks with the original matrix columns.
     """
     matrix_config = dataset.get_matrix_config(matrix_name)
 
@@ -242,47 +389,123 @@ def create_matrix_sample(
     matrix_users = min(matrix_config.user.num_records, num_users)
     matrix_items = min(matrix_config.item.num_records, num_items)
 
-    # prepare sample dataframe
-    matrix_columns = matrix_config.table.primary_key + matrix_config.table.columns
-    matrix_sample = pd.DataFrame(columns=matrix_columns)
+    # the sample of a matrix without users or items is empty
+    if matrix_users <= 0 or matrix_items <= 0:
+        return
 
     user_key = matrix_config.user.key
     item_key = matrix_config.item.key
 
-    # create sample in chunks for very big matrices
-    for _, matrix in enumerate(dataset.read_matrix(matrix_name, chunk_size=50000000)):
-        matrix_sample = pd.concat([matrix_sample, matrix])
-        if len(matrix_sample[user_key].unique()) > matrix_users and \
-                len(matrix_sample[item_key].unique()) > matrix_items:
+    if sampling == SAMPLE_FIRST:
+        users, items = _select_first_occurring(
+            dataset.read_matrix(matrix_name, columns=[user_key, item_key], chunk_size=chunk_size),
+            user_key,
+            item_key,
+            matrix_users,
+            matrix_items
+        )
+        is_user = _create_index_selector(users)
+        is_item = _create_index_selector(items)
+    elif sampling == SAMPLE_HASH:
+        seed = 0 if seed is None else seed
+        is_user = _create_hash_selector(matrix_users / matrix_config.user.num_records, seed)
+        is_item = _create_hash_selector(matrix_items / matrix_config.item.num_records, seed + 1)
+    else:
+        rng = np.random.default_rng(seed)
+        is_user = _create_index_selector(
+            rng.choice(matrix_config.user.num_records, matrix_users, replace=False)
+        )
+        is_item = _create_index_selector(
+            rng.choice(matrix_config.item.num_records, matrix_items, replace=False)
+        )
+
+    for _, matrix in enumerate(dataset.read_matrix(matrix_name, chunk_size=chunk_size)):
+        matrix = matrix[is_user(matrix[user_key].to_numpy()) & is_item(matrix[item_key].to_numpy())]
+        if len(matrix) > 0:
+            yield matrix
+
+
+def _select_first_occurring(
+        matrix_it: Iterator[pd.DataFrame],
+        user_key: str,
+        item_key: str,
+        num_users: int,
+        num_items: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Select the first occurring users and the first occurring items of these users.
+
+    Args:
+        matrix_it: iterator of the matrix chunks with the user and item columns.
+        user_key: the name of the user column.
+        item_key: the name of the item column.
+        num_users: the number of users to select.
+        num_items: the number of items to select.
+
+    Returns:
+        the selected user and item indices.
+    """
+    users = np.empty(0, dtype=np.int64)
+    items = np.empty(0, dtype=np.int64)
+
+    for _, matrix in enumerate(matrix_it):
+        if len(users) < num_users:
+            chunk_users = pd.unique(matrix[user_key])
+            chunk_users = chunk_users[~np.isin(chunk_users, users)]
+            users = np.concatenate([users, chunk_users[:num_users - len(users)]])
+
+        chunk_items = pd.unique(matrix[item_key][np.isin(matrix[user_key], users)])
+        chunk_items = chunk_items[~np.isin(chunk_items, items)]
+        items = np.concatenate([items, chunk_items[:num_items - len(items)]])
+
+        # stop reading when both are selected
+        if len(users) == num_users and len(items) == num_items:
             break
 
-    # users may not be number from 0...num_users
-    unique_users = matrix_sample[user_key].unique()
-    matrix_sample = pd.merge(
-        matrix_sample,
-        pd.DataFrame(list(enumerate(unique_users)), columns=['user',user_key]),
-        how='left',
-        on=user_key
-    )
-    # remove any users above the threshold
-    matrix_sample = matrix_sample[matrix_sample['user'] < matrix_users]
-    # recalculate the indirection array
-    unique_users = dataset.resolve_user_ids(matrix_name, matrix_sample[user_key].unique().tolist())
-
-    # items may not be number from 0...num_items
-    unique_items = matrix_sample[item_key].unique()
-    matrix_sample = pd.merge(
-        matrix_sample,
-        pd.DataFrame(list(enumerate(unique_items)), columns=['item',item_key]),
-        how='left',
-        on=item_key
-    )
-    # remove any items above the threshold
-    matrix_sample = matrix_sample[matrix_sample['item'] < matrix_items]
-    # recalculate and resolve the indirection array
-    unique_items = dataset.resolve_item_ids(matrix_name, matrix_sample[item_key].unique().tolist())
+    return users, items
+
+
+def _create_index_selector(indices: np.ndarray) -> Callable[[np.ndarray], np.ndarray]:
+    """Create a selector for a membership test of the specified indices.
+
+    Args:
+        indices: the indices to select.
+
+    Returns:
+        a function that returns a boolean mask of the indices that are selected.
+    """
+    sorted_indices = np.sort(np.asarray(indices, dtype=np.int64))
 
-    # create sample by removing the extra columns that were added
-    matrix_sample = matrix_sample[['user', 'item'] + matrix_config.table.columns]
+    def is_selected(ids: np.ndarray) -> np.ndarray:
+        if len(sorted_indices) == 0:
+            return np.zeros(len(ids), dtype=bool)
 
-    return matrix_sample, unique_users, unique_items
+        positions = np.minimum(np.searchsorted(sorted_indices, ids), len(sorted_indices) - 1)
+        return sorted_indices[positions] == ids
+
+    return is_selected
+
+
+def _create_hash_selector(fraction: float, seed: int) -> Callable[[np.ndarray], np.ndarray]:
+    """Create a selector that selects the indices with a hash below a threshold.
+
+    The indices are hashed with the SplitMix64 finalizer, so that the selection
+    is deterministic for the seed and independent of the order of the indices.
+
+    Args:
+        fraction: the (approximate) fraction of the indices to select.
+        seed: the seed to mix into the hash.
+
+    Returns:
+        a function that returns a boolean mask of the indices that are selected.
+    """
+    threshold = np.uint64(min(int(fraction * 2 ** 64), 2 ** 64 - 1))
+    seed = np.uint64(seed % 2 ** 64)
+
+    def is_selected(ids: np.ndarray) -> np.ndarray:
+        hashes = np.asarray(ids).astype(np.uint64) ^ seed
+        hashes = hashes + np.uint64(0x9E3779B97F4A7C15)
+        hashes = (hashes ^ (hashes >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+        hashes = (hashes ^ (hashes >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+        hashes = hashes ^ (hashes >> np.uint64(31))
+        return hashes < threshold
+
+    return is_selected
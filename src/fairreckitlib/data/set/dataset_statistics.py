@@ -0,0 +1,415 @@
+"""This module contains accumulators of dataset statistics that are updated in chunks.
+
+Constants:
+
+    COLUMN_CATEGORICAL: the type of a column with categorical values.
+    COLUMN_NUMERICAL: the type of a column with numerical values.
+    MAX_CATEGORIES: the default maximum number of categories that are formatted for a column.
+
+Classes:
+
+    ColumnStatistics: the range or category counts of a table column.
+    Histogram: counts of values in fixed bins.
+    IdPresence: growable presence array of non-negative integer ids.
+    InteractionCounts: growable array of the number of interactions of non-negative integer ids.
+    MatrixStatistics: unique user/item counts and the rating range of a matrix.
+
+This program has been developed by students from the bachelor Computer Science at
+Utrecht University within the Software Project course.
+© Copyright Utrecht University (Department of Information and Computing Sciences)
+"""
+
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from pandas.api.types import is_bool_dtype, is_numeric_dtype
+
+COLUMN_CATEGORICAL = 'categorical'
+COLUMN_NUMERICAL = 'numerical'
+MAX_CATEGORIES = 1000
+
+
+class ColumnStatistics:
+    """Column Statistics that are accumulated over the chunks of a table column.
+
+    The column is numerical when the values of the first chunk have a numeric dtype,
+    in which case the range and the mean of the values are kept. Otherwise the column is
+    categorical and the occurrences of each category are counted in the order of their
+    first appearance. The counts of all the categories are kept while accumulating, so that
+    the counts are exact. When the number of categories exceeds the maximum, only the most
+    frequent categories are formatted and the categories are marked as truncated.
+    Missing values and empty strings are counted as missing and are categorized as None.
+
+    Public methods:
+
+    add
+    get_column_type
+    to_json_format
+    """
+
+    def __init__(self, max_categories: int=MAX_CATEGORIES):
+        """Construct the column statistics.
+
+        Args:
+            max_categories: the maximum number of categories to format for a categorical column.
+        """
+        self.max_categories = max_categories
+        self.column_type = None
+        self.num_values = 0
+        self.num_missing = 0
+        self.value_min = None
+        self.value_max = None
+        self.value_sum = 0.0
+        self.categories: Dict[Any, int] = {}
+
+    def add(self, values: pd.Series) -> None:
+        """Add the values of a column chunk.
+
+        Args:
+            values: the values of the column chunk.
+        """
+        if self.column_type is None:
+            self.column_type = COLUMN_NUMERICAL \
+                if is_numeric_dtype(values) and not is_bool_dtype(values) else COLUMN_CATEGORICAL
+
+        self.num_values += len(values)
+        if self.column_type == COLUMN_NUMERICAL:
+            self._add_numerical(values)
+        else:
+            self._add_categorical(values)
+
+    def _add_categorical(self, values: pd.Series) -> None:
+        """Add the values of a categorical column chunk."""
+        if isinstance(values.dtype, pd.CategoricalDtype):
+            # factorize the integer codes instead of the values, code -1 is a missing value
+            codes, unique_codes = pd.factorize(values.cat.codes.to_numpy())
+            categories = np.append(values.cat.categories.to_numpy(dtype=object), '')[unique_codes]
+        else:
+            codes, categories = pd.factorize(values.fillna(''))
+        counts = np.bincount(codes, minlength=len(categories))
+
+        for i, category in enumerate(categories):
+            category = _to_builtin(category)
+            if category == '':
+                self.num_missing += int(counts[i])
+                category = None
+
+            self.categories[category] = self.categories.get(category, 0) + int(counts[i])
+
+    def _add_numerical(self, values: pd.Series) -> None:
+        """Add the values of a numerical column chunk."""
+        missing = values.isna()
+        num_missing = int(missing.sum())
+        if num_missing > 0:
+            self.num_missing += num_missing
+            values = values[~missing]
+
+        if len(values) == 0:
+            return
+
+        chunk_min = _to_builtin(values.min())
+        chunk_max = _to_builtin(values.max())
+        self.value_min = chunk_min if self.value_min is None else min(self.value_min, chunk_min)
+        self.value_max = chunk_max if self.value_max is None else max(self.value_max, chunk_max)
+        self.value_sum += float(values.sum())
+
+    def get_column_type(self) -> Optional[str]:
+        """Get the type of the column.
+
+        Returns:
+            the column type, either 'categorical' or 'numerical', or None when no values are added.
+        """
+        return self.column_type
+
+    def to_json_format(self) -> Dict[str, Any]:
+        """Format the column statistics to a json compatible dictionary.
+
+        Returns:
+            a dictionary containing the column statistics.
+        """
+        stats = {
+            'type': self.column_type,
+            'num_values': self.num_values,
+            'num_missing': self.num_missing
+        }
+
+        if self.column_type == COLUMN_NUMERICAL:
+            num_present = self.num_values - self.num_missing
+            stats['min'] = self.value_min
+            stats['max'] = self.value_max
+            stats['mean'] = self.value_sum / num_present if num_present > 0 else None
+        else:
+            categories = self.categories
+            truncated = len(categories) > self.max_categories
+            if truncated:
+                # the stable sort keeps the order of first appearance for equal counts
+                top = sorted(categories.items(), key=lambda item: item[1], reverse=True)
+                categories = dict(top[:self.max_categories])
+
+            stats['num_categories'] = len(self.categories)
+            stats['categories'] = list(categories.keys())
+            stats['counts'] = list(categories.values())
+            stats['truncated'] = truncated
+
+        return stats
+
+
+class Histogram:
+    """Histogram that counts the values in fixed bins.
+
+    Values that fall outside the range of the bins are counted in the first or last bin.
+
+    Public methods:
+
+    add
+    get_counts
+    to_json_format
+    """
+
+    def __init__(self, bin_edges: np.ndarray):
+        """Construct the histogram.
+
+        Args:
+            bin_edges: the monotonically increasing edges of the bins.
+        """
+        self.bin_edges = np.asarray(bin_edges, dtype=np.float64)
+        self.counts = np.zeros(len(self.bin_edges) - 1, dtype=np.int64)
+
+    def add(self, values: np.ndarray) -> None:
+        """Add the values of a chunk.
+
+        Args:
+            values: the numerical values to count.
+        """
+        values = np.clip(values, self.bin_edges[0], self.bin_edges[-1])
+        self.counts += np.histogram(values, bins=self.bin_edges)[0]
+
+    def get_counts(self) -> np.ndarray:
+        """Get the number of values in each of the bins.
+
+        Returns:
+            the counts of the bins.
+        """
+        return self.counts
+
+    def to_json_format(self) -> Dict[str, List]:
+        """Format the histogram to a json compatible dictionary.
+
+        Returns:
+            a dictionary containing the bin edges and counts.
+        """
+        return {
+            'bin_edges': self.bin_edges.tolist(),
+            'counts': self.counts.tolist()
+        }
+
+
+class IdPresence:
+    """Id Presence that keeps track of the unique ids that are added.
+
+    The presence of the ids is stored in a boolean array that is indexed by the id,
+    which grows (geometrically) with the largest id. Adding ids is therefore linear in
+    the number of ids that are added and the memory is proportional to the id space.
+
+    Public methods:
+
+    add
+    get_ids
+    get_num_ids
+    """
+
+    def __init__(self):
+        """Construct the id presence."""
+        self.present = np.zeros(0, dtype=bool)
+
+    def add(self, ids: np.ndarray) -> None:
+        """Add the specified ids.
+
+        Args:
+            ids: the non-negative integer ids to add.
+
+        Raises:
+            ValueError: when any of the ids is negative.
+        """
+        if len(ids) == 0:
+            return
+
+        ids = np.asarray(ids, dtype=np.int64)
+        if ids.min() < 0:
+            raise ValueError('Expected non-negative ids')
+
+        max_id = int(ids.max())
+        if max_id >= len(self.present):
+            present = np.zeros(max(max_id + 1, 2 * len(self.present)), dtype=bool)
+            present[:len(self.present)] = self.present
+            self.present = present
+
+        self.present[ids] = True
+
+    def get_ids(self) -> np.ndarray:
+        """Get the unique ids that are added.
+
+        Returns:
+            the sorted unique ids.
+        """
+        return np.flatnonzero(self.present)
+
+    def get_num_ids(self) -> int:
+        """Get the number of unique ids that are added.
+
+        Returns:
+            the number of unique ids.
+        """
+        return int(np.count_nonzero(self.present))
+
+
+class InteractionCounts:
+    """Interaction Counts that keep track of the number of interactions per id.
+
+    The counts are stored in an integer array that is indexed by the id,
+    which grows (geometrically) with the largest id, similar to the id presence.
+
+    Public methods:
+
+    add
+    get_counts
+    to_json_format
+    """
+
+    def __init__(self):
+        """Construct the interaction counts."""
+        self.counts = np.zeros(0, dtype=np.int64)
+
+    def add(self, ids: np.ndarray) -> None:
+        """Add an interaction for each of the specified ids.
+
+        Args:
+            ids: the non-negative integer ids to add, which can contain duplicates.
+
+        Raises:
+            ValueError: when any of the ids is negative.
+        """
+        if len(ids) == 0:
+            return
+
+        ids = np.asarray(ids, dtype=np.int64)
+        if ids.min() < 0:
+            raise ValueError('Expected non-negative ids')
+
+        counts = np.bincount(ids)
+        if len(counts) > len(self.counts):
+            grown = np.zeros(max(len(counts), 2 * len(self.counts)), dtype=np.int64)
+            grown[:len(self.counts)] = self.counts
+            self.counts = grown
+
+        self.counts[:len(counts)] += counts
+
+    def get_counts(self) -> np.ndarray:
+        """Get the number of interactions per id.
+
+        Returns:
+            the counts indexed by id, up to and including the largest id that is added.
+        """
+        present = np.flatnonzero(self.counts)
+        return self.counts[:present[-1] + 1 if len(present) > 0 else 0]
+
+    def to_json_format(self) -> Dict[str, Any]:
+        """Format the summary of the interaction counts to a json compatible dictionary.
+
+        Only the ids with at least one interaction are summarized.
+
+        Returns:
+            a dictionary containing the number of ids and the range, mean and median count.
+        """
+        counts = self.counts[self.counts > 0]
+        if len(counts) == 0:
+            return {'num_ids': 0, 'min': None, 'max': None, 'mean': None, 'median': None}
+
+        return {
+            'num_ids': len(counts),
+            'min': int(counts.min()),
+            'max': int(counts.max()),
+            'mean': float(counts.mean()),
+            'median': float(np.median(counts))
+        }
+
+
+class MatrixStatistics:
+    """Matrix Statistics that are accumulated over the chunks of a matrix.
+
+    Public methods:
+
+    add
+    get_num_items
+    get_num_records
+    get_num_users
+    get_rating_range
+    """
+
+    def __init__(self):
+        """Construct the matrix statistics."""
+        self.users = IdPresence()
+        self.items = IdPresence()
+        self.num_records = 0
+        self.rating_min = np.inf
+        self.rating_max = -np.inf
+
+    def add(self, users: np.ndarray, items: np.ndarray, ratings: np.ndarray) -> None:
+        """Add the statistics of a matrix chunk.
+
+        Args:
+            users: the user ids of the matrix chunk.
+            items: the item ids of the matrix chunk.
+            ratings: the ratings of the matrix chunk.
+        """
+        self.users.add(users)
+        self.items.add(items)
+        self.num_records += len(ratings)
+        if len(ratings) > 0:
+            self.rating_min = min(self.rating_min, float(np.min(ratings)))
+            self.rating_max = max(self.rating_max, float(np.max(ratings)))
+
+    def get_num_items(self) -> int:
+        """Get the number of unique items in the matrix.
+
+        Returns:
+            the number of unique items.
+        """
+        return self.items.get_num_ids()
+
+    def get_num_records(self) -> int:
+        """Get the number of records in the matrix.
+
+        Returns:
+            the number of records.
+        """
+        return self.num_records
+
+    def get_num_users(self) -> int:
+        """Get the number of unique users in the matrix.
+
+        Returns:
+            the number of unique users.
+        """
+        return self.users.get_num_ids()
+
+    def get_rating_range(self) -> Tuple[float, float]:
+        """Get the range of the ratings in the matrix.
+
+        Returns:
+            the minimum and maximum rating, or (inf, -inf) when no ratings are added.
+        """
+        return self.rating_min, self.rating_max
+
+
+def _to_builtin(value: Any) -> Any:
+    """Convert a NumPy scalar to the corresponding builtin type.
+
+    Args:
+        value: the (NumPy) scalar to convert.
+
+    Returns:
+        the builtin scalar.
+    """
+    return value.item() if isinstance(value, np.generic) else value
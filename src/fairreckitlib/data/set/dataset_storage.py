@@ -0,0 +1,544 @@
+"""This module contains the columnar binary storage of dataset tables.
+
+A table that is stored with the 'npy' storage is a directory that contains a typed
+NumPy array file for each of the table columns. Numerical columns are stored as is and
+(string) object columns are dictionary-encoded as integer codes together with a UTF-8
+dictionary of the unique values. This allows to read a subset of the table columns
+without parsing and decompressing the entire table, and the column arrays are
+memory-mapped so that chunked reading only touches the requested rows. Categorical
+columns are read as pandas Categorical directly from the codes, without decoding them.
+A predicate is pushed down into the reader: it is evaluated on the memory-mapped arrays
+of its columns first, after which only the matching rows of the other columns are loaded.
+
+Constants:
+
+    STORAGE_NPY: the columnar storage of a table as typed NumPy arrays.
+
+Classes:
+
+    NpyTableWriter: write a table with the columnar storage in one or more chunks.
+
+Functions:
+
+    read_npy_table: read (a subset of the columns of) a table with the columnar storage.
+    save_npy_table: save a table with the columnar storage.
+    is_csr_matrix_cached: check whether a CSR matrix is cached and up-to-date with its source.
+    load_csr_matrix: load a memory-mapped CSR matrix.
+    save_csr_matrix: save a CSR matrix as separate NumPy arrays.
+
+This program has been developed by students from the bachelor Computer Science at
+Utrecht University within the Software Project course.
+© Copyright Utrecht University (Department of Information and Computing Sciences)
+"""
+
+import os
+from typing import Any, Dict, Iterator, List, Tuple, Union
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+from ...core.io.io_utility import load_json, save_json
+from .dataset_predicate import PREDICATE_CHUNK_SIZE
+from .dataset_predicate import evaluate_condition, evaluate_encoded_condition
+from .dataset_predicate import get_predicate_columns
+
+STORAGE_NPY = 'npy'
+
+NPY_EXT = '.npy'
+NPY_CODES_EXT = '.codes.npy'
+NPY_DICT_EXT = '.dict.npy'
+NPY_DICT_OFFSETS_EXT = '.dict_offsets.npy'
+
+CSR_DATA = 'data'
+CSR_INDICES = 'indices'
+CSR_INDPTR = 'indptr'
+CSR_SHAPE = 'shape'
+CSR_SOURCE_FILE = 'source.json'
+
+
+class NpyTableWriter:
+    """Writer of a table with the columnar storage.
+
+    The table is written to a directory with one array file per column and is allowed
+    to be written in chunks, with the total number of records known in advance.
+    The columns of the written dataframes are matched positionally to the column names,
+    the dtype of each numerical column is determined by the first chunk. Any other
+    column is dictionary-encoded, missing values are encoded as -1.
+
+    Public methods:
+
+    write
+    close
+    """
+
+    def __init__(self, table_dir: str, names: List[str], num_records: int):
+        """Construct the table writer.
+
+        Args:
+            table_dir: the directory to write the table column files to.
+            names: the names of the table columns.
+            num_records: the total number of records that will be written.
+        """
+        self.table_dir = table_dir
+        self.names = names
+        self.num_records = num_records
+        self.num_written = 0
+        self.arrays = {}
+        self.dictionaries = {}
+
+        os.makedirs(self.table_dir, exist_ok=True)
+        # remove column files of a previously saved table
+        for name in self.names:
+            for ext in [NPY_EXT, NPY_CODES_EXT, NPY_DICT_EXT, NPY_DICT_OFFSETS_EXT]:
+                file_path = os.path.join(self.table_dir, name + ext)
+                if os.path.isfile(file_path):
+                    os.remove(file_path)
+
+    def write(self, table: pd.DataFrame) -> None:
+        """Write the next chunk of the table.
+
+        Raises a ValueError when the chunk exceeds the total number of records and
+        a TypeError when a column cannot be stored in the array of the first chunk.
+        The latter can happen for text tables that are read in chunks, in which case
+        the column types need to be specified explicitly when reading the table.
+
+        Args:
+            table: the dataframe chunk to write.
+        """
+        start = self.num_written
+        end = start + len(table)
+        if end > self.num_records:
+            raise ValueError('Table exceeds the expected number of records: ' +
+                             str(self.num_records))
+
+        for column, name in zip(table.columns, self.names):
+            values = table[column]
+            is_encoded = not pd.api.types.is_numeric_dtype(values) and \
+                not pd.api.types.is_bool_dtype(values)
+            if name in self.arrays and is_encoded != (name in self.dictionaries):
+                raise TypeError('Column ' + name + ' changed type between chunks')
+
+            if is_encoded:
+                file_name = name + NPY_CODES_EXT
+                values = self._encode_values(name, values)
+            else:
+                file_name = name + NPY_EXT
+                values = values.to_numpy()
+
+            array = self.arrays.get(name)
+            if array is None:
+                array = np.lib.format.open_memmap(
+                    os.path.join(self.table_dir, file_name),
+                    mode='w+',
+                    dtype=values.dtype,
+                    shape=(self.num_records,)
+                )
+                self.arrays[name] = array
+            elif not np.can_cast(values.dtype, array.dtype, casting='same_kind'):
+                raise TypeError('Column ' + name + ' cannot be stored as ' + str(array.dtype))
+
+            array[start:end] = values
+
+        self.num_written = end
+
+    def close(self) -> None:
+        """Close the writer and store the column dictionaries.
+
+        When less records are written than expected, the column arrays are truncated.
+        """
+        file_paths = []
+        for array in self.arrays.values():
+            array.flush()
+            file_paths.append(array.filename)
+
+        self.arrays = {}
+
+        if self.num_written < self.num_records:
+            for file_path in file_paths:
+                truncated = np.array(np.load(file_path, mmap_mode='r')[:self.num_written])
+                np.save(file_path, truncated)
+
+        for name, dictionary in self.dictionaries.items():
+            encoded = [value.encode('utf-8') for value in dictionary]
+            offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+            offsets[1:] = np.cumsum([len(value) for value in encoded], dtype=np.int64)
+            np.save(os.path.join(self.table_dir, name + NPY_DICT_EXT),
+                    np.frombuffer(b''.join(encoded), dtype=np.uint8))
+            np.save(os.path.join(self.table_dir, name + NPY_DICT_OFFSETS_EXT), offsets)
+
+        self.dictionaries = {}
+
+    def _encode_values(self, name: str, values: pd.Series) -> np.ndarray:
+        """Encode the column values with the (growing) dictionary of the column.
+
+        Args:
+            name: the name of the column to encode.
+            values: the column values to encode.
+
+        Returns:
+            the integer codes of the values.
+        """
+        dictionary = self.dictionaries.setdefault(name, {})
+
+        if isinstance(values.dtype, pd.CategoricalDtype):
+            # only the categories are encoded, the codes are translated to the dictionary
+            translation = np.array([
+                dictionary.setdefault(str(category), len(dictionary))
+                for category in values.cat.categories
+            ] + [-1], dtype=np.int32)
+            return translation[values.cat.codes.to_numpy()]
+
+        valid = values.notna().to_numpy()
+        strings = values[valid].astype(str)
+        for value in pd.unique(strings):
+            if value not in dictionary:
+                dictionary[value] = len(dictionary)
+
+        codes = np.full(len(values), -1, dtype=np.int32)
+        codes[valid] = strings.map(dictionary).to_numpy(dtype=np.int32)
+        return codes
+
+
+def read_npy_table(
+        table_dir: str,
+        names: List[str],
+        *,
+        columns: List[Union[str, int]]=None,
+        chunk_size: int=None,
+        rows: Tuple[int, int]=None,
+        categorical: List[str]=None,
+        predicate: List[Tuple[str, str, Any]]=None
+        ) -> Union[pd.DataFrame, Iterator[pd.DataFrame]]:
+    """Read (a subset of the columns of) a table with the columnar storage.
+
+    Only the requested columns are loaded, in the order of the table columns.
+    Raises a FileNotFoundError when a column file is not present and a
+    ValueError when the requested columns do not match the column names.
+    The categorical columns that are dictionary-encoded are read as pandas Categorical,
+    of which the categories are shared by all the chunks.
+    When a predicate is specified, only the matching rows are loaded and the resulting
+    table (chunks) are indexed by the row numbers of the matching rows. The chunk size
+    is the number of rows that are scanned at once and chunks without matching rows
+    are skipped.
+
+    Args:
+        table_dir: the directory of the table column files.
+        names: the names of the table columns.
+        columns: subset list of columns to load or None to load all.
+            All elements must either be integer indices or strings
+            that correspond to the 'names' argument.
+        chunk_size: loads the table in chunks as an iterator or
+            the entire table when None.
+        rows: (optional) the (start, end) range of the rows to load or None to load all.
+        categorical: (optional) list of column names to read as pandas Categorical.
+        predicate: (optional) list of (column, operator, value) conditions that all need
+            to hold for a row to be loaded, see the dataset_predicate module.
+
+    Returns:
+        the resulting table (iterator).
+    """
+    if columns is not None:
+        requested = [names[col] if isinstance(col, int) else col for col in columns]
+        if any(col not in names for col in requested):
+            raise ValueError('Usecols do not match columns: ' + str(columns))
+        names = [name for name in names if name in requested]
+
+    if not os.path.isdir(table_dir):
+        raise FileNotFoundError('Table directory not found: ' + table_dir)
+
+    arrays = {name: _load_column(table_dir, name) for name in names}
+    for name in categorical if categorical is not None else []:
+        array, dictionary = arrays.get(name, (None, None))
+        if dictionary is not None:
+            arrays[name] = (array, pd.CategoricalDtype(dictionary))
+
+    num_records = len(next(iter(arrays.values()))[0]) if len(arrays) > 0 else 0
+    first_row, end_row = (0, num_records) if rows is None else \
+        (min(rows[0], num_records), min(rows[1], num_records))
+
+    if predicate is not None:
+        return _read_npy_table_rows(
+            table_dir,
+            arrays,
+            (first_row, end_row),
+            chunk_size,
+            predicate
+        )
+
+    if not chunk_size:
+        return _create_table_chunk(arrays, first_row, end_row)
+
+    return (
+        _create_table_chunk(arrays, start, min(start + int(chunk_size), end_row))
+        for start in range(first_row, end_row, int(chunk_size))
+    )
+
+
+def save_npy_table(table: pd.DataFrame, table_dir: str, names: List[str]) -> None:
+    """Save a table with the columnar storage.
+
+    Args:
+        table: the dataframe to save, the columns are matched positionally to the names.
+        table_dir: the directory to save the table column files to.
+        names: the names of the table columns.
+    """
+    writer = NpyTableWriter(table_dir, names, len(table))
+    writer.write(table)
+    writer.close()
+
+
+def is_csr_matrix_cached(csr_dir: str, source_path: str) -> bool:
+    """Check whether the CSR matrix is cached and up-to-date with the source.
+
+    Args:
+        csr_dir: the directory of the CSR matrix files.
+        source_path: the path of the file (or directory) the CSR matrix was created from.
+
+    Returns:
+        whether the cached CSR matrix is present and the source did not change since.
+    """
+    # the source stat is saved last and therefore marks a complete matrix
+    source_stat_path = os.path.join(csr_dir, CSR_SOURCE_FILE)
+    if not os.path.isfile(source_stat_path):
+        return False
+
+    if not os.path.exists(source_path):
+        return True
+
+    try:
+        return load_json(source_stat_path) == _get_source_stat(source_path)
+    except (OSError, ValueError):
+        return False
+
+
+def load_csr_matrix(csr_dir: str) -> sparse.csr_matrix:
+    """Load the CSR matrix with memory-mapped (read-only) arrays.
+
+    The arrays are not copied, which allows multiple processes to share the pages.
+    Raises a FileNotFoundError when the CSR matrix files are not present.
+
+    Args:
+        csr_dir: the directory of the CSR matrix files.
+
+    Returns:
+        the loaded CSR matrix.
+    """
+    return sparse.csr_matrix((
+        np.load(os.path.join(csr_dir, CSR_DATA + NPY_EXT), mmap_mode='r'),
+        np.load(os.path.join(csr_dir, CSR_INDICES + NPY_EXT), mmap_mode='r'),
+        np.load(os.path.join(csr_dir, CSR_INDPTR + NPY_EXT), mmap_mode='r')
+    ), shape=tuple(np.load(os.path.join(csr_dir, CSR_SHAPE + NPY_EXT))), copy=False)
+
+
+def save_csr_matrix(csr_dir: str, matrix: sparse.csr_matrix, source_path: str) -> None:
+    """Save the CSR matrix as separate NumPy arrays.
+
+    Each array is written to a temporary file first and moved afterwards,
+    so that a concurrent reader never observes an incomplete matrix.
+    The modification time and size of the source are saved last, so that the
+    cached matrix is outdated by any change of the source.
+
+    Args:
+        csr_dir: the directory to save the CSR matrix files to.
+        matrix: the CSR matrix to save.
+        source_path: the path of the file (or directory) the CSR matrix is created from.
+    """
+    os.makedirs(csr_dir, exist_ok=True)
+    source_stat_path = os.path.join(csr_dir, CSR_SOURCE_FILE)
+    if os.path.isfile(source_stat_path):
+        os.remove(source_stat_path)
+
+    arrays = [
+        (CSR_SHAPE, np.array(matrix.shape, dtype=np.int64)),
+        (CSR_DATA, matrix.data),
+        (CSR_INDICES, matrix.indices),
+        (CSR_INDPTR, matrix.indptr)
+    ]
+    for name, array in arrays:
+        file_path = os.path.join(csr_dir, name + NPY_EXT)
+        tmp_file_path = file_path + '.' + str(os.getpid()) + '.tmp'
+        with open(tmp_file_path, 'wb') as file:
+            np.save(file, np.asarray(array))
+        os.replace(tmp_file_path, file_path)
+
+    tmp_file_path = source_stat_path + '.' + str(os.getpid()) + '.tmp'
+    save_json(tmp_file_path, _get_source_stat(source_path))
+    os.replace(tmp_file_path, source_stat_path)
+
+
+def _get_source_stat(source_path: str) -> List[List[Any]]:
+    """Get the relative name, modification time and size of the file(s) of the source.
+
+    Args:
+        source_path: the path to a file or a directory of files.
+
+    Returns:
+        a sorted list with the name, modification time (in nanoseconds) and size of each file.
+    """
+    if not os.path.isdir(source_path):
+        stat = os.stat(source_path)
+        return [[os.path.basename(source_path), stat.st_mtime_ns, stat.st_size]]
+
+    result = []
+    for root, _, file_names in os.walk(source_path):
+        for file_name in file_names:
+            stat = os.stat(os.path.join(root, file_name))
+            name = os.path.relpath(os.path.join(root, file_name), source_path)
+            result.append([name, stat.st_mtime_ns, stat.st_size])
+
+    return sorted(result)
+
+
+def _create_table_chunk(
+        arrays: Dict[str, tuple],
+        start: int,
+        end: int,
+        rows: np.ndarray=None) -> pd.DataFrame:
+    """Create a table (chunk) from the memory-mapped column arrays.
+
+    Args:
+        arrays: dictionary with column name as key and (array, dictionary) tuple as value,
+            where the dictionary is the categorical dtype of categorical columns.
+        start: the first record of the chunk.
+        end: the end (exclusive) record of the chunk.
+        rows: (optional) the sorted rows to select instead of all the records in the range.
+
+    Returns:
+        the dataframe with the (selected) records in the range.
+    """
+    selection = slice(start, end) if rows is None else rows
+
+    data = {}
+    for name, (array, dictionary) in arrays.items():
+        if dictionary is None:
+            data[name] = np.array(array[selection])
+        elif isinstance(dictionary, pd.CategoricalDtype):
+            data[name] = pd.Categorical.from_codes(np.array(array[selection]), dtype=dictionary)
+        else:
+            data[name] = _decode_values(np.asarray(array[selection]), dictionary)
+
+    return pd.DataFrame(data, index=pd.RangeIndex(start, end) if rows is None else rows)
+
+
+def _read_npy_table_rows(
+        table_dir: str,
+        arrays: Dict[str, tuple],
+        rows: Tuple[int, int],
+        chunk_size: int,
+        predicate: List[Tuple[str, str, Any]]) -> Union[pd.DataFrame, Iterator[pd.DataFrame]]:
+    """Read the rows of a table with the columnar storage that match the predicate.
+
+    Args:
+        table_dir: the directory of the table column files.
+        arrays: dictionary with column name as key and (array, dictionary) tuple as value.
+        rows: the (start, end) range of the rows to scan.
+        chunk_size: the number of rows to scan for each chunk or None to read all.
+        predicate: list of (column, operator, value) conditions that all need to hold.
+
+    Returns:
+        the matching rows of the table (iterator).
+    """
+    # the predicate columns are not necessarily part of the loaded columns
+    predicate_arrays = {name: _load_column(table_dir, name)
+                        for name in get_predicate_columns(predicate)}
+    scan_size = int(chunk_size) if chunk_size else PREDICATE_CHUNK_SIZE
+    scan_ranges = [(start, min(start + scan_size, rows[1]))
+                   for start in range(rows[0], rows[1], scan_size)]
+
+    if not chunk_size:
+        selected = [_select_rows(predicate_arrays, predicate, *r) for r in scan_ranges]
+        selected = np.concatenate(selected) if len(selected) > 0 else np.empty(0, dtype=np.int64)
+        return _create_table_chunk(arrays, rows[0], rows[0], selected)
+
+    def read_chunks():
+        for start, end in scan_ranges:
+            selected = _select_rows(predicate_arrays, predicate, start, end)
+            if len(selected) > 0:
+                yield _create_table_chunk(arrays, start, end, selected)
+
+    return read_chunks()
+
+
+def _select_rows(
+        predicate_arrays: Dict[str, tuple],
+        predicate: List[Tuple[str, str, Any]],
+        start: int,
+        end: int) -> np.ndarray:
+    """Select the rows in the range that match the predicate.
+
+    Args:
+        predicate_arrays: dictionary with column name as key and (array, dictionary) tuple
+            as value for each of the predicate columns.
+        predicate: list of (column, operator, value) conditions that all need to hold.
+        start: the first row of the range.
+        end: the end (exclusive) row of the range.
+
+    Returns:
+        the (sorted) matching rows in the range.
+    """
+    mask = np.ones(end - start, dtype=bool)
+    for name, op, value in predicate:
+        array, dictionary = predicate_arrays[name]
+        values = np.asarray(array[start:end])
+        if dictionary is None:
+            mask &= evaluate_condition(values, op, value)
+        else:
+            mask &= evaluate_encoded_condition(values, dictionary, op, value)
+
+    return start + np.flatnonzero(mask)
+
+
+def _decode_values(codes: np.ndarray, dictionary: np.ndarray) -> np.ndarray:
+    """Decode the dictionary-encoded column values.
+
+    Args:
+        codes: the integer codes of the values, -1 for missing values.
+        dictionary: the object array of unique values.
+
+    Returns:
+        the decoded object array of the values.
+    """
+    values = np.empty(len(codes), dtype=object)
+    valid = codes >= 0
+    values[valid] = dictionary[codes[valid]]
+    values[~valid] = np.nan
+    return values
+
+
+def _load_column(table_dir: str, name: str) -> tuple:
+    """Load the memory-mapped array (and dictionary) of a table column.
+
+    Args:
+        table_dir: the directory of the table column files.
+        name: the name of the column to load.
+
+    Returns:
+        a tuple of the column array and dictionary or None when not dictionary-encoded.
+    """
+    file_path = os.path.join(table_dir, name + NPY_EXT)
+    if os.path.isfile(file_path):
+        return np.load(file_path, mmap_mode='r'), None
+
+    codes = np.load(os.path.join(table_dir, name + NPY_CODES_EXT), mmap_mode='r')
+    return codes, _load_dictionary(table_dir, name)
+
+
+def _load_dictionary(table_dir: str, name: str) -> np.ndarray:
+    """Load the dictionary of unique values of a dictionary-encoded column.
+
+    Args:
+        table_dir: the directory of the table column files.
+        name: the name of the column to load the dictionary of.
+
+    Returns:
+        the object array of unique values.
+    """
+    blob = np.load(os.path.join(table_dir, name + NPY_DICT_EXT)).tobytes()
+    offsets = np.load(os.path.join(table_dir, name + NPY_DICT_OFFSETS_EXT))
+
+    dictionary = np.empty(len(offsets) - 1, dtype=object)
+    for i in range(len(dictionary)):
+        dictionary[i] = blob[offsets[i]:offsets[i + 1]].decode('utf-8')
+
+    return dictionary
@@ -0,0 +1,177 @@
+"""This module contains functionality to partition dataset tables by the month of their records.
+
+A time-partitioned table is stored as a directory with a table file for each month, of
+which the dataset configuration keeps the number of records and the range of the time column.
+Reading a time range of the table only opens the partitions that overlap with the range.
+The time column is either a unix timestamp in seconds or a (ISO formatted) date string,
+and the range of each partition is stored in the same representation as the column.
+
+Constants:
+
+    TIME_PARTITION_CHUNK_SIZE: the number of records that are partitioned at once.
+
+Functions:
+
+    append_table_by_month: append records to the monthly partitions of a table.
+    get_month_keys: get the year-month keys (e.g. 201311) of the timestamps.
+    partition_table_by_month: partition a table into a directory of monthly table files.
+
+This program has been developed by students from the bachelor Computer Science at
+Utrecht University within the Software Project course.
+© Copyright Utrecht University (Department of Information and Computing Sciences)
+"""
+
+import os
+import shutil
+from typing import Any, Dict
+
+import numpy as np
+import pandas as pd
+from pandas.api.types import is_numeric_dtype
+
+from .dataset_compression import get_compression_ext
+from .dataset_config import DatasetTableConfig, DatasetTimePartitionConfig
+from .dataset_config import create_dataset_table_config
+
+TIME_PARTITION_CHUNK_SIZE = 10000000
+
+
+def append_table_by_month(
+        dataset_dir: str,
+        table_config: DatasetTableConfig,
+        table: pd.DataFrame) -> None:
+    """Append records to the monthly partitions of a time-partitioned table.
+
+    The records are appended to the partition file of their month, and partitions are
+    added for the months that are not present yet. The number of records and the time
+    range of the partitions (and table) configuration are updated in place.
+
+    Args:
+        dataset_dir: the directory of the dataset.
+        table_config: the configuration of the time-partitioned table.
+        table: the records to append with the columns of the table.
+
+    Raises:
+        ValueError: when the table is not time-partitioned.
+    """
+    if table_config.partitions is None:
+        raise ValueError('Unable to append by month to a table that is not time-partitioned')
+
+    partitions = {int(p.name.replace('-', '')): p for p in table_config.partitions}
+    _add_month_records(dataset_dir, table_config, partitions, table)
+
+    table_config.partitions = [partitions[key] for key in sorted(partitions)]
+    table_config.num_records += len(table)
+
+
+def get_month_keys(timestamps: pd.Series) -> np.ndarray:
+    """Get the year-month keys of the timestamps.
+
+    Args:
+        timestamps: the unix timestamps in seconds or the date strings.
+
+    Returns:
+        the keys of the months as integers, e.g. 201311 for November 2013.
+    """
+    if is_numeric_dtype(timestamps):
+        dates = pd.to_datetime(timestamps, unit='s')
+    else:
+        dates = pd.to_datetime(timestamps)
+
+    return (dates.dt.year * 100 + dates.dt.month).to_numpy()
+
+
+def partition_table_by_month(
+        dataset_dir: str,
+        table_config: DatasetTableConfig,
+        partition_column: str,
+        dir_name: str,
+        *,
+        compression: str=None,
+        chunk_size: int=TIME_PARTITION_CHUNK_SIZE) -> DatasetTableConfig:
+    """Partition a table into a directory of monthly table files.
+
+    The table is read in chunks and the records of each chunk are appended to the
+    partition file of their month, which keeps the order of the records within a month.
+    An existing directory with the same name is replaced.
+
+    Args:
+        dataset_dir: the directory of the dataset.
+        table_config: the configuration of the table to partition.
+        partition_column: the name of the time column to partition the table on.
+        dir_name: the name of the directory to store the partition files in.
+        compression: the compression codec of the partition files or None for no compression.
+        chunk_size: the number of records to partition at once.
+
+    Returns:
+        the configuration of the partitioned table with the partitions in chronological order.
+    """
+    table_dir = os.path.join(dataset_dir, dir_name)
+    if os.path.isdir(table_dir):
+        shutil.rmtree(table_dir)
+    os.makedirs(table_dir)
+
+    partitioned_config = create_dataset_table_config(
+        dir_name,
+        table_config.primary_key,
+        table_config.columns,
+        categorical=table_config.categorical,
+        compression=compression,
+        foreign_keys=table_config.foreign_keys
+    )
+
+    partitioned_config.partition_column = partition_column
+
+    partitions: Dict[int, DatasetTimePartitionConfig] = {}
+    for _, chunk in enumerate(table_config.read_table(dataset_dir, chunk_size=chunk_size)):
+        _add_month_records(dataset_dir, partitioned_config, partitions, chunk)
+
+    partitioned_config.partitions = [partitions[key] for key in sorted(partitions)]
+    partitioned_config.num_records = sum(p.num_records for p in partitioned_config.partitions)
+    return partitioned_config
+
+
+def _add_month_records(
+        dataset_dir: str,
+        table_config: DatasetTableConfig,
+        partitions: Dict[int, DatasetTimePartitionConfig],
+        table: pd.DataFrame) -> None:
+    """Add the records to the partition files of their month.
+
+    Args:
+        dataset_dir: the directory of the dataset.
+        table_config: the configuration of the time-partitioned table.
+        partitions: the partition configurations keyed by month, which are updated in place.
+        table: the records to add with the columns of the table.
+    """
+    partition_column = table_config.partition_column
+    for month_key, records in table.groupby(get_month_keys(table[partition_column])):
+        time_min = _to_yml_value(records[partition_column].min())
+        time_max = _to_yml_value(records[partition_column].max())
+
+        partition_config = partitions.get(month_key)
+        if partition_config is None:
+            name = '%04d-%02d' % divmod(int(month_key), 100)
+            partition_config = DatasetTimePartitionConfig(
+                name,
+                name + '.tsv' + get_compression_ext(table_config.file.options.compression),
+                0,
+                time_min,
+                time_max
+            )
+            partitions[month_key] = partition_config
+        else:
+            partition_config.time_min = min(partition_config.time_min, time_min)
+            partition_config.time_max = max(partition_config.time_max, time_max)
+
+        table_config.create_partition_config(partition_config).save_table(
+            records,
+            dataset_dir,
+            append=partition_config.num_records > 0
+        )
+        partition_config.num_records += len(records)
+
+
+def _to_yml_value(value: Any) -> Any:
+    """Convert a (numpy) scalar to a yml compatible value."""
+    return value.item() if isinstance(value, np.generic) else value
@@ -10,9 +10,13 @@ Utrecht University within the Software Project course.
 """
 
 from abc import ABCMeta, abstractmethod
-from typing import Callable, Dict, List, Optional, Tuple
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import multiprocessing
+from typing import Any, Callable, Dict, List, Optional, Tuple
 
+from ..dataset_compression import DEFAULT_COMPRESSION, get_compression_ext
 from ..dataset_config import DatasetConfig, DatasetMatrixConfig, DatasetTableConfig
+from ..dataset_constants import TABLE_FILE_PREFIX
 
 
 class DatasetProcessorBase(metaclass=ABCMeta):
@@ -38,6 +42,12 @@ class DatasetProcessorBase(metaclass=ABCMeta):
     one valid event table or one valid matrix configuration to be successful, concluding
     that remaining tables are optional.
 
+    The table processors of each category are run concurrently in a process pool when
+    the processor is constructed with more than one worker. Processors are expected to be
+    independent of each other, unless they are declared in the processor dependencies.
+    These share state through the processor itself and are therefore run (in order) in
+    the calling process, while the independent processors are run by the worker pool.
+
     Abstract methods:
 
     get_event_configs
@@ -46,18 +56,39 @@ class DatasetProcessorBase(metaclass=ABCMeta):
 
     Public methods:
 
+    get_processor_dependencies
+    get_progress
+    get_table_file_name
     run
     """
 
-    def __init__(self, dataset_dir: str, dataset_name: str):
+    def __init__(
+            self,
+            dataset_dir: str,
+            dataset_name: str,
+            *,
+            num_workers: int=1,
+            compression: Optional[str]=DEFAULT_COMPRESSION,
+            partition_events: bool=False):
         """Construct the base DatasetProcessor.
 
         Args:
             dataset_dir: path of the dataset directory.
             dataset_name: name of the dataset (processor).
+            num_workers: the number of worker processes that run the independent
+                table processors concurrently, or one to run them sequentially.
+            compression: the compression codec of the generated table files
+                or None to store them uncompressed.
+            partition_events: whether to partition the event tables by month, which is
+                only used by the processors that support time-partitioned event tables.
         """
         self.dataset_dir = dataset_dir
         self.dataset_name = dataset_name
+        self.num_workers = max(num_workers, 1)
+        self.compression = compression
+        self.partition_events = partition_events
+        self.num_processors = 0
+        self.num_processed = 0
 
     @abstractmethod
     def get_event_configs(self) -> List[Tuple[str, Callable[[], Optional[DatasetTableConfig]]]]:
@@ -86,6 +117,99 @@ class DatasetProcessorBase(metaclass=ABCMeta):
         """
         raise NotImplementedError()
 
+    def get_table_file_name(self, table_name: str) -> str:
+        """Get the name of a table file that is generated by the processor.
+
+        Args:
+            table_name: the name of the table in the file name.
+
+        Returns:
+            the prefixed file name with the extension of the configured compression.
+        """
+        return TABLE_FILE_PREFIX + self.dataset_name + '_' + table_name + '.tsv' + \
+            get_compression_ext(self.compression)
+
+    def get_processor_dependencies(self) -> Dict[str, List[str]]:
+        """Get the dependencies between the table processors of the dataset.
+
+        A table processor that depends on the state produced by other table processors
+        needs to declare this dependency, so that these are run in the same process.
+        Dependencies are expected to be in the same or an earlier category, which are
+        run in the order: event tables, matrix tables and (other) tables.
+
+        Returns:
+            a dictionary with the table name as key and the names of the tables
+            it depends on as value, empty when all processors are independent.
+        """
+        return {}
+
+    def get_progress(self) -> float:
+        """Get the progress of the running processor.
+
+        Returns:
+            the fraction of the table processors that are finished, between 0.0 and 1.0.
+        """
+        if self.num_processors == 0:
+            return 0.0
+
+        return min(self.num_processed / self.num_processors, 1.0)
+
+    def run_processors(
+            self,
+            processors: List[Tuple[str, Callable[[], Any]]]) -> List[Tuple[str, Any]]:
+        """Run the specified table processors.
+
+        The independent processors are run concurrently by the worker pool when
+        there is more than one worker available, whereas the processors that are
+        part of a dependency are run sequentially in the calling process.
+
+        Args:
+            processors: a list of (table name, table processor) tuples to run.
+
+        Returns:
+            a list of (table name, processor result) tuples in the same order as the processors.
+        """
+        dependencies = self.get_processor_dependencies()
+        shared = set(dependencies.keys())
+        for table_names in dependencies.values():
+            shared.update(table_names)
+
+        independent = [name for name, _ in processors if name not in shared]
+        if self.num_workers == 1 or len(independent) < 2:
+            independent = []
+
+        executor = None
+        futures = {}
+        if len(independent) > 0:
+            # submit the independent processors first so the pool is busy in the meantime,
+            # the workers are spawned as the processor can run on a thread of the registry
+            executor = ProcessPoolExecutor(
+                max_workers=self.num_workers,
+                mp_context=multiprocessing.get_context('spawn')
+            )
+            for table_name, process_config in processors:
+                if table_name in independent:
+                    futures[executor.submit(process_config)] = table_name
+
+        results = {}
+        try:
+            for table_name, process_config in processors:
+                if table_name not in independent:
+                    results[table_name] = process_config()
+                    self.num_processed += 1
+
+            for future in as_completed(futures):
+                results[futures[future]] = future.result()
+                self.num_processed += 1
+        finally:
+            if executor is not None:
+                # cancel the pending processors when one of the processors failed
+                for _, future in enumerate(futures):
+                    future.cancel()
+                executor.shutdown()
+
+        return [(table_name, results[table_name]) for table_name, _ in processors]
+
     def run_event_table_processors(self) -> Dict[str, DatasetTableConfig]:
         """Run the dataset's event table processors.
 
@@ -93,8 +217,7 @@ class DatasetProcessorBase(metaclass=ABCMeta):
             a dictionary with valid event table name-configuration pairs.
         """
         dataset_events = {}
-        for table_name, process_config in self.get_event_configs():
-            config = process_config()
+        for table_name, config in self.run_processors(self.get_event_configs()):
             if config is not None and config.num_records > 0:
                 dataset_events[table_name] = config
 
@@ -107,8 +230,7 @@ class DatasetProcessorBase(metaclass=ABCMeta):
             a dictionary with valid matrix name-configuration pairs.
         """
         dataset_matrices = {}
-        for matrix_name, process_config in self.get_matrix_configs():
-            config = process_config()
+        for matrix_name, config in self.run_processors(self.get_matrix_configs()):
             if config is not None and config.table.num_records > 0:
                 dataset_matrices[matrix_name] = config
 
@@ -121,8 +243,7 @@ class DatasetProcessorBase(metaclass=ABCMeta):
             a dictionary with valid table name-configuration pairs.
         """
         dataset_tables = {}
-        for table_name, process_config in self.get_table_configs():
-            config = process_config()
+        for table_name, config in self.run_processors(self.get_table_configs()):
             if config is not None and config.num_records > 0:
                 dataset_tables[table_name] = config
 
@@ -134,6 +255,10 @@ class DatasetProcessorBase(metaclass=ABCMeta):
         Returns:
             the dataset configuration or None on failure.
         """
+        self.num_processed = 0
+        self.num_processors = len(self.get_event_configs()) + \
+            len(self.get_matrix_configs()) + len(self.get_table_configs())
+
         dataset_events = self.run_event_table_processors()
         dataset_matrices = self.run_matrix_table_processors()
         if len(dataset_events) == 0 and len(dataset_matrices) == 0:
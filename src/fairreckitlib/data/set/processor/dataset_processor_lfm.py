@@ -17,6 +17,9 @@ import pandas as pd
 from ..dataset_config import DATASET_RATINGS_IMPLICIT, RatingMatrixConfig
 from ..dataset_config import DatasetIndexConfig, DatasetMatrixConfig, DatasetTableConfig
 from ..dataset_constants import TABLE_FILE_PREFIX
+from ..dataset_metadata import get_table_metadata
+from ..dataset_statistics import MatrixStatistics
+from ..dataset_time_partition import partition_table_by_month
 from .dataset_processor_base import DatasetProcessorBase
 
 
@@ -74,6 +77,10 @@ class DatasetProcessorLFM(DatasetProcessorBase, metaclass=ABCMeta):
     def process_listening_events(self) -> Optional[DatasetTableConfig]:
         """Process the listening event table.
 
+        The listening events are partitioned by the month of their timestamp when
+        the processor is constructed to partition the event tables, so that reading
+        a time range of the events only opens the partitions of the months involved.
+
         Returns:
             the listening event table configuration or None on failure.
         """
@@ -83,11 +90,18 @@ class DatasetProcessorLFM(DatasetProcessorBase, metaclass=ABCMeta):
             return None
 
         try:
-            # count records in chunks as these files are huge
-            table_iterator = les_table_config.read_table(self.dataset_dir, chunk_size=50000000)
-            for _, table in enumerate(table_iterator):
-                les_table_config.num_records += len(table)
-
+            if self.partition_events:
+                return partition_table_by_month(
+                    self.dataset_dir,
+                    les_table_config,
+                    'timestamp',
+                    TABLE_FILE_PREFIX + self.dataset_name + '_listening events',
+                    compression=self.compression
+                )
+
+            # count records with a newline scan as these files are huge
+            metadata = get_table_metadata(self.dataset_dir, les_table_config)
+            les_table_config.num_records = metadata.num_records
             return les_table_config
         except FileNotFoundError:
             return None
@@ -111,39 +125,39 @@ class DatasetProcessorLFM(DatasetProcessorBase, metaclass=ABCMeta):
         item_id = matrix_table_config.primary_key[1]
         count_column = matrix_table_config.columns[0]
 
-        unique_users = []
-        unique_items = []
-        rating_min = 1000000000.0
-        rating_max = 0.0
+        matrix_stats = MatrixStatistics()
 
         try:
             matrix_it = matrix_table_config.read_table(self.dataset_dir, chunk_size=50000000)
             # process matrix in chunks
             for _, matrix in enumerate(matrix_it):
-                unique_users = pd.Series(unique_users, dtype='int').append(matrix[user_id]).unique()
-                unique_items = pd.Series(unique_items, dtype='int').append(matrix[item_id]).unique()
-                matrix_table_config.num_records += len(matrix)
-                rating_min = min(rating_min, matrix[count_column].min())
-                rating_max = max(rating_max, matrix[count_column].max())
+                matrix_stats.add(
+                    matrix[user_id].to_numpy(),
+                    matrix[item_id].to_numpy(),
+                    matrix[count_column].to_numpy()
+                )
         except FileNotFoundError:
             return None
 
+        matrix_table_config.num_records += matrix_stats.get_num_records()
+        rating_min, rating_max = matrix_stats.get_rating_range()
+
         return DatasetMatrixConfig(
             matrix_table_config,
             RatingMatrixConfig(
-                float(rating_min),
-                float(rating_max),
+                rating_min,
+                rating_max,
                 DATASET_RATINGS_IMPLICIT
             ),
             DatasetIndexConfig(
                 user_idx_file,
                 user_id,
-                len(unique_users)
+                matrix_stats.get_num_users()
             ),
             DatasetIndexConfig(
                 item_idx_file,
                 item_id,
-                len(unique_items)
+                matrix_stats.get_num_items()
             )
         )
 
@@ -176,10 +190,11 @@ class DatasetProcessorLFM(DatasetProcessorBase, metaclass=ABCMeta):
         user_table['user_age'] = user_table['user_age'].astype(int)
 
         # update table configuration
-        user_table_config.file.name = TABLE_FILE_PREFIX + self.dataset_name + '_users.tsv.bz2'
-        user_table_config.file.options.compression = 'bz2'
+        user_table_config.file.name = self.get_table_file_name('users')
+        user_table_config.file.options.compression = self.compression
         user_table_config.file.options.header = False
         user_table_config.file.options.sep = None
+        user_table_config.categorical = ['user_country', 'user_gender']
 
         # store the resulting user table
         user_table_config.save_table(user_table, self.dataset_dir)
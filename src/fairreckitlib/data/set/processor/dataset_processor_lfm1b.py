@@ -20,7 +20,9 @@ from scipy import sparse
 from ..dataset_config import DATASET_RATINGS_IMPLICIT, RatingMatrixConfig
 from ..dataset_config import \
     DatasetIndexConfig, DatasetMatrixConfig, DatasetTableConfig, create_dataset_table_config
-from ..dataset_constants import TABLE_FILE_PREFIX
+from ..dataset_constants import MATRIX_CSR_SUFFIX, TABLE_FILE_PREFIX
+from ..dataset_metadata import get_table_metadata
+from ..dataset_storage import save_csr_matrix
 from .dataset_processor_lfm import DatasetProcessorLFM
 
 ALL_MUSIC_GENRES = [
@@ -164,8 +166,8 @@ class DatasetProcessorLFM1B(DatasetProcessorLFM):
         )
 
         try:
-            num_records = len(album_table_config.read_table(self.dataset_dir))
-            album_table_config.num_records = num_records
+            metadata = get_table_metadata(self.dataset_dir, album_table_config)
+            album_table_config.num_records = metadata.num_records
             return album_table_config
         except FileNotFoundError:
             return None
@@ -213,9 +215,11 @@ class DatasetProcessorLFM1B(DatasetProcessorLFM):
                 artist_table = pd.merge(artist_table, artist_genres, how='left', on='artist_name')
                 artist_table_config.columns += ['artist_genres']
 
-        artist_table_config.file.name = TABLE_FILE_PREFIX + self.dataset_name + '_artists.tsv.bz2'
-        artist_table_config.file.options.compression = 'bz2'
+        artist_table_config.file.name = self.get_table_file_name('artists')
+        artist_table_config.file.options.compression = self.compression
         artist_table_config.num_records = len(artist_table)
+        artist_table_config.categorical = [name for name in ['artist_gender', 'artist_genres']
+                                           if name in artist_table_config.columns]
 
         # store generated artist table
         artist_table_config.save_table(artist_table, self.dataset_dir)
@@ -243,9 +247,8 @@ class DatasetProcessorLFM1B(DatasetProcessorLFM):
         genres_allmusic_table.rename(columns={0: 'allmusic_id'}, inplace=True)
 
         genres_allmusic_table_config.primary_key = ['allmusic_id']
-        genres_allmusic_table_config.file.name = \
-            TABLE_FILE_PREFIX + self.dataset_name + '_genres_allmusic.tsv.bz2'
-        genres_allmusic_table_config.file.options.compression = 'bz2'
+        genres_allmusic_table_config.file.name = self.get_table_file_name('genres_allmusic')
+        genres_allmusic_table_config.file.options.compression = self.compression
         genres_allmusic_table_config.num_records = len(genres_allmusic_table)
 
         # store generated allmusic genre table
@@ -268,8 +271,8 @@ class DatasetProcessorLFM1B(DatasetProcessorLFM):
         )
 
         try:
-            num_records = len(track_table_config.read_table(self.dataset_dir))
-            track_table_config.num_records = num_records
+            metadata = get_table_metadata(self.dataset_dir, track_table_config)
+            track_table_config.num_records = metadata.num_records
             return track_table_config
         except FileNotFoundError:
             return None
@@ -312,7 +315,8 @@ class DatasetProcessorLFM1B(DatasetProcessorLFM):
         artist_index_config.save_indices(self.dataset_dir, artist_list)
 
         # convert csr to dataframe
-        coo_matrix = pd.DataFrame.sparse.from_spmatrix(csr_matrix).sparse.to_coo()
+        csr_matrix = csr_matrix.tocsr()
+        coo_matrix = csr_matrix.tocoo()
         user_artist_matrix = pd.DataFrame()
         user_artist_matrix['user_id'] = coo_matrix.row
         user_artist_matrix['artist_id'] = coo_matrix.col
@@ -320,10 +324,10 @@ class DatasetProcessorLFM1B(DatasetProcessorLFM):
 
         # create matrix table configuration
         user_artist_table_config = create_dataset_table_config(
-            TABLE_FILE_PREFIX + self.dataset_name + '_' + matrix_name + '_matrix.tsv.bz2',
+            self.get_table_file_name(matrix_name + '_matrix'),
             ['user_id', 'artist_id'],
             ['matrix_count'],
-            compression='bz2',
+            compression=self.compression,
             foreign_keys=['user_id', 'artist_id'],
             num_records=len(user_artist_matrix)
         )
@@ -331,6 +335,12 @@ class DatasetProcessorLFM1B(DatasetProcessorLFM):
         # store the resulting matrix
         user_artist_table_config.save_table(user_artist_matrix, self.dataset_dir)
 
+        # store the csr matrix directly so that it does not need to be rebuilt from the table
+        save_csr_matrix(os.path.join(
+            self.dataset_dir,
+            TABLE_FILE_PREFIX + self.dataset_name + '_' + matrix_name + MATRIX_CSR_SUFFIX
+        ), csr_matrix, os.path.join(self.dataset_dir, user_artist_table_config.file.name))
+
         return DatasetMatrixConfig(
             user_artist_table_config,
             RatingMatrixConfig(
@@ -375,8 +385,8 @@ class DatasetProcessorLFM1B(DatasetProcessorLFM):
         )
 
         try:
-            num_records = len(user_additional_table_config.read_table(self.dataset_dir))
-            user_additional_table_config.num_records = num_records
+            metadata = get_table_metadata(self.dataset_dir, user_additional_table_config)
+            user_additional_table_config.num_records = metadata.num_records
             return user_additional_table_config
         except FileNotFoundError:
             return None
@@ -398,8 +408,8 @@ class DatasetProcessorLFM1B(DatasetProcessorLFM):
             header=True
         )
         try:
-            num_records = len(user_genre_allmusic_no_pc_config.read_table(self.dataset_dir))
-            user_genre_allmusic_no_pc_config.num_records = num_records
+            metadata = get_table_metadata(self.dataset_dir, user_genre_allmusic_no_pc_config)
+            user_genre_allmusic_no_pc_config.num_records = metadata.num_records
             return user_genre_allmusic_no_pc_config
         except FileNotFoundError:
             return None
@@ -421,8 +431,8 @@ class DatasetProcessorLFM1B(DatasetProcessorLFM):
             header=True
         )
         try:
-            num_records = len(user_genre_allmusic_weighted_pc_config.read_table(self.dataset_dir))
-            user_genre_allmusic_weighted_pc_config.num_records = num_records
+            metadata = get_table_metadata(self.dataset_dir, user_genre_allmusic_weighted_pc_config)
+            user_genre_allmusic_weighted_pc_config.num_records = metadata.num_records
             return user_genre_allmusic_weighted_pc_config
         except FileNotFoundError:
             return None
@@ -15,7 +15,6 @@ from typing import Callable, List, Optional, Tuple
 import pandas as pd
 
 from ..dataset_config import DatasetMatrixConfig, DatasetTableConfig, create_dataset_table_config
-from ..dataset_constants import TABLE_FILE_PREFIX
 from .dataset_processor_lfm import DatasetProcessorLFM
 
 
@@ -99,19 +98,20 @@ class DatasetProcessorLFM2B(DatasetProcessorLFM):
         Returns:
             the album table configuration or None on failure.
         """
-        try:
-            file_name, num_records = self.process_corrupt_table('albums')
-        except FileNotFoundError:
-            return None
-
-        return create_dataset_table_config(
-            file_name,
+        album_table_config = create_dataset_table_config(
+            self.get_table_file_name('albums'),
             ['album_id'],
             ['album_name', 'artist_name'],
-            compression='bz2',
-            num_records=num_records
+            compression=self.compression
         )
 
+        try:
+            num_records = self.process_corrupt_table('albums', album_table_config)
+            album_table_config.num_records = num_records
+            return album_table_config
+        except FileNotFoundError:
+            return None
+
     def process_artist_table(self) -> Optional[DatasetTableConfig]:
         """Process the artist table.
 
@@ -133,11 +133,18 @@ class DatasetProcessorLFM2B(DatasetProcessorLFM):
         except FileNotFoundError:
             return None
 
-    def process_corrupt_table(self, table_name: str) -> Tuple[str, int]:
+    def process_corrupt_table(self, table_name: str, table_config: DatasetTableConfig) -> int:
         """Process a corrupt table that does not load correctly with pandas.
 
         Loading with the 'python-fwf' engine does not have issues, however the
         row values need to be manually split.
+
+        Args:
+            table_name: the name of the original table file without extension.
+            table_config: the configuration of the table to store the split rows with.
+
+        Returns:
+            the number of records in the stored table.
         """
         table_iterator = pd.read_table(
             os.path.join(self.dataset_dir, table_name + '.tsv.bz2'),
@@ -149,8 +156,7 @@ class DatasetProcessorLFM2B(DatasetProcessorLFM):
             chunksize=1000000
         )
 
-        file_name = TABLE_FILE_PREFIX + self.dataset_name + '_' + table_name + '.tsv.bz2'
-        file_path = os.path.join(self.dataset_dir, file_name)
+        file_path = os.path.join(self.dataset_dir, table_config.file.name)
         # remove existing file when present
         if os.path.isfile(file_path):
             os.remove(file_path)
@@ -159,17 +165,10 @@ class DatasetProcessorLFM2B(DatasetProcessorLFM):
         # process in chunks as splitting manually uses a lot of memory
         for _, dataframe in enumerate(table_iterator):
             dataframe = dataframe['fwf'].str.split('\t', expand=True)
-            dataframe.to_csv(
-                file_path,
-                mode='a',
-                sep='\t',
-                index=False,
-                header=False,
-                compression='bz2'
-            )
+            table_config.save_table(dataframe, self.dataset_dir, append=True)
             num_records += len(dataframe)
 
-        return file_name, num_records
+        return num_records
 
     def process_spotify_table(self) -> Optional[DatasetTableConfig]:
         """Process the spotify table.
@@ -201,19 +200,20 @@ class DatasetProcessorLFM2B(DatasetProcessorLFM):
         Returns:
             the track table configuration or None on failure.
         """
-        try:
-            file_name, num_records = self.process_corrupt_table('tracks')
-        except FileNotFoundError:
-            return None
-
-        return create_dataset_table_config(
-            file_name,
+        track_table_config = create_dataset_table_config(
+            self.get_table_file_name('tracks'),
             ['track_id'],
             ['artist_name', 'track_name'],
-            compression='bz2',
-            num_records=num_records
+            compression=self.compression
         )
 
+        try:
+            num_records = self.process_corrupt_table('tracks', track_table_config)
+            track_table_config.num_records = num_records
+            return track_table_config
+        except FileNotFoundError:
+            return None
+
     def process_user_artist_matrix(self) -> Optional[DatasetMatrixConfig]:
         """Process the user-artist-count matrix.
 
@@ -10,12 +10,12 @@ Utrecht University within the Software Project course.
 """
 
 import os
-from typing import Callable, List, Optional, Tuple
+from typing import Callable, Dict, List, Optional, Tuple
 
 import pandas as pd
 
+from ..dataset_compression import DEFAULT_COMPRESSION
 from ..dataset_config import create_dataset_table_config, DatasetMatrixConfig, DatasetTableConfig
-from ..dataset_constants import TABLE_FILE_PREFIX
 from .dataset_processor_lfm import DatasetProcessorLFM
 
 
@@ -35,14 +35,32 @@ class DatasetProcessorLFM360K(DatasetProcessorLFM):
     lfm-360-gender.json (optional)
     """
 
-    def __init__(self, dataset_dir: str, dataset_name: str):
+    def __init__(
+            self,
+            dataset_dir: str,
+            dataset_name: str,
+            *,
+            num_workers: int=1,
+            compression: Optional[str]=DEFAULT_COMPRESSION,
+            partition_events: bool=False):
         """Construct the DatasetProcessorLFM360K.
 
         Args:
             dataset_name: path of the dataset directory.
             dataset_name: name of the dataset (processor).
+            num_workers: the number of worker processes that run the table processors.
+            compression: the compression codec of the generated table files
+                or None to store them uncompressed.
+            partition_events: unused as no listening events are available for this dataset.
         """
-        DatasetProcessorLFM.__init__(self, dataset_dir, dataset_name)
+        DatasetProcessorLFM.__init__(
+            self,
+            dataset_dir,
+            dataset_name,
+            num_workers=num_workers,
+            compression=compression,
+            partition_events=partition_events
+        )
         # buffer for the user sha and artist name lists
         self.user_list = None
         self.artist_list = None
@@ -69,10 +87,10 @@ class DatasetProcessorLFM360K(DatasetProcessorLFM):
             the configuration of the user table.
         """
         return create_dataset_table_config(
-            TABLE_FILE_PREFIX + self.dataset_name + '_users.tsv.bz2',
+            self.get_table_file_name('users'),
             ['user_id'],
             ['user_sha'],
-            compression='bz2',
+            compression=self.compression,
             num_records=len(self.user_list)
         )
 
@@ -84,6 +102,20 @@ class DatasetProcessorLFM360K(DatasetProcessorLFM):
         """
         return [('user-artist-count', self.process_user_artist_matrix)]
 
+    def get_processor_dependencies(self) -> Dict[str, List[str]]:
+        """Get the dependencies between the table processors of the dataset.
+
+        The user and artist tables are generated from the user and artist lists
+        that are buffered by the user-artist-count matrix processor.
+
+        Returns:
+            a dictionary with the user and artist table dependencies.
+        """
+        return {
+            'user': ['user-artist-count'],
+            'artist': ['user-artist-count']
+        }
+
     def get_table_configs(self) -> List[Tuple[str, Callable[[], Optional[DatasetTableConfig]]]]:
         """Get table configuration processors.
 
@@ -251,10 +283,11 @@ class DatasetProcessorLFM360K(DatasetProcessorLFM):
 
         # create artist table configuration
         artist_table_config = create_dataset_table_config(
-            TABLE_FILE_PREFIX + self.dataset_name + '_artists.tsv.bz2',
+            self.get_table_file_name('artists'),
             artist_key,
             artist_columns,
-            compression='bz2',
+            categorical=['artist_gender'] if artist_gender is not None else None,
+            compression=self.compression,
             num_records=len(self.artist_list)
         )
 
@@ -315,10 +348,10 @@ class DatasetProcessorLFM360K(DatasetProcessorLFM):
         # create matrix by removing other columns
         user_artist_matrix = dataframe[['user_id', 'artist_id', 'matrix_count']]
         user_artist_matrix_table_config = create_dataset_table_config(
-            TABLE_FILE_PREFIX + self.dataset_name + '_user-artist-count_matrix.tsv.bz2',
+            self.get_table_file_name('user-artist-count_matrix'),
             ['user_id', 'artist_id'],
             ['matrix_count'],
-            compression='bz2',
+            compression=self.compression,
             foreign_keys=['user_id', 'artist_id']
         )
 
@@ -349,6 +382,7 @@ class DatasetProcessorLFM360K(DatasetProcessorLFM):
         else:
             for i in range(1, len(user_table.columns)):
                 user_table_config.columns += [user_table.columns[i]]
+            user_table_config.categorical = ['user_gender', 'user_country']
 
             # join user table with user ids
             user_table = pd.merge(user_sha_ids, user_table, how='left', on='user_sha')
@@ -16,7 +16,6 @@ import numpy as np
 
 from ..dataset_config import DATASET_RATINGS_EXPLICIT, RatingMatrixConfig
 from ..dataset_config import DatasetIndexConfig, DatasetMatrixConfig, DatasetTableConfig
-from ..dataset_constants import TABLE_FILE_PREFIX
 from .dataset_processor_base import DatasetProcessorBase
 
 
@@ -81,9 +80,9 @@ class DatasetProcessorML(DatasetProcessorBase, metaclass=ABCMeta):
 
             # update matrix configuration
             user_movie_matrix_table_config.file.name = \
-                TABLE_FILE_PREFIX + self.dataset_name + '_user-movie-rating_matrix.tsv.bz2'
+                self.get_table_file_name('user-movie-rating_matrix')
             user_movie_matrix_table_config.file.options.sep = None
-            user_movie_matrix_table_config.file.options.compression = 'bz2'
+            user_movie_matrix_table_config.file.options.compression = self.compression
             user_movie_matrix_table_config.file.options.header = False
 
             # store resulting matrix
@@ -15,7 +15,6 @@ import numpy as np
 
 from ..dataset_config import DatasetTableConfig
 from ..dataset_config import create_dataset_table_config
-from ..dataset_constants import TABLE_FILE_PREFIX
 from .dataset_processor_ml import DatasetProcessorML
 
 MOVIE_GENRES = [
@@ -115,10 +114,11 @@ class DatasetProcessorML100K(DatasetProcessorML):
         movie_table[genre_column] = genres_table.apply(lambda x: x.str.cat(sep='|'), axis=1)
 
         # update movie table definition
-        movie_table_config.file.name = TABLE_FILE_PREFIX + self.dataset_name + '_movies.tsv.bz2'
-        movie_table_config.file.options.compression = 'bz2'
+        movie_table_config.file.name = self.get_table_file_name('movies')
+        movie_table_config.file.options.compression = self.compression
         movie_table_config.file.options.sep = None
         movie_table_config.columns = movie_columns + [genre_column]
+        movie_table_config.categorical = [genre_column]
         movie_table_config.num_records = len(movie_table)
 
         # store the generated movie table
@@ -152,9 +152,10 @@ class DatasetProcessorML100K(DatasetProcessorML):
         user_table['user_occupation'] = user_table['user_occupation'].str.capitalize()
 
         # update user table configuration
-        user_table_config.file.name = TABLE_FILE_PREFIX + self.dataset_name + '_users.tsv.bz2'
-        user_table_config.file.options.compression = 'bz2'
+        user_table_config.file.name = self.get_table_file_name('users')
+        user_table_config.file.options.compression = self.compression
         user_table_config.file.options.sep = None
+        user_table_config.categorical = ['user_gender', 'user_occupation']
 
         # store the generated user table
         user_table_config.save_table(user_table, self.dataset_dir)
@@ -15,7 +15,6 @@ import pandas as pd
 
 from ..dataset_config import DatasetTableConfig
 from ..dataset_config import create_dataset_table_config
-from ..dataset_constants import TABLE_FILE_PREFIX
 from .dataset_processor_ml import DatasetProcessorML
 
 
@@ -141,6 +140,7 @@ class DatasetProcessorML25M(DatasetProcessorML):
             'movies.csv',
             ['movie_id'],
             ['movie_title', 'movie_genres'],
+            categorical=['movie_genres'],
             header=True,
             sep=','
         )
@@ -156,9 +156,9 @@ class DatasetProcessorML25M(DatasetProcessorML):
             movie_table = pd.merge(movie_table, link_table, how='left', on='movie_id')
 
             # update movie table configuration
-            movie_table_config.file.name = TABLE_FILE_PREFIX + self.dataset_name + '_movies.tsv.bz2'
+            movie_table_config.file.name = self.get_table_file_name('movies')
             movie_table_config.file.options.sep = None
-            movie_table_config.file.options.compression = 'bz2'
+            movie_table_config.file.options.compression = self.compression
             movie_table_config.file.options.header = False
             movie_table_config.columns += link_table_config.columns
 
@@ -1,8 +1,19 @@
 """This module contains random splitting functionality.
 
+The test rows of each user are sampled with a random generator that is seeded with both
+the seed of the splitter and the user, so that the split of a user does not depend on the
+other users in the dataframe. Splitting the dataframe in parts that contain all the rows
+of their users (e.g. user partitions) therefore yields the same rows as splitting it at once.
+
+This applies to the in-memory split as well, so that the streamed and in-memory sets hold
+the same rows. It is a change of behaviour: the test rows used to be sampled by lenskit's
+SampleFrac with an unseeded generator, so that seeded random splits of earlier versions
+select different test rows and are not reproduced (they were not reproducible between runs).
+
 Classes:
 
     RandomSplitter: can split randomly.
+    UserSampleFrac: sample the test rows of each user with a seed per user.
 
 Functions:
 
@@ -18,6 +29,7 @@ import time
 from typing import Any, Dict, Tuple
 
 import lenskit.crossfold as xf
+import numpy as np
 import pandas as pd
 from seedbank import numpy_rng
 
@@ -27,7 +39,8 @@ from .base_splitter import DataSplitter
 class RandomSplitter(DataSplitter):
     """Random Splitter.
 
-    Splits the dataframe into a train and test set randomly user-by-user.
+    Splits the dataframe into a train and test set randomly user-by-user,
+    where the test rows of each user only depend on the seed and the user.
     """
 
     def run(self, dataframe: pd.DataFrame) -> Tuple[pd.DataFrame, pd.DataFrame]:
@@ -40,11 +53,42 @@ class RandomSplitter(DataSplitter):
             the train and test set dataframes of the split.
         """
         rng_spec = numpy_rng(spec=self.params['seed'])
-        frac = xf.SampleFrac(self.test_ratio)
+        frac = UserSampleFrac(self.test_ratio, self.params['seed'])
         for train_set, test_set in xf.partition_users(dataframe, 1, frac, rng_spec=rng_spec):
             return train_set, test_set
 
 
+class UserSampleFrac(xf.PartitionMethod):
+    """Randomly select a fraction of the test rows of each user with a seed per user.
+
+    Public methods:
+
+    __call__
+    """
+
+    def __init__(self, frac: float, seed: int):
+        """Construct the sampler of the test rows.
+
+        Args:
+            frac: the fraction of the rows of each user to select for testing.
+            seed: the seed that is combined with the user to seed the sampling.
+        """
+        self.fraction = frac
+        self.seed = seed
+
+    def __call__(self, udf: pd.DataFrame) -> pd.DataFrame:
+        """Sample the test rows of a user.
+
+        Args:
+            udf: the rows of the user.
+
+        Returns:
+            the sampled test rows.
+        """
+        rng = np.random.default_rng([self.seed, int(udf['user'].iat[0])])
+        return udf.sample(frac=self.fraction, random_state=rng)
+
+
 def create_random_splitter(name: str, params: Dict[str, Any], **kwargs) -> RandomSplitter:
     """Create the Random Splitter.
 
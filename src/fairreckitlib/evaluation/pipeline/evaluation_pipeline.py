@@ -13,7 +13,6 @@ Utrecht University within the Software Project course.
 © Copyright Utrecht University (Department of Information and Computing Sciences)
 """
 
-import os
 import time
 from typing import Callable, List, Optional
 
@@ -24,6 +23,7 @@ from ...core.events.event_error import ON_FAILURE_ERROR, ON_RAISE_ERROR, ErrorEv
 from ...core.io.io_create import create_json
 from ...core.io.io_utility import load_json, save_json
 from ...core.pipeline.core_pipeline import CorePipeline
+from ...data.filter.filter_cache import SubgroupCache
 from ...data.filter.filter_config import DataSubsetConfig
 from ...data.filter.filter_event import FilterDataframeEventArgs
 from ...data.filter.filter_passes import filter_from_filter_passes
@@ -67,7 +67,9 @@ class EvaluationPipeline(CorePipeline):
             dataset: Dataset,
             data_filter_factory: GroupFactory,
             metric_category_factory: GroupFactory,
-            event_dispatcher: EventDispatcher):
+            event_dispatcher: EventDispatcher,
+            *,
+            subgroup_cache: SubgroupCache=None):
         """Construct the evaluation pipeline.
 
         Args:
@@ -75,11 +77,14 @@ class EvaluationPipeline(CorePipeline):
             data_filter_factory: the factory with available filters for all dataset-matrix pairs.
             metric_category_factory: the metric category factory with available metric factories.
             event_dispatcher: used to dispatch model/IO events when running the pipeline.
+            subgroup_cache: (optional) the cache of resolved subgroups to filter rows with,
+                which is shared with the data pipeline and the other evaluation pipelines.
         """
         CorePipeline.__init__(self, event_dispatcher)
         self.dataset = dataset
         self.data_filter_factory = data_filter_factory
         self.metric_category_factory = metric_category_factory
+        self.subgroup_cache = subgroup_cache
 
     def run(self,
             output_path: str,
@@ -218,7 +223,6 @@ class EvaluationPipeline(CorePipeline):
         )
 
         eval_sets = self.filter_set_rows(
-            os.path.split(output_path)[0],
             eval_sets,
             metric_config.subgroup
         )
@@ -283,7 +287,6 @@ class EvaluationPipeline(CorePipeline):
 
     def filter_set_rows(
             self,
-            output_dir: str,
             eval_sets: EvaluationSets,
             subgroup: Optional[DataSubsetConfig]) -> EvaluationSets:
         """Filter the evaluation set rows for the specified subgroup.
@@ -313,12 +316,12 @@ class EvaluationPipeline(CorePipeline):
         filter_factory = self.data_filter_factory
         if eval_sets.train is not None:
             eval_sets.train = filter_from_filter_passes(
-                self, output_dir, eval_sets.train, subgroup, filter_factory)
+                eval_sets.train, subgroup, filter_factory, self.subgroup_cache)
         if eval_sets.test is not None:
             eval_sets.test = filter_from_filter_passes(
-                self, output_dir, eval_sets.test, subgroup, filter_factory)
+                eval_sets.test, subgroup, filter_factory, self.subgroup_cache)
         eval_sets.ratings = filter_from_filter_passes(
-                self, output_dir, eval_sets.ratings, subgroup, filter_factory)
+            eval_sets.ratings, subgroup, filter_factory, self.subgroup_cache)
         end = time.time()
         self.event_dispatcher.dispatch(FilterDataframeEventArgs(
             ON_END_FILTER_RECS,
@@ -15,12 +15,13 @@ Utrecht University within the Software Project course.
 
 from dataclasses import dataclass
 import os
-from typing import List, Callable
+from typing import List, Callable, Optional
 
 from ...core.config.config_factories import GroupFactory
 from ...core.core_constants import MODEL_RATINGS_FILE
 from ...core.events.event_dispatcher import EventDispatcher
 from ...data.data_transition import DataTransition
+from ...data.filter.filter_cache import SubgroupCache
 from .evaluation_config import MetricConfig
 from .evaluation_pipeline import EvaluationPipeline, EvaluationSetPaths
 
@@ -34,6 +35,7 @@ class EvaluationPipelineConfig:
     data_filter_factory: the factory with available filters for all dataset-matrix pairs.
     eval_type_factory: the factory with available metric category factories.
     metric_config_list: list of metric configurations to compute.
+    subgroup_cache: the cache of resolved subgroups to filter rows with or None.
     """
 
     model_dirs: List[str]
@@ -41,6 +43,7 @@ class EvaluationPipelineConfig:
     data_filter_factory: GroupFactory
     eval_type_factory: GroupFactory
     metric_config_list: List[MetricConfig]
+    subgroup_cache: Optional[SubgroupCache]=None
 
 
 def run_evaluation_pipelines(
@@ -61,7 +64,8 @@ def run_evaluation_pipelines(
         data_transition.dataset,
         pipeline_config.data_filter_factory,
         pipeline_config.eval_type_factory,
-        event_dispatcher
+        event_dispatcher,
+        subgroup_cache=pipeline_config.subgroup_cache
     )
 
     # remove any metrics that have a subgroup that is not related to the data transition
@@ -21,6 +21,7 @@ from ..core.config.config_factories import GroupFactory
 from ..core.events.event_dispatcher import EventDispatcher
 from ..core.events.event_error import ON_FAILURE_ERROR, ErrorEventArgs
 from ..core.io.io_create import create_dir, create_json
+from ..data.filter.filter_cache import SubgroupCache
 from ..data.filter.filter_factory import KEY_DATA_SUBSET
 from ..data.data_factory import KEY_DATA
 from ..data.pipeline.data_run import DataPipelineConfig, run_data_pipelines
@@ -54,17 +55,28 @@ class ExperimentPipeline:
             self,
             data_registry: DataRegistry,
             experiment_factory: GroupFactory,
-            event_dispatcher: EventDispatcher):
+            event_dispatcher: EventDispatcher,
+            *,
+            data_cache_dir: str=None,
+            data_chunk_size: int=None):
         """Construct the ExperimentPipeline.
 
         Args:
             data_registry: the registry with available datasets.
             experiment_factory: the factory containing all three pipeline factories.
             event_dispatcher: to dispatch the experiment events.
+            data_cache_dir: (optional) the directory to cache the train and test sets
+                of the data pipelines in, which is shared among experiments and runs.
+            data_chunk_size: (optional) the number of rows to stream the dataset matrices
+                with in the data pipelines, or None to process the matrices in memory.
         """
         self.data_registry = data_registry
         self.experiment_factory = experiment_factory
         self.event_dispatcher = event_dispatcher
+        self.data_cache_dir = data_cache_dir
+        self.data_chunk_size = data_chunk_size
+        # the subgroups that are resolved to user/item ids are shared among all pipelines
+        self.subgroup_cache = SubgroupCache()
 
     def run(self,
             output_dir: str,
@@ -97,7 +109,10 @@ class ExperimentPipeline:
                 output_dir,
                 self.data_registry,
                 data_factory,
-                experiment_config.datasets
+                experiment_config.datasets,
+                self.data_cache_dir,
+                self.subgroup_cache,
+                self.data_chunk_size
             ),
             self.event_dispatcher,
             is_running
@@ -156,7 +171,8 @@ class ExperimentPipeline:
                         data_transition,
                         data_factory.get_factory(KEY_DATA_SUBSET),
                         evaluation_factory.get_factory(experiment_config.get_type()),
-                        experiment_config.evaluation
+                        experiment_config.evaluation,
+                        self.subgroup_cache
                     ),
                     self.event_dispatcher,
                     is_running
@@ -16,7 +16,7 @@ Utrecht University within the Software Project course.
 
 from dataclasses import dataclass
 import os
-from typing import Callable, Union
+from typing import Callable, Optional, Union
 
 from ..core.config.config_factories import GroupFactory
 from ..core.events.event_dispatcher import EventDispatcher
@@ -37,6 +37,8 @@ class ExperimentPipelineConfig:
     start_run: the experiment run to start with.
     num_runs: the number of runs of the experiment.
     num_threads: the max number of threads the experiment can use.
+    data_cache_dir: the directory to cache the train and test sets in or None to disable caching.
+    data_chunk_size: the number of rows to stream the dataset matrices with or None.
     """
 
     output_dir: str
@@ -46,6 +48,8 @@ class ExperimentPipelineConfig:
     start_run: int
     num_runs: int
     num_threads: int
+    data_cache_dir: Optional[str]=None
+    data_chunk_size: Optional[int]=None
 
 
 def run_experiment_pipelines(
@@ -78,7 +82,9 @@ def run_experiment_pipelines(
     experiment_pipeline = ExperimentPipeline(
         pipeline_config.data_registry,
         pipeline_config.experiment_factory,
-        event_dispatcher
+        event_dispatcher,
+        data_cache_dir=pipeline_config.data_cache_dir,
+        data_chunk_size=pipeline_config.data_chunk_size
     )
 
     start_run = pipeline_config.start_run
@@ -11,8 +11,10 @@ Utrecht University within the Software Project course.
 
 import errno
 import os
+from threading import Lock
 from typing import Any, Dict, Callable, List, Union
 
+from .core.config.config_factories import GroupFactory
 from .core.threading.thread_processor import ThreadProcessor
 from .data.data_factory import KEY_DATA
 from .data.filter.filter_constants import KEY_DATA_SUBSET
@@ -42,29 +44,56 @@ class RecommenderSystem:
     get_active_computations
     get_available_algorithms
     get_available_datasets
+    get_dataset_status
     get_available_data_filters
     get_available_metrics
     get_available_rating_converters
     get_available_splitters
     """
 
-    def __init__(self, data_dir: str, result_dir: str, verbose: bool=True):
+    def __init__(
+            self,
+            data_dir: str,
+            result_dir: str,
+            verbose: bool=True,
+            *,
+            num_dataset_workers: int=0,
+            data_cache_dir: str=None,
+            data_chunk_size: int=None):
         """Construct the RecommenderSystem.
 
         Initializes the data registry with available datasets on which the
         recommender system depends and therefore the data directory is expected to exist.
         The result directory however is created when non-existing.
+        Datasets that need processing are processed before the construction returns,
+        unless dataset workers are specified to process them in the background. These
+        datasets become available as soon as the processing is finished.
 
         Args:
             data_dir: path to the directory that contains the datasets.
             result_dir: path to the directory to store computation results.
             verbose: whether the data registry should give verbose output on startup.
+            num_dataset_workers: the number of background workers to process datasets,
+                or zero (default) to process the datasets before the construction returns.
+            data_cache_dir: (optional) path to the directory to cache the train and test sets
+                of the experiments in, so that experiments (runs) with the same seeded data
+                configuration reuse the sets. Expected to be outside the result directory.
+            data_chunk_size: (optional) the number of rows to stream the dataset matrices with,
+                so that matrices that do not fit in memory can be used in experiments.
 
         Raises:
             IOError: when the specified data directory does not exist.
         """
+        # the factory is rebuilt on the caller's thread when a dataset becomes available
+        self.factory_lock = Lock()
+        self.factory_outdated = False
         try:
-            self.data_registry = DataRegistry(data_dir, verbose=verbose)
+            self.data_registry = DataRegistry(
+                data_dir,
+                verbose=verbose,
+                num_workers=num_dataset_workers,
+                on_dataset_ready=self._on_dataset_ready
+            )
         except IOError as err:
             raise IOError('Failed to initialize DataRegistry: '
                           'unknown data directory => ' + data_dir) from err
@@ -73,6 +102,9 @@ class RecommenderSystem:
         if not os.path.isdir(self.result_dir):
             os.mkdir(self.result_dir)
 
+        self.data_cache_dir = data_cache_dir
+        self.data_chunk_size = data_chunk_size
+
         self.experiment_factory = create_experiment_factory(self.data_registry)
         self.thread_processor = ThreadProcessor()
 
@@ -135,11 +167,12 @@ class RecommenderSystem:
         if os.path.isdir(result_dir):
             raise IOError('Result already exists: ' + result_dir)
 
+        experiment_factory = self._get_experiment_factory()
         if validate_config:
             parser = ExperimentConfigParser(verbose)
             config = parser.parse_experiment_config(config.to_yml_format(),
                                                     self.data_registry,
-                                                    self.experiment_factory)
+                                                    experiment_factory)
             if config is None:
                 return False
 
@@ -150,11 +183,13 @@ class RecommenderSystem:
             pipeline_config=ExperimentPipelineConfig(
                 result_dir,
                 self.data_registry,
-                self.experiment_factory,
+                experiment_factory,
                 config,
                 0,
                 1,
-                num_threads
+                num_threads,
+                self.data_cache_dir,
+                self.data_chunk_size
             )
         ))
 
@@ -192,7 +227,7 @@ class RecommenderSystem:
             parser = ExperimentConfigParser(verbose)
             config = parser.parse_experiment_config_from_yml(file_path,
                                                              self.data_registry,
-                                                             self.experiment_factory)
+                                                             self._get_experiment_factory())
             if config is None:
                 return False
         except FileNotFoundError as err:
@@ -241,11 +276,12 @@ class RecommenderSystem:
             raise IOError('Result does not exist: ' + result_dir)
 
         config_path = os.path.join(result_dir, 'config')
+        experiment_factory = self._get_experiment_factory()
         try:
             parser = ExperimentConfigParser(verbose)
             config = parser.parse_experiment_config_from_yml(config_path,
                                                              self.data_registry,
-                                                             self.experiment_factory)
+                                                             experiment_factory)
             if config is None:
                 return False
         except FileNotFoundError as err:
@@ -258,11 +294,13 @@ class RecommenderSystem:
             pipeline_config=ExperimentPipelineConfig(
                 result_dir,
                 self.data_registry,
-                self.experiment_factory,
+                experiment_factory,
                 config,
                 resolve_experiment_start_run(result_dir),
                 num_runs,
-                num_threads
+                num_threads,
+                self.data_cache_dir,
+                self.data_chunk_size
             )
         ))
 
@@ -286,7 +324,7 @@ class RecommenderSystem:
         Returns:
             a dictionary with the availability of algorithms categorized by API.
         """
-        return self.experiment_factory.get_sub_availability(
+        return self._get_experiment_factory().get_sub_availability(
             KEY_MODELS,
             sub_type=model_type
         )
@@ -294,19 +332,57 @@ class RecommenderSystem:
     def get_available_datasets(self) -> Dict[str, Any]:
         """Get the available datasets of the recommender system.
 
+        Only the datasets that are ready to be used are available, the datasets
+        that are (still) being processed can be retrieved with get_dataset_status.
+
         Returns:
             a dictionary where the key corresponds to the dataset name and
                 the value corresponds to the matrix information dictionary.
         """
         return self.data_registry.get_info()
 
+    def get_dataset_status(self) -> Dict[str, Any]:
+        """Get the processing status of the datasets of the recommender system.
+
+        Returns:
+            a dictionary where the key corresponds to the dataset name and the value
+                is a dictionary with the 'state' (pending, processing, ready or failed)
+                and 'progress' (between 0.0 and 1.0) of the dataset.
+        """
+        return self.data_registry.get_status()
+
+    def _get_experiment_factory(self) -> GroupFactory:
+        """Get the experiment factory, which is rebuilt first when it is outdated.
+
+        Returns:
+            the factory with the data/model/evaluation pipeline factories.
+        """
+        with self.factory_lock:
+            if self.factory_outdated:
+                self.experiment_factory = create_experiment_factory(self.data_registry)
+                self.factory_outdated = False
+
+            return self.experiment_factory
+
+    def _on_dataset_ready(self, _: str) -> None:
+        """Mark the experiment factory outdated when a dataset is processed in the background.
+
+        The factory is not rebuilt on the worker thread, but on the thread that
+        requests it next, so that it is never swapped during an active request.
+
+        Args:
+            _: the name of the dataset that became available.
+        """
+        with self.factory_lock:
+            self.factory_outdated = True
+
     def get_available_data_filters(self) -> Dict[str, Any]:
         """Get the available data filters of the recommender system.
 
         Returns:
             a dictionary with the availability of data filters.
         """
-        return self.experiment_factory.get_sub_availability(
+        return self._get_experiment_factory().get_sub_availability(
             KEY_DATA,
             sub_type=KEY_DATA_SUBSET
         )
@@ -321,7 +397,7 @@ class RecommenderSystem:
         Returns:
             a dictionary with the availability of metrics categorized by evaluation type.
         """
-        return self.experiment_factory.get_sub_availability(
+        return self._get_experiment_factory().get_sub_availability(
             KEY_EVALUATION,
             sub_type=eval_type
         )
@@ -332,7 +408,7 @@ class RecommenderSystem:
         Returns:
             a dictionary with the availability of rating converters.
         """
-        return self.experiment_factory.get_sub_availability(
+        return self._get_experiment_factory().get_sub_availability(
             KEY_DATA,
             sub_type=KEY_RATING_CONVERTER
         )
@@ -343,7 +419,7 @@ class RecommenderSystem:
         Returns:
             a dictionary with the availability of data splitters.
         """
-        return self.experiment_factory.get_sub_availability(
+        return self._get_experiment_factory().get_sub_availability(
             KEY_DATA,
             sub_type=KEY_SPLITTING
         )
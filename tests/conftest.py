@@ -2,7 +2,8 @@
 
 Constants:
 
-    DATASET_DIR: the directory to where the dataset samples are stored.
+    DATASET_DIR: the directory to where a copy of the dataset samples is stored.
+    DATASET_SAMPLES_DIR: the directory to where the dataset samples are stored.
     TMP_DIR: the temporary directory that is used in the io_tmp_dir fixture.
     NUM_THREADS: the (maximum) number of threads used in the pipeline tests.
 
@@ -25,7 +26,10 @@ Utrecht University within the Software Project course.
 © Copyright Utrecht University (Department of Information and Computing Sciences)
 """
 
+import atexit
 import os
+import shutil
+import tempfile
 
 import numpy as np
 import pytest
@@ -51,11 +55,16 @@ from src.fairreckitlib.model.pipeline.model_event import \
 if np.__config__.get_info('openblas_info') and os.environ.get('OPENBLAS_NUM_THREADS') != '1':
     os.environ['OPENBLAS_NUM_THREADS'] = '1'
 
-DATASET_DIR = os.path.join('tests', 'datasets')
+DATASET_SAMPLES_DIR = os.path.join('tests', 'datasets')
 TMP_DIR = os.path.join('tests', 'tmp')
 
 NUM_THREADS = 1
 
+# the tests use a copy of the samples, as the datasets save (cache) files in their directory
+DATASET_DIR = os.path.join(tempfile.mkdtemp(), 'datasets')
+shutil.copytree(DATASET_SAMPLES_DIR, DATASET_DIR)
+atexit.register(shutil.rmtree, os.path.dirname(DATASET_DIR), True)
+
 
 @pytest.fixture(scope='package', name='data_registry')
 def fixture_data_registry() -> DataRegistry:
@@ -9,6 +9,8 @@ Functions:
     test_converter_interface_error: test interface error for not implemented functions.
     test_converter_factory: test if factories and converters are created correctly.
     test_apc_alc: test is listen count <= play count.
+    test_kl_converter: test the kl converter against a computation per user.
+    test_kl_converter_example: test the kl converter against a hand-computed example.
     test_to_explicit: test if ratings are converted correctly.
 
 This program has been developed by students from the bachelor Computer Science at
@@ -16,6 +18,7 @@ Utrecht University within the Software Project course.
 © Copyright Utrecht University (Department of Information and Computing Sciences)
 """
 
+import numpy as np
 import pandas as pd
 import pytest
 
@@ -64,6 +67,7 @@ def test_converter_interface_error() -> None:
     converter = DummyConverter()
 
     pytest.raises(NotImplementedError, converter.run, None)
+    pytest.raises(NotImplementedError, converter.run_chunked, None)
 
 
 def test_converter_factory(data_registry: DataRegistry) -> None:
@@ -115,6 +119,80 @@ def test_apc_alc(data_registry: DataRegistry, dataset_name: str, matrix_name: st
             + str(key) + ' ' + str(value) + ' ' + str(play[key]) + ' ' + \
             dataset_name + ' ' + matrix_name
 
+    assert play == dataframe.groupby('item')['rating'].sum().to_dict(), \
+        'expected the play count to be the sum of the ratings of each item'
+    assert listen == dataframe.groupby('item').size().to_dict(), \
+        'expected the listener count to be the number of ratings of each item'
+
+@pytest.mark.parametrize('dataset_name, matrix_name', artist_matrices)
+@pytest.mark.parametrize('method', ['APC', 'ALC'])
+
+def test_kl_converter(
+        data_registry: DataRegistry, dataset_name: str, matrix_name: str, method: str) -> None:
+    """Test the kl converter against a computation per user and in chunks."""
+    print('Testing', CONVERTER_KL, 'converter for', dataset_name, matrix_name, method)
+
+    converter_factory = create_rating_converter_factory(data_registry)
+    matrix_converter_factory = converter_factory.get_factory(dataset_name).get_factory(matrix_name)
+    converter = matrix_converter_factory.create(CONVERTER_KL, {'method': method})
+
+    dataframe = data_registry.get_set(dataset_name).load_matrix(matrix_name)
+    converted_df = converter.run(dataframe.copy())
+    assert (converted_df['rating'] >= 1).all(), 'expected the converted ratings to be at least 1'
+
+    counts = pd.Series(
+        count.calculate_apc(dataframe) if method == 'APC' else count.calculate_alc(dataframe)
+    )
+    for _, (user, user_df) in enumerate(converted_df.groupby('user')):
+        user_counts = dataframe.loc[user_df.index, 'rating'] if method == 'APC' else \
+            pd.Series(1.0, index=user_df.index)
+        p = user_counts.to_numpy(dtype=float) / user_counts.sum()
+        q = counts[user_df['item']].to_numpy() / counts[user_df['item']].sum()
+        kl_pq = max(np.sum(p * np.log(p / q)), 0.0)
+        kl_qp = max(np.sum(q * np.log(q / p)), 0.0)
+        if np.allclose(p, q):
+            assert np.isinf(user_df['rating']).all(), \
+                'expected an infinite score for a user with the global distribution'
+            continue
+
+        score = 1 / np.mean([1 - np.exp(-kl_pq), 1 - np.exp(-kl_qp)])
+        assert np.allclose(user_df['rating'], score), \
+            'expected the ratings of a user to be converted to the score of the user ' + str(user)
+
+    # the rows of a user are spread over multiple chunks
+    chunk_size = len(dataframe) // 3 + 1
+    chunked_df = pd.concat(converter.run_chunked(lambda: (
+        dataframe.iloc[i:i + chunk_size].copy() for i in range(0, len(dataframe), chunk_size)
+    )))
+    assert np.allclose(chunked_df['rating'], converted_df['rating'], rtol=1e-12), \
+        'expected the chunked conversion to match the conversion in memory'
+
+
+def test_kl_converter_example() -> None:
+    """Test the kl converter against a hand-computed example of the user scores."""
+    dataframe = pd.DataFrame({
+        'user': [0, 0, 1, 1, 2],
+        'item': [0, 1, 0, 1, 1],
+        'rating': [3.0, 1.0, 1.0, 1.0, 2.0]
+    })
+
+    # APC: both items are played 4 times, so that Q = (0.5, 0.5) for users 0 and 1
+    # user 0: P = (0.75, 0.25), KL(P||Q) = 0.130812, KL(Q||P) = 0.143841
+    # user 1: P = Q and user 2 has a single item, both have zero divergences
+    converted_df = KLConverter('kl', {'method': 'APC'}).run(dataframe.copy())
+    assert np.allclose(converted_df['rating'][:2], 7.794478, rtol=1e-6), \
+        'expected the score 2 / (2 - exp(-0.130812) - exp(-0.143841)) for user 0'
+    assert np.isinf(converted_df['rating'][2:]).all(), \
+        'expected an infinite score for the users with the global distribution'
+
+    # ALC: the items are listened by 2 and 3 users, so that Q = (0.4, 0.6) for users 0 and 1
+    # users 0 and 1: P = (0.5, 0.5), KL(P||Q) = 0.020411, KL(Q||P) = 0.020136
+    converted_df = KLConverter('kl', {'method': 'ALC'}).run(dataframe.copy())
+    assert np.allclose(converted_df['rating'][:4], 49.827782, rtol=1e-6), \
+        'expected the score 2 / (2 - exp(-0.020411) - exp(-0.020136)) for users 0 and 1'
+    assert np.isinf(converted_df['rating'][4]), \
+        'expected an infinite score for the user with a single item'
+
 @pytest.mark.parametrize('dataset_name, matrix_name', dataset_matrices)
 @pytest.mark.parametrize('modifier', rating_modifiers)
 
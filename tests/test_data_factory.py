@@ -3,6 +3,7 @@
 Functions:
 
     test_data_factory: test data factories to be derived from the correct base class.
+    test_data_modifier_params: test the caching of the data modifier parameters.
 
 This program has been developed by students from the bachelor Computer Science at
 Utrecht University within the Software Project course.
@@ -10,7 +11,9 @@ Utrecht University within the Software Project course.
 """
 
 from src.fairreckitlib.core.config.config_factories import Factory, GroupFactory
+from src.fairreckitlib.core.config.config_parameters import ConfigParameters
 from src.fairreckitlib.data.data_factory import create_data_factory
+from src.fairreckitlib.data.data_modifier import DataModifierFactory
 from src.fairreckitlib.data.filter.filter_constants import KEY_DATA_SUBSET
 from src.fairreckitlib.data.ratings.convert_constants import KEY_RATING_CONVERTER
 from src.fairreckitlib.data.split.split_constants import KEY_SPLITTING
@@ -32,3 +35,35 @@ def test_data_factory(data_registry: DataRegistry) -> None:
         'expected dataset rating converter group factory'
     assert isinstance(data_factory.get_factory(KEY_SPLITTING), Factory), \
         'expected dataset splitting factory'
+
+
+def test_data_modifier_params(data_registry: DataRegistry) -> None:
+    """Test the caching of the data modifier parameters until the dataset changes."""
+    dataset = data_registry.get_set(data_registry.get_available_sets()[0])
+    matrix_name = dataset.get_available_matrices()[0]
+
+    num_calls = []
+    def create_params(**kwargs) -> ConfigParameters:
+        num_calls.append(kwargs['column_name'])
+        return ConfigParameters()
+
+    factory = DataModifierFactory(matrix_name, dataset)
+    factory.add_obj('modifier', lambda name, params, **kwargs: None, create_params)
+
+    params = factory.create_params('modifier')
+    assert factory.create_params('modifier') is params, 'expected the parameters to be cached'
+    factory.get_available()
+    factory.create('modifier')
+    assert num_calls == ['modifier'], 'expected the parameters to be created only once'
+
+    # a change of the dataset invalidates the cached parameters
+    matrix_config = dataset.get_matrix_config(matrix_name)
+    matrix_config.table.num_records += 1
+    assert factory.create_params('modifier') is not params, \
+        'expected the parameters to be created again when the dataset changes'
+    matrix_config.table.num_records -= 1
+
+    factory.create_params('modifier')
+    factory.invalidate_params()
+    factory.create_params('modifier')
+    assert len(num_calls) == 4, 'expected the parameters to be created again when invalidated'
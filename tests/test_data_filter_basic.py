@@ -15,7 +15,9 @@ from src.fairreckitlib.data.filter.count_filter import CountFilter
 
 from src.fairreckitlib.data.set.dataset_registry import DataRegistry
 
-dataset = DataRegistry('tests/datasets').get_set('ML-100K-Sample')
+from .conftest import DATASET_DIR
+
+dataset = DataRegistry(DATASET_DIR).get_set('ML-100K-Sample')
 filter_kwargs = {'dataset': dataset, 'matrix_name': 'user-movie-rating'}
 
 class TestFilterAge:
@@ -0,0 +1,122 @@
+"""This module tests the filter passes that create a subset of a dataset matrix.
+
+Functions:
+
+    test_filter_from_filter_passes: test the union of filter passes of combined filters.
+    test_subgroup_cache: test filtering with the subgroups that are resolved to user/item ids.
+
+This program has been developed by students from the bachelor Computer Science at
+Utrecht University within the Software Project course.
+© Copyright Utrecht University (Department of Information and Computing Sciences)
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.fairreckitlib.data.filter.base_filter import DataFilter
+from src.fairreckitlib.data.filter.filter_cache import SubgroupCache
+from src.fairreckitlib.data.filter.filter_config import \
+    DataSubsetConfig, FilterConfig, FilterPassConfig
+from src.fairreckitlib.data.filter.filter_factory import create_filter_factory
+from src.fairreckitlib.data.filter.filter_passes import filter_from_filter_passes
+from src.fairreckitlib.data.set.dataset_registry import DataRegistry
+
+DATASET_NAME = 'LFM-360K-Sample'
+MATRIX_NAME = 'user-artist-count'
+
+
+FILTER_PASSES = [
+    FilterPassConfig([
+        FilterConfig('user_gender', {'values': ['Male']}),
+        FilterConfig('user_country_count', {'threshold': 10})
+    ]),
+    FilterPassConfig([FilterConfig('user_age', {'range': {'min': 18, 'max': 25}})]),
+    FilterPassConfig([
+        FilterConfig('user_gender', {'values': ['Female', None]}),
+        FilterConfig('user_age', {'range': {'min': 0, 'max': 30}})
+    ])
+]
+
+
+def create_dataframe(data_registry: DataRegistry) -> pd.DataFrame:
+    """Create the matrix dataframe with duplicate rows and a column with the row numbers."""
+    dataframe = data_registry.get_set(DATASET_NAME).load_matrix(MATRIX_NAME)
+    # duplicate rows are part of the dataframe and are expected to be kept
+    dataframe = pd.concat([dataframe, dataframe.iloc[:10]], ignore_index=True)
+    dataframe['row'] = np.arange(len(dataframe))
+    return dataframe
+
+
+def test_filter_from_filter_passes(data_registry: DataRegistry) -> None:
+    """Test that the filters of a pass are combined and the passes are united."""
+    filter_factory = create_filter_factory(data_registry)
+    filter_matrix_factory = filter_factory.get_factory(DATASET_NAME).get_factory(MATRIX_NAME)
+    dataframe = create_dataframe(data_registry)
+    filter_passes = FILTER_PASSES
+
+    # the filters of a pass are applied in order, thus counts only include the previous rows
+    expected_rows = set()
+    for filter_pass in filter_passes:
+        result = dataframe
+        for filter_config in filter_pass.filters:
+            result = filter_matrix_factory.create(
+                filter_config.name,
+                filter_config.params
+            ).run(result)
+        expected_rows.update(result['row'])
+
+    result = filter_from_filter_passes(
+        dataframe,
+        DataSubsetConfig(DATASET_NAME, MATRIX_NAME, filter_passes),
+        filter_factory
+    )
+    assert result['row'].tolist() == sorted(expected_rows), \
+        'expected the rows of any filter pass in the original order'
+    assert list(result.columns) == list(dataframe.columns), \
+        'did not expect the columns of the dataframe to be changed'
+    assert np.array_equal(result.index, np.arange(len(result))), \
+        'expected the subset to have a new index'
+
+    pytest.raises(RuntimeError, filter_from_filter_passes, dataframe, DataSubsetConfig(
+        DATASET_NAME,
+        MATRIX_NAME,
+        [FilterPassConfig([FilterConfig('user_country_count', {'threshold': len(dataframe) + 1})])]
+    ), filter_factory)
+
+
+def test_subgroup_cache(data_registry: DataRegistry, monkeypatch: pytest.MonkeyPatch) -> None:
+    """Test filtering with the subgroups that are resolved to the qualifying user/item ids."""
+    filter_factory = create_filter_factory(data_registry)
+    dataframe = create_dataframe(data_registry)
+    subset = DataSubsetConfig(DATASET_NAME, MATRIX_NAME, FILTER_PASSES)
+    subgroup_cache = SubgroupCache()
+
+    num_resolved = []
+    create_id_mask = DataFilter.create_id_mask
+
+    def on_create_id_mask(self):
+        num_resolved.append(self.get_name())
+        return create_id_mask(self)
+
+    monkeypatch.setattr(DataFilter, 'create_id_mask', on_create_id_mask)
+
+    # the subsets of the dataframe resemble the train, test and rating sets
+    for rows in [slice(None), slice(0, None, 2), slice(1, None, 3)]:
+        result = filter_from_filter_passes(dataframe.iloc[rows], subset, filter_factory,
+                                           subgroup_cache)
+        expected = filter_from_filter_passes(dataframe.iloc[rows], subset, filter_factory)
+        pd.testing.assert_frame_equal(result, expected)
+
+    # the count filter is not resolved as it depends on the rows of the dataframe
+    assert num_resolved == ['user_gender', 'user_age', 'user_gender', 'user_age'], \
+        'expected the subgroup to be resolved only once'
+
+    subgroup = subgroup_cache.get_subgroup(DataSubsetConfig(
+        DATASET_NAME,
+        MATRIX_NAME,
+        [FilterPassConfig(list(f.filters)) for f in FILTER_PASSES]
+    ), None)
+    assert subgroup[0] is None, 'did not expect the pass with the count filter to be resolved'
+    assert [list(id_masks) for id_masks in subgroup[1:]] == [['user'], ['user']], \
+        'expected the passes of user attributes to be resolved to the qualifying user ids'
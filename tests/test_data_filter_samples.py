@@ -13,8 +13,10 @@ from src.fairreckitlib.data.filter.filter_factory import create_filter_factory
 from src.fairreckitlib.data.set.dataset_registry import DataRegistry
 from src.fairreckitlib.data.set.dataset import add_dataset_columns
 
+from .conftest import DATASET_DIR
 
-dataset_registry = DataRegistry('tests/datasets')
+
+dataset_registry = DataRegistry(DATASET_DIR)
 dataset_matrices = [
     ('ML-100K-Sample', 'user-movie-rating'),
     ('ML-25M-Sample', 'user-movie-rating'),
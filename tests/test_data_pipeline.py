@@ -7,6 +7,11 @@ Functions:
     test_data_pipeline_early_stop: test the early stopping of the data pipeline.
     test_run_data_pipelines_failures: test data pipeline run failure for warnings and errors.
     test_run_data_pipelines: test the data pipeline (run) integration.
+    test_run_data_pipelines_cache: test reusing the cached train and test sets of the data pipeline.
+    test_run_data_pipelines_streaming: test streaming the dataset matrices in the data pipeline.
+    test_data_cache_key: test the data cache key for changes of the files that the sets depend on.
+    parse_rows: parse the values of tab separated lines into sorted rows.
+    read_lines: read the lines of a file.
     create_data_matrix_config_list: create data matrix configuration list for all datasets.
 
 This program has been developed by students from the bachelor Computer Science at
@@ -15,17 +20,22 @@ Utrecht University within the Software Project course.
 """
 
 import os
-from typing import List
+import shutil
+from typing import List, Tuple
 
 import pytest
 
 from src.fairreckitlib.core.events.event_dispatcher import EventDispatcher
 from src.fairreckitlib.data.data_factory import create_data_factory
+from src.fairreckitlib.data.filter.filter_config import FilterConfig, FilterPassConfig
+from src.fairreckitlib.data.pipeline.data_cache import get_data_cache_key
 from src.fairreckitlib.data.pipeline.data_config import DataMatrixConfig
-from src.fairreckitlib.data.pipeline.data_pipeline import DataPipeline
+from src.fairreckitlib.data.pipeline.data_event import ON_LOAD_CACHED_SETS
+from src.fairreckitlib.data.pipeline.data_pipeline import STREAM_MATRIX_DTYPES, DataPipeline
 from src.fairreckitlib.data.pipeline.data_run import DataPipelineConfig, run_data_pipelines
 from src.fairreckitlib.data.ratings.convert_config import ConvertConfig
-from src.fairreckitlib.data.ratings.convert_constants import CONVERTER_RANGE, RATING_TYPE_THRESHOLD
+from src.fairreckitlib.data.ratings.convert_constants import CONVERTER_KL, CONVERTER_RANGE
+from src.fairreckitlib.data.ratings.convert_constants import RATING_TYPE_THRESHOLD
 from src.fairreckitlib.data.set.dataset_config import DatasetFileConfig, FileOptionsConfig
 from src.fairreckitlib.data.set.dataset_registry import DataRegistry
 from src.fairreckitlib.data.split.split_config import SplitConfig, create_default_split_config
@@ -270,6 +280,202 @@ def test_run_data_pipelines(
             'expected saved test set in data transition output directory'
 
 
+def test_run_data_pipelines_cache(
+        io_tmp_dir: str,
+        data_registry: DataRegistry,
+        data_event_dispatcher: EventDispatcher,
+        monkeypatch: pytest.MonkeyPatch) -> None:
+    """Test reusing the cached train and test sets of seeded data matrix configurations."""
+    cache_dir = os.path.join(io_tmp_dir, 'cache')
+    data_config_list = create_data_matrix_config_list(data_registry, 1)
+    unseeded_config = data_config_list[0]
+    for data_config in data_config_list:
+        data_config.splitting = SplitConfig('random', {'seed': 100}, 0.2)
+
+    cached_sets = []
+    data_event_dispatcher.add_listener(
+        ON_LOAD_CACHED_SETS,
+        None,
+        (lambda _, args, **kwargs: cached_sets.append(args.train_set_path), None)
+    )
+
+    data_transitions = []
+    for run in range(2):
+        output_dir = os.path.join(io_tmp_dir, 'run_' + str(run))
+        os.mkdir(output_dir)
+        if run > 0:
+            # the second run is expected to skip loading the dataset matrices entirely
+            monkeypatch.setattr(DataPipeline, 'load_from_dataset', None)
+
+        data_transitions.append(run_data_pipelines(
+            DataPipelineConfig(
+                output_dir,
+                data_registry,
+                create_data_factory(data_registry),
+                data_config_list,
+                cache_dir
+            ),
+            data_event_dispatcher,
+            is_always_running
+        ))
+
+    assert len(os.listdir(cache_dir)) == len(data_config_list), \
+        'expected a cache entry for each data matrix configuration'
+    assert cached_sets == [t.train_set_path for t in data_transitions[1]], \
+        'expected the sets of the second run to be loaded from the cache'
+
+    for computed, cached in zip(data_transitions[0], data_transitions[1]):
+        assert computed.output_dir != cached.output_dir, \
+            'expected the cached sets to be stored in the output directory of the run'
+        for computed_path, cached_path in [(computed.train_set_path, cached.train_set_path),
+                                           (computed.test_set_path, cached.test_set_path)]:
+            with open(computed_path, 'rb') as computed_file, open(cached_path, 'rb') as file:
+                assert computed_file.read() == file.read(), 'expected the same sets'
+        assert computed.rating_scale == cached.rating_scale, 'expected the same rating scale'
+
+    dataset = data_registry.get_set(unseeded_config.dataset)
+    unseeded_config.splitting = create_default_split_config()
+    assert get_data_cache_key(dataset, unseeded_config) is None, \
+        'did not expect a configuration without a random seed to be cached'
+
+
+def test_run_data_pipelines_streaming(
+        io_tmp_dir: str,
+        data_registry: DataRegistry,
+        data_event_dispatcher: EventDispatcher) -> None:
+    """Test streaming the dataset matrices in user partitions through the data pipeline."""
+    data_config_list = create_data_matrix_config_list(data_registry, 1)
+    for data_config in data_config_list:
+        data_config.splitting = SplitConfig('random', {'seed': 100}, 0.2)
+        if 'artist' in data_config.matrix:
+            data_config.converter = ConvertConfig(CONVERTER_KL, {'method': 'APC'})
+        if data_config.dataset == 'LFM-360K-Sample':
+            data_config.filter_passes = [
+                FilterPassConfig([FilterConfig('user_gender', {'values': ['Male']})]),
+                FilterPassConfig([FilterConfig('user_age', {'range': {'min': 18, 'max': 25}})])
+            ]
+
+    # the chunks are read with the same dtypes, regardless of the values in each chunk
+    for _, data_config in enumerate(data_config_list):
+        chunks = data_registry.get_set(data_config.dataset).load_matrix(
+            data_config.matrix, 7, dtype=STREAM_MATRIX_DTYPES)
+        for _, chunk in enumerate(chunks):
+            assert all(chunk[name].dtype == STREAM_MATRIX_DTYPES[name] for name in chunk), \
+                'expected the matrix chunks to be read with the explicit dtypes'
+
+    def run_pipelines(chunk_size):
+        output_dir = os.path.join(io_tmp_dir, 'run_' + str(len(os.listdir(io_tmp_dir))))
+        os.mkdir(output_dir)
+        data_transitions = run_data_pipelines(
+            DataPipelineConfig(
+                output_dir,
+                data_registry,
+                create_data_factory(data_registry),
+                data_config_list,
+                chunk_size=chunk_size
+            ),
+            data_event_dispatcher,
+            is_always_running
+        )
+        assert len(data_transitions) == len(data_config_list), \
+            'expected data transition for each data matrix configuration'
+        for _, data_transition in enumerate(data_transitions):
+            assert sorted(os.listdir(data_transition.output_dir)) == \
+                ['test_set.tsv', 'train_set.tsv'], \
+                'did not expect the user partitions to remain in the output directory'
+
+        return [(read_lines(t.train_set_path), read_lines(t.test_set_path), t.rating_scale)
+                for t in data_transitions]
+
+    in_memory = run_pipelines(None)
+    # a single partition holds all the users
+    streamed = run_pipelines(10 ** 9)
+
+    # small chunks spread the users over many partitions
+    for chunk_size in [25, 7]:
+        assert run_pipelines(chunk_size) == streamed, \
+            'expected the same sets for a fixed seed regardless of the chunk size'
+
+    # the streamed ratings are floats, which are compared with the parsed rows in memory
+    for (train_set, test_set, rating_scale), expected in zip(streamed, in_memory):
+        assert parse_rows(train_set) == parse_rows(expected[0]), \
+            'expected the same train set rows'
+        assert parse_rows(test_set) == parse_rows(expected[1]), 'expected the same test set rows'
+        assert rating_scale == expected[2], 'expected the same rating scale'
+
+    # filters that depend on the rows of the matrix can not be streamed
+    data_pipeline = DataPipeline(
+        create_data_factory(data_registry),
+        data_event_dispatcher,
+        chunk_size=25
+    )
+    data_config = next(c for c in data_config_list if c.dataset == 'LFM-360K-Sample')
+    data_config.filter_passes = [
+        FilterPassConfig([FilterConfig('user_country_count', {'threshold': 2})])
+    ]
+    error_info = pytest.raises(
+        RuntimeError,
+        data_pipeline.run,
+        io_tmp_dir,
+        data_registry.get_set(data_config.dataset),
+        data_config,
+        is_always_running
+    )
+    assert 'user_country_count' in str(error_info.value), \
+        'expected the error to name the filter that can not be streamed'
+
+
+def test_data_cache_key(data_registry: DataRegistry, io_tmp_dir: str) -> None:
+    """Test the data cache key for changes of the files that the train and test sets depend on."""
+    dataset_name = 'LFM-360K-Sample'
+    shutil.copytree(
+        data_registry.get_set(dataset_name).data_dir,
+        os.path.join(io_tmp_dir, dataset_name)
+    )
+    dataset = DataRegistry(io_tmp_dir).get_set(dataset_name)
+    matrix_name = 'user-artist-count'
+    data_config = DataMatrixConfig(
+        dataset_name,
+        matrix_name,
+        [FilterPassConfig([FilterConfig('user_gender', {'values': ['Male']})])],
+        None,
+        SplitConfig('random', {'seed': 100}, 0.2)
+    )
+
+    def touch(file_name: str) -> None:
+        """Move the modification time of the dataset file forward."""
+        file_path = os.path.join(dataset.data_dir, file_name)
+        file_stat = os.stat(file_path)
+        os.utime(file_path, ns=(file_stat.st_atime_ns, file_stat.st_mtime_ns + 1000000000))
+
+    cache_key = get_data_cache_key(dataset, data_config)
+    assert get_data_cache_key(dataset, data_config, streamed=True) != cache_key, \
+        'expected the streamed sets to have a different key, as their rows are ordered by user'
+
+    touch(dataset.get_table_config('artist').file.name)
+    assert get_data_cache_key(dataset, data_config) == cache_key, \
+        'did not expect a change of a table that is not filtered on to change the key'
+
+    for file_name in [dataset.get_table_config('user').file.name,
+                      dataset.get_matrix_config(matrix_name).user.file_name,
+                      dataset.get_matrix_config(matrix_name).item.file_name]:
+        touch(file_name)
+        assert get_data_cache_key(dataset, data_config) != cache_key, \
+            'expected a change of the filtered table or the indices to change the key'
+        cache_key = get_data_cache_key(dataset, data_config)
+
+
+def parse_rows(lines: List[str]) -> List[Tuple[float, ...]]:
+    """Parse the values of the tab separated lines and sort the resulting rows."""
+    return sorted(tuple(float(value) for value in line.split('\t')) for line in lines)
+
+
+def read_lines(file_path: str) -> List[str]:
+    """Read the lines of the file with the specified path."""
+    with open(file_path, 'r', encoding='utf-8') as file:
+        return file.read().splitlines()
+
+
 def create_data_matrix_config_list(
         datasets_registry: DataRegistry, num_duplicates: int) -> List[DataMatrixConfig]:
     """Create data matrix configuration list for each available dataset matrix."""
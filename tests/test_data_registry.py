@@ -7,6 +7,8 @@ Functions:
     test_data_registry_get_available_sets: test the available sets of a data registry.
     test_data_registry_get_info: test dataset information of a data registry.
     test_data_registry_get_set: test the dataset retrieval from a data registry.
+    test_data_registry_snapshot: test the registry snapshot and lazy dataset creation.
+    test_data_registry_background_processing: test processing datasets in the background.
 
 This program has been developed by students from the bachelor Computer Science at
 Utrecht University within the Software Project course.
@@ -14,16 +16,20 @@ Utrecht University within the Software Project course.
 """
 
 import os
+import shutil
 
 import pandas as pd
 import pytest
 
 from src.fairreckitlib.core.events.event_dispatcher import EventDispatcher
 from src.fairreckitlib.core.io.io_create import create_dir
+from src.fairreckitlib.core.io.io_utility import load_json, load_yml, save_yml
 from src.fairreckitlib.data.set.dataset import Dataset
 from src.fairreckitlib.data.set.dataset_config_parser import DatasetConfigParser
-from src.fairreckitlib.data.set.dataset_constants import DATASET_CONFIG_FILE
-from src.fairreckitlib.data.set.dataset_registry import DataRegistry
+from src.fairreckitlib.data.set.dataset_constants import \
+    DATASET_CONFIG_FILE, DATA_REGISTRY_FILE, KEY_DATASET
+from src.fairreckitlib.data.set.dataset_registry import DataRegistry, \
+    DATASET_ML_100K, DATASET_STATE_FAILED, DATASET_STATE_READY, KEY_DIR
 from .conftest import DATASET_DIR
 
 
@@ -108,3 +114,98 @@ def test_data_registry_get_set(data_registry: DataRegistry) -> None:
 
         assert bool(dataset), 'expected known dataset to be retrieved'
         assert isinstance(dataset, Dataset), 'expected dataset to be retrieved'
+
+
+def test_data_registry_snapshot(data_registry: DataRegistry, io_tmp_dir: str) -> None:
+    """Test the registry snapshot and lazy dataset creation of a data registry."""
+    for dataset_name in data_registry.get_available_sets():
+        dataset = data_registry.get_set(dataset_name)
+        shutil.copytree(dataset.data_dir, os.path.join(io_tmp_dir, dataset_name))
+
+    # test success for creating the snapshot on construction
+    DataRegistry(io_tmp_dir)
+    snapshot_file_path = os.path.join(io_tmp_dir, DATA_REGISTRY_FILE)
+    assert os.path.isfile(snapshot_file_path), \
+        'expected registry snapshot to be saved in the data directory'
+    assert len(load_json(snapshot_file_path)) == len(data_registry.get_available_sets()), \
+        'expected all datasets to be present in the registry snapshot'
+
+    # test success for constructing from the snapshot without creating the datasets
+    snapshot_registry = DataRegistry(io_tmp_dir)
+    assert sorted(snapshot_registry.get_available_sets()) == \
+        sorted(data_registry.get_available_sets()), \
+        'expected the same datasets to be available from the registry snapshot'
+    for dataset_name in snapshot_registry.get_available_sets():
+        assert snapshot_registry.registry[dataset_name] is None, \
+            'did not expect dataset to be created before it is retrieved'
+
+    assert snapshot_registry.get_info() == data_registry.get_info(), \
+        'expected dataset info to be the same from the registry snapshot'
+
+    for dataset_name in snapshot_registry.get_available_sets():
+        dataset = snapshot_registry.get_set(dataset_name)
+        assert isinstance(dataset, Dataset), 'expected dataset to be created on retrieval'
+        assert dataset.config == data_registry.get_set(dataset_name).config, \
+            'expected dataset configuration to be the same from the registry snapshot'
+        assert snapshot_registry.get_set(dataset_name) is dataset, \
+            'expected dataset to be created only once'
+
+    # test success for invalidating a snapshot entry when the configuration changes
+    dataset_name = data_registry.get_available_sets()[0]
+    config_file_path = os.path.join(io_tmp_dir, dataset_name, DATASET_CONFIG_FILE)
+    config = load_yml(config_file_path)
+    config[KEY_DATASET] = 'changed'
+    save_yml(config_file_path, config)
+
+    changed_registry = DataRegistry(io_tmp_dir)
+    assert 'changed' in changed_registry.get_available_sets(), \
+        'expected changed dataset configuration to be parsed again'
+    assert dataset_name not in changed_registry.get_available_sets(), \
+        'did not expect outdated snapshot entry to be available'
+
+    # test success for removing a snapshot entry when the dataset is deleted afterwards
+    deleted_name = next(name for name in changed_registry.get_available_sets()
+                        if changed_registry.registry[name] is None)
+    deleted_dir = changed_registry.entries[deleted_name][KEY_DIR]
+    shutil.rmtree(os.path.join(io_tmp_dir, deleted_dir))
+    assert deleted_name not in changed_registry.get_available_sets(), \
+        'did not expect deleted dataset to be available'
+    assert deleted_name not in changed_registry.get_info(), \
+        'did not expect deleted dataset info to be available'
+    assert changed_registry.get_set(deleted_name) is None, \
+        'did not expect deleted dataset to be retrieved'
+
+
+def test_data_registry_background_processing(io_tmp_dir: str) -> None:
+    """Test processing datasets in the background of a data registry."""
+    shutil.copytree(
+        os.path.join('tests', 'unprocessed_sets', DATASET_ML_100K),
+        os.path.join(io_tmp_dir, DATASET_ML_100K)
+    )
+    failing_processors = [name for name in DataRegistry(DATASET_DIR).get_available_processors()
+                          if name != DATASET_ML_100K]
+    for processor_name in failing_processors:
+        os.mkdir(os.path.join(io_tmp_dir, processor_name))
+
+    ready_sets = []
+    data_registry = DataRegistry(io_tmp_dir, num_workers=2, on_dataset_ready=ready_sets.append)
+    status = data_registry.get_status()
+    assert len(status) == len(failing_processors) + 1, \
+        'expected status to be available for all datasets that are processed'
+
+    assert data_registry.wait_for_processing(), 'expected dataset processing to finish'
+    status = data_registry.get_status()
+    assert status[DATASET_ML_100K]['state'] == DATASET_STATE_READY, \
+        'expected dataset to be ready after processing succeeded'
+    assert status[DATASET_ML_100K]['progress'] == 1.0, \
+        'expected a ready dataset to be completely processed'
+    for processor_name in failing_processors:
+        assert status[processor_name]['state'] == DATASET_STATE_FAILED, \
+            'expected dataset to fail processing for a directory without dataset files'
+
+    assert data_registry.get_available_sets() == [DATASET_ML_100K], \
+        'expected only the ready dataset to be available'
+    assert ready_sets == [DATASET_ML_100K], \
+        'expected callback to be called for the processed dataset'
+    assert isinstance(data_registry.get_set(DATASET_ML_100K), Dataset), \
+        'expected processed dataset to be retrieved'
@@ -12,6 +12,7 @@ Functions:
     test_split_classes: test split classes.
     test_temp_split: test temporal splitter.
     test_random_split: test random splitter.
+    test_random_split_seed: test random splitter to split each user with the seed.
 
 This program has been developed by students from the bachelor Computer Science at
 Utrecht University within the Software Project course.
@@ -159,3 +160,34 @@ def test_random_split(
     ratio = len(test.index) / (len(train.index) + len(test.index))
     assert (ratio * 0.9) < ratio < (ratio * 1.1), \
         'Test set should be around ' + str(ratio) + ': ' + dataset_name + ' ' + matrix_name
+
+
+@pytest.mark.parametrize('dataset_name, matrix_name', dataset_matrices)
+def test_random_split_seed(
+        data_registry: DataRegistry, dataset_name: str, matrix_name: str) -> None:
+    """Test if the random split of each user only depends on the seed and the user."""
+    print('Testing', SPLIT_RANDOM, 'split seed for', dataset_name, matrix_name)
+
+    random_split = split_factory.create(SPLIT_RANDOM, {'seed': 100}, **split_kwargs)
+    dataframe = data_registry.get_set(dataset_name).load_matrix(matrix_name)
+    (train, test) = random_split.run(dataframe)
+
+    (train_, test_) = random_split.run(dataframe)
+    pd.testing.assert_frame_equal(train, train_)
+    pd.testing.assert_frame_equal(test, test_)
+
+    # a new splitter with the same seed is expected to reproduce the split
+    (_, test_) = split_factory.create(SPLIT_RANDOM, {'seed': 100}, **split_kwargs).run(
+        dataframe)
+    pd.testing.assert_frame_equal(test, test_)
+    (_, test_) = split_factory.create(SPLIT_RANDOM, {'seed': 101}, **split_kwargs).run(
+        dataframe)
+    assert not test.index.equals(test_.index), 'expected another seed to select other rows'
+
+    # splitting the users separately is expected to select the same test rows
+    is_even = dataframe['user'] % 2 == 0
+    test_rows = []
+    for _, user_df in enumerate([dataframe[is_even], dataframe[~is_even]]):
+        test_rows.extend(random_split.run(user_df)[1].index)
+    assert sorted(test_rows) == sorted(test.index), \
+        'expected the same test rows when the users are split separately'
@@ -14,12 +14,19 @@ Functions:
     test_dataset_get_table_config: test the retrieval of table configurations from a dataset.
     test_dataset_get_table_info: test the retrieval of information from tables of a dataset.
     test_dataset_load_matrix: test the matrix loading of a dataset.
+    test_dataset_load_matrix_csr: test the (cached) CSR matrix loading of a dataset.
+    test_dataset_csr_matrix_cached: test the CSR matrix cache against changes of the source.
     test_dataset_load_indices: test the user/item indices loading of a dataset.
+    test_dataset_invalidate_indices: test the invalidation of the cached user/item indices.
     test_dataset_read_matrix: test reading the matrix tables of a dataset.
     test_dataset_read_table: test reading the available tables of a dataset.
     test_dataset_resolve_ids: test the index resolving functionality of a dataset.
     test_add_dataset_columns: test adding columns to a dataframe related to a dataset.
+    test_dataset_attribute_arrays: test the (cached) attribute arrays of a dataset matrix.
     test_dataset_processors: test the integration of the dataset processors.
+    test_dataset_storage_migration: test migrating the storage of the datasets.
+    test_dataset_categorical_table: test reading the categorical columns of a table.
+    assert_dataset_tables_equal: assert the tables of two datasets to be equal.
     assert_data_table_loading: assert table loading according to a table configuration.
     assert_data_table_and_columns: assert table (type), number of rows and requested columns.
 
@@ -29,22 +36,29 @@ Utrecht University within the Software Project course.
 """
 
 import os
+import shutil
 from typing import Any, Callable, List, Optional
 
 import pytest
 
 import numpy as np
 import pandas as pd
+from scipy import sparse
 
 from src.fairreckitlib.core.events.event_dispatcher import EventDispatcher
-from src.fairreckitlib.core.io.io_delete import delete_file
+from src.fairreckitlib.core.io.io_delete import delete_dir, delete_file
 from src.fairreckitlib.data.set.dataset import Dataset, add_dataset_columns
 from src.fairreckitlib.data.set.dataset_config import \
-    DatasetConfig, DatasetMatrixConfig, DatasetTableConfig, DatasetFileConfig
+    DatasetConfig, DatasetMatrixConfig, DatasetTableConfig, DatasetFileConfig, \
+    create_dataset_table_config
 from src.fairreckitlib.data.set.dataset_config_parser import DatasetConfigParser
 from src.fairreckitlib.data.set.dataset_constants import \
-    KEY_MATRIX, DATASET_SPLIT_DELIMITER, DATASET_CONFIG_FILE, TABLE_FILE_PREFIX
+    KEY_MATRIX, DATASET_SPLIT_DELIMITER, DATASET_CONFIG_FILE, DATA_REGISTRY_FILE, \
+    MATRIX_CSR_SUFFIX, TABLE_FILE_PREFIX
+from src.fairreckitlib.data.set.dataset_migration import migrate_data_dir_storage
 from src.fairreckitlib.data.set.dataset_registry import DataRegistry
+from src.fairreckitlib.data.set.dataset_storage import STORAGE_NPY
+from src.fairreckitlib.data.set.dataset_storage import is_csr_matrix_cached, save_csr_matrix
 
 
 def create_dataset_with_dummy_matrix(
@@ -264,6 +278,73 @@ def test_dataset_load_matrix(data_registry: DataRegistry) -> None:
                     'expected \'timestamp\' column to be present in the matrix'
 
 
+def test_dataset_load_matrix_csr(data_registry: DataRegistry) -> None:
+    """Test the (cached) CSR matrix loading of a dataset."""
+    for dataset_name in data_registry.get_available_sets():
+        dataset = data_registry.get_set(dataset_name)
+
+        assert not bool(dataset.load_matrix_csr('unknown')), \
+            'did not expect unknown matrix to be loaded'
+
+        for matrix_name in dataset.get_available_matrices():
+            matrix = dataset.load_matrix(matrix_name)
+            csr_dir = os.path.join(
+                dataset.data_dir,
+                TABLE_FILE_PREFIX + dataset_name + '_' + matrix_name + MATRIX_CSR_SUFFIX
+            )
+
+            # test success for creating the cache and loading it afterwards
+            for _ in range(2):
+                csr_matrix = dataset.load_matrix_csr(matrix_name)
+                assert os.path.isdir(csr_dir), 'expected CSR matrix to be cached'
+                assert not csr_matrix.data.flags.writeable, \
+                    'expected CSR matrix to be memory-mapped (read-only)'
+                assert csr_matrix.nnz == len(matrix), \
+                    'expected CSR matrix to contain all the matrix entries'
+                assert np.isclose(csr_matrix.sum(), matrix['rating'].sum()), \
+                    'expected CSR matrix to contain the same ratings as the matrix'
+
+                users = matrix['user'].to_numpy()
+                items = matrix['item'].to_numpy()
+                assert np.allclose(
+                    np.asarray(csr_matrix[users, items]).ravel(),
+                    matrix['rating'].to_numpy()
+                ), 'expected CSR matrix entries to match the user-item ratings'
+
+            shutil.rmtree(csr_dir)
+
+
+def test_dataset_csr_matrix_cached(io_tmp_dir: str) -> None:
+    """Test the CSR matrix cache against changes of the source file."""
+    source_path = os.path.join(io_tmp_dir, 'matrix.tsv')
+    csr_dir = os.path.join(io_tmp_dir, 'matrix' + MATRIX_CSR_SUFFIX)
+    with open(source_path, 'w', encoding='utf-8') as file:
+        file.write('0\t0\t1\n')
+
+    assert not is_csr_matrix_cached(csr_dir, source_path), \
+        'did not expect the CSR matrix to be cached before it is saved'
+    save_csr_matrix(csr_dir, sparse.csr_matrix(np.ones((1, 1))), source_path)
+    assert is_csr_matrix_cached(csr_dir, source_path), \
+        'expected the CSR matrix to be cached after it is saved'
+
+    # the source is replaced by a copy with an older modification time
+    source_mtime = os.stat(source_path).st_mtime_ns
+    with open(source_path, 'w', encoding='utf-8') as file:
+        file.write('0\t0\t2\n')
+    os.utime(source_path, ns=(source_mtime - 10**9, source_mtime - 10**9))
+    assert not is_csr_matrix_cached(csr_dir, source_path), \
+        'expected the CSR matrix to be outdated by an older source'
+
+    # the source changes in size within the same modification time
+    save_csr_matrix(csr_dir, sparse.csr_matrix(np.ones((1, 1))), source_path)
+    source_mtime = os.stat(source_path).st_mtime_ns
+    with open(source_path, 'a', encoding='utf-8') as file:
+        file.write('1\t0\t1\n')
+    os.utime(source_path, ns=(source_mtime, source_mtime))
+    assert not is_csr_matrix_cached(csr_dir, source_path), \
+        'expected the CSR matrix to be outdated by a source of a different size'
+
+
 def test_dataset_load_indices(data_registry: DataRegistry) -> None:
     """Test the user/item indices loading of a dataset."""
     for dataset_name in data_registry.get_available_sets():
@@ -297,6 +378,34 @@ def test_dataset_load_indices(data_registry: DataRegistry) -> None:
                     'expected user indices for all available users'
 
 
+def test_dataset_invalidate_indices(data_registry: DataRegistry) -> None:
+    """Test the invalidation of the cached user/item indices of a dataset."""
+    for dataset_name in data_registry.get_available_sets():
+        dataset = data_registry.get_set(dataset_name)
+
+        for matrix_name in dataset.get_available_matrices():
+            for load_indices in [dataset.load_item_indices, dataset.load_user_indices]:
+                indices = load_indices(matrix_name)
+                if indices is None:
+                    continue
+
+                assert load_indices(matrix_name) is indices, \
+                    'expected indices to be cached after loading'
+                assert not indices.flags.writeable, \
+                    'expected cached indices to be read-only'
+
+                dataset.invalidate_indices(matrix_name)
+                reloaded_indices = load_indices(matrix_name)
+                assert reloaded_indices is not indices, \
+                    'expected indices to be reloaded after invalidation'
+                assert np.array_equal(reloaded_indices, indices), \
+                    'expected reloaded indices to be the same as the cached indices'
+
+                dataset.invalidate_indices()
+                assert load_indices(matrix_name) is not reloaded_indices, \
+                    'expected indices to be reloaded after invalidating all indices'
+
+
 def test_dataset_read_matrix(data_registry: DataRegistry) -> None:
     """Test reading the matrix tables of a dataset."""
     for dataset_name in data_registry.get_available_sets():
@@ -416,10 +525,45 @@ def test_add_dataset_columns(data_registry: DataRegistry) -> None:
                         'expected column to be preset in the formatted matrix'
 
 
+def test_dataset_attribute_arrays(data_registry: DataRegistry) -> None:
+    """Test the (cached) attribute arrays that are aligned with the matrix ids."""
+    for dataset_name in data_registry.get_available_sets():
+        dataset = data_registry.get_set(dataset_name)
+        pytest.raises(KeyError, dataset.load_attribute_arrays, 'unknown', KEY_MATRIX, [])
+
+        for matrix_name in dataset.get_available_matrices():
+            pytest.raises(KeyError, dataset.load_attribute_arrays, matrix_name, 'unknown', ['c'])
+
+            matrix = dataset.load_matrix(matrix_name)
+            # append a user-item pair that is not present in the dataset
+            missing_pair = matrix.iloc[:1].copy()
+            missing_pair['user'] = matrix['user'].max() + 1000000
+            missing_pair['item'] = matrix['item'].max() + 1000000
+            matrix = pd.concat([matrix, missing_pair], ignore_index=True)
+            matrix_columns = list(matrix.columns)
+
+            for table_name, table_columns in dataset.get_available_columns(matrix_name).items():
+                attributes = dataset.load_attribute_arrays(matrix_name, table_name, table_columns)
+                assert dataset.load_attribute_arrays(matrix_name, table_name, table_columns) == \
+                    attributes, 'expected the attribute arrays to be cached'
+
+                formatted_matrix = add_dataset_columns(dataset, matrix_name, matrix, table_columns)
+                assert list(matrix.columns) == matrix_columns, \
+                    'did not expect the columns to be added to the input dataframe'
+                for column in table_columns:
+                    assert pd.isna(formatted_matrix[column].iloc[-1]), \
+                        'expected a missing value for the ids that are not present'
+
+            dataset.invalidate_indices(matrix_name)
+            assert all(key[0] != matrix_name for key in dataset.attributes), \
+                'expected the attribute arrays to be invalidated with the indices'
+
+
 def test_dataset_processors(io_event_dispatcher: EventDispatcher) -> None:
     """Test the integration of the dataset processors."""
     unprocessed_sets_dir = os.path.join('tests', 'unprocessed_sets')
-    data_registry = DataRegistry(unprocessed_sets_dir)
+    # run the independent table processors of each dataset concurrently
+    data_registry = DataRegistry(unprocessed_sets_dir, num_processor_workers=2)
 
     for dataset_name in data_registry.get_available_sets():
         dataset = data_registry.get_set(dataset_name)
@@ -430,6 +574,10 @@ def test_dataset_processors(io_event_dispatcher: EventDispatcher) -> None:
         assert dataset_config == dataset.config, \
             'expected configuration to be the same after parsing'
 
+        processor = data_registry.processors[dataset_name](dataset.data_dir, dataset_name)
+        assert processor.run() == dataset.config, \
+            'expected sequential processing to produce the same configuration as concurrent'
+
     # do the same checks as the sample registry but with the processed sample registry instead
     test_dataset_available_columns(data_registry)
     test_dataset_available_event_tables(data_registry)
@@ -441,11 +589,14 @@ def test_dataset_processors(io_event_dispatcher: EventDispatcher) -> None:
     test_dataset_get_table_config(data_registry)
     test_dataset_get_table_info(data_registry)
     test_dataset_load_matrix(data_registry)
+    test_dataset_load_matrix_csr(data_registry)
     test_dataset_load_indices(data_registry)
+    test_dataset_invalidate_indices(data_registry)
     test_dataset_read_matrix(data_registry)
     test_dataset_read_table(data_registry)
     test_dataset_resolve_ids(data_registry)
     test_add_dataset_columns(data_registry)
+    test_dataset_attribute_arrays(data_registry)
 
     # clean up generated processing artifacts
     for dataset_dir in os.listdir(unprocessed_sets_dir):
@@ -454,8 +605,116 @@ def test_dataset_processors(io_event_dispatcher: EventDispatcher) -> None:
             continue
 
         for dataset_file in os.listdir(dataset_dir):
-            if dataset_file.startswith(TABLE_FILE_PREFIX):
-                delete_file(os.path.join(dataset_dir, dataset_file), io_event_dispatcher)
+            dataset_file = os.path.join(dataset_dir, dataset_file)
+            if not os.path.basename(dataset_file).startswith(TABLE_FILE_PREFIX):
+                continue
+
+            if os.path.isdir(dataset_file):
+                delete_dir(dataset_file, io_event_dispatcher)
+            else:
+                delete_file(dataset_file, io_event_dispatcher)
+
+    delete_file(os.path.join(unprocessed_sets_dir, DATA_REGISTRY_FILE), io_event_dispatcher)
+
+
+def test_dataset_storage_migration(data_registry: DataRegistry, io_tmp_dir: str) -> None:
+    """Test migrating the storage of the datasets to the columnar storage and back."""
+    for dataset_name in data_registry.get_available_sets():
+        dataset = data_registry.get_set(dataset_name)
+        shutil.copytree(dataset.data_dir, os.path.join(io_tmp_dir, dataset_name))
+
+    for storage in [STORAGE_NPY, None]:
+        migrated_sets = migrate_data_dir_storage(io_tmp_dir, storage=storage, chunk_size=100)
+        assert len(migrated_sets) == len(data_registry.get_available_sets()), \
+            'expected all datasets to be migrated'
+
+        migrated_registry = DataRegistry(io_tmp_dir)
+        for dataset_name in data_registry.get_available_sets():
+            migrated_dataset = migrated_registry.get_set(dataset_name)
+            for table_config in migrated_dataset.config.tables.values():
+                assert table_config.file.options.storage == storage, \
+                    'expected table to be migrated to the storage'
+
+            assert_dataset_tables_equal(data_registry.get_set(dataset_name), migrated_dataset)
+
+        # do the same checks as the sample registry but with the migrated registry instead
+        test_dataset_load_matrix(migrated_registry)
+        test_dataset_read_matrix(migrated_registry)
+        test_dataset_read_table(migrated_registry)
+        test_add_dataset_columns(migrated_registry)
+
+
+@pytest.mark.parametrize('storage', [None, STORAGE_NPY])
+def test_dataset_categorical_table(storage: Optional[str], io_tmp_dir: str) -> None:
+    """Test reading the categorical columns of a table with both storages."""
+    table = pd.DataFrame({
+        'user_id': range(100),
+        'user_country': pd.Series(['NL', 'US', None, 'DE', 'NL'] * 20, dtype='category'),
+        'user_gender': ['Male', 'Female', 'Neutral', None] * 25
+    })
+    table_config = create_dataset_table_config(
+        'table.tsv' if storage is None else 'table',
+        ['user_id'],
+        ['user_country', 'user_gender'],
+        categorical=['user_country', 'user_gender', 'unknown'],
+        num_records=len(table),
+        storage=storage
+    )
+    assert table_config.get_categorical_names() == ['user_country', 'user_gender'], \
+        'expected the declared categorical columns that are present in the table'
+
+    table_config.save_table(table, io_tmp_dir)
+    result = table_config.read_table(io_tmp_dir)
+    for column_name in ['user_country', 'user_gender']:
+        assert isinstance(result[column_name].dtype, pd.CategoricalDtype), \
+            'expected the categorical column to be read as pandas Categorical'
+        assert result[column_name].astype(object).equals(table[column_name].astype(object)), \
+            'expected the categorical column to contain the same values'
+
+    assert result['user_id'].equals(table['user_id']), \
+        'did not expect the other columns to be categorical'
+
+    if storage == STORAGE_NPY:
+        chunks = list(table_config.read_table(io_tmp_dir, chunk_size=30))
+        assert isinstance(pd.concat(chunks)['user_country'].dtype, pd.CategoricalDtype), \
+            'expected the chunks of the typed storage to share the categories'
+
+    table_config.categorical = None
+    assert not isinstance(
+        table_config.read_table(io_tmp_dir)['user_gender'].dtype,
+        pd.CategoricalDtype
+    ), 'did not expect columns to be categorical when not declared'
+
+
+def assert_dataset_tables_equal(dataset: Dataset, other: Dataset) -> None:
+    """Assert the matrices and tables of two datasets to be equal."""
+    for matrix_name in dataset.get_available_matrices():
+        pd.testing.assert_frame_equal(
+            dataset.load_matrix(matrix_name),
+            other.load_matrix(matrix_name)
+        )
+
+    for table_name in dataset.get_available_tables():
+        table_config = dataset.get_table_config(table_name)
+        # the categories of text tables are sorted and of the typed storage in order of appearance
+        pd.testing.assert_frame_equal(
+            dataset.read_table(table_name),
+            other.read_table(table_name),
+            check_categorical=False
+        )
+
+        if other.get_table_config(table_name).file.options.storage == STORAGE_NPY:
+            # test reading a projection of the table in chunks, which is only consistent for
+            # the typed storage as the column types of text files are inferred for each chunk
+            columns = table_config.columns[::-1]
+            table = pd.concat(other.read_table(table_name, columns, 10))
+            assert list(table.columns) == table_config.columns, \
+                'expected projected columns to be in the order of the table'
+            pd.testing.assert_frame_equal(
+                dataset.read_table(table_name, columns),
+                table,
+                check_categorical=False
+            )
 
 
 def assert_data_table_loading(
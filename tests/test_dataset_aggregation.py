@@ -0,0 +1,82 @@
+"""This module tests the aggregation of user-item pairs.
+
+Functions:
+
+    test_pair_aggregator: test the aggregated pairs in memory and with spilled runs.
+    test_pair_aggregator_partial: test merging the flushed partial aggregates of aggregators.
+    test_encode_pairs_error: test encoding pairs with ids that are out of range.
+
+This program has been developed by students from the bachelor Computer Science at
+Utrecht University within the Software Project course.
+© Copyright Utrecht University (Department of Information and Computing Sciences)
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.fairreckitlib.data.set.dataset_aggregation import PairAggregator, encode_pairs
+
+max_pairs_list = [1000000, 500, 50]
+
+
+@pytest.mark.parametrize('max_pairs', max_pairs_list)
+def test_pair_aggregator(max_pairs: int, io_tmp_dir: str) -> None:
+    """Test the aggregated pairs in memory and with spilled runs."""
+    rng = np.random.default_rng(0)
+
+    events = pd.DataFrame({
+        'user': rng.integers(0, 40, 20000),
+        'item': rng.integers(0, 100, 20000),
+        'rating': rng.integers(1, 5, 20000).astype(float)
+    })
+    expected = events.groupby(['user', 'item'], as_index=False).sum()
+
+    aggregator = PairAggregator(io_tmp_dir, max_pairs=max_pairs)
+    for start in range(0, len(events), 1500):
+        chunk = events.iloc[start:start + 1500]
+        aggregator.add(
+            chunk['user'].to_numpy(),
+            chunk['item'].to_numpy(),
+            chunk['rating'].to_numpy()
+        )
+
+    assert (aggregator.get_num_runs() > 0) == (max_pairs < len(expected)), \
+        'expected runs to be spilled only when the distinct pairs exceed the maximum'
+
+    chunks = [pd.DataFrame({'user': users, 'item': items, 'rating': ratings})
+              for users, items, ratings in aggregator.merge(chunk_size=300)]
+    result = pd.concat(chunks, ignore_index=True)
+
+    assert result.equals(expected), \
+        'expected the merged pairs to be equal to the grouped sum in (user, item) order'
+
+
+def test_pair_aggregator_partial(io_tmp_dir: str) -> None:
+    """Test merging the flushed partial aggregates of aggregators."""
+    rng = np.random.default_rng(1)
+    users = rng.integers(0, 20, 5000)
+    items = rng.integers(0, 50, 5000)
+    expected = pd.Series(np.ones(5000)).groupby([users, items]).sum()
+
+    aggregator = PairAggregator(io_tmp_dir)
+    for i, start in enumerate(range(0, 5000, 1000)):
+        partial = PairAggregator(io_tmp_dir, run_prefix='partial_' + str(i))
+        partial.add(users[start:start + 1000], items[start:start + 1000], np.ones(1000))
+        aggregator.add_runs(partial.flush())
+
+    assert aggregator.get_num_runs() == 5, \
+        'expected each partial aggregate to be added as a run'
+
+    result = pd.concat([pd.Series(ratings, index=[chunk_users, chunk_items])
+                        for chunk_users, chunk_items, ratings in aggregator.merge()])
+    assert np.array_equal(result.to_numpy(), expected.to_numpy()), \
+        'expected the merged runs to be equal to the grouped sum'
+    assert result.index.equals(expected.index), \
+        'expected the merged runs to be in (user, item) order'
+
+
+def test_encode_pairs_error() -> None:
+    """Test encoding pairs with ids that are out of range."""
+    pytest.raises(ValueError, encode_pairs, np.array([-1]), np.array([0]))
+    pytest.raises(ValueError, encode_pairs, np.array([0]), np.array([2 ** 31]))
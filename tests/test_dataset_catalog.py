@@ -0,0 +1,285 @@
+"""This module tests the statistics catalog of the dataset table columns and matrices.
+
+Functions:
+
+    test_column_statistics: test the numerical/categorical column statistics over multiple chunks.
+    test_interaction_counts: test the interaction counts per id over multiple chunks.
+    test_statistics_catalog: test the statistics catalog of the datasets against the tables.
+    test_statistics_catalog_changes: test the catalog of a matrix that is changed or renamed.
+    test_statistics_catalog_read_only: test the catalog in memory for a read-only dataset.
+    test_statistics_catalog_truncated: test the categorical filter options of truncated columns.
+
+This program has been developed by students from the bachelor Computer Science at
+Utrecht University within the Software Project course.
+© Copyright Utrecht University (Department of Information and Computing Sciences)
+"""
+
+import os
+import shutil
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.fairreckitlib.data.filter.filter_params import create_params_categorical
+from src.fairreckitlib.data.set import dataset_catalog
+from src.fairreckitlib.data.set.dataset import Dataset
+from src.fairreckitlib.data.set.dataset_catalog import load_statistics_catalog
+from src.fairreckitlib.data.set.dataset_constants import KEY_MATRICES, KEY_MATRIX, KEY_TABLES
+from src.fairreckitlib.data.set.dataset_constants import STATISTICS_CATALOG_FILE
+from src.fairreckitlib.data.set.dataset_constants import TABLE_FILE_PREFIX
+from src.fairreckitlib.data.set.dataset_registry import DataRegistry
+from src.fairreckitlib.data.set.dataset_statistics import \
+    COLUMN_CATEGORICAL, COLUMN_NUMERICAL, ColumnStatistics, InteractionCounts
+
+
+def test_column_statistics() -> None:
+    """Test the numerical/categorical column statistics over multiple chunks."""
+    numerical = pd.Series([3, np.nan, -1, 7, 2, np.nan])
+    column_stats = ColumnStatistics()
+    for start in range(0, len(numerical), 4):
+        column_stats.add(numerical.iloc[start:start + 4])
+
+    assert column_stats.get_column_type() == COLUMN_NUMERICAL, \
+        'expected a column with numeric values to be numerical'
+    assert column_stats.to_json_format() == {
+        'type': COLUMN_NUMERICAL,
+        'num_values': 6,
+        'num_missing': 2,
+        'min': -1,
+        'max': 7,
+        'mean': 2.75
+    }, 'expected the range and the mean of the present values'
+
+    categorical = pd.Series(['b', None, 'a', '', 'b', 'c'])
+    column_stats = ColumnStatistics()
+    for start in range(0, len(categorical), 4):
+        column_stats.add(categorical.iloc[start:start + 4])
+
+    stats = column_stats.to_json_format()
+    assert stats['type'] == COLUMN_CATEGORICAL, \
+        'expected a column with string values to be categorical'
+    assert stats['num_missing'] == 2, 'expected missing values and empty strings to be missing'
+    assert stats['categories'] == ['b', None, 'a', 'c'] and stats['counts'] == [2, 2, 1, 1], \
+        'expected the categories to be counted in the order of their first appearance'
+
+    column_stats = ColumnStatistics(max_categories=3)
+    column_stats.add(categorical)
+    stats = column_stats.to_json_format()
+    assert stats['truncated'] and stats['num_categories'] == 4, \
+        'expected the categories to be truncated when exceeding the maximum'
+    assert stats['categories'] == ['b', None, 'a'] and stats['counts'] == [2, 2, 1], \
+        'expected the most frequent categories to be kept'
+    assert stats['num_values'] == len(categorical), 'expected the values to be counted'
+
+    # a category that is infrequent in the first chunk is still counted exactly
+    column_stats = ColumnStatistics(max_categories=2)
+    for _, chunk in enumerate([['x', 'y', 'z'], ['z', 'z'], ['y']]):
+        column_stats.add(pd.Series(chunk))
+    stats = column_stats.to_json_format()
+    assert stats['categories'] == ['z', 'y'] and stats['counts'] == [3, 2], \
+        'expected the exact counts of the most frequent categories over all chunks'
+
+
+def test_interaction_counts() -> None:
+    """Test the interaction counts per id over multiple chunks."""
+    rng = np.random.default_rng(0)
+    ids = rng.integers(0, 1000, 10000)
+
+    counts = InteractionCounts()
+    assert counts.to_json_format()['num_ids'] == 0, 'expected no ids before adding any'
+
+    for start in range(0, len(ids), 999):
+        counts.add(ids[start:start + 999])
+
+    assert np.array_equal(counts.get_counts(), np.bincount(ids)), \
+        'expected the interactions to be counted per id'
+
+    summary = counts.to_json_format()
+    present = np.bincount(ids)[np.bincount(ids) > 0]
+    assert summary['num_ids'] == len(present), 'expected the ids with interactions to be counted'
+    assert (summary['min'], summary['max']) == (present.min(), present.max()), \
+        'expected the range of the interaction counts'
+    assert np.isclose(summary['median'], np.median(present)), \
+        'expected the median of the interaction counts'
+
+    pytest.raises(ValueError, counts.add, np.array([1, -1]))
+
+
+def test_statistics_catalog(data_registry: DataRegistry, io_tmp_dir: str) -> None:
+    """Test the statistics catalog of (a copy of) the datasets against the dataset tables."""
+    for dataset_name in data_registry.get_available_sets():
+        shutil.copytree(
+            data_registry.get_set(dataset_name).data_dir,
+            os.path.join(io_tmp_dir, dataset_name)
+        )
+
+    copied_registry = DataRegistry(io_tmp_dir)
+    for dataset_name in copied_registry.get_available_sets():
+        dataset = copied_registry.get_set(dataset_name)
+        catalog_path = os.path.join(dataset.data_dir, STATISTICS_CATALOG_FILE)
+
+        assert dataset.get_column_stats('unknown', 'unknown') is None, \
+            'did not expect statistics for an unknown table'
+        assert dataset.get_matrix_stats('unknown') is None, \
+            'did not expect statistics for an unknown matrix'
+
+        for table_name in dataset.get_available_tables():
+            table = dataset.read_table(table_name)
+            for column_name in dataset.get_table_config(table_name).columns:
+                column_stats = dataset.get_column_stats(table_name, column_name)
+                assert column_stats['num_values'] == len(table), \
+                    'expected all the column values to be counted'
+
+                if column_stats['type'] == COLUMN_NUMERICAL:
+                    assert (column_stats['min'], column_stats['max']) == \
+                        (table[column_name].min(), table[column_name].max()), \
+                        'expected the range of the numerical column'
+                elif not column_stats['truncated']:
+                    categories = list(table[column_name].astype(object).fillna('').unique())
+                    categories = [None if len(c) == 0 else c for c in categories]
+                    assert column_stats['categories'] == categories, \
+                        'expected the unique categories of the categorical column'
+
+            assert dataset.get_column_stats(table_name, 'unknown') is None, \
+                'did not expect statistics for an unknown column'
+
+        assert os.path.isfile(catalog_path), 'expected the statistics catalog to be saved'
+
+        for matrix_name in dataset.get_available_matrices():
+            matrix_config = dataset.get_matrix_config(matrix_name)
+            matrix = dataset.read_matrix(matrix_name)
+            matrix_stats = dataset.get_matrix_stats(matrix_name)
+
+            rating_column = matrix_config.table.columns[0]
+            rating_stats = dataset.get_column_stats(KEY_MATRIX, rating_column, matrix_name)
+            assert rating_stats['max'] == matrix[rating_column].max(), \
+                'expected the statistics of the matrix columns'
+            assert sum(matrix_stats['ratings']['counts']) == len(matrix), \
+                'expected all the ratings to be counted in the histogram'
+
+            for index_name, key in [('user', matrix_config.user.key),
+                                    ('item', matrix_config.item.key)]:
+                counts = dataset.get_interaction_counts(matrix_name, index_name)
+                assert np.array_equal(counts, np.bincount(matrix[key])), \
+                    'expected the interaction counts per user/item'
+                assert matrix_stats[index_name + 's']['num_ids'] == matrix[key].nunique(), \
+                    'expected the number of users/items with interactions'
+
+        # an outdated entry is computed again
+        matrix_name = dataset.get_available_matrices()[0]
+        dataset.get_matrix_config(matrix_name).table.num_records += 1
+        assert dataset.get_matrix_stats(matrix_name)['num_records'] == \
+            dataset.get_matrix_config(matrix_name).table.num_records, \
+            'expected an outdated catalog entry to be computed again'
+        dataset.get_matrix_config(matrix_name).table.num_records -= 1
+        dataset.update_statistics_catalog()
+
+        assert load_statistics_catalog(dataset.data_dir) == dataset.update_statistics_catalog(), \
+            'expected the statistics catalog to be persisted'
+
+
+def test_statistics_catalog_changes(data_registry: DataRegistry, io_tmp_dir: str) -> None:
+    """Test the statistics catalog of a (copied) matrix that changes in place or is renamed."""
+    dataset_name = data_registry.get_available_sets()[0]
+    shutil.copytree(
+        data_registry.get_set(dataset_name).data_dir,
+        os.path.join(io_tmp_dir, dataset_name)
+    )
+
+    dataset = DataRegistry(io_tmp_dir).get_set(dataset_name)
+    matrix_name = dataset.get_available_matrices()[0]
+    matrix_config = dataset.get_matrix_config(matrix_name)
+    rating_column = matrix_config.table.columns[0]
+    matrix = dataset.read_matrix(matrix_name)
+    dataset.update_statistics_catalog()
+
+    # the ratings change without changing the number of records
+    matrix[rating_column] = matrix[rating_column] * 2
+    matrix_config.table.save_table(matrix, dataset.data_dir)
+    assert dataset.get_column_stats(KEY_MATRIX, rating_column, matrix_name)['max'] == \
+        matrix[rating_column].max(), 'expected a changed matrix file to be computed again'
+
+    # the matrix files of processed datasets are already prefixed
+    prefixed_file_name = TABLE_FILE_PREFIX + matrix_config.table.file.name
+    shutil.copyfile(
+        os.path.join(dataset.data_dir, matrix_config.table.file.name),
+        os.path.join(dataset.data_dir, prefixed_file_name)
+    )
+    matrix_config.table.file.name = prefixed_file_name
+    assert dataset.get_interaction_counts(matrix_name, 'user') is not None, \
+        'expected the interaction counts of the renamed matrix'
+    assert os.path.isfile(os.path.join(
+        dataset.data_dir,
+        prefixed_file_name.split('.')[0] + '_user_counts.npy'
+    )), 'expected the interaction counts file to be prefixed once'
+
+
+def test_statistics_catalog_read_only(
+        data_registry: DataRegistry,
+        monkeypatch: pytest.MonkeyPatch) -> None:
+    """Test the statistics catalog in memory when the dataset directory is read-only."""
+    # a new dataset of the samples, which does not have the catalog of the registry in memory
+    sample_set = data_registry.get_set(data_registry.get_available_sets()[0])
+    dataset = Dataset(sample_set.data_dir, sample_set.config)
+
+    def save_read_only(*_, **__) -> None:
+        raise PermissionError('Read-only file system')
+
+    monkeypatch.setattr(dataset_catalog, 'save_json', save_read_only)
+    monkeypatch.setattr(dataset_catalog.np, 'save', save_read_only)
+    monkeypatch.setattr(dataset_catalog, 'load_statistics_catalog',
+                        lambda _: {KEY_MATRICES: {}, KEY_TABLES: {}})
+
+    matrix_name = dataset.get_available_matrices()[0]
+    matrix_config = dataset.get_matrix_config(matrix_name)
+    matrix = dataset.read_matrix(matrix_name)
+    assert dataset.get_matrix_stats(matrix_name)['num_records'] == len(matrix), \
+        'expected the statistics catalog to be kept in memory'
+    assert np.array_equal(
+        dataset.get_interaction_counts(matrix_name, 'user'),
+        np.bincount(matrix[matrix_config.user.key])
+    ), 'expected the interaction counts to be kept in memory'
+
+
+def test_statistics_catalog_truncated(
+        data_registry: DataRegistry,
+        io_tmp_dir: str,
+        monkeypatch: pytest.MonkeyPatch) -> None:
+    """Test the categorical filter options of (copied) dataset columns that are truncated."""
+    dataset_name = data_registry.get_available_sets()[0]
+    shutil.copytree(
+        data_registry.get_set(dataset_name).data_dir,
+        os.path.join(io_tmp_dir, dataset_name)
+    )
+
+    # the catalog of the copy is computed again with at most one formatted category
+    catalog_file_path = os.path.join(io_tmp_dir, dataset_name, STATISTICS_CATALOG_FILE)
+    if os.path.isfile(catalog_file_path):
+        os.remove(catalog_file_path)
+
+    monkeypatch.setattr(dataset_catalog, 'MAX_CATEGORIES', 1)
+    dataset = DataRegistry(io_tmp_dir).get_set(dataset_name)
+    matrix_name = dataset.get_available_matrices()[0]
+    num_truncated = 0
+    for table_name, table_columns in dataset.get_available_columns(matrix_name).items():
+        for _, column_name in enumerate(table_columns):
+            column_stats = dataset.get_column_stats(table_name, column_name, matrix_name)
+            if column_stats is None or not column_stats.get('truncated'):
+                continue
+
+            values = dataset.read_table(table_name, [column_name])[column_name]
+            values = values.astype(object).fillna('').unique()
+            params = create_params_categorical(
+                column_name=column_name,
+                dataset=dataset,
+                matrix_name=matrix_name
+            )
+            assert len(column_stats['categories']) == 1 and \
+                column_stats['num_categories'] == len(values), \
+                'expected the catalog to format one category of the exact number of categories'
+            assert len(params.get_param('values').options) == len(values), \
+                'expected the filter options to contain all the categories of the column'
+            num_truncated += 1
+
+    assert num_truncated > 0, 'expected the dataset to have truncated categorical columns'
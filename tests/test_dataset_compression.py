@@ -0,0 +1,141 @@
+"""This module tests the compression codecs of dataset files.
+
+Functions:
+
+    test_compression_codecs: test the lookup of the registered compression codecs.
+    test_compressed_table: test saving and reading a table with a compression codec.
+    test_optional_compressed_table: test saving and reading a table with an optional codec.
+    test_register_compression_codec: test a registered codec that is not supported by pandas.
+
+This program has been developed by students from the bachelor Computer Science at
+Utrecht University within the Software Project course.
+© Copyright Utrecht University (Department of Information and Computing Sciences)
+"""
+
+import gzip
+import os
+
+import pandas as pd
+import pytest
+
+from src.fairreckitlib.data.set import dataset_compression
+from src.fairreckitlib.data.set.dataset_compression import \
+    COMPRESSION_BZ2, COMPRESSION_GZIP, COMPRESSION_LZ4, COMPRESSION_XZ, COMPRESSION_ZSTD, \
+    CompressionCodec, \
+    get_compression_codec, get_compression_codecs, get_compression_ext, infer_compression, \
+    is_compression_available, open_compressed_file, register_compression_codec
+from src.fairreckitlib.data.set.dataset_config import create_dataset_table_config
+
+compression_list = [COMPRESSION_BZ2, COMPRESSION_GZIP, COMPRESSION_XZ]
+optional_compression_list = [(COMPRESSION_LZ4, 'lz4.frame'), (COMPRESSION_ZSTD, 'zstandard')]
+
+
+def create_table(num_records: int) -> pd.DataFrame:
+    """Create a table with the specified number of records."""
+    return pd.DataFrame({
+        'user_id': range(num_records),
+        'user_name': ['user' + str(i) for i in range(num_records)]
+    })
+
+
+def test_compression_codecs() -> None:
+    """Test the lookup of the registered compression codecs."""
+    for compression in get_compression_codecs():
+        extension = get_compression_ext(compression)
+        assert extension == get_compression_codec(compression).extension, \
+            'expected the extension of the compression codec'
+        assert infer_compression('table.tsv' + extension) == compression, \
+            'expected the compression to be inferred from the file extension'
+
+    for compression in compression_list:
+        assert is_compression_available(compression), \
+            'expected the standard library codecs to be available'
+
+    assert get_compression_ext(None) == '', 'expected no extension without compression'
+    assert infer_compression('table.tsv') is None, \
+        'did not expect a compression to be inferred for an uncompressed file'
+    pytest.raises(KeyError, get_compression_codec, 'unknown')
+    pytest.raises(KeyError, register_compression_codec, get_compression_codec(COMPRESSION_BZ2))
+
+
+def assert_compressed_table(compression: str, io_tmp_dir: str) -> None:
+    """Assert saving (in chunks) and reading a table with a compression codec."""
+    table = create_table(100)
+    table_config = create_dataset_table_config(
+        'table.tsv' + get_compression_ext(compression),
+        ['user_id'],
+        ['user_name'],
+        compression=compression,
+        compression_level=1
+    )
+
+    table_config.save_table(table.iloc[:50], io_tmp_dir)
+    table_config.save_table(table.iloc[50:], io_tmp_dir, append=True)
+    assert table_config.read_table(io_tmp_dir).equals(table), \
+        'expected the appended chunks to be read as one table'
+
+    # the compression is inferred from the file extension when not specified
+    table_config.file.options.compression = None
+    chunks = list(table_config.read_table(io_tmp_dir, chunk_size=30))
+    assert pd.concat(chunks, ignore_index=True).equals(table), \
+        'expected the table to be read in chunks'
+    assert table_config.get_partitions(io_tmp_dir, 2) is None, \
+        'did not expect a compressed table to be partitioned'
+
+    with open_compressed_file(os.path.join(io_tmp_dir, table_config.file.name),
+                              compression) as file:
+        assert len(file.read().splitlines()) == len(table), \
+            'expected the decompressed stream to contain the table records'
+
+
+@pytest.mark.parametrize('compression', compression_list)
+def test_compressed_table(compression: str, io_tmp_dir: str) -> None:
+    """Test saving (in chunks) and reading a table with a compression codec."""
+    assert_compressed_table(compression, io_tmp_dir)
+
+
+@pytest.mark.parametrize('compression, package', optional_compression_list)
+def test_optional_compressed_table(compression: str, package: str, io_tmp_dir: str) -> None:
+    """Test saving (in chunks) and reading a table with a codec of an optional package."""
+    pytest.importorskip(package)
+    assert is_compression_available(compression), \
+        'expected the codec to be available when the package is installed'
+
+    assert_compressed_table(compression, io_tmp_dir)
+
+
+def test_register_compression_codec(io_tmp_dir: str, monkeypatch: pytest.MonkeyPatch) -> None:
+    """Test a registered codec that is not supported by pandas and opens the stream itself."""
+    monkeypatch.setattr(
+        dataset_compression,
+        'COMPRESSION_CODECS',
+        dict(dataset_compression.COMPRESSION_CODECS)
+    )
+
+    open_calls = []
+    def open_file(file_path: str, mode: str, level: int, _: int):
+        open_calls.append((mode, level))
+        return gzip.open(file_path, mode, compresslevel=level if level is not None else 9)
+
+    register_compression_codec(CompressionCodec('gzip-stream', '.gzs', open_file))
+    assert 'gzip-stream' in get_compression_codecs(), 'expected the codec to be registered'
+
+    table = create_table(100)
+    table_config = create_dataset_table_config(
+        'table.tsv.gzs',
+        ['user_id'],
+        ['user_name'],
+        compression_level=5,
+        header=True
+    )
+
+    table_config.save_table(table.iloc[:50], io_tmp_dir)
+    table_config.save_table(table.iloc[50:], io_tmp_dir, append=True)
+    assert open_calls == [('wb', 5), ('ab', 5)], \
+        'expected the stream to be opened by the codec with the compression level'
+
+    assert table_config.read_table(io_tmp_dir).equals(table), \
+        'expected the table to be read from the stream of the codec'
+    chunks = list(table_config.read_table(io_tmp_dir, chunk_size=30))
+    assert pd.concat(chunks, ignore_index=True).equals(table), \
+        'expected the table to be read in chunks from the stream of the codec'
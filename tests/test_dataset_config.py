@@ -33,7 +33,7 @@ from src.fairreckitlib.core.io.io_utility import save_array_to_hdf5, save_yml
 from src.fairreckitlib.data.set.dataset_config_parser import DatasetConfigParser, \
     parse_int, parse_float, parse_string, parse_string_list, \
     parse_optional_string, parse_optional_bool, parse_file_name, parse_rating_matrix, \
-    VALID_SEPARATORS, VALID_COMPRESSIONS, VALID_ENCODINGS
+    VALID_SEPARATORS, VALID_COMPRESSIONS, VALID_ENCODINGS, VALID_STORAGES
 from src.fairreckitlib.data.set.dataset_config import \
     DatasetIndexConfig, DatasetMatrixConfig, RatingMatrixConfig, \
     DatasetConfig, DatasetFileConfig, DatasetTableConfig, FileOptionsConfig, \
@@ -41,8 +41,9 @@ from src.fairreckitlib.data.set.dataset_config import \
 from src.fairreckitlib.data.set.dataset_constants import \
     KEY_DATASET, KEY_EVENTS, KEY_MATRICES, KEY_TABLES, \
     KEY_MATRIX, KEY_IDX_ITEM, KEY_IDX_USER, KEY_RATING_MIN, KEY_RATING_MAX, KEY_RATING_TYPE, \
-    TABLE_KEY, TABLE_PRIMARY_KEY, TABLE_FOREIGN_KEYS, TABLE_COLUMNS, TABLE_FILE, \
-    TABLE_COMPRESSION, TABLE_ENCODING, TABLE_HEADER, TABLE_NUM_RECORDS, TABLE_SEP
+    TABLE_CATEGORICAL, TABLE_KEY, TABLE_PRIMARY_KEY, TABLE_FOREIGN_KEYS, TABLE_COLUMNS, \
+    TABLE_FILE, TABLE_COMPRESSION, TABLE_COMPRESSION_LEVEL, TABLE_ENCODING, TABLE_HEADER, \
+    TABLE_NUM_RECORDS, TABLE_SEP, TABLE_STORAGE
 
 STRING_LIST = ['a', 'b', 'c', 'd', 'e']
 
@@ -289,13 +290,25 @@ def test_parse_file_options_config_minimal() -> None:
         assert not bool(parser.parse_file_options_config(file_options_config)), \
             'did not expect parsing to succeed for an incorrect compression value'
 
-        # test encoding option failure
+        # test compression level option failure
         file_options_config[TABLE_COMPRESSION] = None
+        file_options_config[TABLE_COMPRESSION_LEVEL] = invalid
+        assert not bool(parser.parse_file_options_config(file_options_config)), \
+            'did not expect parsing to succeed for an incorrect compression level value'
+
+        # test encoding option failure
+        file_options_config[TABLE_COMPRESSION_LEVEL] = None
         file_options_config[TABLE_ENCODING] = invalid
         assert not bool(parser.parse_file_options_config(file_options_config)), \
             'did not expect parsing to succeed for an incorrect encoding value'
 
+        # test storage option failure
         file_options_config[TABLE_ENCODING] = None
+        file_options_config[TABLE_STORAGE] = invalid
+        assert not bool(parser.parse_file_options_config(file_options_config)), \
+            'did not expect parsing to succeed for an incorrect storage value'
+
+        file_options_config[TABLE_STORAGE] = None
         # skip boolean values which should succeed for optional booleans
         if not isinstance(invalid, bool):
             # test header option failure
@@ -336,6 +349,16 @@ def test_parse_file_options_config_valid() -> None:
         assert file_options_config == parsed_options_config.to_yml_format(), \
             'expected formatting FileOptionsConfig to be the same as the original configuration'
 
+    # test success for a valid compression level option
+    file_options_config = {TABLE_COMPRESSION: VALID_COMPRESSIONS[0], TABLE_COMPRESSION_LEVEL: 5}
+    parsed_options_config = parser.parse_file_options_config(file_options_config)
+    assert isinstance(parsed_options_config, FileOptionsConfig), \
+        'expected FileOptionsConfig to be parsed for a configuration with a valid compression level'
+    assert parsed_options_config.compression_level == 5, \
+        'expected parsed compression level to be the same as the input'
+    assert file_options_config == parsed_options_config.to_yml_format(), \
+        'expected formatting FileOptionsConfig to be the same as the original configuration'
+
     # test success for valid encoding options
     for encoding in VALID_ENCODINGS:
         file_options_config = {TABLE_ENCODING: encoding}
@@ -347,6 +370,17 @@ def test_parse_file_options_config_valid() -> None:
         assert file_options_config == parsed_options_config.to_yml_format(), \
             'expected formatting FileOptionsConfig to be the same as the original configuration'
 
+    # test success for valid storage options
+    for storage in VALID_STORAGES:
+        file_options_config = {TABLE_STORAGE: storage}
+        parsed_options_config = parser.parse_file_options_config(file_options_config)
+        assert isinstance(parsed_options_config, FileOptionsConfig), \
+            'expected FileOptionsConfig to be parsed for a configuration with a valid storage'
+        assert parsed_options_config.storage == storage, \
+            'expected parsed storage to be the same as the input'
+        assert file_options_config == parsed_options_config.to_yml_format(), \
+            'expected formatting FileOptionsConfig to be the same as the original configuration'
+
     # test success for valid header option
     file_options_config = {TABLE_HEADER: True}
     parsed_options_config = parser.parse_file_options_config(file_options_config)
@@ -374,6 +408,11 @@ def test_parse_dataset_file_config(io_tmp_dir: str) -> None:
         io_tmp_dir, {KEY_NAME: file_name, TABLE_HEADER: ''})), \
         'did not expect parsing to succeed for an incorrect file options configuration'
 
+    # test failure for a file name that is not a directory for a binary storage
+    assert not bool(parser.parse_dataset_file_config(
+        io_tmp_dir, {KEY_NAME: file_name, TABLE_STORAGE: VALID_STORAGES[0]})), \
+        'did not expect parsing to succeed for a binary storage that is not a directory'
+
     # test success
     file_config = {KEY_NAME: file_name}
     parsed_file_config = parser.parse_dataset_file_config(io_tmp_dir, file_config)
@@ -422,6 +461,13 @@ def test_parse_dataset_table_config(io_tmp_dir: str) -> None:
     assert table_config == parsed_config.to_yml_format(), \
         'expected formatting DatasetTableConfig to be the same as the original configuration'
 
+    table_config[TABLE_CATEGORICAL] = ['a']
+    parsed_config = parser.parse_dataset_table_config(io_tmp_dir, table_config)
+    assert parsed_config.categorical == ['a'], \
+        'expected the categorical columns to be parsed'
+    assert table_config == parsed_config.to_yml_format(), \
+        'expected formatting DatasetTableConfig to be the same as the original configuration'
+
 
 def test_parse_dataset_index_config(io_tmp_dir: str) -> None:
     """Test parsing dataset index configuration from a dictionary."""
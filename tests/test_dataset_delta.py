@@ -0,0 +1,207 @@
+"""This module tests appending new events to a processed dataset.
+
+Functions:
+
+    test_merge_matrix_counts: test merging count deltas into a matrix without indirection arrays.
+    test_append_events: test appending a delta file of events to a processed dataset.
+    test_append_events_failure: test that a failed append leaves the dataset unchanged.
+
+This program has been developed by students from the bachelor Computer Science at
+Utrecht University within the Software Project course.
+© Copyright Utrecht University (Department of Information and Computing Sciences)
+"""
+
+import os
+import shutil
+from typing import Dict
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.fairreckitlib.data.set import dataset_delta
+from src.fairreckitlib.data.set.dataset_config import DATASET_RATINGS_EXPLICIT
+from src.fairreckitlib.data.set.dataset_config import DatasetIndexConfig, DatasetMatrixConfig
+from src.fairreckitlib.data.set.dataset_config import RatingMatrixConfig
+from src.fairreckitlib.data.set.dataset_config import create_dataset_table_config
+from src.fairreckitlib.data.set.dataset_delta import get_event_count_matrices
+from src.fairreckitlib.data.set.dataset_delta import merge_matrix_counts
+from src.fairreckitlib.data.set.dataset_matrix import DatasetMatrixProcessor, MatrixProcessorConfig
+from src.fairreckitlib.data.set.dataset_migration import migrate_dataset_storage
+from src.fairreckitlib.data.set.dataset_registry import DATASET_LFM_1B, DataRegistry
+from src.fairreckitlib.data.set.dataset_storage import STORAGE_NPY
+
+
+def test_merge_matrix_counts(io_tmp_dir: str) -> None:
+    """Test merging count deltas into a matrix of which the ids are the original ids."""
+    matrix = pd.DataFrame({
+        'user_id': [0, 0, 1, 2],
+        'item_id': [0, 1, 1, 0],
+        'matrix_count': [1, 2, 3, 4]
+    })
+    table_config = create_dataset_table_config(
+        'matrix.tsv',
+        ['user_id', 'item_id'],
+        ['matrix_count'],
+        num_records=len(matrix)
+    )
+    table_config.save_table(matrix, io_tmp_dir)
+    matrix_config = DatasetMatrixConfig(
+        table_config,
+        RatingMatrixConfig(1, 4, DATASET_RATINGS_EXPLICIT),
+        DatasetIndexConfig(None, 'user_id', 3),
+        DatasetIndexConfig(None, 'item_id', 2)
+    )
+
+    replacements = merge_matrix_counts(
+        io_tmp_dir,
+        matrix_config,
+        np.array([0, 1, 3]),
+        np.array([1, 2, 0]),
+        np.array([5, 1, 2]),
+        chunk_size=3
+    )
+    assert [file_name for _, file_name in replacements] == [table_config.file.name], \
+        'expected only the matrix to be replaced as there are no indirection arrays'
+    for tmp_file_name, file_name in replacements:
+        os.replace(os.path.join(io_tmp_dir, tmp_file_name), os.path.join(io_tmp_dir, file_name))
+
+    result = table_config.read_table(io_tmp_dir)
+    assert result.values.tolist() == [[0, 0, 1], [0, 1, 7], [1, 1, 3], [2, 0, 4],
+                                      [1, 2, 1], [3, 0, 2]], \
+        'expected the counts to be added to the present pairs and the new pairs to be appended'
+    assert table_config.num_records == 6, 'expected the new pairs to be counted'
+    assert (matrix_config.user.num_records, matrix_config.item.num_records) == (4, 3), \
+        'expected the new users and items to be counted'
+    assert (matrix_config.ratings.rating_min, matrix_config.ratings.rating_max) == (1, 7), \
+        'expected the rating range of the merged matrix'
+
+
+@pytest.mark.parametrize('partition_events', [False, True])
+def test_append_events(partition_events: bool, io_tmp_dir: str) -> None:
+    """Test appending a delta file of events to a processed dataset and its count matrices."""
+    dataset_dir = os.path.join(io_tmp_dir, DATASET_LFM_1B)
+    shutil.copytree(os.path.join('tests', 'unprocessed_sets', DATASET_LFM_1B), dataset_dir)
+
+    # split the listening events into the processed events and the delta
+    events_path = os.path.join(dataset_dir, 'LFM-1b_LEs.txt')
+    delta_path = os.path.join(io_tmp_dir, 'delta.txt')
+    with open(events_path, 'r', encoding='utf-8') as events_file:
+        lines = events_file.readlines()
+    with open(events_path, 'w', encoding='utf-8') as events_file:
+        events_file.writelines(lines[:60000])
+    with open(delta_path, 'w', encoding='utf-8') as delta_file:
+        delta_file.writelines(lines[60000:])
+
+    dataset = DataRegistry(io_tmp_dir, partition_events=partition_events).get_set(DATASET_LFM_1B)
+    event_table_name = dataset.get_available_event_tables()[0]
+    assert DatasetMatrixProcessor(dataset, False).run(
+        MatrixProcessorConfig(event_table_name, 'track_id', 'count')
+    ), 'expected the matrix to be processed'
+    # the cached statistics and CSR matrix are outdated by the delta
+    dataset.get_matrix_stats('user-track-count')
+    dataset.load_matrix_csr('user-track-count')
+
+    assert dataset.append_events(event_table_name, delta_path) == ['user-track-count'], \
+        'expected the count matrix of the event table to be updated'
+
+    all_events = pd.DataFrame(
+        [line.rstrip('\n').split('\t') for line in lines],
+        columns=['user_id', 'artist_id', 'album_id', 'track_id', 'timestamp']
+    ).astype(np.int64)
+
+    # the configuration is persisted and the events contain the delta
+    dataset = DataRegistry(io_tmp_dir).get_set(DATASET_LFM_1B)
+    event_table = dataset.config.events[event_table_name]
+    assert event_table.num_records == len(all_events), 'expected the delta to be appended'
+    assert (event_table.partitions is not None) == partition_events, \
+        'expected the partitions to be kept'
+    result = dataset.read_event_table(event_table_name)
+    assert len(result) == len(all_events) and \
+        result.sort_values(list(result.columns)).values.tolist() == \
+        all_events.sort_values(list(all_events.columns)).values.tolist(), \
+        'expected the events of the event table and the delta'
+
+    matrix_config = dataset.get_matrix_config('user-track-count')
+    matrix = dataset.read_matrix('user-track-count')
+    users = np.array(dataset.load_user_indices('user-track-count'))[matrix['user_id']]
+    items = np.array(dataset.load_item_indices('user-track-count'))[matrix['track_id']]
+    result = pd.Series(matrix['matrix_count'].to_numpy(), index=pd.MultiIndex.from_arrays(
+        [users, items], names=['user_id', 'track_id']
+    )).sort_index()
+    expected = all_events.groupby(['user_id', 'track_id']).size().sort_index()
+
+    assert np.array_equal(result.index, expected.index) and \
+        np.array_equal(result.to_numpy(), expected.to_numpy()), \
+        'expected the counts of all the events in the matrix'
+    assert matrix_config.table.num_records == len(expected), 'expected the pairs to be counted'
+    assert matrix_config.user.num_records == all_events['user_id'].nunique(), \
+        'expected the user indices to be extended with the new users'
+    assert matrix_config.item.num_records == all_events['track_id'].nunique(), \
+        'expected the item indices to be extended with the new items'
+    assert (matrix_config.ratings.rating_min, matrix_config.ratings.rating_max) == \
+        (expected.min(), expected.max()), 'expected the rating range of the merged matrix'
+    assert dataset.load_matrix_csr('user-track-count').sum() == len(all_events), \
+        'expected the cached CSR matrix to be created again'
+    assert dataset.get_interaction_counts('user-track-count', 'user').sum() == len(expected), \
+        'expected the statistics catalog of the matrix to be computed again'
+
+    pytest.raises(KeyError, dataset.append_events, 'unknown', delta_path)
+    pytest.raises(ValueError, dataset.append_events, event_table_name, pd.DataFrame())
+
+    # the single column of a count matrix depends on the rating column of the processor
+    matrix_config.table.columns = ['matrix_plays']
+    assert get_event_count_matrices(dataset.config, event_table_name) == ['user-track-count'], \
+        'expected a matrix with a single column to be a count matrix'
+
+    # other matrices with the keys of the event table can not be derived from the events
+    matrix_config.table.columns = ['matrix_rating', 'matrix_timestamp']
+    assert get_event_count_matrices(dataset.config, event_table_name) == [], \
+        'did not expect a matrix with a rating and timestamp column to be a count matrix'
+    pytest.raises(ValueError, dataset.append_events, event_table_name, delta_path)
+    matrix_config.table.columns = ['matrix_count']
+    assert dataset.config.events[event_table_name].num_records == len(all_events), \
+        'expected the events not to be appended when a matrix is not supported'
+
+    migrate_dataset_storage(dataset.data_dir, storage=STORAGE_NPY, verbose=False)
+    dataset = DataRegistry(io_tmp_dir).get_set(DATASET_LFM_1B)
+    pytest.raises(ValueError, dataset.append_events, event_table_name, delta_path)
+
+
+@pytest.mark.parametrize('partition_events', [False, True])
+def test_append_events_failure(
+        partition_events: bool,
+        io_tmp_dir: str,
+        monkeypatch: pytest.MonkeyPatch) -> None:
+    """Test that appending events leaves the dataset unchanged when saving the update fails."""
+    dataset_dir = os.path.join(io_tmp_dir, DATASET_LFM_1B)
+    shutil.copytree(os.path.join('tests', 'unprocessed_sets', DATASET_LFM_1B), dataset_dir)
+
+    dataset = DataRegistry(io_tmp_dir, partition_events=partition_events).get_set(DATASET_LFM_1B)
+    event_table_name = dataset.get_available_event_tables()[0]
+    assert DatasetMatrixProcessor(dataset, False).run(
+        MatrixProcessorConfig(event_table_name, 'track_id', 'count')
+    ), 'expected the matrix to be processed'
+
+    events = dataset.read_event_table(event_table_name).head(100).copy()
+    # new users and tracks that extend the indirection arrays
+    events['user_id'] += 1000000
+    events['track_id'] += 1000000
+
+    def get_dir_state() -> Dict[str, int]:
+        return {os.path.relpath(os.path.join(root, name), dataset_dir):
+                os.path.getsize(os.path.join(root, name))
+                for root, _, file_names in os.walk(dataset_dir) for name in file_names}
+
+    dir_state = get_dir_state()
+    config = dataset.config.to_yml_format()
+
+    def save_yml_failure(*_, **__) -> None:
+        raise OSError('No space left on device')
+
+    monkeypatch.setattr(dataset_delta, 'save_yml', save_yml_failure)
+    pytest.raises(OSError, dataset.append_events, event_table_name, events)
+
+    assert get_dir_state() == dir_state, 'expected the files of the dataset to be unchanged'
+    assert dataset.config.to_yml_format() == config, \
+        'expected the configuration of the dataset to be unchanged'
@@ -0,0 +1,93 @@
+"""This module tests the creation of matrices from dataset event tables.
+
+Functions:
+
+    test_dataset_matrix_processor: test creating several matrices from an event table.
+    test_dataset_matrix_processor_errors: test the errors of the matrix processor.
+    test_dataset_matrix_processor_empty: test saving a matrix without any user-item pairs.
+
+This program has been developed by students from the bachelor Computer Science at
+Utrecht University within the Software Project course.
+© Copyright Utrecht University (Department of Information and Computing Sciences)
+"""
+
+import os
+import shutil
+
+import numpy as np
+import pytest
+
+from src.fairreckitlib.data.set.dataset_aggregation import PairAggregator
+from src.fairreckitlib.data.set.dataset_matrix import \
+    DatasetMatrixProcessor, MatrixProcessorConfig
+from src.fairreckitlib.data.set.dataset_registry import DataRegistry, DATASET_LFM_1B
+
+num_workers_list = [1, 3]
+
+
+@pytest.mark.parametrize('num_workers', num_workers_list)
+def test_dataset_matrix_processor(num_workers: int, io_tmp_dir: str) -> None:
+    """Test creating several matrices from an event table in a single pass."""
+    shutil.copytree(
+        os.path.join('tests', 'unprocessed_sets', DATASET_LFM_1B),
+        os.path.join(io_tmp_dir, DATASET_LFM_1B)
+    )
+    dataset = DataRegistry(io_tmp_dir).get_set(DATASET_LFM_1B)
+    event_table_name, event_table = next(iter(dataset.config.events.items()))
+    events = event_table.read_table(dataset.data_dir)
+
+    item_keys = ['album_id', 'track_id']
+    processor_configs = [MatrixProcessorConfig(event_table_name, key, 'count') for key in item_keys]
+
+    processor = DatasetMatrixProcessor(dataset, False)
+    assert processor.run(processor_configs, chunk_size=7000, max_pairs=5000,
+                         num_workers=num_workers), \
+        'expected the matrices to be processed'
+    assert not processor.run(processor_configs), \
+        'did not expect the matrices to be processed again'
+
+    for item_key in item_keys:
+        matrix_name = 'user-' + item_key.split('_')[0] + '-count'
+        matrix = dataset.read_matrix(matrix_name)
+        assert matrix is not None, 'expected the matrix to be added to the dataset'
+        assert len(matrix) == dataset.get_matrix_config(matrix_name).table.num_records, \
+            'expected the number of records of the matrix to be stored'
+
+        expected = events.groupby(['user_id', item_key]).size()
+        users = np.array(dataset.load_user_indices(matrix_name))[matrix['user_id']]
+        items = np.array(dataset.load_item_indices(matrix_name))[matrix[item_key]]
+
+        assert np.array_equal(users, expected.index.get_level_values(0)), \
+            'expected the matrix users to be in ascending order'
+        assert np.array_equal(items, expected.index.get_level_values(1)), \
+            'expected the matrix items to be ordered per user'
+        assert np.array_equal(matrix['matrix_count'], expected.to_numpy()), \
+            'expected the matrix to count the user-item events'
+
+
+def test_dataset_matrix_processor_errors(data_registry: DataRegistry) -> None:
+    """Test the errors of the matrix processor with unknown events or item keys."""
+    dataset = data_registry.get_set(data_registry.get_available_sets()[0])
+    processor = DatasetMatrixProcessor(dataset, False)
+
+    pytest.raises(KeyError, processor.run, MatrixProcessorConfig('unknown', 'item_id', 'count'))
+    for event_table_name in dataset.get_available_event_tables():
+        pytest.raises(IndexError, processor.run,
+                      MatrixProcessorConfig(event_table_name, 'unknown', 'count'))
+
+
+def test_dataset_matrix_processor_empty(io_tmp_dir: str) -> None:
+    """Test saving a matrix without any user-item pairs, e.g. of an empty event table."""
+    shutil.copytree(
+        os.path.join('tests', 'unprocessed_sets', DATASET_LFM_1B),
+        os.path.join(io_tmp_dir, DATASET_LFM_1B)
+    )
+    dataset = DataRegistry(io_tmp_dir).get_set(DATASET_LFM_1B)
+    processor = DatasetMatrixProcessor(dataset, False)
+
+    spill_dir = os.path.join(io_tmp_dir, 'spill')
+    os.mkdir(spill_dir)
+    matrix_config = processor.save_matrix('empty', PairAggregator(spill_dir), 'item_id', 'count')
+    assert matrix_config.table.num_records == 0, 'did not expect any matrix records'
+    assert (matrix_config.ratings.rating_min, matrix_config.ratings.rating_max) == (0.0, 0.0), \
+        'expected a finite rating range for an empty matrix'
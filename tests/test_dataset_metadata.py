@@ -0,0 +1,122 @@
+"""This module tests the metadata of dataset table files and fast record counting.
+
+Functions:
+
+    test_count_file_records: test counting the records of text files with a newline scan.
+    test_count_file_records_lines: test counting the records with different line endings.
+    test_get_table_metadata: test the creation and reuse of the table metadata sidecar.
+    test_get_table_metadata_read_only: test the table metadata when the sidecar cannot be saved.
+
+This program has been developed by students from the bachelor Computer Science at
+Utrecht University within the Software Project course.
+© Copyright Utrecht University (Department of Information and Computing Sciences)
+"""
+
+import os
+
+import pandas as pd
+import pytest
+
+from src.fairreckitlib.core.io.io_utility import save_json
+from src.fairreckitlib.data.set import dataset_metadata
+from src.fairreckitlib.data.set.dataset_config import create_dataset_table_config
+from src.fairreckitlib.data.set.dataset_constants import TABLE_FILE_PREFIX
+from src.fairreckitlib.data.set.dataset_metadata import \
+    METADATA_FILE_SUFFIX, count_file_records, get_table_metadata
+
+unprocessed_files = [
+    ('LFM-1B', 'LFM-1b_LEs.txt', False),
+    ('LFM-1B', 'LFM-1b_users_additional.txt', True),
+    ('LFM-2B', 'listening-events.tsv.bz2', True),
+    ('LFM-2B', 'user_artist_playcount.tsv', False),
+]
+
+
+@pytest.mark.parametrize('dataset_name, file_name, header', unprocessed_files)
+def test_count_file_records(
+        dataset_name: str,
+        file_name: str,
+        header: bool,
+        monkeypatch: pytest.MonkeyPatch) -> None:
+    """Test counting the records of text files with a newline scan."""
+    file_path = os.path.join('tests', 'unprocessed_sets', dataset_name, file_name)
+    expected = len(pd.read_table(file_path, header=0 if header else None))
+
+    assert count_file_records(file_path, header=header) == expected, \
+        'expected the number of records to match the parsed table'
+
+    # force the file to be scanned in many small byte ranges
+    monkeypatch.setattr(dataset_metadata, 'SCAN_BLOCK_SIZE', 1000)
+    for num_threads in [1, 3]:
+        assert count_file_records(file_path, header=header, num_threads=num_threads) == \
+               expected, 'expected the number of records to be independent of the threads'
+
+
+def test_count_file_records_lines(io_tmp_dir: str) -> None:
+    """Test counting the records of text files with different line endings."""
+    file_path = os.path.join(io_tmp_dir, 'table.tsv')
+    for contents, num_records in [('', 0), ('a\nb\n', 2), ('a\nb', 2), ('a', 1)]:
+        with open(file_path, 'w', encoding='utf-8') as file:
+            file.write(contents)
+
+        assert count_file_records(file_path) == num_records, \
+            'expected the last line to be counted with or without a newline'
+
+    assert count_file_records(file_path, header=True) == 0, \
+        'expected the header not to be counted as a record'
+
+    pytest.raises(FileNotFoundError, count_file_records, os.path.join(io_tmp_dir, 'unknown'))
+    pytest.raises(ValueError, count_file_records, file_path, compression='unknown')
+
+
+def test_get_table_metadata(io_tmp_dir: str) -> None:
+    """Test the creation and reuse of the table metadata sidecar."""
+    table_config = create_dataset_table_config('table.tsv', ['user_id'], ['user_name'])
+    table_path = os.path.join(io_tmp_dir, table_config.file.name)
+    metadata_path = os.path.join(
+        io_tmp_dir,
+        TABLE_FILE_PREFIX + table_config.file.name + METADATA_FILE_SUFFIX
+    )
+
+    pytest.raises(FileNotFoundError, get_table_metadata, io_tmp_dir, table_config)
+
+    table_config.save_table(pd.DataFrame({'user_id': [0, 1], 'user_name': ['a', 'b']}), io_tmp_dir)
+    metadata = get_table_metadata(io_tmp_dir, table_config)
+    assert os.path.isfile(metadata_path), 'expected the metadata sidecar to be created'
+    assert metadata.num_records == 2, 'expected the records of the table to be counted'
+    assert metadata.file_size == os.path.getsize(table_path), \
+        'expected the size of the table file to be stored'
+    assert metadata.column_dtypes == {'user_id': 'int64', 'user_name': 'object'}, \
+        'expected the dtypes of the columns to be inferred'
+
+    # tamper with the sidecar to verify that it is reused
+    metadata.num_records = 10
+    save_json(metadata_path, metadata.to_json_format())
+    assert get_table_metadata(io_tmp_dir, table_config).num_records == 10, \
+        'expected the metadata sidecar to be reused for an unchanged table'
+
+    table_config.save_table(pd.DataFrame({'user_id': [2], 'user_name': ['c']}), io_tmp_dir,
+                            append=True)
+    assert get_table_metadata(io_tmp_dir, table_config).num_records == 3, \
+        'expected the metadata sidecar to be recreated for a changed table'
+
+    table_config.file.options.header = True
+    assert get_table_metadata(io_tmp_dir, table_config).num_records == 2, \
+        'expected the metadata sidecar to be recreated for a changed configuration'
+
+
+def test_get_table_metadata_read_only(io_tmp_dir: str, monkeypatch: pytest.MonkeyPatch) -> None:
+    """Test the table metadata when the sidecar cannot be saved."""
+    table_config = create_dataset_table_config('table.tsv', ['user_id'], ['user_name'])
+    table_config.save_table(pd.DataFrame({'user_id': [0, 1], 'user_name': ['a', 'b']}), io_tmp_dir)
+
+    def save_json_read_only(*_, **__) -> None:
+        raise PermissionError('Read-only file system')
+
+    monkeypatch.setattr(dataset_metadata, 'save_json', save_json_read_only)
+    assert get_table_metadata(io_tmp_dir, table_config).num_records == 2, \
+        'expected the metadata to be returned when the sidecar cannot be saved'
+    assert not os.path.isfile(os.path.join(
+        io_tmp_dir,
+        TABLE_FILE_PREFIX + table_config.file.name + METADATA_FILE_SUFFIX
+    )), 'expected no metadata sidecar to be created'
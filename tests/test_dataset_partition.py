@@ -0,0 +1,94 @@
+"""This module tests the partitioning of dataset tables.
+
+Functions:
+
+    test_dataset_table_partitions: test reading a table as the union of its partitions.
+    test_dataset_table_partitions_compressed: test that compressed tables are not partitioned.
+
+This program has been developed by students from the bachelor Computer Science at
+Utrecht University within the Software Project course.
+© Copyright Utrecht University (Department of Information and Computing Sciences)
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.fairreckitlib.data.set.dataset_config import create_dataset_table_config
+from src.fairreckitlib.data.set.dataset_partition import FileRangeReader
+from src.fairreckitlib.data.set.dataset_storage import STORAGE_NPY
+
+num_partitions_list = [1, 2, 3, 7, 1000]
+storage_list = [None, STORAGE_NPY]
+
+
+@pytest.mark.parametrize('storage', storage_list)
+@pytest.mark.parametrize('num_partitions', num_partitions_list)
+def test_dataset_table_partitions(
+        num_partitions: int,
+        storage: str,
+        io_tmp_dir: str,
+        monkeypatch: pytest.MonkeyPatch) -> None:
+    """Test reading a table as the union of its partitions."""
+    readers = []
+    reader_init = FileRangeReader.__init__
+
+    def on_reader_init(self, *args):
+        readers.append(self)
+        reader_init(self, *args)
+
+    monkeypatch.setattr(FileRangeReader, '__init__', on_reader_init)
+
+    rng = np.random.default_rng(0)
+    table = pd.DataFrame({
+        'user_id': rng.integers(0, 1000, 500),
+        'item_id': rng.integers(0, 1000000, 500),
+        'timestamp': rng.integers(0, 10 ** 9, 500)
+    })
+
+    table_config = create_dataset_table_config(
+        'table.tsv' if storage is None else 'table',
+        ['user_id', 'item_id'],
+        ['timestamp'],
+        header=storage is None,
+        num_records=len(table),
+        storage=storage
+    )
+    table_config.save_table(table, io_tmp_dir)
+
+    partitions = table_config.get_partitions(io_tmp_dir, num_partitions)
+    assert 0 < len(partitions) <= num_partitions, \
+        'expected at least one and at most the requested number of partitions'
+
+    chunks = []
+    for partition in partitions:
+        table_iterator = table_config.read_table(
+            io_tmp_dir, columns=['user_id', 'item_id'], chunk_size=64, partition=partition)
+        chunks.extend(table_iterator)
+        # the iterator is still referenced, thus the reader is not released yet
+        assert all(reader.closed for reader in readers), \
+            'expected the partition reader to be closed when the chunks are exhausted'
+
+    result = pd.concat(chunks, ignore_index=True)
+    assert result.equals(table[['user_id', 'item_id']]), \
+        'expected the partitions to contain all the records in order'
+
+    # closing the iterator before it is exhausted closes the reader as well
+    table_iterator = table_config.read_table(io_tmp_dir, chunk_size=64, partition=partitions[0])
+    next(table_iterator)
+    table_iterator.close()
+    assert all(reader.closed for reader in readers), \
+        'expected the partition reader to be closed when the iterator is closed'
+
+
+def test_dataset_table_partitions_compressed(io_tmp_dir: str) -> None:
+    """Test that compressed tables are not partitioned."""
+    for file_name, compression in [('table.tsv.bz2', None), ('table.tsv', 'bz2')]:
+        table_config = create_dataset_table_config(
+            file_name,
+            ['user_id'],
+            [],
+            compression=compression
+        )
+        assert table_config.get_partitions(io_tmp_dir, 4) is None, \
+            'expected compressed text tables to not be partitioned'
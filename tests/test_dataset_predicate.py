@@ -0,0 +1,169 @@
+"""This module tests the predicates that select the rows of dataset tables while reading.
+
+Functions:
+
+    test_evaluate_condition: test evaluating the conditions on (encoded) column values.
+    test_validate_predicate: test validating the predicate against the table columns.
+    test_table_predicate: test reading the rows of a table that match a predicate.
+    test_dataset_predicate: test reading the rows of the dataset matrices and tables.
+
+This program has been developed by students from the bachelor Computer Science at
+Utrecht University within the Software Project course.
+© Copyright Utrecht University (Department of Information and Computing Sciences)
+"""
+
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.fairreckitlib.data.set.dataset_config import create_dataset_table_config
+from src.fairreckitlib.data.set.dataset_predicate import PREDICATE_OPERATORS, \
+    create_predicate_mask, evaluate_condition, evaluate_encoded_condition, validate_predicate
+from src.fairreckitlib.data.set.dataset_registry import DataRegistry
+from src.fairreckitlib.data.set.dataset_storage import STORAGE_NPY
+
+
+def create_table(num_records: int) -> pd.DataFrame:
+    """Create a table with numerical, (missing) string and categorical columns."""
+    rng = np.random.default_rng(0)
+    return pd.DataFrame({
+        'user_id': np.arange(num_records),
+        'user_rating': rng.integers(1, 6, num_records).astype(float),
+        'user_gender': rng.choice(np.array(['Male', 'Female', None], dtype=object), num_records),
+        'user_country': rng.choice(['NL', 'US', 'DE'], num_records)
+    })
+
+
+def test_evaluate_condition() -> None:
+    """Test evaluating the conditions on (encoded) column values with the pandas semantics."""
+    values = pd.Series(['b', np.nan, 'a', 'c', 'a'], dtype=object)
+    codes, categories = pd.factorize(values)
+    for op, value in [('==', 'a'), ('!=', 'a'), ('<', 'b'), ('<=', 'b'), ('>', 'a'),
+                      ('>=', 'b'), ('in', ['a', 'c']), ('not in', ['a']), ('in', ['a', None])]:
+        if op in ('in', 'not in'):
+            expected = values.isin(value)
+            expected = ~expected if op == 'not in' else expected
+        else:
+            expected = PREDICATE_OPERATORS[op](values, value)
+
+        expected = expected.to_numpy(dtype=bool)
+        assert np.array_equal(evaluate_condition(values, op, value), expected), \
+            'expected the condition to be evaluated like pandas'
+        assert np.array_equal(evaluate_condition(values.astype('category'), op, value),
+                              expected), \
+            'expected a categorical condition to be evaluated on the codes'
+        assert np.array_equal(
+            evaluate_encoded_condition(codes, categories.to_numpy(dtype=object), op, value),
+            expected
+        ), 'expected an encoded condition to be evaluated on the codes'
+
+    numbers = np.array([1.0, np.nan, 3.0])
+    assert np.array_equal(evaluate_condition(numbers, '!=', 1.0), [False, True, True]), \
+        'expected missing values to match the not equal condition'
+    assert np.array_equal(evaluate_condition(numbers, 'in', [3, np.nan]), [False, True, True]), \
+        'expected missing values to match a missing value in the collection'
+
+
+def test_validate_predicate() -> None:
+    """Test validating the predicate against the table columns."""
+    column_names = ['user_id', 'user_gender']
+    validate_predicate([('user_id', '>=', 1), ['user_gender', 'in', ['Male']]], column_names)
+
+    for predicate in [
+            [('unknown', '==', 1)],
+            [('user_id', '=', 1)],
+            [('user_id', '==')],
+            ['user_id'],
+            [('user_gender', 'in', 'Male')]]:
+        pytest.raises(ValueError, validate_predicate, predicate, column_names)
+
+
+@pytest.mark.parametrize('chunk_size', [None, 7])
+@pytest.mark.parametrize('storage', [None, STORAGE_NPY])
+def test_table_predicate(
+        storage: Optional[str],
+        chunk_size: Optional[int],
+        io_tmp_dir: str) -> None:
+    """Test reading the rows of a table that match a predicate."""
+    table = create_table(100)
+    table_config = create_dataset_table_config(
+        'table.tsv' if storage is None else 'table',
+        ['user_id'],
+        ['user_rating', 'user_gender', 'user_country'],
+        categorical=['user_gender', 'user_country'],
+        num_records=len(table),
+        storage=storage
+    )
+    table_config.save_table(table, io_tmp_dir)
+
+    predicate = [
+        ('user_rating', '>=', 3),
+        ('user_gender', '!=', 'Female'),
+        ('user_country', 'in', ['NL', 'DE'])
+    ]
+    expected = table[create_predicate_mask(table, predicate)][['user_id', 'user_gender']]
+
+    result = table_config.read_table(
+        io_tmp_dir,
+        columns=['user_gender', 'user_id'],
+        chunk_size=chunk_size,
+        predicate=predicate
+    )
+    if chunk_size is not None:
+        result = list(result)
+        assert all(0 < len(chunk) <= chunk_size for chunk in result), \
+            'expected chunks with matching rows only of at most the chunk size'
+        result = pd.concat(result)
+
+    assert list(result.columns) == ['user_id', 'user_gender'], \
+        'expected the predicate columns to be dropped when not requested'
+    assert np.array_equal(result.index, expected.index), \
+        'expected the row numbers of the matching rows as index'
+    assert result['user_id'].equals(expected['user_id']), \
+        'expected only the rows that match the predicate'
+    assert result['user_gender'].astype(object).equals(expected['user_gender']), \
+        'expected the values of the matching rows'
+
+    result = table_config.read_table(io_tmp_dir, predicate=[('user_rating', '>', 5)])
+    assert len(result) == 0 and list(result.columns) == list(table.columns), \
+        'expected an empty table with all the columns when no rows match'
+
+    pytest.raises(ValueError, table_config.read_table, io_tmp_dir,
+                  predicate=[('unknown', '==', 1)])
+    pytest.raises(ValueError, table_config.read_table, io_tmp_dir,
+                  columns=['unknown'], predicate=[('user_id', '==', 1)])
+
+
+def test_dataset_predicate(data_registry: DataRegistry) -> None:
+    """Test reading the rows of the dataset matrices and tables that match a predicate."""
+    for dataset_name in data_registry.get_available_sets():
+        dataset = data_registry.get_set(dataset_name)
+
+        for matrix_name in dataset.get_available_matrices():
+            matrix_config = dataset.get_matrix_config(matrix_name)
+            matrix = dataset.read_matrix(matrix_name)
+            user_key = matrix_config.user.key
+            rating_column = matrix_config.table.columns[0]
+
+            users = list(matrix[user_key].unique()[:5])
+            rating = matrix[rating_column].median()
+            predicate = [(user_key, 'in', users), (rating_column, '>=', rating)]
+            expected = matrix[matrix[user_key].isin(users) & (matrix[rating_column] >= rating)]
+
+            result = dataset.read_matrix(matrix_name, predicate=predicate)
+            pd.testing.assert_frame_equal(result, expected)
+
+            result = pd.concat(dataset.read_matrix(matrix_name, [rating_column], 50, predicate))
+            pd.testing.assert_frame_equal(result, expected[[rating_column]])
+
+        for table_name in dataset.get_available_tables():
+            table_config = dataset.get_table_config(table_name)
+            key = table_config.primary_key[0]
+            table = dataset.read_table(table_name, [key])
+
+            keys = list(table[key].iloc[::3])
+            result = dataset.read_table(table_name, [key], predicate=[(key, 'in', keys)])
+            assert result[key].equals(table[key].iloc[::3]), \
+                'expected the table rows with the selected keys'
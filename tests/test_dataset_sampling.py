@@ -0,0 +1,110 @@
+"""This module tests the creation of dataset samples.
+
+Functions:
+
+    test_create_dataset_sample: test creating a sample of the datasets in chunks.
+    test_create_dataset_sample_errors: test the errors of creating a dataset sample.
+    test_create_matrix_sample_empty: test sampling a matrix without users or items.
+
+This program has been developed by students from the bachelor Computer Science at
+Utrecht University within the Software Project course.
+© Copyright Utrecht University (Department of Information and Computing Sciences)
+"""
+
+import copy
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.fairreckitlib.data.set.dataset_registry import DataRegistry
+from src.fairreckitlib.data.set.dataset_sampling import \
+    SAMPLE_FIRST, SAMPLE_HASH, SAMPLE_RANDOM, create_dataset_sample, create_matrix_sample
+
+sampling_list = [SAMPLE_FIRST, SAMPLE_HASH, SAMPLE_RANDOM]
+
+
+@pytest.mark.parametrize('sampling', sampling_list)
+def test_create_dataset_sample(sampling: str, data_registry: DataRegistry, io_tmp_dir: str) -> None:
+    """Test creating a sample of the datasets in chunks."""
+    num_users = 20
+    num_items = 50
+
+    for dataset_name in data_registry.get_available_sets():
+        dataset = data_registry.get_set(dataset_name)
+        samples = []
+        for i, chunk_size in enumerate([1000, 10E6]):
+            sample_dir = os.path.join(io_tmp_dir, dataset_name + '_' + str(i))
+            os.mkdir(sample_dir)
+            samples.append(create_dataset_sample(
+                sample_dir, dataset, num_users, num_items,
+                sampling=sampling, seed=0, chunk_size=chunk_size
+            ))
+
+        for matrix_name in dataset.get_available_matrices():
+            matrix_config = dataset.get_matrix_config(matrix_name)
+            user_key = matrix_config.user.key
+            item_key = matrix_config.item.key
+
+            sample_matrices = [sample.read_matrix(matrix_name) for sample in samples]
+            assert sample_matrices[0].equals(sample_matrices[1]), \
+                'expected the sample to be independent of the chunk size'
+
+            sample = samples[0]
+            sample_matrix = sample_matrices[0]
+            sample_config = sample.get_matrix_config(matrix_name)
+            assert len(sample_matrix) == sample_config.table.num_records, \
+                'expected the number of sample records to be stored'
+            if sampling == SAMPLE_FIRST:
+                assert sample_config.user.num_records <= num_users, \
+                    'expected the sample to contain at most the number of users'
+                assert sample_config.item.num_records <= num_items, \
+                    'expected the sample to contain at most the number of items'
+
+            # the sample pairs need to be present in the original matrix
+            matrix = dataset.read_matrix(matrix_name)
+            original = pd.DataFrame({
+                'user': dataset.resolve_user_ids(matrix_name, matrix[user_key]),
+                'item': dataset.resolve_item_ids(matrix_name, matrix[item_key])
+            })
+            resolved = pd.DataFrame({
+                'user': sample.resolve_user_ids(matrix_name, sample_matrix[user_key]),
+                'item': sample.resolve_item_ids(matrix_name, sample_matrix[item_key])
+            })
+            merged = pd.merge(resolved, original, how='left', indicator=True)
+            assert np.all(merged['_merge'] == 'both'), \
+                'expected the sample pairs to be present in the original matrix'
+
+        for table_name, table_config in samples[0].config.tables.items():
+            assert len(samples[0].read_table(table_name)) == table_config.num_records, \
+                'expected the number of sample table records to be stored'
+
+
+def test_create_dataset_sample_errors(data_registry: DataRegistry, io_tmp_dir: str) -> None:
+    """Test the errors of creating a dataset sample."""
+    dataset = data_registry.get_set(data_registry.get_available_sets()[0])
+
+    pytest.raises(ValueError, create_dataset_sample, io_tmp_dir, dataset, 10, 10,
+                  sampling='unknown')
+    pytest.raises(ValueError, create_matrix_sample, dataset,
+                  dataset.get_available_matrices()[0], 10, 10, sampling='unknown')
+
+    os.mkdir(os.path.join(io_tmp_dir, dataset.get_name() + '-Sample'))
+    pytest.raises(IOError, create_dataset_sample, io_tmp_dir, dataset, 10, 10)
+
+
+@pytest.mark.parametrize('sampling', sampling_list)
+def test_create_matrix_sample_empty(sampling: str, data_registry: DataRegistry) -> None:
+    """Test sampling a matrix without users or items to result in an empty sample."""
+    dataset = copy.deepcopy(data_registry.get_set(data_registry.get_available_sets()[0]))
+    matrix_name = dataset.get_available_matrices()[0]
+    matrix_config = dataset.get_matrix_config(matrix_name)
+
+    for index_config in [matrix_config.user, matrix_config.item]:
+        num_records = index_config.num_records
+        index_config.num_records = 0
+        sample = create_matrix_sample(dataset, matrix_name, 10, 10, sampling=sampling, seed=0)
+        assert len(list(sample)) == 0, \
+            'expected an empty sample for a matrix without users or items'
+        index_config.num_records = num_records
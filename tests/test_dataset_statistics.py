@@ -0,0 +1,66 @@
+"""This module tests the accumulators of dataset statistics.
+
+Functions:
+
+    test_id_presence: test the unique ids of the id presence over multiple chunks.
+    test_matrix_statistics: test the matrix statistics over multiple chunks.
+
+This program has been developed by students from the bachelor Computer Science at
+Utrecht University within the Software Project course.
+© Copyright Utrecht University (Department of Information and Computing Sciences)
+"""
+
+import numpy as np
+import pytest
+
+from src.fairreckitlib.data.set.dataset_registry import DataRegistry
+from src.fairreckitlib.data.set.dataset_statistics import IdPresence, MatrixStatistics
+
+
+def test_id_presence() -> None:
+    """Test the unique ids of the id presence over multiple chunks."""
+    rng = np.random.default_rng(0)
+    ids = rng.integers(0, 100000, 10000)
+
+    presence = IdPresence()
+    assert presence.get_num_ids() == 0, 'expected no ids before adding any'
+
+    for start in range(0, len(ids), 999):
+        presence.add(ids[start:start + 999])
+
+    assert np.array_equal(presence.get_ids(), np.unique(ids)), \
+        'expected the unique ids to be present'
+    assert presence.get_num_ids() == len(np.unique(ids)), \
+        'expected the number of unique ids to be counted'
+
+    pytest.raises(ValueError, presence.add, np.array([1, -1]))
+
+
+def test_matrix_statistics(data_registry: DataRegistry) -> None:
+    """Test the matrix statistics over multiple chunks of the dataset matrices."""
+    for dataset_name in data_registry.get_available_sets():
+        dataset = data_registry.get_set(dataset_name)
+        for matrix_name in dataset.get_available_matrices():
+            matrix_config = dataset.get_matrix_config(matrix_name)
+            user_key = matrix_config.user.key
+            item_key = matrix_config.item.key
+            rating_column = matrix_config.table.columns[0]
+
+            matrix_stats = MatrixStatistics()
+            for _, matrix in enumerate(dataset.read_matrix(matrix_name, chunk_size=500)):
+                matrix_stats.add(
+                    matrix[user_key].to_numpy(),
+                    matrix[item_key].to_numpy(),
+                    matrix[rating_column].to_numpy()
+                )
+
+            matrix = dataset.read_matrix(matrix_name)
+            assert matrix_stats.get_num_records() == len(matrix), \
+                'expected all the matrix records to be counted'
+            assert matrix_stats.get_num_users() == matrix[user_key].nunique(), \
+                'expected the unique users to be counted'
+            assert matrix_stats.get_num_items() == matrix[item_key].nunique(), \
+                'expected the unique items to be counted'
+            assert matrix_stats.get_rating_range() == \
+                (matrix[rating_column].min(), matrix[rating_column].max()), \
+                'expected the rating range of the matrix'
@@ -0,0 +1,193 @@
+"""This module tests the partitioning of dataset tables by the month of their records.
+
+Functions:
+
+    test_range_matching: test checking whether a range of column values can match a predicate.
+    test_partition_table_by_month: test partitioning a table and reading a time range of it.
+    test_partition_listening_events: test the monthly partitions of the listening events.
+
+This program has been developed by students from the bachelor Computer Science at
+Utrecht University within the Software Project course.
+© Copyright Utrecht University (Department of Information and Computing Sciences)
+"""
+
+import os
+import shutil
+from typing import List
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.fairreckitlib.data.set.dataset_config import DatasetTableConfig
+from src.fairreckitlib.data.set.dataset_config import create_dataset_table_config
+from src.fairreckitlib.data.set.dataset_migration import migrate_dataset_storage
+from src.fairreckitlib.data.set.dataset_predicate import create_predicate_mask, is_range_matching
+from src.fairreckitlib.data.set.dataset_registry import \
+    DATASET_LFM_1B, DATASET_LFM_2B, DataRegistry
+from src.fairreckitlib.data.set.dataset_storage import STORAGE_NPY
+from src.fairreckitlib.data.set.dataset_time_partition import \
+    get_month_keys, partition_table_by_month
+
+
+def read_opened_partitions(
+        table_config: DatasetTableConfig,
+        dataset_dir: str,
+        monkeypatch: pytest.MonkeyPatch,
+        **kwargs) -> List[str]:
+    """Read the partitioned table and get the names of the partitions that are opened."""
+    opened = []
+    create_partition_config = DatasetTableConfig.create_partition_config
+
+    def on_create_partition_config(self, partition_config):
+        opened.append(partition_config.name)
+        return create_partition_config(self, partition_config)
+
+    with monkeypatch.context() as patch:
+        patch.setattr(DatasetTableConfig, 'create_partition_config', on_create_partition_config)
+        table = table_config.read_table(dataset_dir, **kwargs)
+        if kwargs.get('chunk_size'):
+            table = pd.concat(table)
+
+    return opened
+
+
+def test_range_matching() -> None:
+    """Test checking whether a range of column values can match a predicate."""
+    for predicate, expected in [
+            ([('time', '==', 15)], True),
+            ([('time', '==', 25)], False),
+            ([('time', '<', 10)], False),
+            ([('time', '<=', 10)], True),
+            ([('time', '>', 20)], False),
+            ([('time', '>=', 20)], True),
+            ([('time', 'in', [5, 25])], False),
+            ([('time', 'in', [5, 12])], True),
+            ([('time', '!=', 15)], True),
+            ([('time', 'not in', [15])], True),
+            ([('time', '>=', 12), ('time', '<', 14)], True),
+            ([('time', '>=', 12), ('time', '<', 5)], False),
+            ([('other', '==', 0)], True),
+            ([('time', '>=', '2013-11')], True)]:
+        assert is_range_matching('time', 10, 20, predicate) == expected, \
+            'expected the range to be checked against the conditions: ' + str(predicate)
+
+
+@pytest.mark.parametrize('chunk_size', [None, 7])
+def test_partition_table_by_month(
+        chunk_size: int,
+        io_tmp_dir: str,
+        monkeypatch: pytest.MonkeyPatch) -> None:
+    """Test partitioning a table by month and reading a time range of the partitions."""
+    rng = np.random.default_rng(0)
+    timestamps = rng.integers(
+        pd.Timestamp('2013-01-01').timestamp(),
+        pd.Timestamp('2013-07-01').timestamp(),
+        100
+    )
+    table = pd.DataFrame({
+        'user_id': rng.integers(0, 10, 100),
+        'item_id': rng.integers(0, 20, 100),
+        'timestamp': timestamps
+    })
+    table_config = create_dataset_table_config('events.tsv', ['user_id', 'item_id'], ['timestamp'])
+    table_config.save_table(table, io_tmp_dir)
+
+    partitioned_config = partition_table_by_month(
+        io_tmp_dir,
+        table_config,
+        'timestamp',
+        'events',
+        chunk_size=13
+    )
+    partitions = partitioned_config.partitions
+    assert [p.name for p in partitions] == ['2013-0' + str(i) for i in range(1, 7)], \
+        'expected a partition for each month in chronological order'
+    assert partitioned_config.num_records == len(table), 'expected all records to be partitioned'
+
+    months = get_month_keys(table['timestamp'])
+    expected = table.iloc[np.argsort(months, kind='stable')].reset_index(drop=True)
+    for partition_config in partitions:
+        times = table['timestamp'][months == int(partition_config.name.replace('-', ''))]
+        assert partition_config.num_records == len(times), \
+            'expected the number of records of the month'
+        assert (partition_config.time_min, partition_config.time_max) == \
+            (times.min(), times.max()), 'expected the time range of the month'
+
+    result = partitioned_config.read_table(io_tmp_dir, chunk_size=chunk_size)
+    if chunk_size is not None:
+        result = pd.concat(result)
+    pd.testing.assert_frame_equal(result, expected)
+
+    predicate = [
+        ('timestamp', '>=', partitions[2].time_min),
+        ('timestamp', '<=', partitions[3].time_max)
+    ]
+    assert read_opened_partitions(partitioned_config, io_tmp_dir, monkeypatch,
+                                  chunk_size=chunk_size, predicate=predicate) == \
+        [partitions[2].name, partitions[3].name], \
+        'expected only the partitions in the time range to be opened'
+
+    result = partitioned_config.read_table(io_tmp_dir, columns=['user_id'], predicate=predicate)
+    pd.testing.assert_frame_equal(
+        result,
+        expected[create_predicate_mask(expected, predicate)][['user_id']]
+    )
+
+    result = partitioned_config.read_table(io_tmp_dir, partition=(1, 3))
+    pd.testing.assert_frame_equal(
+        result,
+        expected.iloc[partitions[0].num_records:
+                      sum(p.num_records for p in partitions[:3])]
+    )
+
+    pytest.raises(ValueError, partitioned_config.save_table, table, io_tmp_dir)
+
+
+@pytest.mark.parametrize('dataset_name', [DATASET_LFM_1B, DATASET_LFM_2B])
+def test_partition_listening_events(
+        dataset_name: str,
+        io_tmp_dir: str,
+        monkeypatch: pytest.MonkeyPatch) -> None:
+    """Test the monthly partitions of the listening events that are processed for a dataset."""
+    shutil.copytree(
+        os.path.join('tests', 'unprocessed_sets', dataset_name),
+        os.path.join(io_tmp_dir, dataset_name)
+    )
+    data_registry = DataRegistry(io_tmp_dir, partition_events=True)
+    dataset = data_registry.get_set(dataset_name)
+    processor = data_registry.processors[dataset_name](dataset.data_dir, dataset_name)
+
+    events = processor.create_listening_events_config().read_table(dataset.data_dir)
+    months = get_month_keys(events['timestamp'])
+    events = events.iloc[np.argsort(months, kind='stable')].reset_index(drop=True)
+
+    for storage in [None, STORAGE_NPY]:
+        if storage is not None:
+            migrate_dataset_storage(dataset.data_dir, storage=storage, verbose=False)
+            dataset = DataRegistry(io_tmp_dir).get_set(dataset_name)
+
+        event_table_name = dataset.get_available_event_tables()[0]
+        event_table = dataset.config.events[event_table_name]
+        assert event_table.partitions is not None and event_table.partition_column == 'timestamp', \
+            'expected the listening events to be partitioned on the timestamp'
+        assert len(event_table.partitions) == len(np.unique(months)), \
+            'expected a partition for each month of the listening events'
+        assert event_table.num_records == len(events), 'expected all events to be partitioned'
+
+        pd.testing.assert_frame_equal(event_table.read_table(dataset.data_dir), events)
+
+        partition = event_table.partitions[len(event_table.partitions) // 2]
+        predicate = [
+            ('timestamp', '>=', partition.time_min),
+            ('timestamp', '<=', partition.time_max)
+        ]
+        assert read_opened_partitions(event_table, dataset.data_dir, monkeypatch,
+                                      predicate=predicate) == [partition.name], \
+            'expected only the partition of the month to be opened'
+
+        result = dataset.read_event_table(event_table_name, ['user_id'], predicate=predicate)
+        pd.testing.assert_frame_equal(
+            result,
+            events[create_predicate_mask(events, predicate)][['user_id']]
+        )
@@ -53,6 +53,15 @@ def test_recommender_system_constructor(io_tmp_dir: str) -> None:
     assert isinstance(recommender_system.experiment_factory, GroupFactory), \
         'expected experiment factory to be created on construction'
 
+    # a dataset that is ready in the background only marks the factory outdated
+    experiment_factory = recommender_system.experiment_factory
+    recommender_system._on_dataset_ready('dataset')
+    assert recommender_system.experiment_factory is experiment_factory, \
+        'did not expect the experiment factory to be swapped on the worker thread'
+    recommender_system.get_available_algorithms()
+    assert recommender_system.experiment_factory is not experiment_factory, \
+        'expected the experiment factory to be rebuilt on request when outdated'
+
     assert isinstance(recommender_system.thread_processor, ThreadProcessor), \
         'expected thread processor to be created on construction'
 